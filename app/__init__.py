@@ -1,33 +1,92 @@
 # File: app/__init__.py
 
-# This file initializes our Flask application and brings together the different components.
+# Application factory. Extensions are created unbound here and attached to
+# each app in create_app(), so importing `app` is cheap and several
+# independently configured instances can live in one process.
 
 from flask import Flask
 from flask_sqlalchemy import SQLAlchemy
 from flask_migrate import Migrate
 from flask_login import LoginManager
-from config import Config  # <-- IMPORT THE NEW CONFIG
+from config import Config
 
-# Create the main Flask application instance
-app = Flask(__name__)
-app.config.from_object(Config) # <-- APPLY CONFIG FROM THE FILE
+from app.tenancy import TenantSession
 
-# --- Database & Migration Engine Initialization ---
-db = SQLAlchemy(app)
-migrate = Migrate(app, db)
-login = LoginManager(app)
+# --- Database, migrations & login (bound per app in create_app) ---
+# The session class routes queries to the active tenant's bind (app/tenancy.py).
+db = SQLAlchemy(session_options={"class_": TenantSession})
+migrate = Migrate()
+login = LoginManager()
 
 # Tell Flask-Login which page to redirect to for login.
-login.login_view = 'login'
+login.login_view = 'auth.login'
 
-# We import the routes and models here at the bottom to avoid circular import errors.
-from app import routes, models
 
+def create_app(config_class=Config):
+    app = Flask(__name__)
+    app.config.from_object(config_class)
 
+    from app import tenancy, replicas
+    tenancy.configure_binds(app)
+    replicas.configure_binds(app)
+    db.init_app(app)
+    # Tenant and replica binds hold no models of their own. Flask-SQLAlchemy
+    # still registers a (shared) metadata per key, which would make
+    # db.create_all() in any other app look for those binds.
+    for key in app.config["SQLALCHEMY_BINDS"]:
+        db.metadatas.pop(key, None)
+    migrate.init_app(app, db)
+    login.init_app(app)
 
+    # --- Per-company database routing (no-op without TENANTS) ---
+    tenancy.init_app(app)
+    # --- Read replica for read-only endpoints (no-op without one) ---
+    replicas.init_app(app, db)
 
+    # --- Response compression & Cache-Control policies ---
+    from app import middleware
+    middleware.init_app(app)
 
+    # --- Cache shared by the workers (app/cache.py) ---
+    from app import cache
+    cache.init_app(app)
 
+    # --- Live dashboard deltas (server-sent events) ---
+    from app import live
+    live.init_app(app)
 
+    # --- Opt-in request profiling (signed header, admin flag or sampling) ---
+    if app.config.get('PROFILE_ENABLED', True):
+        from app import profiling
+        profiling.init_app(app)
 
+    # Models plus the session hooks that keep tombstones, the status
+    # transition log and lead scores in the same transaction as every write
+    # (and drop cached dashboards and map tiles).
+    from app import models  # noqa: F401
+    from app.services import (sync, funnel, scoring, clusters, attachments, webhooks, appointments,  # noqa: F401
+                              metrics)
 
+    from app.auth import bp as auth_bp
+    from app.dashboard import bp as dashboard_bp
+    from app.leads import bp as leads_bp
+    from app.deals import bp as deals_bp
+    from app.projector import bp as projector_bp
+    app.register_blueprint(auth_bp)
+    app.register_blueprint(dashboard_bp)
+    app.register_blueprint(leads_bp)
+    app.register_blueprint(deals_bp)
+    app.register_blueprint(projector_bp)
+
+    # Optional subsystems are only imported when switched on.
+    if app.config.get('API_ENABLED', True):
+        from app.api import bp as api_bp
+        app.register_blueprint(api_bp)
+    if app.config.get('PROFILE_ENABLED', True):
+        from app.admin import bp as admin_bp
+        app.register_blueprint(admin_bp)
+
+    from app import cli
+    cli.register(app)
+
+    return app
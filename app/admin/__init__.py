@@ -0,0 +1,8 @@
+# File: app/admin/__init__.py
+
+from flask import Blueprint
+
+bp = Blueprint('admin', __name__, url_prefix='/admin')
+
+# Imported at the bottom so the views can register themselves on bp.
+from app.admin import routes  # noqa: E402,F401
@@ -0,0 +1,27 @@
+# File: app/admin/routes.py
+
+from flask import current_app, render_template, abort, send_from_directory
+from flask_login import login_required
+
+from app import profiling
+from app.admin import bp
+
+
+# -----------------------------
+# Request profiles (app/profiling.py)
+# -----------------------------
+@bp.route('/profiles')
+@login_required
+def profiles():
+    if not profiling.is_admin():
+        abort(403)
+    rows = profiling.captures(current_app.config['PROFILE_DIR'])
+    return render_template('admin_profiles.html', title='Slowest Requests', profiles=rows)
+
+
+@bp.route('/profiles/<path:filename>')
+@login_required
+def profile_file(filename):
+    if not profiling.is_admin():
+        abort(403)
+    return send_from_directory(current_app.config['PROFILE_DIR'], filename, as_attachment=True)
@@ -0,0 +1,8 @@
+# File: app/api/__init__.py
+
+from flask import Blueprint
+
+bp = Blueprint('api', __name__)
+
+# Imported at the bottom so the views can register themselves on bp.
+from app.api import routes  # noqa: E402,F401
@@ -0,0 +1,603 @@
+# File: app/api/routes.py
+
+from datetime import date, datetime, timedelta
+from urllib.parse import quote
+
+from flask import current_app, request, abort, jsonify, send_file, send_from_directory, url_for
+from flask_login import current_user, login_required
+
+from app import db
+from app.api import bp
+from app.models import Appointment, Attachment, Job, Lead, Upload, User
+from app.services import (activity, jobs, sync, funnel, cohorts, scoring, geocoding, routing, clusters,
+                          attachments, forecast, appointments, kpis)
+
+# -----------------------------
+# Background jobs (enqueue + status)
+# -----------------------------
+def _own_job_or_404(job_id):
+    job = db.session.get(Job, job_id)
+    if job is None:
+        abort(404)
+    if job.user_id != current_user.id:
+        abort(403)
+    return job
+
+
+@bp.route('/jobs')
+@login_required
+def job_list():
+    recent = (Job.query.filter_by(user_id=current_user.id)
+              .order_by(Job.id.desc()).limit(20).all())
+    return jsonify([j.to_dict() for j in recent])
+
+
+@bp.route('/jobs/<int:job_id>')
+@login_required
+def job_status(job_id):
+    return jsonify(_own_job_or_404(job_id).to_dict())
+
+
+@bp.route('/jobs/<int:job_id>/download')
+@login_required
+def job_download(job_id):
+    job = _own_job_or_404(job_id)
+    result = job.to_dict()["result"] or {}
+    if job.kind != 'export_leads' or job.status != 'succeeded' or not result.get("filename"):
+        abort(404)
+    return send_from_directory(current_app.config['EXPORT_FOLDER'], result["filename"], as_attachment=True)
+
+
+@bp.route('/leads/import', methods=['POST'])
+@login_required
+def import_leads():
+    """Queue a CSV lead import. Accepts a multipart `file` or a raw text/csv body."""
+    upload = request.files.get('file')
+    text = upload.read().decode('utf-8-sig') if upload else request.get_data(as_text=True)
+    if not text.strip():
+        return jsonify({"error": "CSV body is empty"}), 400
+    job = jobs.enqueue('import_leads', {"user_id": current_user.id, "csv": text}, user_id=current_user.id)
+    db.session.commit()
+    return jobs.accepted(job)
+
+
+@bp.route('/leads/export', methods=['POST'])
+@login_required
+def export_leads():
+    job = jobs.enqueue('export_leads', {"user_id": current_user.id}, user_id=current_user.id)
+    db.session.commit()
+    return jobs.accepted(job)
+
+
+# -----------------------------
+# Lead priority
+# -----------------------------
+MAX_TOP_LEADS = 200
+
+
+@bp.route('/leads/top.json')
+@login_required
+def top_leads():
+    """Open leads to revisit today, highest priority score first."""
+    limit = max(1, min(request.args.get('limit', 50, type=int), MAX_TOP_LEADS))
+    return jsonify([
+        {"id": l.id, "name": l.full_name, "status": l.status, "phone_number": l.phone_number,
+         "address": l.address, "priority_score": round(l.priority_score, 2)}
+        for l in scoring.top_leads(current_user.id, limit)
+    ])
+
+
+# -----------------------------
+# Canvassing route
+# -----------------------------
+@bp.route('/route.json', methods=['POST'])
+@login_required
+def route_json():
+    """Visit order for {"lead_ids": [...]} (default: top-priority leads, or those nearest
+    "start" when given), from {"start": {"lat", "lng"}} or the first stop."""
+    data = request.get_json(silent=True) or {}
+    max_stops = current_app.config.get('ROUTE_MAX_STOPS', 300)
+    start = data.get('start')
+    try:
+        start = (float(start['lat']), float(start['lng'])) if start else None
+        lead_ids = [int(i) for i in data['lead_ids']] if data.get('lead_ids') is not None else None
+    except (KeyError, TypeError, ValueError):
+        return jsonify({"error": "lead_ids must be ids; start must be {lat, lng}"}), 400
+    if lead_ids is not None and len(lead_ids) > max_stops:
+        return jsonify({"error": f"at most {max_stops} stops per route"}), 400
+
+    if lead_ids is None:
+        if start is not None:
+            lead_ids = routing.lead_index(current_user.id).nearby(start[0], start[1], max_stops)
+        else:
+            lead_ids = [l.id for l in scoring.top_leads(current_user.id, max_stops)]
+    if lead_ids:
+        geocoding.geocode_leads(user_id=current_user.id, lead_ids=lead_ids)
+        db.session.commit()
+    leads = {l.id: l for l in Lead.query.filter(Lead.user_id == current_user.id, Lead.id.in_(lead_ids),
+                                                Lead.latitude.is_not(None))} if lead_ids else {}
+    stops = [leads[i] for i in dict.fromkeys(lead_ids) if i in leads]
+    plan = routing.plan_route([(l.latitude, l.longitude) for l in stops], start=start)
+    legs = plan["legs_km"] if start is not None else [0.0] + plan["legs_km"]
+    return jsonify({
+        "stops": [{"id": stops[i].id, "name": stops[i].full_name, "address": stops[i].address,
+                   "lat": stops[i].latitude, "lng": stops[i].longitude, "leg_km": leg}
+                  for i, leg in zip(plan["order"], legs)],
+        "total_km": plan["total_km"],
+        "skipped": [i for i in dict.fromkeys(lead_ids) if i not in leads],
+    })
+
+
+# -----------------------------
+# Map clusters
+# -----------------------------
+@bp.route('/map/clusters.json')
+@login_required
+def map_clusters():
+    """Lead clusters for ?bbox=south,west,north,east&zoom=N; scope=mine (default) or team (TEAM_MANAGERS)."""
+    try:
+        south, west, north, east = (float(v) for v in request.args['bbox'].split(','))
+        zoom = int(request.args.get('zoom', 12))
+    except (KeyError, ValueError):
+        return jsonify({"error": "bbox must be south,west,north,east and zoom an integer"}), 400
+    if not (south < north and west < east):
+        return jsonify({"error": "bbox must have south < north and west < east"}), 400
+    scope = request.args.get('scope', 'mine')
+    if scope not in ('team', 'mine'):
+        return jsonify({"error": "scope must be 'team' or 'mine'"}), 400
+    if scope == 'team' and not _is_manager():
+        abort(403)
+    out = clusters.viewport_clusters(south, west, north, east, zoom,
+                                     user_id=current_user.id if scope == 'mine' else None)
+    return jsonify({"zoom": zoom, "scope": scope, **out})
+
+
+# -----------------------------
+# Attachments (resumable uploads, file and thumbnail serving)
+# -----------------------------
+def _own_upload_or_404(upload_id):
+    upload = db.session.get(Upload, upload_id)
+    if upload is None or upload.user_id != current_user.id:
+        abort(404)
+    return upload
+
+
+def _own_attachment_or_404(attachment_id):
+    attachment = db.session.get(Attachment, attachment_id)
+    if attachment is None or attachments.owner_of(attachment.lead_id, attachment.deal_id) != current_user.id:
+        abort(404)
+    return attachment
+
+
+def _upload_error(exc):
+    headers = {"Upload-Offset": str(exc.offset)} if exc.offset is not None else {}
+    return jsonify({"error": str(exc), "offset": exc.offset}), exc.status, headers
+
+
+@bp.route('/attachments/uploads', methods=['POST'])
+@login_required
+def upload_start():
+    """Start an upload: {"filename", "size", "content_type", "lead_id" | "deal_id"}.
+
+    Then PATCH the bytes to the returned URL in chunks, each with an
+    Upload-Offset header; HEAD that URL to find where to resume.
+    """
+    data = request.get_json(silent=True) or {}
+    lead_id, deal_id = data.get('lead_id'), data.get('deal_id')
+    if attachments.owner_of(lead_id, deal_id) != current_user.id:
+        return jsonify({"error": "lead or deal not found"}), 404
+    try:
+        upload = attachments.start_upload(current_user.id, data.get('filename'), data.get('size'),
+                                          data.get('content_type'), lead_id=lead_id, deal_id=deal_id)
+    except attachments.UploadError as exc:
+        return _upload_error(exc)
+    db.session.commit()
+    url = url_for('api.upload_chunk', upload_id=upload.id)
+    return jsonify({"upload_id": upload.id, "offset": 0, "size": upload.size, "upload_url": url}), 201, \
+        {"Location": url}
+
+
+@bp.route('/attachments/uploads/<upload_id>', methods=['HEAD'])
+@login_required
+def upload_offset(upload_id):
+    upload = _own_upload_or_404(upload_id)
+    return "", 200, {"Upload-Offset": str(attachments.offset(upload)), "Upload-Length": str(upload.size),
+                     "Cache-Control": "no-store"}
+
+
+@bp.route('/attachments/uploads/<upload_id>', methods=['PATCH'])
+@login_required
+def upload_chunk(upload_id):
+    """Append the request body at Upload-Offset; 201 with the attachment once complete."""
+    upload = _own_upload_or_404(upload_id)
+    at, length = request.headers.get('Upload-Offset', type=int), request.content_length
+    if at is None:
+        return jsonify({"error": "Upload-Offset header is required"}), 400
+    if length is None:
+        return jsonify({"error": "Content-Length is required"}), 411
+    try:
+        done = attachments.write_chunk(upload, at, request.stream, length)
+    except attachments.UploadError as exc:
+        return _upload_error(exc)
+    if done < upload.size:
+        return "", 204, {"Upload-Offset": str(done)}
+    if attachments.owner_of(upload.lead_id, upload.deal_id) != current_user.id:
+        attachments.cancel_upload(upload)   # the lead or deal was deleted or archived mid-upload
+        db.session.commit()
+        return jsonify({"error": "lead or deal not found"}), 404
+    attachment = attachments.finish_upload(upload)
+    db.session.commit()
+    return jsonify(attachment.to_dict()), 201, {"Upload-Offset": str(done)}
+
+
+@bp.route('/attachments/uploads/<upload_id>', methods=['DELETE'])
+@login_required
+def upload_cancel(upload_id):
+    attachments.cancel_upload(_own_upload_or_404(upload_id))
+    db.session.commit()
+    return "", 204
+
+
+@bp.route('/attachments')
+@login_required
+def attachment_list():
+    """Attachments of ?lead_id= or ?deal_id=."""
+    lead_id, deal_id = request.args.get('lead_id', type=int), request.args.get('deal_id', type=int)
+    if attachments.owner_of(lead_id, deal_id) != current_user.id:
+        return jsonify({"error": "lead or deal not found"}), 404
+    return jsonify([a.to_dict() for a in attachments.listing(lead_id, deal_id)])
+
+
+def _send(path, relative, blob, mimetype, download_name, inline):
+    accel = current_app.config.get('ATTACHMENT_ACCEL_PREFIX')
+    if accel:   # nginx serves the bytes (sendfile, ranges) from an internal location
+        response = current_app.response_class(mimetype=mimetype)
+        response.headers["X-Accel-Redirect"] = accel.rstrip("/") + "/" + relative
+        response.headers["Content-Disposition"] = \
+            f"{'inline' if inline else 'attachment'}; filename*=UTF-8''{quote(download_name)}"
+    else:       # ranges via Werkzeug; sendfile through wsgi.file_wrapper or USE_X_SENDFILE
+        response = send_file(path, mimetype=mimetype, as_attachment=not inline, download_name=download_name,
+                             conditional=True, etag=blob.sha256, max_age=None)
+        response.headers.setdefault("Accept-Ranges", "bytes")   # Werkzeug only sets it on a 206
+    response.headers["Cache-Control"] = "private, max-age=31536000, immutable"   # content-addressed
+    response.headers["X-Content-Type-Options"] = "nosniff"
+    return response
+
+
+@bp.route('/attachments/<int:attachment_id>')
+@login_required
+def attachment_file(attachment_id):
+    attachment = _own_attachment_or_404(attachment_id)
+    blob = attachment.blob
+    inline = blob.content_type in current_app.config.get('ATTACHMENT_INLINE_TYPES', ())
+    return _send(attachments.blob_path(blob.sha256), attachments.relative_blob_path(blob.sha256), blob,
+                 blob.content_type if inline else 'application/octet-stream', attachment.filename, inline)
+
+
+@bp.route('/attachments/<int:attachment_id>/thumb')
+@login_required
+def attachment_thumb(attachment_id):
+    """JPEG thumbnail, ?size= one of ATTACHMENT_THUMB_SIZES (default the smallest)."""
+    attachment = _own_attachment_or_404(attachment_id)
+    sizes = current_app.config.get('ATTACHMENT_THUMB_SIZES', (256,))
+    size = request.args.get('size', sizes[0], type=int)
+    if size not in sizes:
+        return jsonify({"error": f"size must be one of {', '.join(map(str, sizes))}"}), 400
+    try:
+        path = attachments.thumbnail(attachment.blob, size)
+    except attachments.ThumbnailUnavailable as exc:
+        return jsonify({"error": str(exc)}), 404
+    except TimeoutError:
+        return jsonify({"error": "thumbnail is still being made"}), 503, {"Retry-After": "1"}
+    response = send_file(path, mimetype='image/jpeg', conditional=True,
+                         etag=f"{attachment.blob.sha256}-{size}", max_age=None)
+    response.headers["Cache-Control"] = "private, max-age=31536000, immutable"
+    return response
+
+
+@bp.route('/attachments/<int:attachment_id>', methods=['DELETE'])
+@login_required
+def attachment_delete(attachment_id):
+    db.session.delete(_own_attachment_or_404(attachment_id))
+    db.session.commit()
+    return "", 204
+
+
+# -----------------------------
+# Appointments (calendar, availability, storm-day rescheduling)
+# -----------------------------
+def _when(value, name):
+    try:
+        return datetime.fromisoformat(value)
+    except (TypeError, ValueError):
+        raise appointments.ScheduleError(f"{name} must be an ISO date-time")
+
+
+def _span(data):
+    """(starts_at, ends_at) from starts_at plus ends_at or minutes."""
+    starts_at = _when(data.get('starts_at'), 'starts_at')
+    if data.get('ends_at') is not None:
+        return starts_at, _when(data['ends_at'], 'ends_at')
+    try:
+        return starts_at, starts_at + timedelta(minutes=int(data.get('minutes', 60)))
+    except (TypeError, ValueError):
+        raise appointments.ScheduleError("minutes must be an integer")
+
+
+def _is_manager() -> bool:
+    return current_user.username in (current_app.config.get('TEAM_MANAGERS') or ())
+
+
+def _team(scope):
+    """Rep ids for scope=mine|team; team is TEAM_MANAGERS only (403 otherwise)."""
+    if scope not in ('team', 'mine'):
+        raise appointments.ScheduleError("scope must be 'team' or 'mine'")
+    if scope == 'mine':
+        return [current_user.id]
+    if not _is_manager():
+        abort(403)
+    return db.session.execute(db.select(User.id)).scalars().all()
+
+
+def _conflict(exc):
+    return jsonify({"error": str(exc), "conflicts": [a.to_dict() for a in exc.conflicts]}), 409
+
+
+def _own_appointment_or_404(appointment_id):
+    appt = db.session.get(Appointment, appointment_id)
+    if appt is None or current_user.id not in (appt.user_id, attachments.owner_of(lead_id=appt.lead_id)):
+        abort(404)
+    return appt
+
+
+@bp.route('/appointments')
+@login_required
+def appointment_list():
+    """The current rep's scheduled appointments in [start, end) (default: the next 7 days)."""
+    try:
+        start = _when(request.args['start'], 'start') if request.args.get('start') else \
+            datetime.combine(date.today(), datetime.min.time())
+        end = _when(request.args['end'], 'end') if request.args.get('end') else start + timedelta(days=7)
+    except appointments.ScheduleError as e:
+        return jsonify({"error": str(e)}), 400
+    rows = Appointment.query.filter(Appointment.user_id == current_user.id, Appointment.status == 'scheduled',
+                                    Appointment.starts_at < end, Appointment.ends_at > start) \
+        .order_by(Appointment.starts_at).all()
+    return jsonify([a.to_dict() for a in rows])
+
+
+@bp.route('/appointments', methods=['POST'])
+@login_required
+def appointment_create():
+    """Book {lead_id, starts_at, ends_at | minutes, user_id?, notes?}; 409 lists the clashes.
+
+    Reps book for themselves; TEAM_MANAGERS may pass another rep's user_id.
+    The lead must belong to the rep being booked.
+    """
+    data = request.get_json(silent=True) or {}
+    rep_id = data.get('user_id', current_user.id)
+    if not isinstance(rep_id, int) or isinstance(rep_id, bool):
+        return jsonify({"error": "user_id must be an integer"}), 400
+    if rep_id != current_user.id and not _is_manager():
+        abort(403)
+    if db.session.get(User, rep_id) is None:
+        return jsonify({"error": "user not found"}), 404
+    lead = db.session.get(Lead, data.get('lead_id') or 0)
+    if lead is None or lead.user_id != rep_id:
+        return jsonify({"error": "lead not found"}), 404
+    try:
+        appt = appointments.book(lead, rep_id, *_span(data), notes=data.get('notes'))
+    except appointments.ScheduleConflict as e:
+        return _conflict(e)
+    except appointments.ScheduleError as e:
+        return jsonify({"error": str(e)}), 400
+    db.session.commit()
+    return jsonify(appt.to_dict()), 201
+
+
+@bp.route('/appointments/<int:appointment_id>', methods=['PATCH'])
+@login_required
+def appointment_move(appointment_id):
+    appt = _own_appointment_or_404(appointment_id)
+    data = request.get_json(silent=True) or {}
+    try:
+        appointments.move(appt, *_span(data))
+    except appointments.ScheduleConflict as e:
+        return _conflict(e)
+    except appointments.ScheduleError as e:
+        return jsonify({"error": str(e)}), 400
+    if 'notes' in data:
+        appt.notes = data['notes']
+    db.session.commit()
+    return jsonify(appt.to_dict())
+
+
+@bp.route('/appointments/<int:appointment_id>', methods=['DELETE'])
+@login_required
+def appointment_cancel(appointment_id):
+    _own_appointment_or_404(appointment_id).status = 'cancelled'
+    db.session.commit()
+    return "", 204
+
+
+@bp.route('/appointments/availability')
+@login_required
+def appointment_availability():
+    """Free windows per rep for ?start=&end=&minutes=60&scope=mine|team (at most 62 days)."""
+    try:
+        start, end = _when(request.args.get('start'), 'start'), _when(request.args.get('end'), 'end')
+        minutes = request.args.get('minutes', 60, type=int)
+        if not (start < end <= start + timedelta(days=62)) or minutes <= 0:
+            raise appointments.ScheduleError("need start < end within 62 days and minutes > 0")
+        free = appointments.availability(_team(request.args.get('scope', 'mine')), start, end, minutes)
+    except appointments.ScheduleError as e:
+        return jsonify({"error": str(e)}), 400
+    return jsonify({"minutes": minutes, "free": {
+        str(uid): [[lo.isoformat(), hi.isoformat()] for lo, hi in slots] for uid, slots in free.items()}})
+
+
+@bp.route('/appointments/next')
+@login_required
+def appointment_next():
+    """Earliest open slot for ?minutes=60 after ?after= (default now) among ?scope=mine|team."""
+    try:
+        after = _when(request.args['after'], 'after') if request.args.get('after') else datetime.now()
+        minutes = request.args.get('minutes', 60, type=int)
+        found = appointments.next_open_slot(_team(request.args.get('scope', 'mine')), after, minutes)
+    except appointments.ScheduleError as e:
+        return jsonify({"error": str(e)}), 400
+    if found is None:
+        return jsonify({"slot": None})
+    uid, start = found
+    return jsonify({"slot": {"user_id": uid, "starts_at": start.isoformat(),
+                             "ends_at": (start + timedelta(minutes=minutes)).isoformat()}})
+
+
+@bp.route('/appointments/reschedule', methods=['POST'])
+@login_required
+def appointment_reschedule():
+    """Storm day: move {day, scope: mine|team, not_before?} appointments to the earliest open slots."""
+    data = request.get_json(silent=True) or {}
+    try:
+        day = date.fromisoformat(data.get('day') or '')
+        not_before = _when(data['not_before'], 'not_before') if data.get('not_before') else None
+        out = appointments.bulk_reschedule(day, _team(data.get('scope', 'mine')), not_before)
+    except ValueError as e:   # ScheduleError, or a bad day
+        return jsonify({"error": str(e)}), 400
+    db.session.commit()
+    return jsonify(out)
+
+
+# -----------------------------
+# Daily activity (range read, bulk upsert, CSV backfill)
+# -----------------------------
+def _upsert_activity(rows, mode):
+    try:
+        clean = activity.validate(rows)
+        n = activity.upsert_activities(current_user.id, clean, mode)
+    except activity.ActivityError as e:
+        return jsonify({"error": str(e), "errors": e.errors}), 400
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    db.session.commit()
+    return jsonify({"upserted": n, "mode": mode})
+
+
+@bp.route('/activity.json', methods=['GET'])
+@login_required
+def activity_list():
+    try:
+        end = date.fromisoformat(request.args['end']) if request.args.get('end') else date.today()
+        start = date.fromisoformat(request.args['start']) if request.args.get('start') else end.replace(day=1)
+    except ValueError:
+        return jsonify({"error": "start/end must be YYYY-MM-DD"}), 400
+    return jsonify({"start": start.isoformat(), "end": end.isoformat(),
+                    "days": activity.activity_range(current_user.id, start, end)})
+
+
+@bp.route('/activity.json', methods=['POST'])
+@login_required
+def activity_bulk():
+    """Upsert many days: {"rows": [{date, doors_knocked, appointments_set}], "mode": "replace"|"add"}."""
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict) or not isinstance(data.get("rows"), list):
+        return jsonify({"error": "Body must be an object with a 'rows' list"}), 400
+    return _upsert_activity(data["rows"], data.get("mode", "replace"))
+
+
+@bp.route('/activity/import', methods=['POST'])
+@login_required
+def activity_import():
+    """CSV backfill (header: date,doors_knocked,appointments_set). Multipart `file` or raw body."""
+    upload = request.files.get('file')
+    text = upload.read().decode('utf-8-sig') if upload else request.get_data(as_text=True)
+    if not text.strip():
+        return jsonify({"error": "CSV body is empty"}), 400
+    return _upsert_activity(activity.parse_csv(text), request.args.get('mode', 'replace'))
+
+
+# -----------------------------
+# Delta sync (offline field client)
+# -----------------------------
+@bp.route('/sync', methods=['GET'])
+@login_required
+def sync_pull():
+    """Changes to the user's rows after ?since=<cursor> (0 = full download)."""
+    since = request.args.get('since', 0, type=int)
+    limit = request.args.get('limit', sync.MAX_PULL, type=int)
+    return jsonify(sync.changes_since(current_user.id, since, limit))
+
+
+@bp.route('/sync', methods=['POST'])
+@login_required
+def sync_push():
+    """Apply batched offline mutations, then return results plus changes since the client's cursor."""
+    data = request.get_json(force=True) or {}
+    if not isinstance(data, dict):
+        return jsonify({"error": "body must be an object"}), 400
+    mutations = data.get('mutations') or []
+    if not isinstance(mutations, list):
+        return jsonify({"error": "mutations must be a list"}), 400
+    try:
+        since = int(data.get('since') or 0)
+    except (TypeError, ValueError):
+        return jsonify({"error": "since must be an integer cursor"}), 400
+    try:
+        results = sync.apply_mutations(current_user.id, mutations)
+    except sync.MutationError as e:
+        return jsonify({"error": str(e)}), 400
+    pulled = sync.changes_since(current_user.id, since)
+    return jsonify({"results": results, **pulled})
+
+
+# -----------------------------
+# Funnel velocity analytics
+# -----------------------------
+@bp.route('/analytics/funnel.json')
+@login_required
+def funnel_json():
+    """Time-in-stage, conversion and aging per stage, from the daily rollups."""
+    entity = request.args.get('entity', 'deal')
+    if entity not in ('lead', 'deal'):
+        return jsonify({"error": "entity must be 'lead' or 'deal'"}), 400
+    try:
+        start = date.fromisoformat(request.args['start']) if request.args.get('start') else None
+        end = date.fromisoformat(request.args['end']) if request.args.get('end') else None
+    except ValueError:
+        return jsonify({"error": "start/end must be YYYY-MM-DD"}), 400
+    return jsonify(funnel.funnel_report([current_user.id], entity, start, end))
+
+
+@bp.route('/analytics/cohorts.json')
+@login_required
+def cohorts_json():
+    """Conversion curves and revenue per lead-creation cohort (?grain=week|month&periods=N)."""
+    grain = request.args.get('grain', 'week')
+    if grain not in ('week', 'month'):
+        return jsonify({"error": "grain must be 'week' or 'month'"}), 400
+    periods = request.args.get('periods', type=int)
+    return jsonify(cohorts.cohort_report(current_user.id, grain, periods))
+
+
+@bp.route('/analytics/forecast.json')
+@login_required
+def forecast_json():
+    """Expected commission from open deals by month, against the income goal pace (?months=N)."""
+    months = request.args.get('months', type=int)
+    if months is not None and not 1 <= months <= 36:
+        return jsonify({"error": "months must be between 1 and 36"}), 400
+    return jsonify(forecast.forecast(current_user.id, months=months))
+
+
+@bp.route('/analytics/kpis.json')
+@login_required
+def kpi_trend_json():
+    """Nightly KPI snapshots by day (?start=&end=YYYY-MM-DD, default last 90 days; ?fields=a,b)."""
+    fields = [f for f in request.args.get('fields', '').split(',') if f] or None
+    try:
+        start = date.fromisoformat(request.args['start']) if request.args.get('start') else None
+        end = date.fromisoformat(request.args['end']) if request.args.get('end') else None
+        rows = kpis.trend(current_user.id, start, end, fields)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    return jsonify({"fields": fields or list(kpis.FIELDS), "days": rows})
@@ -0,0 +1,8 @@
+# File: app/auth/__init__.py
+
+from flask import Blueprint
+
+bp = Blueprint('auth', __name__)
+
+# Imported at the bottom so the views can register themselves on bp.
+from app.auth import routes  # noqa: E402,F401
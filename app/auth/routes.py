@@ -0,0 +1,68 @@
+# File: app/auth/routes.py
+
+from flask import render_template, flash, redirect, url_for
+from flask_login import login_user, logout_user, current_user
+
+from app import db
+from app.auth import bp
+from app.passwords import HashPoolBusy, needs_rehash, verify_password
+from app.forms import LoginForm, RegistrationForm
+from app.models import User
+
+# -----------------------------
+# Auth
+# -----------------------------
+def _busy(template, title, form):
+    """503 while this worker's password-hash pool is full."""
+    flash('Too many sign-ins right now, please try again in a moment.', 'warning')
+    return render_template(template, title=title, form=form), 503, {'Retry-After': '1'}
+
+
+@bp.route('/login', methods=['GET', 'POST'])
+def login():
+    if current_user.is_authenticated:
+        return redirect(url_for('dashboard.index'))
+    form = LoginForm()
+    if form.validate_on_submit():
+        user = User.query.filter_by(username=form.username.data).first()
+        try:
+            # A missing user still pays for a hash (see app/passwords.py).
+            ok = verify_password(user.password_hash if user else None, form.password.data)
+        except HashPoolBusy:
+            return _busy('login.html', 'Sign In', form)
+        if not ok:
+            flash('Invalid username or password', 'danger')
+            return redirect(url_for('auth.login'))
+        if needs_rehash(user.password_hash):
+            try:
+                user.set_password(form.password.data)   # upgrade to PASSWORD_HASH_METHOD
+                db.session.commit()
+            except HashPoolBusy:
+                pass   # the password checked out; upgrade on a quieter sign-in
+        login_user(user, remember=form.remember_me.data)
+        return redirect(url_for('dashboard.index'))
+    return render_template('login.html', title='Sign In', form=form)
+
+
+@bp.route('/logout')
+def logout():
+    logout_user()
+    return redirect(url_for('dashboard.index'))
+
+
+@bp.route('/register', methods=['GET', 'POST'])
+def register():
+    if current_user.is_authenticated:
+        return redirect(url_for('dashboard.index'))
+    form = RegistrationForm()
+    if form.validate_on_submit():
+        user = User(username=form.username.data, email=form.email.data)
+        try:
+            user.set_password(form.password.data)
+        except HashPoolBusy:
+            return _busy('register.html', 'Register', form)
+        db.session.add(user)
+        db.session.commit()
+        flash('Congratulations, you are now a registered user!', 'success')
+        return redirect(url_for('auth.login'))
+    return render_template('register.html', title='Register', form=form)
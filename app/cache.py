@@ -0,0 +1,379 @@
+# File: app/cache.py
+
+# Cache shared by every Gunicorn worker. Each worker keeps a small LRU of live
+# objects (CACHE_MEMORY_SIZE entries) in front of a shared tier that all
+# workers on the host, or all hosts with Redis, read and write:
+#
+#   CACHE_BACKEND = "sqlite"   a WAL-mode SQLite file at CACHE_SQLITE_PATH, read
+#                              through a CACHE_SQLITE_MMAP memory map (default)
+#                  "redis"     CACHE_REDIS_URL, needs the `redis` package;
+#                              "stub://" is an in-process stand-in for tests
+#                  "memory"    this process only
+#                  or a "package.module:Class" path
+#
+# Invalidation is by version, never by deleting keys. Every entry depends on
+# a few tags ("rep:7", "map", ...). A tag's version is a counter in the
+# shared tier, and the versions are part of the entry's key. A write bumps
+# the tags it touches (invalidate()), and every worker misses on its next
+# read. Old entries just age out. Tags are bumped when the ORM flushes, so
+# the writer's own transaction sees the change, and again after commit, so
+# a reader that cached the old rows in between doesn't keep them. Nothing is
+# stored while a request reads from a lagging replica.
+#
+# Hits (memory / shared) and misses are counted per key family, the part of
+# the key before the first ':', and added to the shared tier every
+# CACHE_STATS_EVERY lookups. `flask cache stats` prints them.
+
+import hashlib
+import importlib
+import math
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from collections import Counter, OrderedDict
+
+from flask import current_app, g, has_app_context, has_request_context
+from sqlalchemy import event
+
+from app import db, tenancy
+
+MISSING = object()
+
+
+# -----------------------------
+# Shared tiers
+# -----------------------------
+class SqliteTier:
+    """Entries and counters in one SQLite file, shared by the processes on this host.
+
+    Each thread of each process has its own connection (reopened after a fork).
+    """
+
+    def __init__(self, config):
+        self.path = config.get("CACHE_SQLITE_PATH")
+        self.mmap = int(config.get("CACHE_SQLITE_MMAP", 64 << 20))
+        self.max_entries = config.get("CACHE_SQLITE_MAX_ENTRIES", 100_000)
+        self._local = threading.local()
+        self._writes = 0
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        self._db().executescript("""
+            CREATE TABLE IF NOT EXISTS cache_entry (key TEXT PRIMARY KEY, value BLOB, expires REAL) WITHOUT ROWID;
+            CREATE TABLE IF NOT EXISTS cache_counter (key TEXT PRIMARY KEY, n INTEGER NOT NULL) WITHOUT ROWID;
+        """)
+
+    def _db(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=5.0, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(f"PRAGMA mmap_size={self.mmap}")
+            self._local.conn, self._local.pid = conn, os.getpid()
+        return conn
+
+    def get(self, key):
+        row = self._db().execute("SELECT value, expires FROM cache_entry WHERE key = ?", (key,)).fetchone()
+        return row[0] if row is not None and row[1] > time.time() else None
+
+    def set(self, key, value: bytes, ttl: float):
+        conn = self._db()
+        conn.execute("INSERT OR REPLACE INTO cache_entry VALUES (?, ?, ?)", (key, value, time.time() + ttl))
+        self._writes += 1
+        if self._writes % 1000 == 0:
+            self.prune()
+
+    def prune(self):
+        """Drop expired entries, then the soonest-expiring ones above CACHE_SQLITE_MAX_ENTRIES."""
+        conn = self._db()
+        conn.execute("DELETE FROM cache_entry WHERE expires <= ?", (time.time(),))
+        over = conn.execute("SELECT count(*) FROM cache_entry").fetchone()[0] - self.max_entries
+        if over > 0:
+            conn.execute("DELETE FROM cache_entry WHERE key IN "
+                         "(SELECT key FROM cache_entry ORDER BY expires LIMIT ?)", (over,))
+
+    def incr(self, key, n=1) -> int:
+        # UPSERT ... RETURNING needs SQLite 3.35; one statement keeps concurrent bumps from colliding.
+        return self._db().execute(
+            "INSERT INTO cache_counter VALUES (?, ?) ON CONFLICT(key) DO UPDATE SET n = n + excluded.n "
+            "RETURNING n", (key, n)).fetchone()[0]
+
+    def counters(self, keys) -> list:
+        keys = list(keys)
+        found = dict(self._db().execute(
+            f"SELECT key, n FROM cache_counter WHERE key IN ({','.join('?' * len(keys))})", keys)) if keys else {}
+        return [found.get(k, 0) for k in keys]
+
+    def scan_counters(self, prefix) -> dict:
+        return dict(self._db().execute(
+            "SELECT key, n FROM cache_counter WHERE key >= ? AND key < ?", (prefix, prefix + "\uffff")))
+
+    def clear(self):
+        self._db().execute("DELETE FROM cache_entry")
+
+
+class StubRedis:
+    """The handful of redis-py calls RedisTier makes, on a dict (CACHE_REDIS_URL = "stub://")."""
+
+    def __init__(self):
+        self._data, self._expires, self._lock = {}, {}, threading.Lock()
+
+    def _live(self, key):
+        exp = self._expires.get(key)
+        if exp is not None and exp <= time.time():
+            self._data.pop(key, None)
+            self._expires.pop(key, None)
+        return self._data.get(key)
+
+    def get(self, key):
+        with self._lock:
+            return self._live(key)
+
+    def mget(self, keys):
+        with self._lock:
+            return [self._live(k) for k in keys]
+
+    def set(self, key, value, ex=None):
+        with self._lock:
+            self._data[key] = value
+            self._expires[key] = time.time() + ex if ex else None
+
+    def incrby(self, key, n=1):
+        with self._lock:
+            value = int(self._live(key) or 0) + n
+            self._data[key] = str(value).encode()
+            return value
+
+    def scan_iter(self, match):
+        prefix = match.rstrip("*")
+        with self._lock:
+            return [k for k in list(self._data) if k.startswith(prefix) and self._live(k) is not None]
+
+    def delete(self, *keys):
+        with self._lock:
+            for k in keys:
+                self._data.pop(k, None)
+                self._expires.pop(k, None)
+
+
+class RedisTier:
+    """Entries and counters in Redis, shared by every host."""
+
+    ENTRY, COUNTER = "cache:e:", "cache:c:"
+
+    def __init__(self, config, client=None):
+        url = config.get("CACHE_REDIS_URL", "redis://localhost:6379/0")
+        if client is None and url.startswith("stub://"):
+            client = StubRedis()
+        if client is None:
+            import redis   # optional dependency, only needed with CACHE_BACKEND = "redis"
+            client = redis.Redis.from_url(url)
+        self.client = client
+
+    def get(self, key):
+        return self.client.get(self.ENTRY + key)
+
+    def set(self, key, value: bytes, ttl: float):
+        self.client.set(self.ENTRY + key, value, ex=max(1, math.ceil(ttl)))
+
+    def incr(self, key, n=1) -> int:
+        return int(self.client.incrby(self.COUNTER + key, n))
+
+    def counters(self, keys) -> list:
+        keys = list(keys)
+        return [int(v or 0) for v in self.client.mget([self.COUNTER + k for k in keys])] if keys else []
+
+    def scan_counters(self, prefix) -> dict:
+        keys = [k.decode() if isinstance(k, bytes) else k for k in self.client.scan_iter(self.COUNTER + prefix + "*")]
+        return {k[len(self.COUNTER):]: n for k, n in zip(keys, self.counters(k[len(self.COUNTER):] for k in keys))}
+
+    def clear(self):
+        keys = list(self.client.scan_iter(self.ENTRY + "*"))
+        if keys:
+            self.client.delete(*keys)
+
+
+TIERS = {"sqlite": SqliteTier, "redis": RedisTier, "memory": None}
+
+
+# -----------------------------
+# Cache
+# -----------------------------
+class Cache:
+    """Per-process LRU over an optional shared tier, with tag versions and hit/miss counters."""
+
+    def __init__(self, shared=None, size=2048, ttl=300, stats_every=200, prefix=""):
+        self.shared, self.prefix = shared, prefix
+        self.size, self.ttl, self.stats_every = size, ttl, stats_every
+        self._memory = OrderedDict()   # full key -> (expires, value)
+        self._versions = {}            # tag -> version, when there is no shared tier
+        self._counts = Counter()       # (family, "memory" | "shared" | "miss") -> n since the last flush
+        self._lock = threading.Lock()
+
+    # -- tags --
+    def _tag(self, tag) -> str:
+        return f"v:{self.prefix}{tenancy.current() or '-'}:{tag}"
+
+    def versions(self, tags) -> tuple:
+        names = [self._tag(t) for t in tags]
+        if self.shared is not None:
+            return tuple(self.shared.counters(names))
+        with self._lock:
+            return tuple(self._versions.get(n, 0) for n in names)
+
+    def bump(self, names):
+        """Advance already-qualified tag names (see invalidate())."""
+        for name in names:
+            if self.shared is not None:
+                self.shared.incr(name)
+            else:
+                with self._lock:
+                    self._versions[name] = self._versions.get(name, 0) + 1
+
+    def _full(self, key, versions) -> str:
+        return f"{self.prefix}{tenancy.current() or '-'}:{key}@{'.'.join(map(str, versions))}"
+
+    # -- lookups --
+    def _count(self, key, outcome):
+        with self._lock:
+            self._counts[(key.partition(":")[0], outcome)] += 1
+            flush = self.shared is not None and sum(self._counts.values()) >= self.stats_every
+            counts = self._counts if flush else None
+            if flush:
+                self._counts = Counter()
+        if counts:
+            for (family, what), n in counts.items():
+                self.shared.incr(f"stat:{family}:{what}", n)
+
+    def _get(self, key, full):
+        now = time.time()
+        with self._lock:
+            hit = self._memory.get(full)
+            if hit is not None and hit[0] > now:
+                self._memory.move_to_end(full)
+                value = hit[1]
+            else:
+                value = MISSING
+        if value is not MISSING:
+            self._count(key, "memory")
+            return value
+        if self.shared is not None:
+            raw = self.shared.get(full)
+            if raw is not None:
+                value = pickle.loads(raw)
+                self._remember(full, value, self.ttl)
+                self._count(key, "shared")
+                return value
+        self._count(key, "miss")
+        return MISSING
+
+    def _remember(self, full, value, ttl):
+        with self._lock:
+            self._memory[full] = (time.time() + ttl, value)
+            self._memory.move_to_end(full)
+            while len(self._memory) > self.size:
+                self._memory.popitem(last=False)
+
+    def _put(self, full, value, ttl):
+        if has_request_context() and g.get("db_replica"):
+            return   # a lagging replica could store old rows under a new version
+        self._remember(full, value, ttl)
+        if self.shared is not None:
+            try:
+                raw = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+            except (pickle.PicklingError, TypeError, AttributeError):
+                return   # this worker only
+            self.shared.set(full, raw, ttl)
+
+    def get(self, key, tags=(), default=None):
+        value = self._get(key, self._full(key, self.versions(tags)))
+        return default if value is MISSING else value
+
+    def set(self, key, value, tags=(), ttl=None):
+        self._put(self._full(key, self.versions(tags)), value, ttl or self.ttl)
+
+    def cached(self, key, compute, tags=(), ttl=None):
+        """The cached value for `key`, computing and storing it on a miss (None isn't stored).
+
+        Values come back shared between callers: treat them as read-only.
+        """
+        full = self._full(key, self.versions(tags))
+        value = self._get(key, full)
+        if value is MISSING:
+            value = compute()
+            if value is not None:
+                self._put(full, value, ttl or self.ttl)
+        return value
+
+    def stats(self) -> dict:
+        """{family: {"memory", "shared", "miss", "hit_rate"}}: all workers' with a shared tier, else ours."""
+        totals = Counter()
+        if self.shared is not None:
+            for name, n in self.shared.scan_counters("stat:").items():
+                _, family, what = name.split(":", 2)
+                totals[(family, what)] += n
+        with self._lock:
+            totals.update(self._counts)
+        out = {}
+        for (family, what), n in totals.items():
+            out.setdefault(family, {"memory": 0, "shared": 0, "miss": 0})[what] += n
+        for row in out.values():
+            looked = row["memory"] + row["shared"] + row["miss"]
+            row["hit_rate"] = round((row["memory"] + row["shared"]) / looked, 3) if looked else 0.0
+        return dict(sorted(out.items()))
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+        if self.shared is not None:
+            self.shared.clear()
+
+
+def cache(app=None) -> Cache:
+    return (app or current_app).extensions["cache"]
+
+
+def init_app(app):
+    """Create the app's cache and its shared tier."""
+    cfg = app.config
+    name = cfg.get("CACHE_BACKEND", "sqlite")
+    if name in TIERS:
+        tier_cls = TIERS[name]
+    else:
+        module, _, attr = name.partition(":")
+        tier_cls = getattr(importlib.import_module(module), attr)
+    app.extensions["cache"] = Cache(
+        shared=tier_cls(cfg) if tier_cls is not None else None,
+        size=cfg.get("CACHE_MEMORY_SIZE", 2048), ttl=cfg.get("CACHE_TTL", 300),
+        stats_every=cfg.get("CACHE_STATS_EVERY", 200),
+        # Apps on different databases can share one tier without seeing each other's entries.
+        prefix=cfg.get("CACHE_KEY_PREFIX") or
+        hashlib.sha1(str(cfg.get("SQLALCHEMY_DATABASE_URI")).encode()).hexdigest()[:8] + "/")
+    return app
+
+
+# -----------------------------
+# Invalidation on write
+# -----------------------------
+def invalidate(*tags, session=None):
+    """Bump `tags` now and again when `session` (default db.session) commits."""
+    if not tags or not has_app_context():
+        return
+    c = cache()
+    names = [c._tag(t) for t in tags]
+    c.bump(names)
+    session = session if session is not None else db.session()
+    session.info.setdefault("cache_tags", set()).update(names)
+
+
+@event.listens_for(db.session, "after_commit")
+def _bump_after_commit(session):
+    names = session.info.pop("cache_tags", None)
+    if names and has_app_context():
+        cache().bump(names)
+
+
+@event.listens_for(db.session, "after_rollback")
+def _forget_on_rollback(session):
+    session.info.pop("cache_tags", None)
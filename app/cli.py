@@ -0,0 +1,307 @@
+# File: app/cli.py
+
+# Flask CLI commands (`flask jobs ...`, `flask tenants ...`). Groups are attached to each app in
+# register(); heavy imports stay inside the commands so `flask --help` is fast.
+
+import click
+from flask import current_app
+from flask.cli import AppGroup
+
+from app import db, tenancy
+
+jobs = AppGroup('jobs', help='Background job queue.')
+funnel = AppGroup('funnel', help='Status-transition funnel analytics.')
+cohorts = AppGroup('cohorts', help='Lead cohort cache.')
+tenants = AppGroup('tenants', help='Per-company databases.')
+archive = AppGroup('archive', help='Cold storage for old leads.')
+leads = AppGroup('leads', help='Lead priority scores and geocodes.')
+profile = AppGroup('profile', help='Request profiling.')
+plans = AppGroup('plans', help='Commission pay plans.')
+attachments = AppGroup('attachments', help='Lead and deal file storage.')
+webhooks = AppGroup('webhooks', help='Outbound webhook deliveries.')
+appointments = AppGroup('appointments', help='Rep appointment calendar.')
+kpis = AppGroup('kpis', help='Daily per-rep KPI snapshots.')
+cache = AppGroup('cache', help='Shared cache tier.')
+
+
+def register(app):
+    for group in (jobs, funnel, cohorts, tenants, archive, leads, profile, plans, attachments, webhooks,
+                  appointments, kpis, cache):
+        app.cli.add_command(group)
+    app.cli.add_command(seed)
+
+
+@jobs.command('worker')
+@click.option('--threads', type=int, default=None, help='Thread pool size for I/O-bound jobs.')
+@click.option('--processes', type=int, default=None, help='Process pool size for CPU-bound jobs.')
+@click.option('--burst', is_flag=True, help='Exit once the queue is empty.')
+def jobs_worker(threads, processes, burst):
+    """Run a job worker in the foreground."""
+    from app.services.jobs import Worker
+    worker = Worker(current_app._get_current_object(), threads=threads, processes=processes)
+    try:
+        worker.run(burst=burst)
+    except KeyboardInterrupt:
+        worker.stop()
+
+
+@jobs.command('status')
+def jobs_status():
+    """Print job counts by kind and status (per tenant)."""
+    from app.models import Job
+    for tenant in tenancy.each():
+        rows = db.session.query(Job.kind, Job.status, db.func.count(Job.id)) \
+            .group_by(Job.kind, Job.status).order_by(Job.kind, Job.status).all()
+        for kind, status, n in rows:
+            click.echo(f"{tenant or '-':<16}{kind:<24}{status:<12}{n:>8}")
+
+
+@funnel.command('rollup')
+@click.option('--since', default=None, help='First day (YYYY-MM-DD) to rebuild; defaults to yesterday.')
+@click.option('--full', is_flag=True, help='Rebuild every day from the full transition log.')
+def funnel_rollup(since, full):
+    """Recompute the daily funnel aggregates (run nightly)."""
+    from datetime import date
+    from app.services import funnel as funnel_service
+    for tenant in tenancy.each():
+        start = None if full else (date.fromisoformat(since) if since else funnel_service.default_rollup_since())
+        rows = funnel_service.rebuild_daily_stats(start)
+        click.echo(f"{tenant or '-'}: funnel_daily_stat: {rows} rows rebuilt since {start or 'the beginning'}")
+
+
+@kpis.command('snapshot')
+@click.option('--batch-size', type=int, default=None, help='Reps per batch (default KPI_SNAPSHOT_BATCH_SIZE).')
+def kpis_snapshot(batch_size):
+    """Record every rep's dashboard and projector numbers for today (run nightly)."""
+    from app.services import kpis as kpi_service
+    for tenant in tenancy.each():
+        out = kpi_service.snapshot(batch_size=batch_size)
+        click.echo(f"{tenant or '-'}: {out['day']}: {out['written']} snapshots written, {out['skipped']} already taken")
+
+
+@cohorts.command('reset')
+@click.option('--user-id', type=int, default=None)
+@click.option('--grain', type=click.Choice(['week', 'month']), default=None)
+def cohorts_reset(user_id, grain):
+    """Forget frozen cohorts so they are recomputed on next request."""
+    from app.services import cohorts as cohort_service
+    for tenant in tenancy.each():
+        n = cohort_service.reset_cache(user_id, grain)
+        click.echo(f"{tenant or '-'}: cohort_snapshot: {n} rows deleted")
+
+
+@archive.command('run')
+@click.option('--months', type=float, default=None, help='Archive leads untouched this long (default ARCHIVE_AFTER_MONTHS).')
+@click.option('--batch-size', type=int, default=None)
+def archive_run(months, batch_size):
+    """Move finished and stale leads with their deals to the archive tables."""
+    from datetime import datetime, timedelta
+    from app.services import archive as archive_service
+    cutoff = datetime.utcnow() - timedelta(days=round(months * 30.4375)) if months else None
+    for tenant in tenancy.each():
+        out = archive_service.archive_leads(cutoff=cutoff, batch_size=batch_size)
+        click.echo(f"{tenant or '-'}: archived {out['leads']} leads, {out['deals']} deals "
+                   f"in {out['batches']} batches (untouched since {out['cutoff']})")
+
+
+@leads.command('rescore')
+def leads_rescore():
+    """Recompute every lead's priority score (run nightly)."""
+    from app.services import scoring
+    for tenant in tenancy.each():
+        click.echo(f"{tenant or '-'}: rescored {scoring.rescore_all()} leads")
+
+
+@leads.command('geocode')
+@click.option('--limit', type=int, default=None, help='Look up at most this many leads per tenant.')
+def leads_geocode(limit):
+    """Geocode leads whose address is new or changed."""
+    from app.services import geocoding
+    for tenant in tenancy.each():
+        out = geocoding.geocode_leads(limit=limit)
+        db.session.commit()
+        click.echo(f"{tenant or '-'}: geocoded {out['found']} of {out['looked_up']} leads")
+
+
+@profile.command('token')
+@click.option('--label', default='ops', help='Recorded in the token (who asked).')
+def profile_token(label):
+    """Print an X-Profile header value that profiles any request sent with it."""
+    from app import profiling
+    click.echo(f"{profiling.HEADER}: {profiling.make_token(label=label)}")
+
+
+@attachments.command('prune')
+def attachments_prune():
+    """Delete unreferenced files and abandoned uploads (per tenant)."""
+    from app.services import attachments as attachment_service
+    for tenant in tenancy.each():
+        out = attachment_service.prune()
+        click.echo(f"{tenant or '-'}: removed {out['blobs']} blobs, {out['uploads']} abandoned uploads")
+
+
+@webhooks.command('dispatch')
+@click.option('--threads', type=int, default=None, help='Concurrent deliveries across all endpoints.')
+@click.option('--burst', is_flag=True, help='Exit once nothing is due.')
+def webhooks_dispatch(threads, burst):
+    """Deliver outbox events to WEBHOOK_ENDPOINTS in the foreground."""
+    from app.services.webhooks import Dispatcher
+    dispatcher = Dispatcher(current_app._get_current_object(), threads=threads)
+    try:
+        dispatcher.run(burst=burst)
+    except KeyboardInterrupt:
+        dispatcher.stop()
+
+
+@webhooks.command('status')
+def webhooks_status():
+    """Print delivery counts by endpoint and status (per tenant)."""
+    from app.models import WebhookDelivery as D
+    for tenant in tenancy.each():
+        rows = db.session.query(D.endpoint, D.status, db.func.count(D.id)) \
+            .group_by(D.endpoint, D.status).order_by(D.endpoint, D.status).all()
+        for endpoint, status, n in rows:
+            click.echo(f"{tenant or '-':<16}{endpoint:<24}{status:<12}{n:>8}")
+
+
+@webhooks.command('replay')
+@click.option('--endpoint', default=None, help='Only this endpoint (default: all).')
+def webhooks_replay(endpoint):
+    """Queue dead-lettered deliveries again."""
+    from app.services import webhooks as webhook_service
+    for tenant in tenancy.each():
+        n = webhook_service.replay(endpoint)
+        db.session.commit()
+        click.echo(f"{tenant or '-'}: {n} deliveries queued again")
+
+
+@webhooks.command('prune')
+@click.option('--days', type=int, default=None, help='Keep delivered events this long (default WEBHOOK_RETENTION_DAYS).')
+def webhooks_prune(days):
+    """Delete delivered events past retention."""
+    from app.services import webhooks as webhook_service
+    for tenant in tenancy.each():
+        out = webhook_service.prune(days)
+        click.echo(f"{tenant or '-'}: removed {out['deliveries']} deliveries, {out['events']} events")
+
+
+@appointments.command('reschedule')
+@click.argument('day', type=click.DateTime(formats=['%Y-%m-%d']))
+@click.option('--user', 'username', default=None, help='Only this rep (default: everyone).')
+def appointments_reschedule(day, username):
+    """Move DAY's appointments (e.g. a storm day) to the earliest open slots after it."""
+    from app.services import appointments as appointment_service
+    for tenant in tenancy.each():
+        user_id = _user_id(username)
+        out = appointment_service.bulk_reschedule(day.date(), None if user_id is None else [user_id])
+        db.session.commit()
+        click.echo(f"{tenant or '-'}: moved {len(out['moved'])}, unplaced {len(out['unplaced'])}")
+
+
+@cache.command('stats')
+def cache_stats():
+    """Print hits (per-worker memory, shared tier) and misses by key family, across workers."""
+    from app.cache import cache as app_cache
+    click.echo(f"{'family':<16}{'memory':>10}{'shared':>10}{'miss':>10}{'hit rate':>10}")
+    for family, row in app_cache().stats().items():
+        click.echo(f"{family:<16}{row['memory']:>10}{row['shared']:>10}{row['miss']:>10}{row['hit_rate']:>10.1%}")
+
+
+@cache.command('clear')
+def cache_clear():
+    """Drop every shared entry (e.g. after restoring a database behind the app's back)."""
+    from app.cache import cache as app_cache
+    app_cache().clear()
+    click.echo("cache cleared")
+
+
+def _user_id(username):
+    from app.models import User
+    if username is None:
+        return None
+    user = User.query.filter_by(username=username).first()
+    if user is None:
+        raise click.BadParameter(f"No user named {username}", param_hint='--user')
+    return user.id
+
+
+@plans.command('set')
+@click.argument('rules_file', type=click.File('r'))
+@click.option('--user', 'username', default=None, help='Rep the plan is for (default: company-wide).')
+@click.option('--name', default=None, help='Plan name shown to the rep.')
+def plans_set(rules_file, username, name):
+    """Create or replace a pay plan from a JSON rules file."""
+    from app.services import commissions
+    try:
+        plan = commissions.save_plan(_user_id(username), rules_file.read(), name=name)
+    except ValueError as exc:
+        raise click.UsageError(str(exc))
+    db.session.commit()
+    click.echo(f"{tenancy.current() or '-'}: {plan.name} v{plan.version} for {username or 'everyone'}")
+
+
+@plans.command('show')
+@click.option('--user', 'username', default=None, help='Show the plan that applies to this rep.')
+def plans_show(username):
+    """Print the plan rules that apply to a rep (or the company default)."""
+    import json
+    from app.services import commissions
+    plan = commissions.plan_for(_user_id(username))
+    click.echo(f"{plan.name} v{plan.version}")
+    click.echo(json.dumps(plan.rules, indent=2, sort_keys=True))
+
+
+@click.command('seed')
+@click.option('--users', type=int, default=10, show_default=True, help='Reps to generate.')
+@click.option('--seed', 'random_seed', type=int, default=42, show_default=True, help='Random seed.')
+@click.option('--years', type=float, default=None, help='Years of history (default: SEED_PROFILE).')
+@click.option('--end', default=None, help='Last day of history (YYYY-MM-DD); defaults to today.')
+@click.option('--batch-size', type=int, default=None, help='Rows per INSERT (default: SEED_BATCH_SIZE).')
+@click.option('--prefix', default='seed', show_default=True, help='Username prefix.')
+@click.option('--password', default='seed', show_default=True, help='Password for every seeded user.')
+@click.option('--tenant', default=None, help='Seed this tenant database instead of the default.')
+def seed(users, random_seed, years, end, batch_size, prefix, password, tenant):
+    """Generate synthetic reps with multi-year funnels (reproducible per --seed)."""
+    import time
+    from datetime import date
+    from app.services import seed as seeder
+    tenancy.activate(tenant)
+    t0 = time.perf_counter()
+    try:
+        counts = seeder.seed(users=users, seed=random_seed, prefix=prefix, password=password,
+                             end=date.fromisoformat(end) if end else None, years=years,
+                             batch_size=batch_size,
+                             progress=lambda done, total: click.echo(f"{done}/{total} reps", err=True))
+    except ValueError as exc:
+        raise click.UsageError(str(exc))
+    elapsed = time.perf_counter() - t0
+    total = sum(counts.values())
+    click.echo(f"{tenant or '-'}: " + ", ".join(f"{n} {name}" for name, n in counts.items())
+               + f" in {elapsed:.1f}s ({total / elapsed:,.0f} rows/s)")
+
+
+@tenants.command('list')
+def tenants_list():
+    """Show each tenant and where its database lives."""
+    for name in tenancy.names():
+        click.echo(f"{name:<20}{tenancy.engine(name).url.render_as_string(hide_password=True)}")
+
+
+@tenants.command('upgrade')
+@click.option('--revision', default='head', help='Target revision (default: head).')
+@click.option('--tenant', 'only', multiple=True, help='Limit to these tenants (repeatable).')
+def tenants_upgrade(revision, only):
+    """Apply migrations to every tenant database, one at a time."""
+    from flask_migrate import upgrade
+    selected = [t for t in tenancy.names() if not only or t in only]
+    unknown = set(only) - set(selected)
+    if unknown:
+        raise click.BadParameter(f"Unknown tenant(s): {', '.join(sorted(unknown))}", param_hint='--tenant')
+    for name in selected:
+        engine = tenancy.engine(name)
+        if engine.dialect.name == 'postgresql':
+            with engine.begin() as conn:
+                conn.exec_driver_sql(f'CREATE SCHEMA IF NOT EXISTS "{name}"')
+        click.echo(f"{name}: upgrading to {revision}")
+        upgrade(revision=revision, x_arg=[f"tenant={name}"])
+
@@ -0,0 +1,8 @@
+# File: app/dashboard/__init__.py
+
+from flask import Blueprint
+
+bp = Blueprint('dashboard', __name__)
+
+# Imported at the bottom so the views can register themselves on bp.
+from app.dashboard import routes  # noqa: E402,F401
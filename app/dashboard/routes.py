@@ -0,0 +1,100 @@
+# File: app/dashboard/routes.py
+
+from datetime import date
+
+from flask import Response, current_app, render_template, flash, redirect, url_for, request, stream_with_context
+from flask_login import current_user, login_required
+from sqlalchemy.orm import selectinload
+
+from app import db, live, replicas
+from app.dashboard import bp
+from app.forms import SettingsForm, DailyActivityForm
+from app.models import Lead, Settings, DailyActivity
+from app.services import activity, forecast, metrics
+
+# -----------------------------
+# Dashboard
+# -----------------------------
+@bp.route('/')
+@bp.route('/index', methods=['GET', 'POST'])
+@login_required
+def index():
+    settings_form = SettingsForm()
+    activity_form = DailyActivityForm()
+
+    settings = Settings.query.filter_by(user_id=current_user.id).first()
+    if not settings:
+        # A lagging replica must not make us insert a duplicate row.
+        replicas.use_primary()
+        settings = Settings.query.filter_by(user_id=current_user.id).first()
+    if not settings:
+        settings = Settings(user_id=current_user.id)
+        db.session.add(settings)
+        db.session.commit()
+
+    if 'submit_settings' in request.form and settings_form.validate_on_submit():
+        settings.annual_income_goal = settings_form.annual_income_goal.data
+        db.session.commit()
+        live.publish_changes(current_user.id)
+        flash('Your income goal has been updated!', 'success')
+        return redirect(url_for('dashboard.index'))
+
+    if 'submit_activity' in request.form and activity_form.validate_on_submit():
+        # One atomic upsert: concurrent submissions for the same day can't duplicate it.
+        try:
+            rows = activity.validate([{
+                "date": date.today(),
+                "doors_knocked": activity_form.doors_knocked.data,
+                "appointments_set": activity_form.appointments_set.data,
+            }])
+        except activity.ActivityError as e:
+            flash(e.errors[0]["error"], 'danger')
+            return redirect(url_for('dashboard.index'))
+        activity.upsert_activities(current_user.id, rows)
+        db.session.commit()
+        live.publish_changes(current_user.id)
+        flash('Your daily activity has been logged!', 'success')
+        return redirect(url_for('dashboard.index'))
+
+    # prefill GET
+    today_activity = DailyActivity.query.filter_by(
+        date=date.today(), user_id=current_user.id
+    ).first()
+    if request.method == 'GET':
+        settings_form.annual_income_goal.data = settings.annual_income_goal
+        if today_activity:
+            activity_form.doors_knocked.data = today_activity.doors_knocked
+            activity_form.appointments_set.data = today_activity.appointments_set
+        else:
+            activity_form.doors_knocked.data = 0
+            activity_form.appointments_set.data = 0
+
+    # The table shows every lead's deal badges: load the deals in one extra query, not one per lead.
+    leads = Lead.query.filter_by(user_id=current_user.id).options(selectinload(Lead.deals)).all()
+    summary = metrics.dashboard_summary(current_user.id, settings.annual_income_goal)
+    cash_flow = forecast.forecast(current_user.id, months=current_app.config.get('FORECAST_DASHBOARD_MONTHS', 6))
+
+    return render_template(
+        'index.html',
+        title='Dashboard',
+        leads=leads,
+        pipeline_value=summary['pipeline_value'],
+        potential_commission=summary['potential_commission'],
+        earned_commission=summary['earned_commission'],
+        settings_form=settings_form,
+        activity_form=activity_form,
+        annual_income_goal=settings.annual_income_goal,
+        projections=summary['projections'],
+        forecast=cash_flow,
+    )
+
+
+@bp.route('/events')
+@login_required
+def events():
+    """Server-sent dashboard deltas for the current user (see app/live.py)."""
+    cfg = current_app.config
+    body = live.stream(live.channel(current_user.id), heartbeat=cfg.get('LIVE_HEARTBEAT', 15),
+                       max_seconds=cfg.get('LIVE_STREAM_SECONDS', 300))
+    return Response(stream_with_context(body), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-store', 'X-Accel-Buffering': 'no'})
@@ -0,0 +1,8 @@
+# File: app/deals/__init__.py
+
+from flask import Blueprint
+
+bp = Blueprint('deals', __name__)
+
+# Imported at the bottom so the views can register themselves on bp.
+from app.deals import routes  # noqa: E402,F401
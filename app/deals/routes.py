@@ -0,0 +1,113 @@
+# File: app/deals/routes.py
+
+from flask import render_template, flash, redirect, url_for, request, abort
+from flask_login import current_user, login_required
+
+from app import db, live
+from app.deals import bp
+from app.forms import DealForm
+from app.models import Lead, Deal
+
+# -----------------------------
+# Deals
+# -----------------------------
+def _ensure_contract_price_if_completed(form):
+    """Attach a validation error if status is Job Completed but price is empty/nonpositive."""
+    if (form.status.data == 'Job Completed') and (not form.contract_price.data or form.contract_price.data <= 0):
+        form.contract_price.errors.append('Contract price is required for completed jobs.')
+        return False
+    return True
+
+
+@bp.route('/lead/<int:lead_id>/add_deal', methods=['GET', 'POST'])
+@login_required
+def add_deal(lead_id):
+    lead = Lead.query.get_or_404(lead_id)
+    if lead.user_id != current_user.id:
+        abort(403)
+
+    form = DealForm()
+
+    # Prefill defaults on GET
+    if request.method == 'GET':
+        if form.commission_base.data is None:
+            form.commission_base.data = 'profit'
+        if form.company_margin.data is None:
+            form.company_margin.data = current_user.company_margin or 30.0
+        if form.commission_rate.data is None:
+            form.commission_rate.data = current_user.commission_rate or 40.0
+
+    if form.validate_on_submit():
+        if not _ensure_contract_price_if_completed(form):
+            return render_template('add_deal.html', title='Add Deal', form=form, lead=lead)
+
+        deal = Deal(
+            status=form.status.data,
+            contract_price=form.contract_price.data or 0.0,
+            commission_rate=form.commission_rate.data,
+            commission_base=form.commission_base.data,
+            company_margin=form.company_margin.data or 0.0,
+            lead_id=lead.id,
+        )
+        db.session.add(deal)
+        db.session.commit()
+        # keep lead.status in sync with its deals
+        lead.refresh_status_from_deals()
+        db.session.commit()
+        live.publish_changes(current_user.id, lead_ids=[lead.id])
+
+        flash(f'Deal created for {lead.first_name} {lead.last_name}!', 'success')
+        return redirect(url_for('leads.lead_detail', lead_id=lead.id))
+
+    return render_template('add_deal.html', title='Add Deal', form=form, lead=lead)
+
+
+@bp.route('/deal/edit/<int:deal_id>', methods=['GET', 'POST'])
+@login_required
+def edit_deal(deal_id):
+    deal = Deal.query.get_or_404(deal_id)
+    if deal.lead.user_id != current_user.id:
+        abort(403)
+
+    form = DealForm()
+
+    if request.method == 'GET':
+        form.status.data = deal.status
+        form.contract_price.data = deal.contract_price
+        form.commission_rate.data = deal.commission_rate
+        form.commission_base.data = deal.commission_base or 'profit'
+        form.company_margin.data = deal.company_margin if (deal.commission_base or 'profit') == 'profit' else 0.0
+
+    if form.validate_on_submit():
+        if not _ensure_contract_price_if_completed(form):
+            return render_template('edit_deal.html', title='Edit Deal', form=form, deal=deal)
+
+        deal.status = form.status.data
+        deal.contract_price = form.contract_price.data or 0.0
+        deal.commission_rate = form.commission_rate.data
+        deal.commission_base = form.commission_base.data
+        deal.company_margin = form.company_margin.data or 0.0
+        db.session.commit()
+        lead = deal.lead
+        lead.refresh_status_from_deals()
+        db.session.commit()
+        live.publish_changes(current_user.id, lead_ids=[lead.id])
+
+        flash('Deal information has been updated!', 'success')
+        return redirect(url_for('leads.lead_detail', lead_id=deal.lead_id))
+
+    return render_template('edit_deal.html', title='Edit Deal', form=form, deal=deal)
+
+
+@bp.route('/deal/delete/<int:deal_id>', methods=['POST'])
+@login_required
+def delete_deal(deal_id):
+    deal = Deal.query.get_or_404(deal_id)
+    if deal.lead.user_id != current_user.id:
+        abort(403)
+    lead_id = deal.lead_id
+    db.session.delete(deal)
+    db.session.commit()
+    live.publish_changes(current_user.id, lead_ids=[lead_id])
+    flash('The deal has been deleted.', 'success')
+    return redirect(url_for('leads.lead_detail', lead_id=lead_id))
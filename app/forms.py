@@ -4,7 +4,10 @@ from wtforms import (
     StringField, PasswordField, BooleanField, SubmitField, IntegerField,
     TextAreaField, DecimalField, SelectField, FloatField, RadioField
 )
-from wtforms.validators import DataRequired, Email, EqualTo, ValidationError, NumberRange, Optional
+from wtforms.validators import DataRequired, Email, EqualTo, NumberRange, Optional
+from sqlalchemy import or_, select
+
+from app import db
 from app.models import User, LEAD_STATUSES  # shared status list
 
 # Shared status choices for Lead and Deal
@@ -79,13 +82,19 @@ class RegistrationForm(FlaskForm):
     password2 = PasswordField('Repeat Password', validators=[DataRequired(), EqualTo('password')])
     submit = SubmitField('Register')
 
-    def validate_username(self, username):
-        if User.query.filter_by(username=username.data).first():
-            raise ValidationError('Please use a different username.')
-
-    def validate_email(self, email):
-        if User.query.filter_by(email=email.data).first():
-            raise ValidationError('Please use a different email address.')
+    def validate(self, **kwargs):
+        rv = super().validate(**kwargs)
+        if not rv:
+            return False
+        # One query for both unique columns, before the password is hashed.
+        taken = db.session.execute(
+            select(User.username, User.email)
+            .where(or_(User.username == self.username.data, User.email == self.email.data))).all()
+        if any(username == self.username.data for username, _ in taken):
+            self.username.errors.append('Please use a different username.')
+        if any(email == self.email.data for _, email in taken):
+            self.email.errors.append('Please use a different email address.')
+        return not taken
 
 # -----------------------------
 # Manual projector
@@ -0,0 +1,8 @@
+# File: app/leads/__init__.py
+
+from flask import Blueprint
+
+bp = Blueprint('leads', __name__)
+
+# Imported at the bottom so the views can register themselves on bp.
+from app.leads import routes  # noqa: E402,F401
@@ -0,0 +1,129 @@
+# File: app/leads/routes.py
+
+from flask import render_template, flash, redirect, url_for, request, abort
+from flask_login import current_user, login_required
+
+from app import db, live
+from app.forms import LeadForm
+from app.leads import bp
+from app.models import Lead
+from app.services import archive as archive_service
+
+ARCHIVE_PAGE_SIZE = 50
+
+SYNONYMS = {
+    "Appointment Set": "Appt",
+    "Contract Signed": "Signed",
+    "Job Completed": "Completed",
+}
+def _norm(s): return SYNONYMS.get(s, s)
+
+
+# -----------------------------
+# Leads
+# -----------------------------
+@bp.route('/add_lead', methods=['GET', 'POST'])
+@login_required
+def add_lead():
+    form = LeadForm()
+    if form.validate_on_submit():
+        lead = Lead(
+            first_name=form.first_name.data,
+            last_name=form.last_name.data,
+            phone_number=form.phone_number.data,
+            email=form.email.data,
+            address=form.address.data,
+            notes=form.notes.data,
+            user_id=current_user.id,  # Lead.status uses model default
+        )
+        db.session.add(lead)
+        db.session.commit()
+        live.publish_changes(current_user.id, lead_ids=[lead.id])
+        flash(f'Lead for {lead.first_name} {lead.last_name} created successfully!', 'success')
+        return redirect(url_for('dashboard.index'))
+    return render_template('add_lead.html', title='Add New Lead', form=form)
+
+
+@bp.route('/lead/<int:lead_id>')
+@login_required
+def lead_detail(lead_id):
+    lead = Lead.query.get_or_404(lead_id)
+    if lead.user_id != current_user.id:
+        abort(403)
+    return render_template('lead_detail.html', title=f'Lead: {lead.first_name}', lead=lead)
+
+
+@bp.route('/lead/delete/<int:lead_id>', methods=['POST'])
+@login_required
+def delete_lead(lead_id):
+    lead = Lead.query.get_or_404(lead_id)
+    if lead.user_id != current_user.id:
+        abort(403)
+    lead_name = f"{lead.first_name} {lead.last_name}"
+    db.session.delete(lead)
+    db.session.commit()
+    live.publish_changes(current_user.id, removed=[lead_id])
+    flash(f'Lead for {lead_name} has been deleted.', 'success')
+    return redirect(url_for('dashboard.index'))
+
+
+@bp.route('/lead/edit/<int:lead_id>', methods=['GET', 'POST'])
+@login_required
+def edit_lead(lead_id):
+    """Edit all lead fields, including status."""
+    lead = Lead.query.get_or_404(lead_id)
+    if lead.user_id != current_user.id:
+        abort(403)
+
+    form = LeadForm(obj=lead)
+
+    if request.method == 'POST':
+        if not form.validate_on_submit():
+            flash(f"Form errors: {form.errors}", "danger")
+            return render_template('edit_lead.html', title='Edit Lead', form=form, lead=lead)
+
+        before = lead.status
+        new_status = _norm(form.status.data)
+
+        lead.first_name   = form.first_name.data
+        lead.last_name    = form.last_name.data
+        lead.phone_number = form.phone_number.data
+        lead.email        = form.email.data
+        lead.address      = form.address.data
+        lead.notes        = form.notes.data
+        lead.status       = new_status
+
+        # push lead status down to every existing deal
+        for d in lead.deals:
+            d.status = new_status
+
+        db.session.commit()
+        live.publish_changes(current_user.id, lead_ids=[lead.id])
+        flash(f"Lead saved. Status: {before} → {lead.status} (applied to {len(lead.deals)} deal(s))", "success")
+        return redirect(url_for('leads.lead_detail', lead_id=lead.id))
+    return render_template('edit_lead.html', title='Edit Lead', form=form, lead=lead)
+
+
+# -----------------------------
+# Archive (cold storage)
+# -----------------------------
+@bp.route('/archive')
+@login_required
+def archive():
+    q = request.args.get('q', '')
+    page = max(1, request.args.get('page', 1, type=int))
+    rows = archive_service.search(current_user.id, q, limit=ARCHIVE_PAGE_SIZE + 1,
+                                  offset=(page - 1) * ARCHIVE_PAGE_SIZE)
+    return render_template('archive.html', title='Archived Leads', leads=rows[:ARCHIVE_PAGE_SIZE],
+                           q=q, page=page, has_next=len(rows) > ARCHIVE_PAGE_SIZE)
+
+
+@bp.route('/archive/<int:archived_id>/restore', methods=['POST'])
+@login_required
+def restore_lead(archived_id):
+    lead = archive_service.restore_lead(current_user.id, archived_id)
+    if lead is None:
+        abort(404)
+    live.publish_changes(current_user.id, lead_ids=[lead.id])
+    flash(f'Lead for {lead.first_name} {lead.last_name} restored from the archive.', 'success')
+    return redirect(url_for('leads.lead_detail', lead_id=lead.id))
@@ -0,0 +1,224 @@
+# File: app/live.py
+
+# Live dashboard updates over server-sent events. Each open dashboard holds a
+# `GET /events` stream subscribed to its user's channel; write routes call
+# `publish_changes()` after they commit, which pushes a small JSON delta
+# (the dashboard aggregates, changed/removed lead rows with their status badges)
+# that the page patches in place instead of reloading.
+#
+# Fan-out goes through an in-process Broker. Its backend decides how events
+# reach other workers: LIVE_BACKEND = "local" (single process), "redis"
+# (pub/sub, needs the `redis` package) or a "package.module:Class" path.
+
+import importlib
+import json
+import logging
+import queue
+import threading
+import time
+
+from flask import current_app, url_for
+
+from app import tenancy
+
+log = logging.getLogger(__name__)
+
+# Legacy rows may still carry the long status names.
+_BADGES = {
+    "Completed": "bg-green-100 text-green-800", "Job Completed": "bg-green-100 text-green-800",
+    "Signed": "bg-blue-100 text-blue-800", "Contract Signed": "bg-blue-100 text-blue-800",
+}
+
+
+def status_badge(status) -> str:
+    """Tailwind classes for a deal status badge (shared by index.html and the deltas)."""
+    return _BADGES.get(status, "bg-yellow-100 text-yellow-800")
+
+
+def channel(user_id, tenant=None) -> str:
+    return f"{tenant or tenancy.current() or '-'}:{user_id}"
+
+
+# -----------------------------
+# Broker & backends
+# -----------------------------
+class LocalBackend:
+    """Single-process fan-out: published events go straight to local subscribers."""
+
+    def __init__(self, broker, config):
+        self.broker = broker
+
+    def publish(self, channel, data):
+        self.broker.deliver(channel, data)
+
+    def wants(self, channel) -> bool:
+        return self.broker.listening(channel)
+
+    def close(self):
+        pass
+
+
+class RedisBackend:
+    """Cross-worker fan-out via Redis pub/sub; every worker delivers to its own subscribers."""
+
+    PREFIX = "live:"
+
+    def __init__(self, broker, config):
+        import redis   # optional dependency, only needed with LIVE_BACKEND = "redis"
+        self.broker = broker
+        self.client = redis.Redis.from_url(config["LIVE_REDIS_URL"])
+        self.pubsub = self.client.pubsub(ignore_subscribe_messages=True)
+        self.pubsub.psubscribe(**{self.PREFIX + "*": self._on_message})
+        self.thread = self.pubsub.run_in_thread(sleep_time=1.0, daemon=True)
+
+    def publish(self, channel, data):
+        self.client.publish(self.PREFIX + channel, data)
+
+    def _on_message(self, message):
+        name = message["channel"].decode()[len(self.PREFIX):]
+        self.broker.deliver(name, message["data"].decode())
+
+    def wants(self, channel) -> bool:
+        return True   # listeners may be on other workers
+
+    def close(self):
+        self.thread.stop()
+
+
+BACKENDS = {"local": LocalBackend, "redis": RedisBackend}
+
+
+class Broker:
+    """Channel -> subscriber queues for this process; publishing goes through the backend."""
+
+    def __init__(self, queue_size=100):
+        self.queue_size = queue_size
+        self._subs = {}
+        self._lock = threading.Lock()
+        self.backend = None
+
+    def subscribe(self, channel) -> queue.Queue:
+        q = queue.Queue(maxsize=self.queue_size)
+        with self._lock:
+            self._subs.setdefault(channel, set()).add(q)
+        return q
+
+    def unsubscribe(self, channel, q):
+        with self._lock:
+            subs = self._subs.get(channel)
+            if subs is not None:
+                subs.discard(q)
+                if not subs:
+                    del self._subs[channel]
+
+    def listening(self, channel) -> bool:
+        with self._lock:
+            return bool(self._subs.get(channel))
+
+    def deliver(self, channel, data: str):
+        with self._lock:
+            subs = list(self._subs.get(channel, ()))
+        for q in subs:
+            try:
+                q.put_nowait(data)
+            except queue.Full:
+                # A stalled client: drop its backlog and have it reload once it catches up.
+                with q.mutex:
+                    q.queue.clear()
+                q.put_nowait(json.dumps({"type": "reload"}))
+
+    def publish(self, channel, event: dict):
+        self.backend.publish(channel, json.dumps(event, separators=(",", ":")))
+
+
+def broker(app=None) -> Broker:
+    return (app or current_app).extensions["live"]
+
+
+def init_app(app):
+    """Create the app's broker and backend, and expose `status_badge` to templates."""
+    b = Broker(queue_size=app.config.get("LIVE_QUEUE_SIZE", 100))
+    name = app.config.get("LIVE_BACKEND", "local")
+    if name in BACKENDS:
+        backend_cls = BACKENDS[name]
+    else:
+        module, _, attr = name.partition(":")
+        backend_cls = getattr(importlib.import_module(module), attr)
+    b.backend = backend_cls(b, app.config)
+    app.extensions["live"] = b
+    app.add_template_global(status_badge)
+    return app
+
+
+# -----------------------------
+# Deltas
+# -----------------------------
+def _lead_rows(user_id, lead_ids) -> dict:
+    from app.models import Lead
+    rows = {}
+    for lead in Lead.query.filter(Lead.user_id == user_id, Lead.id.in_(list(lead_ids))):
+        rows[lead.id] = {
+            "id": lead.id, "name": f"{lead.first_name} {lead.last_name}", "email": lead.email,
+            "url": url_for("leads.lead_detail", lead_id=lead.id),
+            "badges": [{"status": d.status, "class": status_badge(d.status)} for d in lead.deals],
+        }
+    return rows
+
+
+def dashboard_delta(user_id, lead_ids=(), removed=()) -> dict:
+    """The event for one user's dashboards after a write.
+
+    Aggregates always go out in full: they're a handful of numbers, and a
+    diff against what was last sent is wrong for a page that opened since, or
+    when the previous write was published from another worker (or skipped).
+    """
+    from app.services import metrics
+    summary = metrics.dashboard_summary(user_id)
+    aggregates = {k: summary[k] for k in ("pipeline_value", "potential_commission", "earned_commission")}
+    aggregates.update(summary["projections"])
+    rows = _lead_rows(user_id, lead_ids) if lead_ids else {}
+    return {
+        "type": "dashboard",
+        "aggregates": aggregates,
+        "leads": list(rows.values()),
+        "removed": sorted(set(removed) | (set(lead_ids) - set(rows))),
+    }
+
+
+def publish_changes(user_id, lead_ids=(), removed=()):
+    """Push a dashboard delta to the user's open dashboards (call after commit).
+
+    Never raises: a failed push only means the page updates on its next load.
+    """
+    try:
+        b = broker()
+        if not b.backend.wants(channel(user_id)):
+            return
+        b.publish(channel(user_id), dashboard_delta(user_id, lead_ids, removed))
+    except Exception:
+        log.exception("live update for user %s failed", user_id)
+
+
+def stream(channel_name, heartbeat=15.0, max_seconds=300.0):
+    """SSE body for one subscriber; ends after `max_seconds` (EventSource reconnects)."""
+    b = broker()
+    q = b.subscribe(channel_name)
+
+    def generate():
+        deadline = time.monotonic() + max_seconds
+        try:
+            yield "retry: 2000\n\n"
+            while True:
+                left = deadline - time.monotonic()
+                if left <= 0:
+                    return
+                try:
+                    data = q.get(timeout=min(heartbeat, left))
+                except queue.Empty:
+                    yield ": ping\n\n"
+                    continue
+                yield f"data: {data}\n\n"
+        finally:
+            b.unsubscribe(channel_name, q)
+
+    return generate()
@@ -0,0 +1,280 @@
+# File: app/middleware.py
+
+# HTTP response middleware: content-encoding negotiation (gzip / brotli) and
+# per-endpoint Cache-Control policies.
+
+import itertools
+import os
+import zlib
+
+from flask import request
+
+try:  # brotli is optional; gzip is always available
+    import brotli
+except ImportError:  # pragma: no cover - depends on the environment
+    brotli = None
+
+
+def _parse_accept_encoding(header):
+    """Return {coding: q} for an Accept-Encoding header value."""
+    accepted = {}
+    for part in (header or "").split(","):
+        part = part.strip()
+        if not part:
+            continue
+        coding, _, params = part.partition(";")
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        accepted[coding.strip().lower()] = q
+    return accepted
+
+
+def choose_encoding(header, brotli_available=None):
+    """Pick the best supported coding for an Accept-Encoding header, or None."""
+    if brotli_available is None:
+        brotli_available = brotli is not None
+    accepted = _parse_accept_encoding(header)
+    wildcard = accepted.get("*", 0.0)
+    candidates = (["br"] if brotli_available else []) + ["gzip"]
+    best, best_q = None, 0.0
+    for coding in candidates:
+        q = accepted.get(coding, wildcard)
+        if q > best_q:
+            best, best_q = coding, q
+    return best
+
+
+class _Compressor:
+    """Streaming compressor with a uniform compress/flush/finish interface."""
+
+    def __init__(self, coding, gzip_level=6, brotli_quality=4):
+        self.coding = coding
+        if coding == "br":
+            self._c = brotli.Compressor(quality=brotli_quality)
+        else:
+            # wbits=31 -> gzip container
+            self._c = zlib.compressobj(gzip_level, zlib.DEFLATED, 31)
+
+    def compress(self, chunk):
+        if self.coding == "br":
+            return self._c.process(chunk)
+        return self._c.compress(chunk)
+
+    def flush(self):
+        if self.coding == "br":
+            return self._c.flush()
+        return self._c.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self):
+        if self.coding == "br":
+            return self._c.finish()
+        return self._c.flush(zlib.Z_FINISH)
+
+
+class CompressionMiddleware:
+    """WSGI middleware that compresses text responses above a size threshold.
+
+    Responses with a Content-Length are compressed in one shot (and skipped if
+    smaller than ``min_size``). Responses without one are treated as streamed:
+    every chunk is compressed and sync-flushed so the client sees it right
+    away, and memory stays bounded by the chunk size.
+    """
+
+    def __init__(self, wsgi_app, min_size=500, gzip_level=6, brotli_quality=4,
+                 mimetypes=("text/html", "application/json")):
+        self.wsgi_app = wsgi_app
+        self.min_size = min_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+        self.mimetypes = tuple(mimetypes)
+
+    def _compressible(self, status, headers, environ):
+        if environ.get("REQUEST_METHOD") == "HEAD":
+            return False
+        if not status.startswith("200"):
+            return False
+        names = {k.lower(): v for k, v in headers}
+        if "content-encoding" in names or "content-range" in names:
+            return False
+        ctype = names.get("content-type", "").split(";")[0].strip().lower()
+        if ctype not in self.mimetypes:
+            return False
+        if "no-transform" in names.get("cache-control", ""):
+            return False
+        length = names.get("content-length")
+        if length is not None and int(length) < self.min_size:
+            return False
+        return True
+
+    def __call__(self, environ, start_response):
+        captured, written = {}, []
+
+        def _capture(status, headers, exc_info=None):
+            captured["status"] = status
+            captured["headers"] = headers
+            captured["exc_info"] = exc_info
+            return written.append  # legacy write(): buffered, sent ahead of the iterable
+
+        app_iter = self.wsgi_app(environ, _capture)
+        rest, pulled = app_iter, []
+        if "status" not in captured:
+            # Generator apps may call start_response on their first iteration;
+            # PEP 3333 allows it up to the first non-empty chunk.
+            rest = iter(app_iter)
+            try:
+                for chunk in rest:
+                    pulled.append(chunk)
+                    if chunk:
+                        break
+            except BaseException:
+                _close(app_iter)
+                raise
+        if written or pulled:
+            app_iter = _Body(app_iter, rest, written, pulled)
+        status, headers = captured["status"], list(captured["headers"])
+
+        vary_tokens = [v for k, v in headers if k.lower() == "vary"]
+        ctype = next((v for k, v in headers if k.lower() == "content-type"), "")
+        if ctype.split(";")[0].strip().lower() in self.mimetypes and \
+                not any("accept-encoding" in v.lower() for v in vary_tokens):
+            headers.append(("Vary", "Accept-Encoding"))
+
+        coding = choose_encoding(environ.get("HTTP_ACCEPT_ENCODING"))
+        if coding is None or not self._compressible(status, headers, environ):
+            start_response(status, headers, captured["exc_info"])
+            return app_iter
+
+        compressor = _Compressor(coding, self.gzip_level, self.brotli_quality)
+        streamed = not any(k.lower() == "content-length" for k, _ in headers)
+        headers = [(k, _weaken_etag(v) if k.lower() == "etag" else v)
+                   for k, v in headers if k.lower() != "content-length"]
+        headers.append(("Content-Encoding", coding))
+
+        if streamed:
+            start_response(status, headers, captured["exc_info"])
+            return _stream(app_iter, compressor)
+
+        try:
+            body = b"".join(app_iter)
+        finally:
+            _close(app_iter)
+        data = compressor.compress(body) + compressor.finish()
+        headers.append(("Content-Length", str(len(data))))
+        start_response(status, headers, captured["exc_info"])
+        return [data]
+
+
+class _Body:
+    """The app's body with its buffered write() data and any chunks pulled early put back in order."""
+
+    def __init__(self, app_iter, rest, written, pulled):
+        self.app_iter, self.rest, self.written, self.pulled = app_iter, rest, written, pulled
+
+    def __iter__(self):
+        for chunk in itertools.chain(self.pulled, self.rest):
+            yield from self._drain()
+            yield chunk
+        yield from self._drain()
+
+    def _drain(self):
+        while self.written:
+            yield self.written.pop(0)
+
+    def close(self):
+        _close(self.app_iter)
+
+
+def _close(app_iter):
+    if hasattr(app_iter, "close"):
+        app_iter.close()
+
+
+def _weaken_etag(value):
+    # The compressed bytes differ from the identity representation.
+    return value if value.startswith("W/") else "W/" + value
+
+
+def _stream(app_iter, compressor):
+    try:
+        for chunk in app_iter:
+            if not chunk:
+                continue
+            out = compressor.compress(chunk) + compressor.flush()
+            if out:
+                yield out
+        tail = compressor.finish()
+        if tail:
+            yield tail
+    finally:
+        _close(app_iter)
+
+
+# -----------------------------
+# Cache-Control
+# -----------------------------
+DEFAULT_CACHE_POLICIES = {
+    "static": "public, max-age=31536000, immutable",
+    # Dashboards are per-user and every write redirects back to them, so they
+    # are never shared and always revalidated (ETag) rather than served stale.
+    "dashboard.index": "private, no-cache",
+    "leads.lead_detail": "private, no-cache",
+    "projector.manual_projector": "private, no-cache",
+    "projector.manual_projector_json": "private, max-age=60",
+    "auth.login": "no-store",
+    "auth.register": "no-store",
+}
+
+
+def _static_version(app, filename):
+    path = os.path.join(app.static_folder or "", filename)
+    try:
+        return int(os.stat(path).st_mtime)
+    except OSError:
+        return None
+
+
+def init_app(app):
+    """Wrap ``app`` with compression and register the cache-policy hooks."""
+    app.wsgi_app = CompressionMiddleware(
+        app.wsgi_app,
+        min_size=app.config.get("COMPRESS_MIN_SIZE", 500),
+        gzip_level=app.config.get("COMPRESS_LEVEL", 6),
+        brotli_quality=app.config.get("COMPRESS_BROTLI_QUALITY", 4),
+        mimetypes=app.config.get("COMPRESS_MIMETYPES", ("text/html", "application/json")),
+    )
+    policies = dict(DEFAULT_CACHE_POLICIES)
+    policies.update(app.config.get("CACHE_POLICIES") or {})
+
+    @app.url_defaults
+    def _version_static_urls(endpoint, values):
+        # Static files are served "immutable", so their URLs must change with the file.
+        if endpoint == "static" and "filename" in values and "v" not in values:
+            version = _static_version(app, values["filename"])
+            if version is not None:
+                values["v"] = version
+
+    @app.after_request
+    def _apply_cache_policy(response):
+        if "Cache-Control" in response.headers:
+            return response
+        if request.method not in ("GET", "HEAD") or response.status_code not in (200, 304):
+            response.headers["Cache-Control"] = "no-store"
+            return response
+        endpoint = request.endpoint or ""
+        policy = policies.get(endpoint, app.config.get("CACHE_DEFAULT_POLICY", "private, no-cache"))
+        if endpoint == "static" and "v" not in request.args:
+            policy = "public, max-age=3600"  # unversioned URL: never claim immutability
+        response.headers["Cache-Control"] = policy
+        if ("no-cache" in policy and response.status_code == 200
+                and not response.is_streamed and not response.direct_passthrough):
+            # Cheap revalidation: an unchanged page comes back as a bodiless 304.
+            response.add_etag()
+            response.make_conditional(request)
+        return response
+
+    return app
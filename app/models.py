@@ -1,21 +1,113 @@
 # File: app/models.py
 
+import json
 from datetime import datetime
 import datetime as dt
 
-from app import db, login
+from app import db, login, passwords
 from flask_login import UserMixin
-from werkzeug.security import generate_password_hash, check_password_hash
+from sqlalchemy import event
+from sqlalchemy.orm import make_transient_to_detached
 
 # ---- Shared status vocabulary (used by Lead and Deal) ----
 LEAD_STATUSES = ["New", "Contacted", "Appt", "Signed", "Completed"]
 LEAD_STATUS_ORDER = {s: i for i, s in enumerate(LEAD_STATUSES)}
 
 
-# Flask-Login loader
+# -----------------------------
+# Change tracking (delta sync)
+# -----------------------------
+class SyncClock(db.Model):
+    """Single-row counter handing out the global, monotonic change sequence."""
+    id = db.Column(db.Integer, primary_key=True)
+    value = db.Column(db.BigInteger, nullable=False, default=0)
+
+
+def next_sync_seq(context):
+    """Column default/onupdate: the next value of a block reserved per statement.
+
+    An executemany INSERT/UPDATE (bulk imports, ORM batches) reserves one block
+    for all its rows on the statement's own connection. The clock row's write
+    lock is held until the surrounding transaction commits, so sequence order
+    matches commit order and a client cursor can never skip a change that
+    commits late. ORM flushes normally stamp their rows up front instead
+    (sync.stamp_flush), so this only runs for core statements and stragglers.
+    `context` has no default: SQLAlchemy only passes it to callables that
+    require it.
+    """
+    block = getattr(context, "_sync_seqs", None)
+    if block is None:
+        n = len(context.compiled_parameters or ()) or 1
+        first = reserve_sync_seqs(n, context.connection)
+        block = context._sync_seqs = iter(range(first, first + n))
+    # A statement asks once per parameter set; the fallback covers anything extra.
+    return next(block, None) or reserve_sync_seqs(1, context.connection)
+
+
+def reserve_sync_seqs(n: int, conn=None) -> int:
+    """Claim `n` consecutive sequence values in one statement; returns the first."""
+    conn = conn if conn is not None else db.session.connection()
+    clock = SyncClock.__table__
+    last = conn.execute(clock.update().where(clock.c.id == 1).values(value=clock.c.value + n)
+                        .returning(clock.c.value)).scalar()
+    if last is None:
+        conn.execute(clock.insert().values(id=1, value=n))
+        last = n
+    return last - n + 1
+
+
+class SyncTracked:
+    """Mixin: `version` bumps on every UPDATE, `sync_seq` is re-stamped on every write."""
+    version = db.Column(db.Integer, nullable=False, default=1, server_default='1',
+                        onupdate=db.text('version + 1'))
+
+    @db.declared_attr
+    def sync_seq(cls):
+        return db.Column(db.BigInteger, index=True, default=next_sync_seq, onupdate=next_sync_seq)
+
+
+class Tombstone(db.Model):
+    """Records deletes of synced rows so offline clients can drop them."""
+    id = db.Column(db.Integer, primary_key=True)
+    entity = db.Column(db.String(20), nullable=False)     # 'lead' | 'deal' | 'activity' | 'settings'
+    entity_id = db.Column(db.Integer, nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), index=True)
+    sync_seq = db.Column(db.BigInteger, index=True, default=next_sync_seq)
+    deleted_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+
+# Flask-Login loader: every request looks up its user, so the row comes from
+# the cache (app/cache.py) and is attached to the session without a query.
+# The password hash never goes into the shared cache: it stays unloaded and
+# is only read from the database if something (login, rehash) asks for it.
+SESSION_USER_UNCACHED = ("password_hash",)
+
+
 @login.user_loader
 def load_user(id):
-    return User.query.get(int(id))
+    from app.cache import cache
+    id = int(id)
+    in_session = db.session.identity_map.get(db.session.identity_key(User, id))
+    if in_session is not None:
+        return in_session
+
+    def columns():
+        user = db.session.get(User, id)
+        return user and {a.key: getattr(user, a.key) for a in User.__mapper__.column_attrs
+                         if a.key not in SESSION_USER_UNCACHED}
+    row = cache().cached(f"user:{id}:session", columns, tags=[f"user:{id}"])
+    if row is None:
+        return None
+    user = User(**row)
+    make_transient_to_detached(user)
+    return db.session.merge(user, load=False)
+
+
+@event.listens_for(db.session, "after_flush")
+def _forget_cached_users(session, flush_context):
+    from app.cache import invalidate
+    ids = {o.id for o in list(session.dirty) + list(session.deleted) if isinstance(o, User)}
+    invalidate(*(f"user:{i}" for i in ids), session=session)
 
 
 # -----------------------------
@@ -37,10 +129,10 @@ class User(UserMixin, db.Model):
     commission_rate = db.Column(db.Float, nullable=False, default=40.0)  # percent
 
     def set_password(self, password):
-        self.password_hash = generate_password_hash(password)
+        self.password_hash = passwords.hash_password(password)
 
     def check_password(self, password):
-        return check_password_hash(self.password_hash, password)
+        return passwords.verify_password(self.password_hash, password)
 
     def __repr__(self):
         return f'<User {self.username}>'
@@ -49,7 +141,7 @@ class User(UserMixin, db.Model):
 # -----------------------------
 # Lead
 # -----------------------------
-class Lead(db.Model):
+class Lead(SyncTracked, db.Model):
     id = db.Column(db.Integer, primary_key=True)
     first_name = db.Column(db.String(100), nullable=False)
     last_name = db.Column(db.String(100), nullable=False)
@@ -58,18 +150,48 @@ class Lead(db.Model):
     address = db.Column(db.String(200))
     notes = db.Column(db.Text)
     date_created = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
-    # status at lead level (shared vocabulary)
-    status = db.Column(db.String(20), nullable=False, default='New')
+    # status at lead level (shared vocabulary); active_history keeps the old
+    # value around so status changes can be logged (see StatusTransition)
+    status = db.column_property(db.Column(db.String(20), nullable=False, default='New'),
+                                active_history=True)
+
+    # revisit priority, maintained by app/services/scoring.py (NULL = closed)
+    priority_score = db.Column(db.Float)
+
+    # cached geocode of `geocoded_address`, maintained by app/services/geocoding.py;
+    # NULL coordinates with a geocoded_address mean "looked up, not found"
+    latitude = db.Column(db.Float)
+    longitude = db.Column(db.Float)
+    geocoded_address = db.Column(db.String(200))
+    geocoded_at = db.Column(db.DateTime)
+    geohash = db.Column(db.String(12))   # of (latitude, longitude), for map clusters
 
     # relationships
     deals = db.relationship('Deal', backref='lead', lazy=True, cascade="all, delete-orphan")
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'))
 
+    __table_args__ = (
+        db.Index('ix_lead_user_date_created', 'user_id', 'date_created'),
+        db.Index('ix_lead_status_updated_at', 'status', 'updated_at'),
+        db.Index('ix_lead_user_priority_score', 'user_id', 'priority_score'),
+        # covering: map clusters aggregate straight from the index
+        db.Index('ix_lead_geohash', 'geohash', 'status', 'latitude', 'longitude'),
+        db.Index('ix_lead_user_geohash', 'user_id', 'geohash', 'status', 'latitude', 'longitude'),
+    )
+
     @property
     def full_name(self) -> str:
         return f"{self.first_name} {self.last_name}".strip()
 
+    def refresh_status_from_deals(self):
+        """Lead status follows the furthest-along deal (unchanged if there are none)."""
+        if self.deals:
+            top = max(LEAD_STATUS_ORDER.get(d.status, 0) for d in self.deals)
+            self.status = LEAD_STATUSES[top]
+        return self.status
+
     def __repr__(self):
         return f'<Lead {self.first_name} {self.last_name}>'
 
@@ -77,16 +199,17 @@ class Lead(db.Model):
 # -----------------------------
 # Deal
 # -----------------------------
-class Deal(db.Model):
+class Deal(SyncTracked, db.Model):
     id = db.Column(db.Integer, primary_key=True)
 
     # Use the same vocabulary as leads. Keep String(50) to avoid DB migrations for length.
-    status = db.Column(db.String(50), nullable=False, default='New')
+    status = db.column_property(db.Column(db.String(50), nullable=False, default='New'),
+                                active_history=True)
 
     contract_price = db.Column(db.Float, nullable=False, default=0.0)
     commission_rate = db.Column(db.Float, nullable=False, default=0.10)  # percent
     date_updated = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
-    lead_id = db.Column(db.Integer, db.ForeignKey('lead.id'), nullable=False)
+    lead_id = db.Column(db.Integer, db.ForeignKey('lead.id'), nullable=False, index=True)
 
     # projector parity
     commission_base = db.Column(db.String(20), nullable=False, default='profit')  # 'profit' | 'revenue'
@@ -99,13 +222,19 @@ class Deal(db.Model):
 # -----------------------------
 # Daily Activity
 # -----------------------------
-class DailyActivity(db.Model):
+class DailyActivity(SyncTracked, db.Model):
     id = db.Column(db.Integer, primary_key=True)
     date = db.Column(db.Date, nullable=False, default=dt.date.today)
     doors_knocked = db.Column(db.Integer, default=0)
     appointments_set = db.Column(db.Integer, default=0)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'))
 
+    # One row per rep per day; bulk writes upsert against it (app/services/activity.py).
+    __table_args__ = (
+        db.UniqueConstraint('user_id', 'date', name='uq_daily_activity_user_date'),
+    )
+
     def __repr__(self):
         return f'<DailyActivity {self.date}>'
 
@@ -113,7 +242,348 @@ class DailyActivity(db.Model):
 # -----------------------------
 # Settings
 # -----------------------------
-class Settings(db.Model):
+class Settings(SyncTracked, db.Model):
     id = db.Column(db.Integer, primary_key=True)
     annual_income_goal = db.Column(db.Float, default=100000.0)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'))
+
+
+# -----------------------------
+# Appointments (see app/services/appointments.py)
+# -----------------------------
+class Appointment(db.Model):
+    """A rep's visit to a lead. Times are the rep's local wall-clock time."""
+    id = db.Column(db.Integer, primary_key=True)
+    lead_id = db.Column(db.Integer, db.ForeignKey('lead.id', ondelete='CASCADE'), index=True)
+    archived_lead_id = db.Column(db.Integer, index=True)   # ArchivedLead.id while the lead is in cold storage
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    starts_at = db.Column(db.DateTime, nullable=False)
+    ends_at = db.Column(db.DateTime, nullable=False)
+    status = db.Column(db.String(12), nullable=False, default='scheduled')   # scheduled|cancelled
+    notes = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    __table_args__ = (
+        # covering: schedules are read straight from a (rep, start) range scan
+        db.Index('ix_appointment_user_starts_at', 'user_id', 'starts_at', 'ends_at', 'status'),
+    )
+
+    def to_dict(self):
+        return {
+            "id": self.id, "lead_id": self.lead_id, "user_id": self.user_id,
+            "starts_at": self.starts_at.isoformat(), "ends_at": self.ends_at.isoformat(),
+            "status": self.status, "notes": self.notes,
+        }
+
+
+# -----------------------------
+# Pay plans
+# -----------------------------
+class PayPlan(db.Model):
+    """Commission rules (JSON, see app/services/commissions.py) for one rep, or the company default.
+
+    user_id NULL is the company default. `version` bumps on every edit; compiled
+    plans are cached per (id, version).
+    """
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(100), nullable=False)
+    rules = db.Column(db.Text, nullable=False)              # JSON
+    version = db.Column(db.Integer, nullable=False, default=1)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), unique=True)
+
+    __mapper_args__ = {"version_id_col": version}
+
+    def __repr__(self):
+        return f'<PayPlan {self.name} v{self.version}>'
+
+
+# -----------------------------
+# Attachments (files on disk, see app/services/attachments.py)
+# -----------------------------
+class Blob(db.Model):
+    """One stored file, addressed by its SHA-256; shared by every attachment with the same bytes."""
+    id = db.Column(db.Integer, primary_key=True)
+    sha256 = db.Column(db.String(64), nullable=False, unique=True)
+    size = db.Column(db.BigInteger, nullable=False)
+    content_type = db.Column(db.String(100), nullable=False, default='application/octet-stream')
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+
+class Attachment(db.Model):
+    """A file on a lead or deal. Archiving moves lead_id/deal_id to archived_* so the files survive."""
+    id = db.Column(db.Integer, primary_key=True)
+    filename = db.Column(db.String(255), nullable=False)
+    lead_id = db.Column(db.Integer, db.ForeignKey('lead.id', ondelete='CASCADE'), index=True)
+    deal_id = db.Column(db.Integer, db.ForeignKey('deal.id', ondelete='CASCADE'), index=True)
+    archived_lead_id = db.Column(db.Integer, index=True)   # ArchivedLead.id / ArchivedDeal.id
+    archived_deal_id = db.Column(db.Integer, index=True)
+    blob_id = db.Column(db.Integer, db.ForeignKey('blob.id'), nullable=False, index=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    blob = db.relationship('Blob', lazy='joined')
+
+    def to_dict(self):
+        return {
+            "id": self.id, "filename": self.filename, "lead_id": self.lead_id, "deal_id": self.deal_id,
+            "size": self.blob.size, "content_type": self.blob.content_type, "sha256": self.blob.sha256,
+            "created_at": self.created_at.isoformat() if self.created_at else None,
+        }
+
+
+class Upload(db.Model):
+    """A resumable upload in progress. The bytes received so far are the size of its .part file."""
+    id = db.Column(db.String(32), primary_key=True)        # random token
+    filename = db.Column(db.String(255), nullable=False)
+    content_type = db.Column(db.String(100))
+    size = db.Column(db.BigInteger, nullable=False)         # declared total
+    lead_id = db.Column(db.Integer)
+    deal_id = db.Column(db.Integer)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+
+
+# -----------------------------
+# Background jobs
+# -----------------------------
+JOB_STATUSES = ["queued", "running", "succeeded", "failed"]
+
+
+class Job(db.Model):
+    """A unit of background work, claimed and run by `flask jobs worker`."""
+    id = db.Column(db.Integer, primary_key=True)
+    kind = db.Column(db.String(64), nullable=False)
+    payload = db.Column(db.Text)                      # JSON
+    result = db.Column(db.Text)                       # JSON
+    status = db.Column(db.String(20), nullable=False, default='queued')
+    progress = db.Column(db.Float, nullable=False, default=0.0)   # 0..1
+    message = db.Column(db.String(255))
+    error = db.Column(db.Text)
+
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    max_attempts = db.Column(db.Integer, nullable=False, default=3)
+    run_after = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    locked_by = db.Column(db.String(64))
+    locked_at = db.Column(db.DateTime)
+
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    finished_at = db.Column(db.DateTime)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), index=True)
+
+    __table_args__ = (
+        db.Index('ix_job_status_run_after', 'status', 'run_after'),
+    )
+
+    def to_dict(self) -> dict:
+        return {
+            "id": self.id,
+            "kind": self.kind,
+            "status": self.status,
+            "progress": self.progress,
+            "message": self.message,
+            "error": self.error,
+            "attempts": self.attempts,
+            "max_attempts": self.max_attempts,
+            "created_at": self.created_at.isoformat() if self.created_at else None,
+            "finished_at": self.finished_at.isoformat() if self.finished_at else None,
+            "result": json.loads(self.result) if self.result else None,
+        }
+
+    def __repr__(self):
+        return f'<Job {self.id} {self.kind} {self.status}>'
+
+
+# -----------------------------
+# Outbound webhooks (app/services/webhooks.py)
+# -----------------------------
+class OutboxEvent(db.Model):
+    """A domain event for integrations, written in the transaction that caused it."""
+    id = db.Column(db.Integer, primary_key=True)
+    kind = db.Column(db.String(40), nullable=False)    # 'lead.created', 'deal.completed', ...
+    payload = db.Column(db.Text, nullable=False)       # JSON
+    user_id = db.Column(db.Integer)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+
+class WebhookDelivery(db.Model):
+    """One event owed to one WEBHOOK_ENDPOINTS entry; 'dead' once attempts run out."""
+    id = db.Column(db.Integer, primary_key=True)
+    event_id = db.Column(db.Integer, db.ForeignKey('outbox_event.id'), nullable=False, index=True)
+    endpoint = db.Column(db.String(64), nullable=False)
+    status = db.Column(db.String(12), nullable=False, default='pending')   # pending|sending|delivered|dead
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    run_after = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    locked_by = db.Column(db.String(64))
+    locked_at = db.Column(db.DateTime)
+    error = db.Column(db.Text)
+    delivered_at = db.Column(db.DateTime)
+
+    __table_args__ = (
+        db.Index('ix_webhook_delivery_endpoint_status_run_after', 'endpoint', 'status', 'run_after'),
+    )
+
+
+# -----------------------------
+# Status transitions & funnel rollups
+# -----------------------------
+class StatusTransition(db.Model):
+    """Append-only log of Lead/Deal status changes (written in the same flush)."""
+    id = db.Column(db.Integer, primary_key=True)
+    entity = db.Column(db.String(10), nullable=False)          # 'lead' | 'deal'
+    entity_id = db.Column(db.Integer, nullable=False)
+    lead_id = db.Column(db.Integer, nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'))
+    from_status = db.Column(db.String(50))                     # NULL on creation
+    to_status = db.Column(db.String(50), nullable=False)
+    at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+    __table_args__ = (
+        db.Index('ix_status_transition_entity_at', 'entity', 'entity_id', 'at'),
+        db.Index('ix_status_transition_user_at', 'user_id', 'entity', 'at'),
+    )
+
+    def __repr__(self):
+        return f'<StatusTransition {self.entity} {self.entity_id} {self.from_status}->{self.to_status}>'
+
+
+class FunnelDailyStat(db.Model):
+    """Daily rollup of finished stage stints, rebuilt by the `funnel_rollup` job.
+
+    One row per (user, day the stint ended, entity, stage, next stage, dwell
+    bucket). `stage` is '' for creations, so entries per stage are the sum of
+    rows whose `next_stage` is that stage.
+    """
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    day = db.Column(db.Date, nullable=False)
+    entity = db.Column(db.String(10), nullable=False)
+    stage = db.Column(db.String(50), nullable=False)
+    next_stage = db.Column(db.String(50), nullable=False)
+    bucket = db.Column(db.Integer, nullable=False)
+    n = db.Column(db.Integer, nullable=False)
+    dwell_seconds = db.Column(db.Float, nullable=False)
+
+    __table_args__ = (
+        db.Index('ix_funnel_daily_stat_user_entity_day', 'user_id', 'entity', 'day'),
+    )
+
+
+# -----------------------------
+# Cohort cache
+# -----------------------------
+class CohortSnapshot(db.Model):
+    """Frozen numbers for a closed lead cohort (see app/services/cohorts.py)."""
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    grain = db.Column(db.String(10), nullable=False)       # 'week' | 'month'
+    cohort_start = db.Column(db.Date, nullable=False)
+    data = db.Column(db.Text, nullable=False)              # JSON
+    computed_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        db.UniqueConstraint('user_id', 'grain', 'cohort_start', name='uq_cohort_snapshot'),
+    )
+
+
+# -----------------------------
+# KPI snapshots
+# -----------------------------
+class KpiSnapshot(db.Model):
+    """One rep's dashboard and projector numbers as of `day` (see app/services/kpis.py).
+
+    Append-only: the nightly pass writes each (user, day) once and never
+    updates it, so trends read these rows instead of replaying history.
+    Projector columns are NULL while the rep's history is too thin for ratios.
+    """
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    day = db.Column(db.Date, nullable=False)
+    pipeline_value = db.Column(db.Float, nullable=False)
+    potential_commission = db.Column(db.Float, nullable=False)
+    earned_commission = db.Column(db.Float, nullable=False)
+    forecast_expected = db.Column(db.Float, nullable=False)      # open deals, probability-weighted
+    projected_year_end = db.Column(db.Float, nullable=False)
+    doors = db.Column(db.Integer, nullable=False)                 # lifetime funnel totals
+    appointments = db.Column(db.Integer, nullable=False)
+    deals_signed = db.Column(db.Integer, nullable=False)
+    deals_completed = db.Column(db.Integer, nullable=False)
+    completion_rate = db.Column(db.Float, nullable=False)
+    avg_commission = db.Column(db.Float, nullable=False)
+    deals_needed = db.Column(db.Float, nullable=False)
+    daily_doors_goal = db.Column(db.Float, nullable=False)
+    daily_appointments_goal = db.Column(db.Float, nullable=False)
+    doors_per_day = db.Column(db.Float)                           # projector, full goal over a work year
+    appts_per_day = db.Column(db.Float)
+    deals_per_day = db.Column(db.Float)
+    eff_rate = db.Column(db.Float)
+
+    __table_args__ = (
+        db.UniqueConstraint('user_id', 'day', name='uq_kpi_snapshot_user_day'),
+    )
+
+
+# -----------------------------
+# Cold storage (archived leads & deals)
+# -----------------------------
+class ArchivedLead(db.Model):
+    """A lead moved out of the live table by `flask archive run`.
+
+    Its own id is a surrogate: SQLite hands freed lead ids to new leads, so the
+    same live id can be archived more than once. original_id is the id it had.
+    """
+    id = db.Column(db.Integer, primary_key=True)
+    original_id = db.Column(db.Integer, nullable=False, index=True)
+    first_name = db.Column(db.String(100), nullable=False)
+    last_name = db.Column(db.String(100), nullable=False)
+    phone_number = db.Column(db.String(20))
+    email = db.Column(db.String(120))
+    address = db.Column(db.String(200))
+    notes = db.Column(db.Text)
+    status = db.Column(db.String(20), nullable=False)
+    date_created = db.Column(db.DateTime)
+    updated_at = db.Column(db.DateTime)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'))
+    archived_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+    deals = db.relationship('ArchivedDeal', backref='lead', lazy=True)
+
+    __table_args__ = (
+        db.Index('ix_archived_lead_user_last_name', 'user_id', 'last_name'),
+    )
+
+    @property
+    def full_name(self) -> str:
+        return f"{self.first_name} {self.last_name}".strip()
+
+    def __repr__(self):
+        return f'<ArchivedLead {self.first_name} {self.last_name}>'
+
+
+class ArchivedDeal(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    original_id = db.Column(db.Integer, nullable=False, index=True)
+    status = db.Column(db.String(50), nullable=False)
+    contract_price = db.Column(db.Float, nullable=False, default=0.0)
+    commission_rate = db.Column(db.Float, nullable=False, default=0.10)
+    date_updated = db.Column(db.DateTime)
+    lead_id = db.Column(db.Integer, db.ForeignKey('archived_lead.id', ondelete='CASCADE'),
+                        nullable=False, index=True)   # the ArchivedLead row, not the live id
+    commission_base = db.Column(db.String(20), nullable=False, default='profit')
+    company_margin = db.Column(db.Float, nullable=False, default=30.0)
+    archived_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+
+class ArchiveSummary(db.Model):
+    """Lifetime totals of everything a user has archived, kept in step by the archiver."""
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False, unique=True)
+    leads = db.Column(db.Integer, nullable=False, default=0)
+    deals = db.Column(db.Integer, nullable=False, default=0)
+    deals_signed = db.Column(db.Integer, nullable=False, default=0)       # Signed or Completed
+    deals_completed = db.Column(db.Integer, nullable=False, default=0)
+    completed_rcv = db.Column(db.Float, nullable=False, default=0.0)
+    completed_commission = db.Column(db.Float, nullable=False, default=0.0)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
@@ -0,0 +1,96 @@
+# File: app/passwords.py
+
+# Password hashing for login and registration. Stored hashes are Werkzeug's
+# "method$salt$hash" strings, made with PASSWORD_HASH_METHOD
+# ("scrypt:32768:8:1", "pbkdf2:sha256:600000", ...). A hash made with other
+# parameters still verifies, and needs_rehash() tells the login route to
+# store a fresh one while it has the plaintext.
+#
+# A hash costs ~100 ms of CPU and, for scrypt, 32 MB. When a whole team signs
+# in at shift start, each request runs its hash on a per-process pool of
+# PASSWORD_HASH_WORKERS threads. hashlib releases the GIL while it hashes, so
+# threaded workers keep serving other requests. The pool and its queue are
+# bounded: past PASSWORD_HASH_QUEUE waiting hashes, a request waits up to
+# PASSWORD_HASH_WAIT seconds and then gets HashPoolBusy (a 503) instead of
+# piling up memory. Unknown usernames are checked against a dummy hash, so a
+# failed login takes as long whether or not the user exists.
+
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+
+from flask import current_app, has_app_context
+from werkzeug.security import check_password_hash, generate_password_hash
+
+DEFAULT_METHOD = "scrypt:32768:8:1"
+
+
+class HashPoolBusy(RuntimeError):
+    """Too many password hashes are queued in this process."""
+
+
+@lru_cache(maxsize=8)
+def _prefix(method) -> str:
+    """The "method" part Werkzeug writes for `method`, with its defaults filled in."""
+    return generate_password_hash("", method).split("$", 1)[0]
+
+
+@lru_cache(maxsize=8)
+def _dummy(method) -> str:
+    return generate_password_hash("not a password", method)
+
+
+def _method() -> str:
+    return current_app.config.get("PASSWORD_HASH_METHOD", DEFAULT_METHOD) if has_app_context() else DEFAULT_METHOD
+
+
+class _Pool:
+    def __init__(self, workers, queue, wait):
+        self.executor = ThreadPoolExecutor(workers, thread_name_prefix="pwhash")
+        self.slots = threading.BoundedSemaphore(workers + queue)
+        self.wait = wait
+
+    def run(self, fn, *args):
+        if not self.slots.acquire(timeout=self.wait):
+            raise HashPoolBusy("too many logins at once, try again")
+        try:
+            return self.executor.submit(fn, *args).result()
+        finally:
+            self.slots.release()
+
+
+def _pool():
+    if not has_app_context():
+        return None
+    app = current_app._get_current_object()
+    pool = app.extensions.get("password_pool")
+    if pool is None:
+        workers = app.config.get("PASSWORD_HASH_WORKERS", 2)
+        if workers <= 0:
+            return None
+        pool = app.extensions["password_pool"] = _Pool(
+            workers, app.config.get("PASSWORD_HASH_QUEUE", 32), app.config.get("PASSWORD_HASH_WAIT", 2.0))
+    return pool
+
+
+def _run(fn, *args):
+    pool = _pool()
+    return fn(*args) if pool is None else pool.run(fn, *args)
+
+
+def hash_password(password) -> str:
+    """A new hash of `password` with PASSWORD_HASH_METHOD."""
+    return _run(generate_password_hash, password, _method())
+
+
+def verify_password(pwhash, password) -> bool:
+    """Whether `password` matches `pwhash`; a None hash (no such user) costs the same and fails."""
+    if not pwhash:
+        _run(check_password_hash, _dummy(_method()), password)
+        return False
+    return _run(check_password_hash, pwhash, password)
+
+
+def needs_rehash(pwhash) -> bool:
+    """Whether `pwhash` was made with other parameters than PASSWORD_HASH_METHOD."""
+    return bool(pwhash) and pwhash.split("$", 1)[0] != _prefix(_method())
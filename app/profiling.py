@@ -0,0 +1,255 @@
+# File: app/profiling.py
+
+# Opt-in request profiling. A request is profiled when it carries a signed
+# X-Profile header (`flask profile token`), when an admin (PROFILE_ADMINS)
+# adds ?_profile=1, or by random sampling at PROFILE_SAMPLE_RATE.
+#
+# A profiled request runs under a stack sampler (PROFILE_MODE = "sample", writes
+# collapsed stacks for flamegraph.pl / speedscope) or cProfile ("cprofile",
+# writes a .prof for pstats / snakeviz). Every SQL statement it executes is
+# timed. Output goes to PROFILE_DIR: <id>.collapsed or <id>.prof, <id>.sql.txt
+# and <id>.json (summary + where the samples went: sql / orm / template / app).
+# Bound parameters (password hashes, customer details) are left out of the
+# .sql.txt unless PROFILE_SQL_PARAMS is set. /admin/profiles lists the slowest
+# captures.
+
+import cProfile
+import io
+import json
+import os
+import pstats
+import random
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from datetime import datetime
+
+from flask import current_app, g, request
+from flask_login import current_user
+from itsdangerous import BadSignature, URLSafeTimedSerializer
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+HEADER = "X-Profile"
+QUERY_FLAG = "_profile"
+_SALT = "request-profile"
+_active = threading.local()   # .sql: list while the current thread's request is profiled; .params: keep values
+REDACTED = "(redacted; set PROFILE_SQL_PARAMS to keep)"
+
+# Innermost matching frame decides where a sample's time went.
+_CATEGORIES = (
+    ("sql", ("sqlalchemy/engine", "sqlalchemy/pool", "sqlite3", "psycopg")),
+    ("orm", ("sqlalchemy/orm", "sqlalchemy/sql", "flask_sqlalchemy")),
+    ("template", ("jinja2", "/templates/")),
+    ("app", (os.sep + "app" + os.sep,)),
+)
+
+
+def _serializer(app=None):
+    return URLSafeTimedSerializer((app or current_app).config["SECRET_KEY"], salt=_SALT)
+
+
+def make_token(app=None, label="ops") -> str:
+    """A value for the X-Profile header, valid for PROFILE_TOKEN_MAX_AGE seconds."""
+    return _serializer(app).dumps({"label": label})
+
+
+def is_admin(user=None) -> bool:
+    user = user if user is not None else current_user
+    return bool(getattr(user, "is_authenticated", False)
+                and user.username in (current_app.config.get("PROFILE_ADMINS") or ()))
+
+
+def _requested() -> bool:
+    cfg = current_app.config
+    token = request.headers.get(HEADER)
+    if token:
+        try:
+            _serializer().loads(token, max_age=cfg.get("PROFILE_TOKEN_MAX_AGE", 3600))
+            return True
+        except BadSignature:
+            pass
+    if request.args.get(QUERY_FLAG) and is_admin():
+        return True
+    rate = cfg.get("PROFILE_SAMPLE_RATE", 0.0)
+    return rate > 0 and random.random() < rate
+
+
+class StackSampler:
+    """Samples one thread's stack every `interval` seconds from a helper thread."""
+
+    def __init__(self, thread_id, interval=0.005):
+        self.thread_id, self.interval = thread_id, interval
+        self.stacks = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="profile-sampler", daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append((code.co_filename, f"{frame.f_globals.get('__name__', '?')}:{code.co_name}"))
+                frame = frame.f_back
+            if stack:
+                self.stacks[tuple(reversed(stack))] += 1
+
+    def collapsed(self) -> str:
+        return "".join(f"{';'.join(name for _, name in stack)} {n}\n" for stack, n in self.stacks.most_common())
+
+    def breakdown(self) -> dict:
+        out = Counter()
+        for stack, n in self.stacks.items():
+            out[_category(stack)] += n
+        return dict(out)
+
+
+def _category(stack) -> str:
+    for filename, _ in reversed(stack):
+        path = filename.replace("\\", "/")
+        for name, needles in _CATEGORIES:
+            if any(needle.replace(os.sep, "/") in path for needle in needles):
+                return name
+    return "other"
+
+
+# -----------------------------
+# SQL capture (only for threads with a profiled request)
+# -----------------------------
+def _before_execute(conn, cursor, statement, parameters, context, executemany):
+    if getattr(_active, "sql", None) is not None:
+        conn.info.setdefault("_profile_t0", []).append(time.perf_counter())
+
+
+def _after_execute(conn, cursor, statement, parameters, context, executemany):
+    sql = getattr(_active, "sql", None)
+    if sql is not None and conn.info.get("_profile_t0"):
+        ms = (time.perf_counter() - conn.info["_profile_t0"].pop()) * 1000.0
+        params = repr(parameters)[:300] if _active.params else REDACTED
+        sql.append({"ms": round(ms, 3), "statement": statement, "params": params, "many": executemany})
+
+
+# -----------------------------
+# Request hooks
+# -----------------------------
+def _start():
+    if not _requested():
+        return
+    mode = current_app.config.get("PROFILE_MODE", "sample")
+    g.profile = {"id": f"{datetime.utcnow():%Y%m%dT%H%M%S}-{uuid.uuid4().hex[:8]}", "mode": mode,
+                 "t0": time.perf_counter()}
+    _active.sql = []
+    _active.params = current_app.config.get("PROFILE_SQL_PARAMS", False)
+    if mode == "cprofile":
+        g.profile["profiler"] = cProfile.Profile()
+        g.profile["profiler"].enable()
+    else:
+        g.profile["profiler"] = StackSampler(threading.get_ident(),
+                                             current_app.config.get("PROFILE_INTERVAL", 0.005))
+        g.profile["profiler"].start()
+
+
+def _stop():
+    prof = g.pop("profile", None)
+    if prof is None:
+        return None
+    if prof["mode"] == "cprofile":
+        prof["profiler"].disable()
+    else:
+        prof["profiler"].stop()
+    prof["ms"] = (time.perf_counter() - prof["t0"]) * 1000.0
+    prof["sql"], _active.sql = _active.sql, None
+    return prof
+
+
+def _write(prof, status_code):
+    folder = current_app.config["PROFILE_DIR"]
+    os.makedirs(folder, exist_ok=True)
+    base = os.path.join(folder, prof["id"])
+    sql = prof["sql"]
+    summary = {
+        "id": prof["id"], "mode": prof["mode"], "at": datetime.utcnow().isoformat(timespec="seconds"),
+        "method": request.method, "path": request.full_path.rstrip("?"), "endpoint": request.endpoint,
+        "status": status_code, "ms": round(prof["ms"], 2),
+        "sql_count": len(sql), "sql_ms": round(sum(s["ms"] for s in sql), 2),
+    }
+    if prof["mode"] == "cprofile":
+        prof["profiler"].dump_stats(base + ".prof")
+        out = io.StringIO()
+        pstats.Stats(prof["profiler"], stream=out).sort_stats("cumulative").print_stats(30)
+        summary["files"] = [prof["id"] + ".prof", prof["id"] + ".sql.txt"]
+        summary["top"] = out.getvalue()
+    else:
+        with open(base + ".collapsed", "w") as fh:
+            fh.write(prof["profiler"].collapsed())
+        summary["files"] = [prof["id"] + ".collapsed", prof["id"] + ".sql.txt"]
+        summary["breakdown"] = prof["profiler"].breakdown()
+    with open(base + ".sql.txt", "w") as fh:
+        for i, s in enumerate(sql, 1):
+            fh.write(f"-- #{i} {s['ms']:.3f} ms{' (executemany)' if s['many'] else ''}\n"
+                     f"{s['statement'].strip()}\n-- params: {s['params']}\n\n")
+    with open(base + ".json", "w") as fh:
+        json.dump(summary, fh, indent=1)
+    _prune(folder, current_app.config.get("PROFILE_KEEP", 200))
+    return summary
+
+
+def _prune(folder, keep):
+    runs = sorted(f[:-5] for f in os.listdir(folder) if f.endswith(".json"))
+    for run in runs[:max(0, len(runs) - keep)]:
+        for ext in (".json", ".collapsed", ".prof", ".sql.txt"):
+            try:
+                os.remove(os.path.join(folder, run + ext))
+            except FileNotFoundError:
+                pass
+
+
+def captures(folder, limit=50) -> list:
+    """Saved profile summaries, slowest first."""
+    if not os.path.isdir(folder):
+        return []
+    out = []
+    for name in os.listdir(folder):
+        if name.endswith(".json"):
+            try:
+                with open(os.path.join(folder, name)) as fh:
+                    out.append(json.load(fh))
+            except (OSError, ValueError):
+                continue
+    out.sort(key=lambda s: s.get("ms", 0), reverse=True)
+    return out[:limit]
+
+
+def init_app(app):
+    """Register the profiling hooks (cheap when nothing asks for a profile)."""
+    if not event.contains(Engine, "before_cursor_execute", _before_execute):
+        event.listen(Engine, "before_cursor_execute", _before_execute)
+        event.listen(Engine, "after_cursor_execute", _after_execute)
+
+    @app.before_request
+    def _profile_start():
+        _start()
+
+    @app.after_request
+    def _profile_finish(response):
+        prof = _stop()
+        if prof is not None:
+            summary = _write(prof, response.status_code)
+            response.headers["X-Profile-Id"] = summary["id"]
+        return response
+
+    @app.teardown_request
+    def _profile_cleanup(exc):
+        _stop()   # the request failed before after_request: just stop the profiler
+
+    return app
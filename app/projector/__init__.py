@@ -0,0 +1,8 @@
+# File: app/projector/__init__.py
+
+from flask import Blueprint
+
+bp = Blueprint('projector', __name__)
+
+# Imported at the bottom so the views can register themselves on bp.
+from app.projector import routes  # noqa: E402,F401
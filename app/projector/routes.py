@@ -0,0 +1,274 @@
+# File: app/projector/routes.py
+
+import hashlib
+import json
+
+from flask import render_template, request, jsonify
+from flask_login import current_user, login_required
+
+from app import db
+from app.cache import cache
+from app.forms import ManualProjectorForm
+from app.models import Settings
+from app.projector import bp
+from app.services import commissions, jobs
+from app.services.metrics import ratios_from_totals, rep_funnel, rep_tags
+from app.services.projector import Ratios, projector_metrics
+from app.services.solver import Capacity, solve_batch
+
+# -----------------------------
+# Manual projector (UI + JSON)
+# -----------------------------
+@bp.route('/manual_projector', methods=['GET', 'POST'])
+@login_required
+def manual_projector():
+    form = ManualProjectorForm()
+    results, error = None, None
+
+    if form.validate_on_submit():
+        income_goal = float(form.income_goal.data or 0)
+        days        = int(form.days_to_forecast.data or 0)
+        knocks      = int(form.doors_knocked.data or 0)
+        appts       = int(form.appointments_set.data or 0)
+        signs       = int(form.deals_signed.data or 0)
+        completes   = int(form.deals_completed.data or 0)
+        total_rcv   = float(form.total_rcv.data or 0)
+
+        try:
+            if days <= 0:
+                raise ValueError("Days must be > 0.")
+            if appts <= 0 or signs <= 0 or completes <= 0 or total_rcv <= 0:
+                raise ValueError("Historical totals must be > 0.")
+
+            ratios = Ratios(
+                doors_per_appt = knocks / appts,
+                appts_per_deal = appts / signs,
+                avg_rcv_per_completed_deal = total_rcv / completes,
+            )
+
+            commission_base = (request.form.get('commission_base') or 'profit').strip()
+            commission_pct  = float((request.form.get('commission_rate') or current_user.commission_rate or 0))
+            company_margin  = float((request.form.get('company_margin') or current_user.company_margin or 0))
+
+            plan = commissions.plan_for(current_user.id)
+            metrics = projector_metrics(
+                annual_goal=income_goal,
+                days=days,
+                ratios=ratios,
+                commission_pct=commission_pct,
+                company_margin_pct=company_margin,
+                commission_base=commission_base,
+                plan=plan,
+            )
+
+            sign_to_complete_ratio = completes / signs
+            if sign_to_complete_ratio <= 0:
+                raise ValueError("Invalid sign→complete ratio.")
+
+            deals_signed_per_day = metrics["deals_per_day"] / sign_to_complete_ratio
+            appts_per_day        = deals_signed_per_day * ratios.appts_per_deal
+            doors_per_day        = appts_per_day * ratios.doors_per_appt
+
+            results = {
+                "daily_knocks":       doors_per_day,
+                "daily_appointments": appts_per_day,
+                "daily_deals_signed": deals_signed_per_day,
+                "assumptions": {
+                    "commission_base": commission_base,
+                    "company_margin_pct": company_margin if commission_base == "profit" else 0.0,
+                    "commission_pct": commission_pct,
+                    "pay_plan": plan.name,
+                },
+                "ratios": {
+                    "doors_per_appt": ratios.doors_per_appt,
+                    "appts_per_deal": ratios.appts_per_deal,
+                    "avg_rcv_per_completed_deal": ratios.avg_rcv_per_completed_deal,
+                },
+                "percents": {
+                    "door_to_appt": (appts / knocks * 100.0) if knocks > 0 else 0.0,
+                    "appt_to_sign": (signs / appts * 100.0) if appts  > 0 else 0.0,
+                    "sign_to_complete": (completes / signs * 100.0) if signs > 0 else 0.0,
+                    "effective_on_revenue": metrics["eff_rate"] * 100.0,
+                },
+                "avg_comm_per_deal": metrics["avg_comm_per_deal"],
+            }
+
+        except Exception as e:
+            error = str(e)
+
+    return render_template(
+        "manual_projector.html",
+        title="Manual Projector",
+        form=form,
+        results=results,
+        error=error,
+    )
+
+
+@bp.route('/manual_projector.json', methods=['GET', 'POST'])
+@login_required
+def manual_projector_json():
+    data = request.get_json(force=True) if request.method == 'POST' else {}
+
+    income_goal = float(data.get('income_goal', 0))
+    days = int(data.get('days_to_forecast', 0))
+    knocks = int(data.get('doors_knocked', 0))
+    appts = int(data.get('appointments_set', 0))
+    signs = int(data.get('deals_signed', 0))
+    completes = int(data.get('deals_completed', 0))
+    total_rcv = float(data.get('total_rcv', 0))
+    commission_base = (data.get('commission_base') or 'profit').strip()
+    commission_pct  = float(data.get('commission_rate', current_user.commission_rate or 0))
+    company_margin  = float(data.get('company_margin', current_user.company_margin or 0))
+
+    if days <= 0 or appts <= 0 or signs <= 0 or completes <= 0 or total_rcv <= 0:
+        return jsonify({"error": "All inputs must be > 0"}), 400
+
+    ratios = Ratios(
+        doors_per_appt = knocks / appts,
+        appts_per_deal = appts / signs,
+        avg_rcv_per_completed_deal = total_rcv / completes,
+    )
+    plan = commissions.plan_for(current_user.id)
+    metrics = projector_metrics(
+        annual_goal=income_goal,
+        days=days,
+        ratios=ratios,
+        commission_pct=commission_pct,
+        company_margin_pct=company_margin,
+        commission_base=commission_base,
+        plan=plan,
+    )
+
+    sign_to_complete_ratio = completes / signs
+    deals_signed_per_day = metrics["deals_per_day"] / sign_to_complete_ratio
+    appts_per_day  = deals_signed_per_day * ratios.appts_per_deal
+    doors_per_day  = appts_per_day * ratios.doors_per_appt
+
+    return jsonify({
+        "deals_per_day": deals_signed_per_day,
+        "appts_per_day": appts_per_day,
+        "doors_per_day": doors_per_day,
+        "assumptions": {
+            "commission_base": commission_base,
+            "company_margin_pct": company_margin if commission_base == "profit" else 0.0,
+            "commission_pct": commission_pct,
+            "pay_plan": plan.name,
+        },
+        "percents": {
+            "door_to_appt": (appts / knocks * 100.0) if knocks > 0 else 0.0,
+            "appt_to_sign": (signs / appts * 100.0),
+            "sign_to_complete": (completes / signs * 100.0),
+            "effective_on_revenue": metrics["eff_rate"] * 100.0,
+        },
+        "avg_comm_per_deal": metrics["avg_comm_per_deal"],
+        "ratios": {"avg_rcv_per_completed_deal": ratios.avg_rcv_per_completed_deal},
+    })
+
+
+@bp.route('/forecast.json', methods=['POST'])
+@login_required
+def forecast_json():
+    """Queue a Monte Carlo income forecast for a daily door capacity."""
+    data = request.get_json(force=True) or {}
+    try:
+        payload = {
+            "doors_per_day": float(data.get('doors_per_day', 0)),
+            "days_to_forecast": int(data.get('days_to_forecast', 0)),
+            "doors_knocked": int(data.get('doors_knocked', 0)),
+            "appointments_set": int(data.get('appointments_set', 0)),
+            "deals_signed": int(data.get('deals_signed', 0)),
+            "deals_completed": int(data.get('deals_completed', 0)),
+            "total_rcv": float(data.get('total_rcv', 0)),
+            "commission_base": (data.get('commission_base') or 'profit').strip(),
+            "commission_rate": float(data.get('commission_rate', current_user.commission_rate or 0)),
+            "company_margin": float(data.get('company_margin', current_user.company_margin or 0)),
+            "trials": min(int(data.get('trials', 2000)), 100000),
+            "plan": commissions.plan_for(current_user.id).rules,   # the worker has no session to look it up
+        }
+    except (TypeError, ValueError):
+        return jsonify({"error": "Inputs must be numeric"}), 400
+    if (payload["doors_per_day"] <= 0 or payload["days_to_forecast"] <= 0
+            or payload["appointments_set"] <= 0 or payload["deals_signed"] <= 0
+            or payload["deals_completed"] <= 0 or payload["total_rcv"] <= 0):
+        return jsonify({"error": "All inputs must be > 0"}), 400
+
+    job = jobs.enqueue('monte_carlo_forecast', payload, user_id=current_user.id)
+    db.session.commit()
+    return jobs.accepted(job)
+
+
+# -----------------------------
+# Inverse projector (capacity -> income)
+# -----------------------------
+MAX_SOLVE_SCENARIOS = 5000
+
+
+@bp.route('/projector/solve.json', methods=['POST'])
+@login_required
+def projector_solve_json():
+    """Achievable income and required rate/margin/doors for many capacity scenarios.
+
+    Each scenario needs `doors_per_day` and `days`. Ratios, pay terms and the
+    goal default to the current user's history, profile and Settings.
+    """
+    data = request.get_json(force=True) or {}
+    raw = data.get('scenarios') or []
+    if not isinstance(raw, list) or not raw:
+        return jsonify({"error": "scenarios must be a non-empty list"}), 400
+    if len(raw) > MAX_SOLVE_SCENARIOS:
+        return jsonify({"error": f"At most {MAX_SOLVE_SCENARIOS} scenarios per call"}), 400
+
+    # Dashboards re-post the same scenarios: answer from the cache until the rep's history changes.
+    uid = current_user.id
+    digest = hashlib.sha1(json.dumps(raw, sort_keys=True, default=str).encode()).hexdigest()
+    results = cache().cached(f"solve:{uid}:{digest}", lambda: _solve(raw),
+                             tags=[*rep_tags(uid, pay=True), f"user:{uid}"])
+    return jsonify({"results": results})
+
+
+def _solve(raw) -> list:
+    history, history_stc = ratios_from_totals(rep_funnel(current_user.id))
+    settings = Settings.query.filter_by(user_id=current_user.id).first()
+    default_goal = settings.annual_income_goal if settings else None
+    plan = commissions.plan_for(current_user.id)
+
+    scenarios, errors = [], {}
+    for i, s in enumerate(raw):
+        if not isinstance(s, dict):
+            errors[i] = "Each scenario must be an object"
+            scenarios.append(None)
+            continue
+        try:
+            r = s.get('ratios')
+            ratios = Ratios(
+                doors_per_appt=float(r['doors_per_appt']),
+                appts_per_deal=float(r['appts_per_deal']),
+                avg_rcv_per_completed_deal=float(r['avg_rcv_per_completed_deal']),
+            ) if r else history
+            if ratios is None:
+                raise ValueError("No ratios given and not enough history to derive them")
+            goal = s.get('annual_goal', default_goal)
+            scenarios.append(Capacity(
+                doors_per_day=float(s['doors_per_day']),
+                days=int(s['days']),
+                ratios=ratios,
+                commission_pct=float(s.get('commission_rate', current_user.commission_rate or 0)),
+                company_margin_pct=float(s.get('company_margin', current_user.company_margin or 0)),
+                commission_base=(s.get('commission_base') or 'profit').strip(),
+                sign_to_complete=float(s.get('sign_to_complete', history_stc if not r and history_stc else 1.0)),
+                annual_goal=float(goal) if goal is not None else None,
+                plan=plan,
+            ))
+        except (KeyError, TypeError, ValueError) as e:
+            errors[i] = str(e) if isinstance(e, ValueError) else f"Missing or invalid field: {e}"
+            scenarios.append(None)
+
+    solved = iter(solve_batch([c for c in scenarios if c is not None]))
+    results = []
+    for i, c in enumerate(scenarios):
+        out = {"error": errors[i]} if c is None else next(solved)
+        if isinstance(raw[i], dict) and raw[i].get('label') is not None:
+            out["label"] = raw[i]['label']
+        results.append(out)
+    return results
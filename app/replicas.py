@@ -0,0 +1,102 @@
+# File: app/replicas.py
+
+# Read/write splitting. Requests to the endpoints listed in REPLICA_ENDPOINTS
+# read from a replica engine (bind `replica`, or `replica:<tenant>`); everything
+# else, every flush and every INSERT/UPDATE/DELETE goes to the primary.
+#
+# Read-your-writes: a request that writes pins its client to the primary for
+# REPLICA_PIN_SECONDS (a timestamp in the signed session cookie), so a user
+# never sees a replica that hasn't caught up with their own change yet.
+
+import time
+
+from flask import current_app, g, has_app_context, request, session
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+from sqlalchemy.sql.dml import UpdateBase
+
+PIN_KEY = "_db_pin"
+
+
+def bind_key(tenant=None) -> str:
+    return f"replica:{tenant}" if tenant else "replica"
+
+
+def configure_binds(app):
+    """Add the replica binds to SQLALCHEMY_BINDS (call before db.init_app)."""
+    binds = dict(app.config.get("SQLALCHEMY_BINDS") or {})
+    if app.config.get("SQLALCHEMY_REPLICA_URI"):
+        binds.setdefault(bind_key(), app.config["SQLALCHEMY_REPLICA_URI"])
+    for tenant, url in (app.config.get("TENANT_REPLICA_URLS") or {}).items():
+        binds.setdefault(bind_key(tenant), url)
+    app.config["SQLALCHEMY_BINDS"] = binds
+
+
+def use_primary():
+    """Send the rest of this request to the primary (e.g. before a get-or-create)."""
+    if has_app_context():
+        g.db_primary = True
+
+
+def reading(session, clause=None) -> bool:
+    """True if this statement may be served by a replica."""
+    return (has_app_context()
+            and g.get("db_replica", False)
+            and not g.get("db_primary", False)
+            and not session._flushing
+            and not isinstance(clause, UpdateBase))
+
+
+def sync_sqlite(primary, replica):
+    """Replication stand-in for local runs: copy one SQLite file over another."""
+    if make_url(str(primary.url)).get_backend_name() != "sqlite":
+        raise ValueError("sync_sqlite only copies SQLite databases")
+    src, dst = primary.raw_connection(), replica.raw_connection()
+    try:
+        src.driver_connection.backup(dst.driver_connection)
+    finally:
+        src.close()
+        dst.close()
+
+
+def _wrote():
+    if has_app_context():
+        g.db_primary = True
+        g.db_wrote = True
+
+
+def _after_flush(session, flush_context):
+    _wrote()
+
+
+def _on_execute(state):
+    if state.is_insert or state.is_update or state.is_delete:
+        _wrote()
+
+
+def init_app(app, db):
+    """Register replica routing (a no-op when no replica is configured)."""
+    if not any(k == "replica" or k.startswith("replica:") for k in app.config["SQLALCHEMY_BINDS"]):
+        return app
+    endpoints = app.config.get("REPLICA_ENDPOINTS") or {}
+
+    if not event.contains(db.session, "after_flush", _after_flush):
+        event.listen(db.session, "after_flush", _after_flush)
+        event.listen(db.session, "do_orm_execute", _on_execute)
+
+    @app.before_request
+    def _choose_engine():
+        if request.method not in endpoints.get(request.endpoint, ()):
+            return None
+        if session.get(PIN_KEY, 0) > time.time():
+            return None  # this client wrote recently: read its own writes
+        g.db_replica = True
+        return None
+
+    @app.after_request
+    def _pin_after_write(response):
+        if g.get("db_wrote"):
+            session[PIN_KEY] = time.time() + current_app.config.get("REPLICA_PIN_SECONDS", 5)
+        return response
+
+    return app
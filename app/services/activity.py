@@ -0,0 +1,114 @@
+# File: app/services/activity.py
+
+# Daily activity upserts. Many days are written in one
+# INSERT ... ON CONFLICT (user_id, date) DO UPDATE statement, so a month of
+# paper logs is one round trip and two concurrent submissions for the same day
+# can't create duplicates.
+
+import csv
+import io
+from datetime import date, datetime
+
+from flask import current_app
+from sqlalchemy import select
+
+from app import db
+from app.models import DailyActivity
+from app.services import metrics
+from app.services.sql import upsert
+
+FIELDS = ("doors_knocked", "appointments_set")
+MODES = ("replace", "add")
+
+
+class ActivityError(ValueError):
+    """Rejected input; `errors` lists [{"row": n, "error": message}]."""
+
+    def __init__(self, errors):
+        super().__init__(f"{len(errors)} invalid row(s)")
+        self.errors = errors
+
+
+def _count(value, name):
+    try:
+        n = int(value if value not in (None, "") else 0)
+    except (TypeError, ValueError):
+        raise ValueError(f"{name} must be a whole number")
+    if n < 0:
+        raise ValueError(f"{name} must be >= 0")
+    return n
+
+
+def _day(value):
+    if isinstance(value, date):
+        return value
+    try:
+        return date.fromisoformat(str(value or "").strip())
+    except ValueError:
+        raise ValueError("date must be YYYY-MM-DD")
+
+
+def validate(rows, today=None) -> list:
+    """Normalise [{date, doors_knocked, appointments_set}] or raise ActivityError with every problem."""
+    today = today or date.today()
+    max_rows = current_app.config.get("ACTIVITY_MAX_ROWS", 1000)
+    if len(rows) > max_rows:
+        raise ActivityError([{"row": None, "error": f"At most {max_rows} rows per request"}])
+    clean, errors, seen = [], [], {}
+    for i, row in enumerate(rows, start=1):
+        try:
+            if not isinstance(row, dict):
+                raise ValueError("Each row must be an object")
+            day = _day(row.get("date"))
+            if day > today:
+                raise ValueError("date is in the future")
+            if day in seen:
+                raise ValueError(f"duplicate date (also row {seen[day]})")
+            seen[day] = i
+            clean.append({"date": day, **{f: _count(row.get(f), f) for f in FIELDS}})
+        except ValueError as e:
+            errors.append({"row": i, "error": str(e)})
+    if errors:
+        raise ActivityError(errors)
+    return clean
+
+
+def upsert_activities(user_id: int, rows, mode: str = "replace") -> int:
+    """Insert or update one row per day. ``mode='add'`` adds to existing counts instead.
+
+    Rows must already be validated. The caller commits.
+    """
+    if mode not in MODES:
+        raise ValueError(f"mode must be one of {', '.join(MODES)}")
+    if not rows:
+        return 0
+    t = DailyActivity.__table__
+    now = datetime.utcnow()
+    stmt = upsert(t)
+    changes = {f: (t.c[f] + stmt.excluded[f]) if mode == "add" else stmt.excluded[f] for f in FIELDS}
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[t.c.user_id, t.c.date],
+        set_={**changes,
+              "version": t.c.version + 1,
+              "sync_seq": stmt.excluded.sync_seq,     # freshly stamped by the insert default
+              "updated_at": now},
+    )
+    db.session.execute(stmt, [{"user_id": user_id, "updated_at": now, **r} for r in rows])
+    metrics.touched([user_id])
+    return len(rows)
+
+
+def parse_csv(text: str) -> list:
+    """Rows from CSV text with a `date,doors_knocked,appointments_set` header."""
+    reader = csv.DictReader(io.StringIO(text))
+    return [{(k or "").strip().lower(): (v or "").strip() for k, v in row.items()} for row in reader]
+
+
+def activity_range(user_id: int, start: date, end: date) -> list:
+    rows = db.session.execute(
+        select(DailyActivity.date, DailyActivity.doors_knocked, DailyActivity.appointments_set)
+        .where(DailyActivity.user_id == user_id, DailyActivity.date.between(start, end))
+        .order_by(DailyActivity.date)
+    )
+    return [{"date": d.isoformat(), "doors_knocked": doors or 0, "appointments_set": appts or 0}
+            for d, doors, appts in rows]
@@ -0,0 +1,279 @@
+# File: app/services/appointments.py
+
+# Appointment calendar: conflict checks, free slots, next open slot and bulk
+# rescheduling, all on an in-memory interval index per rep.
+#
+# A rep's schedule for a window is one range scan of the covering
+# (user_id, starts_at, ends_at, status) index. Appointments are never longer
+# than APPOINTMENT_MAX_MINUTES, so the scan can start that far before the
+# window. Each appointment is padded by APPOINTMENT_BUFFER_MINUTES of travel
+# on both sides and kept sorted by start, with a running maximum of ends.
+# "Does anything overlap [a, b)?" is then a bisect plus a short backwards walk.
+# Free slots are the gaps of that sweep inside working hours, on the
+# APPOINTMENT_SLOT_MINUTES grid. A whole team's month of availability is one
+# query plus linear work per rep.
+
+import math
+from bisect import bisect_left, bisect_right
+from datetime import datetime, time, timedelta
+from itertools import accumulate
+
+from flask import current_app
+from sqlalchemy import delete, event, select
+
+from app import db
+from app.models import Appointment, Lead, User, LEAD_STATUS_ORDER
+
+
+class ScheduleError(ValueError):
+    """Bad appointment times."""
+
+
+class ScheduleConflict(ValueError):
+    """The slot overlaps other appointments of the rep (`conflicts`, travel buffer included)."""
+
+    def __init__(self, conflicts):
+        super().__init__("the rep already has an appointment then")
+        self.conflicts = conflicts
+
+
+def _cfg(key, default):
+    return current_app.config.get(key, default)
+
+
+def _pad() -> timedelta:
+    return timedelta(minutes=_cfg("APPOINTMENT_BUFFER_MINUTES", 15))
+
+
+# -----------------------------
+# Interval index
+# -----------------------------
+class IntervalIndex:
+    """One rep's busy intervals sorted by start, with a running max of ends.
+
+    overlapping() is O(log n + k): the backwards walk from the last start before
+    the query's end stops once the running max end falls before its start.
+    """
+
+    __slots__ = ("starts", "ends", "ids", "reach")
+
+    def __init__(self, intervals=()):
+        rows = sorted(intervals, key=lambda r: (r[0], r[1]))
+        self.starts = [r[0] for r in rows]
+        self.ends = [r[1] for r in rows]
+        self.ids = [r[2] for r in rows]
+        self.reach = list(accumulate(self.ends, max))
+
+    def __len__(self):
+        return len(self.starts)
+
+    def _reindex(self, i):
+        for j in range(i, len(self.ends)):
+            self.reach[j] = max(self.reach[j - 1], self.ends[j]) if j else self.ends[j]
+
+    def add(self, start, end, id=None):
+        i = bisect_right(self.starts, start)
+        self.starts.insert(i, start)
+        self.ends.insert(i, end)
+        self.ids.insert(i, id)
+        self.reach.insert(i, end)
+        self._reindex(i)
+
+    def remove(self, id):
+        if id not in self.ids:
+            return
+        i = self.ids.index(id)
+        for column in (self.starts, self.ends, self.ids, self.reach):
+            del column[i]
+        self._reindex(i)
+
+    def _hits(self, start, end) -> list:
+        out, j = [], bisect_left(self.starts, end) - 1
+        while j >= 0 and self.reach[j] > start:
+            if self.ends[j] > start:
+                out.append(j)
+            j -= 1
+        return out[::-1]
+
+    def overlapping(self, start, end) -> list:
+        """Ids of intervals overlapping [start, end), by start."""
+        return [self.ids[j] for j in self._hits(start, end)]
+
+    def gaps(self, start, end):
+        """Free (from, to) stretches of [start, end)."""
+        cursor = start
+        for j in self._hits(start, end):
+            if self.starts[j] > cursor:
+                yield cursor, self.starts[j]
+            cursor = max(cursor, self.ends[j])
+        if cursor < end:
+            yield cursor, end
+
+
+# -----------------------------
+# Working hours
+# -----------------------------
+def _ceil(dt, step_minutes):
+    midnight = datetime.combine(dt.date(), time())
+    minutes = math.ceil((dt - midnight).total_seconds() / 60 / step_minutes - 1e-9) * step_minutes
+    return midnight + timedelta(minutes=minutes)
+
+
+def work_windows(start, end):
+    """(from, to) working-hours stretches of [start, end), a day at a time."""
+    first, last = _cfg("APPOINTMENT_DAY_HOURS", (8, 19))
+    workdays = _cfg("APPOINTMENT_WORKDAYS", (0, 1, 2, 3, 4, 5))
+    day = start.date()
+    while datetime.combine(day, time()) < end:
+        if day.weekday() in workdays:
+            midnight = datetime.combine(day, time())
+            lo, hi = max(start, midnight + timedelta(hours=first)), min(end, midnight + timedelta(hours=last))
+            if lo < hi:
+                yield lo, hi
+        day += timedelta(days=1)
+
+
+def _fits(index, window, minutes):
+    """(slot from, to) gaps of `window` long enough for `minutes`, starting on the slot grid."""
+    step = _cfg("APPOINTMENT_SLOT_MINUTES", 15)
+    need = timedelta(minutes=minutes)
+    for lo, hi in index.gaps(*window):
+        lo = _ceil(lo, step)
+        if lo + need <= hi:
+            yield lo, hi
+
+
+# -----------------------------
+# Schedules
+# -----------------------------
+def schedules(user_ids, start, end, exclude=()) -> dict:
+    """{user_id: IntervalIndex} of scheduled appointments touching [start, end), padded for travel."""
+    user_ids = list(user_ids)
+    out = {uid: [] for uid in user_ids}
+    if not user_ids:
+        return {}
+    pad, A = _pad(), Appointment.__table__
+    longest = timedelta(minutes=_cfg("APPOINTMENT_MAX_MINUTES", 480))
+    rows = db.session.execute(
+        select(A.c.user_id, A.c.starts_at, A.c.ends_at, A.c.id)
+        .where(A.c.user_id.in_(user_ids), A.c.starts_at >= start - longest - pad, A.c.starts_at < end + pad,
+               A.c.ends_at > start - pad, A.c.status == "scheduled"))
+    for uid, s, e, appt_id in rows:
+        if appt_id not in exclude:
+            out[uid].append((s - pad, e + pad, appt_id))
+    return {uid: IntervalIndex(busy) for uid, busy in out.items()}
+
+
+def availability(user_ids, start, end, minutes) -> dict:
+    """{user_id: [(from, to)]}: working-hours windows in [start, end) where `minutes` fit."""
+    indexes = schedules(user_ids, start, end)
+    windows = list(work_windows(start, end))
+    return {uid: [slot for w in windows for slot in _fits(index, w, minutes)] for uid, index in indexes.items()}
+
+
+def next_open_slot(user_ids, after, minutes, days=None):
+    """(user_id, start) of the earliest slot for `minutes` after `after` among these reps, or None."""
+    until = after + timedelta(days=days or _cfg("APPOINTMENT_SEARCH_DAYS", 60))
+    # A week at a time, so a slot tomorrow doesn't load two months of calendars.
+    lo = after
+    while lo < until:
+        hi = min(until, datetime.combine(lo.date() + timedelta(days=7), time()))   # whole days per chunk
+        indexes = schedules(user_ids, lo, hi)
+        for window in work_windows(lo, hi):
+            best = None
+            for uid, index in indexes.items():
+                slot = next(_fits(index, window, minutes), None)
+                if slot is not None and (best is None or slot[0] < best[1]):
+                    best = (uid, slot[0])
+            if best is not None:
+                return best
+        lo = hi
+    return None
+
+
+# -----------------------------
+# Booking
+# -----------------------------
+def _check_times(starts_at, ends_at):
+    if not (isinstance(starts_at, datetime) and isinstance(ends_at, datetime)):
+        raise ScheduleError("starts_at and ends_at are required")
+    if ends_at <= starts_at:
+        raise ScheduleError("ends_at must be after starts_at")
+    if ends_at - starts_at > timedelta(minutes=_cfg("APPOINTMENT_MAX_MINUTES", 480)):
+        raise ScheduleError("appointment is too long")
+
+
+def _check_free(user_id, starts_at, ends_at, exclude_id=None):
+    # Row lock on the rep (Postgres): two bookings for one rep can't both pass the check.
+    db.session.execute(select(User.id).where(User.id == user_id).with_for_update())
+    index = schedules([user_id], starts_at, ends_at, exclude={exclude_id})[user_id]
+    clashes = index.overlapping(starts_at, ends_at)
+    if clashes:
+        raise ScheduleConflict(Appointment.query.filter(Appointment.id.in_(clashes))
+                               .order_by(Appointment.starts_at).all())
+
+
+def book(lead: Lead, user_id, starts_at, ends_at, notes=None) -> Appointment:
+    """Schedule a visit; the lead moves up to 'Appt' if it was behind. Caller commits."""
+    _check_times(starts_at, ends_at)
+    _check_free(user_id, starts_at, ends_at)
+    appt = Appointment(lead_id=lead.id, user_id=user_id, starts_at=starts_at, ends_at=ends_at, notes=notes)
+    db.session.add(appt)
+    if LEAD_STATUS_ORDER.get(lead.status, 0) < LEAD_STATUS_ORDER["Appt"]:
+        lead.status = "Appt"
+    return appt
+
+
+def move(appt: Appointment, starts_at, ends_at):
+    """Reschedule one appointment. Caller commits."""
+    _check_times(starts_at, ends_at)
+    _check_free(appt.user_id, starts_at, ends_at, exclude_id=appt.id)
+    appt.starts_at, appt.ends_at = starts_at, ends_at
+
+
+def bulk_reschedule(day, user_ids=None, not_before=None) -> dict:
+    """Move every scheduled appointment on `day` to each rep's earliest open slots from `not_before`.
+
+    For a storm day: appointments keep their rep and length and are placed in
+    their original order, so the first visit of the day gets the first free
+    slot. Appointments with no room within APPOINTMENT_SEARCH_DAYS stay put and
+    are reported as unplaced. Caller commits.
+    """
+    day_start = datetime.combine(day, time())
+    not_before = not_before or day_start + timedelta(days=1)
+    until = not_before + timedelta(days=_cfg("APPOINTMENT_SEARCH_DAYS", 60))
+    q = Appointment.query.filter(Appointment.status == "scheduled", Appointment.starts_at >= day_start,
+                                 Appointment.starts_at < day_start + timedelta(days=1))
+    if user_ids is not None:
+        q = q.filter(Appointment.user_id.in_(list(user_ids)))
+    appts = q.order_by(Appointment.starts_at, Appointment.id).all()
+
+    pad = _pad()
+    indexes = schedules({a.user_id for a in appts}, not_before, until)
+    windows = list(work_windows(not_before, until))
+    moved, unplaced = [], []
+    for appt in appts:
+        index = indexes[appt.user_id]
+        index.remove(appt.id)
+        length = appt.ends_at - appt.starts_at
+        slot = next((s for w in windows for s, _ in _fits(index, w, length.total_seconds() / 60)), None)
+        if slot is None:
+            index.add(appt.starts_at - pad, appt.ends_at + pad, appt.id)
+            unplaced.append(appt.id)
+            continue
+        moved.append({"id": appt.id, "from": appt.starts_at.isoformat(), "to": slot.isoformat()})
+        appt.starts_at, appt.ends_at = slot, slot + length
+        index.add(slot - pad, slot + length + pad, appt.id)
+    return {"moved": moved, "unplaced": unplaced}
+
+
+@event.listens_for(db.session, "after_flush")
+def _drop_for_deleted_leads(session, flush_context):
+    """Deleting a lead drops its appointments, as the FK's cascade would where it's enforced.
+
+    Archiving keeps them, parked on archived_lead_id (see services/archive.py).
+    """
+    leads = [o.id for o in session.deleted if isinstance(o, Lead)]
+    if leads:
+        A = Appointment.__table__
+        session.connection().execute(delete(A).where(A.c.lead_id.in_(leads)))
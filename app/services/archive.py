@@ -0,0 +1,244 @@
+# File: app/services/archive.py
+
+# Hot/cold split for leads. `archive_leads` moves finished or long-untouched
+# leads, with their deals, into `archived_lead` / `archived_deal` in batches of
+# set-based INSERT ... SELECT + DELETE statements, and folds their totals into
+# `archive_summary` so lifetime numbers don't need the cold rows. Commission is
+# folded in as the change in each affected rep's plan earnings, so archiving
+# (or restoring) never changes what the dashboard says a rep has earned.
+# Archived leads can be searched and restored on demand. Archive rows get their
+# own ids (the live id is kept as `original_id`, since SQLite reuses freed ids),
+# and attachments and appointments stay put, parked on `archived_lead_id` /
+# `archived_deal_id` pointing at those archive rows, so the live foreign keys
+# never point at a row that isn't there (or at a reused id).
+
+from datetime import datetime, timedelta
+
+from flask import current_app
+from sqlalchemy import and_, bindparam, case, delete, exists, func, insert, literal, or_, select, update
+
+from app import db
+from app.models import (Lead, Deal, Tombstone, ArchivedLead, ArchivedDeal, ArchiveSummary, Attachment,
+                        Appointment)
+from app.services import commissions, metrics, scoring
+
+SUMMARY_FIELDS = ("leads", "deals", "deals_signed", "deals_completed", "completed_rcv", "completed_commission")
+_LEAD_COLUMNS = [c.name for c in ArchivedLead.__table__.c if c.name not in ("id", "original_id", "archived_at")]
+_DEAL_COLUMNS = [c.name for c in ArchivedDeal.__table__.c
+                 if c.name not in ("id", "original_id", "lead_id", "archived_at")]
+
+
+def default_cutoff(now=None) -> datetime:
+    months = current_app.config.get("ARCHIVE_AFTER_MONTHS", 12)
+    return (now or datetime.utcnow()) - timedelta(days=round(months * 30.4375))
+
+
+def _candidates(cutoff, stale_statuses, after_id, limit) -> list:
+    """Ids of leads untouched since `cutoff` that are Completed (all deals done) or stale."""
+    L, D = Lead.__table__, Deal.__table__
+    untouched = or_(L.c.updated_at < cutoff, and_(L.c.updated_at.is_(None), L.c.date_created < cutoff))
+    recent_deal = exists().where(D.c.lead_id == L.c.id, D.c.date_updated >= cutoff)
+    open_deal = exists().where(D.c.lead_id == L.c.id, D.c.status != "Completed")
+    finished = and_(L.c.status == "Completed", ~open_deal)
+    return db.session.execute(
+        select(L.c.id)
+        .where(L.c.id > after_id, untouched, ~recent_deal,
+               or_(finished, L.c.status.in_(stale_statuses)))
+        .order_by(L.c.id).limit(limit)
+    ).scalars().all()
+
+
+def _deltas(lead_table, deal_table, lead_ids) -> dict:
+    """{user_id: {summary field: amount}} for the given leads (live or archived tables).
+
+    completed_commission is left at 0; see _earned_moves().
+    """
+    L, D = lead_table, deal_table
+    out = {}
+    for uid, n in db.session.execute(
+            select(L.c.user_id, func.count()).where(L.c.id.in_(lead_ids)).group_by(L.c.user_id)):
+        out[uid] = dict.fromkeys(SUMMARY_FIELDS, 0)
+        out[uid]["leads"] = n
+    done = D.c.status == "Completed"
+    rows = db.session.execute(
+        select(L.c.user_id, func.count(),
+               func.sum(case((D.c.status.in_(["Signed", "Completed"]), 1), else_=0)),
+               func.sum(case((done, 1), else_=0)),
+               func.sum(case((done, D.c.contract_price), else_=0.0)))
+        .select_from(D.join(L, L.c.id == D.c.lead_id))
+        .where(L.c.id.in_(lead_ids)).group_by(L.c.user_id)
+    )
+    for uid, n, signed, completed, rcv in rows:
+        out[uid].update(deals=n, deals_signed=int(signed or 0), deals_completed=int(completed or 0),
+                        completed_rcv=float(rcv or 0.0))
+    return out
+
+
+def _earned(user_ids) -> dict:
+    return {uid: e["earned"] for uid, e in commissions.earnings_by_user(user_ids).items()}
+
+
+def _earned_moves(owner_ids):
+    """Reps whose plan earnings move with these owners' deals, and their earnings now.
+
+    That's the owners plus anyone their plans pay a split or override. Call
+    _add_earned() with the result once the rows have moved.
+    """
+    plans = commissions.plans_for(owner_ids)
+    reps = sorted(set(owner_ids).union(*(p.payees for p in plans.values())))
+    return reps, _earned(reps)
+
+
+def _add_earned(deltas: dict, moves, sign: int):
+    """Put the drop (sign +1, archiving) or rise (-1, restoring) in plan earnings into `deltas`."""
+    reps, before = moves
+    after = _earned(reps)
+    for uid in reps:
+        d = deltas.setdefault(uid, dict.fromkeys(SUMMARY_FIELDS, 0))
+        d["completed_commission"] = sign * (before[uid] - after[uid])
+    return deltas
+
+
+def _apply(deltas: dict, sign: int):
+    existing = {s.user_id: s for s in ArchiveSummary.query.filter(ArchiveSummary.user_id.in_(list(deltas)))}
+    for uid, d in deltas.items():
+        summary = existing.get(uid)
+        if summary is None:
+            summary = ArchiveSummary(user_id=uid, **dict.fromkeys(SUMMARY_FIELDS, 0))
+            db.session.add(summary)
+        for field in SUMMARY_FIELDS:
+            setattr(summary, field, (getattr(summary, field) or 0) + sign * d[field])
+
+
+def _archive_batch(lead_ids, now):
+    L, D = Lead.__table__, Deal.__table__
+    AL, AD = ArchivedLead.__table__, ArchivedDeal.__table__
+    deltas = _deltas(L, D, lead_ids)
+
+    deals = db.session.execute(
+        select(D.c.id, L.c.user_id).join(L, L.c.id == D.c.lead_id).where(D.c.lead_id.in_(lead_ids))
+    ).all()
+    owners = db.session.execute(select(L.c.id, L.c.user_id).where(L.c.id.in_(lead_ids))).all()
+    moves = _earned_moves({u for _, u in owners})
+
+    archived_leads = db.session.execute(insert(AL).from_select(
+        _LEAD_COLUMNS + ["original_id", "archived_at"],
+        select(*[L.c[n] for n in _LEAD_COLUMNS], L.c.id, literal(now)).where(L.c.id.in_(lead_ids))
+    ).returning(AL.c.id, AL.c.original_id)).all()
+    archived_deals = db.session.execute(insert(AD).from_select(
+        _DEAL_COLUMNS + ["original_id", "lead_id", "archived_at"],
+        select(*[D.c[n] for n in _DEAL_COLUMNS], D.c.id, AL.c.id, literal(now))
+        .join(AL, AL.c.original_id == D.c.lead_id)
+        .where(AL.c.id.in_([i for i, _ in archived_leads]))
+    ).returning(AD.c.id, AD.c.original_id)).all()
+
+    # Core deletes skip the ORM tombstone hook; offline clients still need to drop these rows.
+    tombstones = [{"entity": "deal", "entity_id": i, "user_id": u} for i, u in deals]
+    tombstones += [{"entity": "lead", "entity_id": i, "user_id": u} for i, u in owners]
+    db.session.execute(insert(Tombstone), tombstones)
+    A, P = Attachment.__table__, Appointment.__table__
+    parked = [{"live": orig, "archived": aid} for aid, orig in archived_leads]
+    if parked:
+        for T in (A, P):
+            db.session.execute(update(T).where(T.c.lead_id == bindparam("live"))
+                               .values(archived_lead_id=bindparam("archived"), lead_id=None), parked)
+    parked = [{"live": orig, "archived": aid} for aid, orig in archived_deals]
+    if parked:
+        db.session.execute(update(A).where(A.c.deal_id == bindparam("live"))
+                           .values(archived_deal_id=bindparam("archived"), deal_id=None), parked)
+    db.session.execute(delete(D).where(D.c.lead_id.in_(lead_ids)))
+    db.session.execute(delete(L).where(L.c.id.in_(lead_ids)))
+    _apply(_add_earned(deltas, moves, +1), +1)
+    metrics.touched(u for _, u in owners)
+    db.session.commit()
+    return len(deals)
+
+
+def archive_leads(cutoff=None, batch_size=None, stale_statuses=None, now=None) -> dict:
+    """Move every eligible lead (and its deals) to cold storage, one batch per transaction."""
+    cfg = current_app.config
+    now = now or datetime.utcnow()
+    cutoff = cutoff or default_cutoff(now)
+    batch_size = batch_size or cfg.get("ARCHIVE_BATCH_SIZE", 500)
+    stale_statuses = list(stale_statuses or cfg.get("ARCHIVE_STALE_STATUSES", ("New", "Contacted")))
+
+    leads = deals = batches = 0
+    after_id = 0
+    while True:
+        ids = _candidates(cutoff, stale_statuses, after_id, batch_size)
+        if not ids:
+            break
+        deals += _archive_batch(ids, now)
+        leads += len(ids)
+        batches += 1
+        after_id = ids[-1]
+    return {"leads": leads, "deals": deals, "batches": batches, "cutoff": cutoff.isoformat()}
+
+
+def restore_lead(user_id: int, archived_id: int):
+    """Move one archived lead (by its ArchivedLead id) and its deals back to the live tables.
+
+    The lead gets its old id back unless a new lead has taken it. Returns the Lead, or None.
+    """
+    archived = ArchivedLead.query.filter_by(id=archived_id, user_id=user_id).first()
+    if archived is None:
+        return None
+    L, D = Lead.__table__, Deal.__table__
+    AL, AD = ArchivedLead.__table__, ArchivedDeal.__table__
+    deltas = _deltas(AL, AD, [archived_id])
+    moves = _earned_moves([user_id])
+
+    now = datetime.utcnow()
+    lead_row = {n: getattr(archived, n) for n in _LEAD_COLUMNS}
+    lead_row["updated_at"] = now   # fresh activity, or the next run would archive it again
+    if db.session.get(Lead, archived.original_id) is None:
+        lead_row["id"] = archived.original_id
+    new_id = db.session.execute(insert(L).returning(L.c.id), [lead_row]).scalar_one()
+    A, P = Attachment.__table__, Appointment.__table__
+    db.session.execute(update(A).where(A.c.archived_lead_id == archived_id)
+                       .values(lead_id=new_id, archived_lead_id=None))
+    db.session.execute(update(P).where(P.c.archived_lead_id == archived_id)
+                       .values(lead_id=new_id, archived_lead_id=None))
+
+    if archived.deals:
+        taken = set(db.session.execute(
+            select(D.c.id).where(D.c.id.in_([d.original_id for d in archived.deals]))).scalars())
+        for d in archived.deals:
+            row = {n: getattr(d, n) for n in _DEAL_COLUMNS}
+            row["lead_id"] = new_id
+            if d.original_id not in taken:
+                row["id"] = d.original_id
+            deal_id = db.session.execute(insert(D).returning(D.c.id), [row]).scalar_one()
+            db.session.execute(update(A).where(A.c.archived_deal_id == d.id)
+                               .values(deal_id=deal_id, archived_deal_id=None))
+
+    db.session.execute(delete(AD).where(AD.c.lead_id == archived_id))
+    db.session.execute(delete(AL).where(AL.c.id == archived_id))
+    _apply(_add_earned(deltas, moves, -1), -1)
+    scoring.rescore([new_id])
+    metrics.touched([user_id])
+    db.session.commit()
+    return db.session.get(Lead, new_id)
+
+
+def search(user_id: int, q: str = "", limit: int = 50, offset: int = 0) -> list:
+    """Archived leads matching `q` on name, email, phone or address; newest archive first."""
+    query = ArchivedLead.query.filter(ArchivedLead.user_id == user_id)
+    q = (q or "").strip()
+    if q:
+        like = f"%{q}%"
+        query = query.filter(or_(ArchivedLead.first_name.ilike(like), ArchivedLead.last_name.ilike(like),
+                                 ArchivedLead.email.ilike(like), ArchivedLead.phone_number.ilike(like),
+                                 ArchivedLead.address.ilike(like)))
+    return query.order_by(ArchivedLead.archived_at.desc(), ArchivedLead.id.desc()) \
+        .limit(limit).offset(offset).all()
+
+
+def summaries(user_ids) -> dict:
+    """{user_id: {summary field: total}}, zeros for users with nothing archived."""
+    user_ids = list(user_ids)
+    out = {uid: dict.fromkeys(SUMMARY_FIELDS, 0) for uid in user_ids}
+    if user_ids:
+        for s in ArchiveSummary.query.filter(ArchiveSummary.user_id.in_(user_ids)):
+            out[s.user_id] = {f: getattr(s, f) for f in SUMMARY_FIELDS}
+    return out
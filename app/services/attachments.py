@@ -0,0 +1,324 @@
+# File: app/services/attachments.py
+
+# Photos and documents on leads and deals.
+#
+# Uploads are resumable: the client creates an upload (name, declared size),
+# then PATCHes chunks at an explicit offset. Each chunk is streamed from the
+# request body straight into <root>/uploads/<id>.part in small pieces, so a
+# worker never holds more than ATTACHMENT_COPY_BUFFER bytes of a file. The
+# offset is simply the size of the .part file, so a client that lost its
+# connection asks for it (HEAD) and carries on.
+#
+# Finished files are content-addressed: the SHA-256 of the bytes names the
+# blob (<root>/blobs/ab/<sha>). A repeat upload of the same photo only adds an
+# Attachment row pointing at the existing Blob. Each tenant gets its own root.
+#
+# Thumbnails are made on first request by THUMBNAILER in a small shared thread
+# pool (concurrent requests for the same thumbnail wait on one job) and cached
+# next to the blobs. Deleting a lead or deal drops its attachments; blobs
+# nothing points at any more are deleted by `flask attachments prune`, with
+# uploads abandoned for ATTACHMENT_UPLOAD_TTL.
+
+import hashlib
+import importlib
+import os
+import secrets
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+try:
+    import fcntl
+except ImportError:   # pragma: no cover - not on Windows
+    fcntl = None
+
+from flask import current_app
+from sqlalchemy import delete, event, exists, or_, select
+
+from app import db, tenancy
+from app.models import Attachment, Blob, Deal, Lead, Upload
+from app.services import sql
+
+
+class UploadError(ValueError):
+    """The client sent something we can't accept; `status` is the HTTP status to answer with."""
+
+    def __init__(self, message, status=400, offset=None):
+        super().__init__(message)
+        self.status, self.offset = status, offset
+
+
+class ThumbnailUnavailable(Exception):
+    """No thumbnail can be made for this file (not an image, or no imaging library)."""
+
+
+# -----------------------------
+# Paths
+# -----------------------------
+def root() -> str:
+    return os.path.join(current_app.config["ATTACHMENT_FOLDER"], tenancy.current() or "default")
+
+
+def blob_path(sha256: str) -> str:
+    return os.path.join(root(), "blobs", sha256[:2], sha256)
+
+
+def relative_blob_path(sha256: str) -> str:
+    return "/".join((tenancy.current() or "default", "blobs", sha256[:2], sha256))
+
+
+def _part_path(upload_id: str) -> str:
+    return os.path.join(root(), "uploads", upload_id + ".part")
+
+
+def _thumb_path(sha256: str, size: int) -> str:
+    return os.path.join(root(), "thumbs", sha256[:2], f"{sha256}-{size}.jpg")
+
+
+# -----------------------------
+# Ownership
+# -----------------------------
+def owner_of(lead_id=None, deal_id=None):
+    """user_id owning the lead/deal, or None if it doesn't exist."""
+    if deal_id is not None:
+        return db.session.execute(
+            select(Lead.user_id).join(Deal, Deal.lead_id == Lead.id).where(Deal.id == deal_id)).scalar()
+    if lead_id is not None:
+        return db.session.execute(select(Lead.user_id).where(Lead.id == lead_id)).scalar()
+    return None
+
+
+# -----------------------------
+# Uploads
+# -----------------------------
+def start_upload(user_id, filename, size, content_type=None, lead_id=None, deal_id=None) -> Upload:
+    """Register an upload; the caller commits."""
+    cfg = current_app.config
+    filename = os.path.basename((filename or "").replace("\\", "/")).strip()[:255]
+    if not filename:
+        raise UploadError("filename is required")
+    if (lead_id is None) == (deal_id is None):
+        raise UploadError("give exactly one of lead_id and deal_id")
+    if not isinstance(size, int) or size <= 0:
+        raise UploadError("size must be a positive integer")
+    if size > cfg.get("ATTACHMENT_MAX_SIZE", 50 * 1024 * 1024):
+        raise UploadError("file is too large", status=413)
+    upload = Upload(id=secrets.token_hex(16), filename=filename, size=size,
+                    content_type=(content_type or "application/octet-stream")[:100],
+                    lead_id=lead_id, deal_id=deal_id, user_id=user_id)
+    os.makedirs(os.path.dirname(_part_path(upload.id)), exist_ok=True)
+    open(_part_path(upload.id), "wb").close()
+    db.session.add(upload)
+    return upload
+
+
+def offset(upload: Upload) -> int:
+    try:
+        return os.path.getsize(_part_path(upload.id))
+    except FileNotFoundError:
+        return 0
+
+
+def _copy(stream, fh, limit: int, bufsize: int) -> int:
+    """Copy up to `limit` bytes from `stream` into `fh`, `bufsize` at a time."""
+    written = 0
+    while written < limit:
+        chunk = stream.read(min(bufsize, limit - written))
+        if not chunk:
+            break
+        fh.write(chunk)
+        written += len(chunk)
+    return written
+
+
+def write_chunk(upload: Upload, at: int, stream, length: int) -> int:
+    """Append `length` bytes from `stream` at offset `at`; returns the new offset.
+
+    Raises UploadError(409) with the current offset when `at` doesn't match it,
+    so a client can resume from the right place.
+    """
+    cfg = current_app.config
+    if length > cfg.get("ATTACHMENT_CHUNK_MAX", 8 * 1024 * 1024):
+        raise UploadError("chunk is too large", status=413)
+    with open(_part_path(upload.id), "ab") as fh:
+        if fcntl is not None:
+            fcntl.flock(fh, fcntl.LOCK_EX)   # one writer per upload at a time
+        current = fh.seek(0, os.SEEK_END)
+        if at != current:
+            raise UploadError("offset mismatch", status=409, offset=current)
+        if current + length > upload.size:
+            raise UploadError("chunk runs past the declared size", status=413, offset=current)
+        written = _copy(stream, fh, length, cfg.get("ATTACHMENT_COPY_BUFFER", 64 * 1024))
+        fh.flush()
+        return current + written
+
+
+def _hash_file(path: str, bufsize: int) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as fh:
+        for chunk in iter(lambda: fh.read(bufsize), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def finish_upload(upload: Upload) -> Attachment:
+    """Turn a complete upload into an Attachment, storing the bytes once per content. Caller commits."""
+    part = _part_path(upload.id)
+    sha = _hash_file(part, current_app.config.get("ATTACHMENT_COPY_BUFFER", 64 * 1024) * 16)
+    # Get-or-create in one statement: two workers finishing the same bytes both
+    # land on the one row instead of the second failing the unique sha256.
+    db.session.execute(sql.upsert(Blob.__table__).values(
+        sha256=sha, size=upload.size, content_type=upload.content_type, created_at=datetime.utcnow(),
+    ).on_conflict_do_nothing(index_elements=["sha256"]))
+    blob = db.session.execute(select(Blob).where(Blob.sha256 == sha)).scalar_one()
+    target = blob_path(sha)
+    if not os.path.exists(target):
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        os.replace(part, target)   # atomic; a concurrent twin writes the same bytes
+    else:
+        os.remove(part)   # already stored
+    attachment = Attachment(filename=upload.filename, lead_id=upload.lead_id, deal_id=upload.deal_id,
+                            blob=blob, user_id=upload.user_id)
+    db.session.add(attachment)
+    db.session.delete(upload)
+    return attachment
+
+
+def cancel_upload(upload: Upload):
+    try:
+        os.remove(_part_path(upload.id))
+    except FileNotFoundError:
+        pass
+    db.session.delete(upload)
+
+
+# -----------------------------
+# Attachments
+# -----------------------------
+def listing(lead_id=None, deal_id=None) -> list:
+    q = Attachment.query
+    q = q.filter_by(deal_id=deal_id) if deal_id is not None else q.filter_by(lead_id=lead_id)
+    return q.order_by(Attachment.id).all()
+
+
+@event.listens_for(db.session, "after_flush")
+def _detach_deleted(session, flush_context):
+    """Deleting a lead or deal drops its attachments (the blobs go at the next prune).
+
+    The foreign keys cascade too, but SQLite only enforces them with PRAGMA foreign_keys.
+    """
+    leads = [o.id for o in session.deleted if isinstance(o, Lead)]
+    deals = [o.id for o in session.deleted if isinstance(o, Deal)]
+    if leads or deals:
+        A = Attachment.__table__
+        session.connection().execute(delete(A).where(or_(A.c.lead_id.in_(leads), A.c.deal_id.in_(deals))))
+
+
+def prune(now=None) -> dict:
+    """Delete blobs nothing points at (with their thumbnails) and abandoned uploads."""
+    now = now or datetime.utcnow()
+    ttl = timedelta(seconds=current_app.config.get("ATTACHMENT_UPLOAD_TTL", 86400))
+    stale = Upload.query.filter(Upload.created_at < now - ttl).all()
+    for upload in stale:
+        cancel_upload(upload)
+    orphans = db.session.execute(
+        select(Blob.id, Blob.sha256).where(~exists().where(Attachment.blob_id == Blob.id))).all()
+    if orphans:
+        db.session.execute(delete(Blob).where(Blob.id.in_([bid for bid, _ in orphans])))
+    db.session.commit()
+    for _, sha in orphans:   # only once the rows are gone for good
+        _remove_files(sha)
+    return {"uploads": len(stale), "blobs": len(orphans)}
+
+
+def _remove_files(sha):
+    thumbs = os.path.dirname(_thumb_path(sha, 0))
+    paths = [blob_path(sha)]
+    if os.path.isdir(thumbs):
+        paths += [os.path.join(thumbs, f) for f in os.listdir(thumbs) if f.startswith(sha + "-")]
+    for path in paths:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+
+# -----------------------------
+# Thumbnails
+# -----------------------------
+def pil_thumbnail(src: str, dst: str, size: int):
+    try:
+        from PIL import Image, UnidentifiedImageError
+    except ImportError:
+        raise ThumbnailUnavailable("Pillow is not installed")
+    try:
+        with Image.open(src) as im:
+            im.draft("RGB", (size, size))   # JPEG: decode at reduced scale
+            im.thumbnail((size, size))
+            im.convert("RGB").save(dst, "JPEG", quality=80, optimize=True)
+    except (UnidentifiedImageError, OSError) as exc:
+        raise ThumbnailUnavailable(str(exc))
+
+
+THUMBNAILERS = {"pil": pil_thumbnail}
+
+_inflight = {}             # thumbnail path -> Future
+_inflight_lock = threading.Lock()
+
+
+def _thumbnailer(app):
+    name = app.config.get("THUMBNAILER", "pil")
+    if name in THUMBNAILERS:
+        return THUMBNAILERS[name]
+    module, _, attr = name.partition(":")
+    return getattr(importlib.import_module(module), attr)
+
+
+def _pool(app) -> ThreadPoolExecutor:
+    pool = app.extensions.get("thumbnail_pool")
+    if pool is None:
+        pool = app.extensions["thumbnail_pool"] = ThreadPoolExecutor(
+            app.config.get("ATTACHMENT_THUMB_WORKERS", 2), thread_name_prefix="thumb")
+    return pool
+
+
+def _render(make, src, dst, size):
+    tmp = f"{dst}.{secrets.token_hex(4)}.tmp"
+    try:
+        make(src, tmp, size)
+        os.replace(tmp, dst)   # readers never see a half-written thumbnail
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+    return dst
+
+
+def thumbnail(blob: Blob, size: int) -> str:
+    """Path of a cached `size` px thumbnail, rendering it in the pool on first use.
+
+    Raises ThumbnailUnavailable, or TimeoutError if rendering takes longer than
+    ATTACHMENT_THUMB_TIMEOUT (it keeps going and is cached for the next request).
+    """
+    if not blob.content_type.startswith("image/"):
+        raise ThumbnailUnavailable("not an image")
+    dst = _thumb_path(blob.sha256, size)
+    if os.path.exists(dst):
+        return dst
+    app = current_app._get_current_object()
+    with _inflight_lock:
+        future, owner = _inflight.get(dst), False
+        if future is None and os.path.exists(dst):   # finished while we waited for the lock
+            return dst
+        if future is None:
+            os.makedirs(os.path.dirname(dst), exist_ok=True)
+            future = _inflight[dst] = _pool(app).submit(
+                _render, _thumbnailer(app), blob_path(blob.sha256), dst, size)
+            owner = True
+    if owner:   # outside the lock: runs right here if the render already finished
+        future.add_done_callback(lambda f: _forget(dst))
+    return future.result(timeout=app.config.get("ATTACHMENT_THUMB_TIMEOUT", 10))
+
+
+def _forget(dst):
+    with _inflight_lock:
+        _inflight.pop(dst, None)
@@ -0,0 +1,99 @@
+# File: app/services/clusters.py
+
+# Server-side map clusters. Leads carry a precomputed geohash (set with their
+# coordinates, see app/services/geocoding.py) under two covering indexes, team
+# wide and per user. For a viewport and zoom we pick a cluster precision p
+# (cells at least ~128 px wide), cover the viewport with tiles = geohash cells
+# of precision p - 1, and aggregate each tile with GROUP BY substr(geohash, 1, p)
+# over an index range scan. A tile holds at most 32 clusters and is cached on
+# its own, so panning only computes the tiles that scrolled into view.
+#
+# Tiles live in the shared cache (app/cache.py) for MAP_TILE_TTL seconds under
+# the tenant's "map" tag, which any lead or deal write bumps for every worker.
+
+from flask import current_app, has_app_context
+from sqlalchemy import event, func, select
+
+from app import db
+from app.cache import cache
+from app.cache import invalidate as invalidate_tags
+from app.models import Lead, Deal
+from app.services import geohash
+
+MAX_PRECISION = geohash.PRECISION
+_END = "{"   # sorts after every geohash character
+
+
+def precision_for_zoom(zoom: int) -> int:
+    """Finest precision whose cells are >= 128 px wide at this web-map zoom (256 px tiles)."""
+    p = 1
+    while p < MAX_PRECISION and (5 * (p + 1) + 1) // 2 <= zoom + 1:
+        p += 1
+    return p
+
+
+def _cfg(key, default):
+    return current_app.config.get(key, default) if has_app_context() else default
+
+
+def invalidate(session=None):
+    """Forget the active tenant's cached tiles (for core writes; ORM writes do it themselves)."""
+    invalidate_tags("map", session=session)
+
+
+def _aggregate(tile: str, precision: int, user_id=None) -> list:
+    L, D = Lead.__table__, Deal.__table__
+    where = [L.c.geohash >= tile, L.c.geohash < tile + _END] if tile else [L.c.geohash.is_not(None)]
+    if user_id is not None:
+        where.append(L.c.user_id == user_id)
+    cell = func.substr(L.c.geohash, 1, precision).label("cell")
+
+    out = {}
+    for gh, status, n, lat, lng in db.session.execute(
+            select(cell, L.c.status, func.count(), func.sum(L.c.latitude), func.sum(L.c.longitude))
+            .where(*where).group_by(cell, L.c.status)):
+        c = out.setdefault(gh, {"geohash": gh, "count": 0, "lat": 0.0, "lng": 0.0, "pipeline": 0, "status": {}})
+        c["count"] += n
+        c["lat"] += lat
+        c["lng"] += lng
+        c["status"][status] = n
+    for gh, value in db.session.execute(
+            select(cell, func.sum(D.c.contract_price))
+            .select_from(L.join(D, D.c.lead_id == L.c.id))
+            .where(*where, D.c.status != "Completed").group_by(cell)):
+        out[gh]["pipeline"] = round(value or 0)
+    for c in out.values():
+        c["lat"] = round(c["lat"] / c["count"], 5)
+        c["lng"] = round(c["lng"] / c["count"], 5)
+    return [out[k] for k in sorted(out)]
+
+
+def _overlaps(cell, south, west, north, east) -> bool:
+    s, w, n, e = cell
+    return s <= north and n >= south and w <= east and e >= west
+
+
+def tile_clusters(tile: str, precision: int, user_id=None) -> list:
+    """Clusters of precision `precision` inside geohash cell `tile` (cached)."""
+    return cache().cached(f"tiles:{user_id}:{tile}:{precision}", lambda: _aggregate(tile, precision, user_id),
+                          tags=["map"], ttl=_cfg("MAP_TILE_TTL", 600))
+
+
+def viewport_clusters(south, west, north, east, zoom: int, user_id=None) -> dict:
+    """Clusters for a viewport: {"precision", "tiles", "clusters"}."""
+    precision = precision_for_zoom(zoom)
+    max_tiles = _cfg("MAP_MAX_TILES", 32)
+    while precision > 1 and geohash.cover_count(south, west, north, east, precision - 1) > max_tiles:
+        precision -= 1
+    tiles = geohash.cover(south, west, north, east, precision - 1)
+    clusters = [c for t in tiles for c in tile_clusters(t, precision, user_id)
+                if _overlaps(geohash.bounds(c["geohash"]), south, west, north, east)]
+    return {"precision": precision, "tiles": len(tiles), "clusters": clusters}
+
+
+@event.listens_for(db.session, "after_flush")
+def _invalidate_on_write(session, flush_context):
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        if isinstance(obj, (Lead, Deal)):
+            invalidate(session)
+            return
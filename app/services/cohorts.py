@@ -0,0 +1,152 @@
+# File: app/services/cohorts.py
+
+# Lead cohorts by creation week/month: conversion curves to Appt / Signed /
+# Completed and revenue per cohort.
+#
+# Open cohorts come from one grouped UNION ALL statement over leads created
+# after the cache watermark (an index range scan on (user_id, date_created)).
+# Cohorts older than COHORT_CLOSE_DAYS are frozen into `cohort_snapshot` the
+# first time they are seen and never recomputed.
+
+import json
+from datetime import date, datetime, timedelta
+
+from flask import current_app
+from sqlalchemy import Integer, case, cast, func, literal, select, union_all
+from sqlalchemy.exc import IntegrityError
+
+from app import db
+from app.models import Lead, Deal, StatusTransition, CohortSnapshot
+from app.services.sql import seconds_between, period_start
+
+CURVE_STAGES = ["Appt", "Signed", "Completed"]
+PERIOD_DAYS = {"week": 7, "month": 30.4375}
+
+
+def _py_period_start(d: date, grain: str) -> date:
+    if grain == "week":
+        return d - timedelta(days=d.weekday())
+    return d.replace(day=1)
+
+
+def _next_period(d: date, grain: str) -> date:
+    if grain == "week":
+        return d + timedelta(days=7)
+    return (d.replace(day=28) + timedelta(days=4)).replace(day=1)
+
+
+def _as_date(v) -> date:
+    return v if isinstance(v, date) else date.fromisoformat(str(v)[:10])
+
+
+def _compute(user_id: int, grain: str, since, max_periods: int) -> dict:
+    """Raw cohort counts for leads created on/after `since` (None = all), in one statement."""
+    L, T, D = Lead.__table__, StatusTransition.__table__, Deal.__table__
+
+    reached = {
+        "Appt": T.c.to_status.in_(["Appt", "Signed", "Completed"]),
+        "Signed": T.c.to_status.in_(["Signed", "Completed"]),
+        "Completed": T.c.to_status == "Completed",
+    }
+    first = (select(T.c.entity_id.label("lead_id"),
+                    *[func.min(case((cond, T.c.at))).label(stage) for stage, cond in reached.items()])
+             .where(T.c.entity == "lead", T.c.user_id == user_id))
+    leads = select(L.c.id, L.c.date_created,
+                   period_start(L.c.date_created, grain).label("cohort")) \
+        .where(L.c.user_id == user_id, L.c.date_created.is_not(None))
+    if since is not None:
+        first = first.where(T.c.at >= since)   # nothing is reached before the lead exists
+        leads = leads.where(L.c.date_created >= since)
+    first = first.group_by(T.c.entity_id).subquery("first_reach")
+    leads = leads.subquery("cohort_leads")
+    p = (select(leads, *[first.c[s] for s in CURVE_STAGES])
+         .select_from(leads.outerjoin(first, first.c.lead_id == leads.c.id))).subquery("p")
+
+    parts = [
+        select(p.c.cohort, literal("leads").label("metric"), literal(-1).label("period"),
+               cast(func.count(), db.Float).label("value")).group_by(p.c.cohort),
+        select(p.c.cohort, literal("revenue"), literal(-1), func.sum(D.c.contract_price))
+        .select_from(p.join(D, D.c.lead_id == p.c.id))
+        .where(D.c.status == "Completed").group_by(p.c.cohort),
+    ]
+    for stage in CURVE_STAGES:
+        period = cast(seconds_between(p.c.date_created, p.c[stage]) / (86400.0 * PERIOD_DAYS[grain]), Integer)
+        parts.append(select(p.c.cohort, literal(stage), period, cast(func.count(), db.Float))
+                     .where(p.c[stage].is_not(None)).group_by(p.c.cohort, period))
+
+    out = {}
+    for cohort, metric, period, value in db.session.execute(union_all(*parts)):
+        c = out.setdefault(_as_date(cohort), {"leads": 0, "revenue": 0.0,
+                                              "reached": {s: [0] * max_periods for s in CURVE_STAGES}})
+        if metric == "leads":
+            c["leads"] = int(value)
+        elif metric == "revenue":
+            c["revenue"] = float(value or 0.0)
+        else:
+            c["reached"][metric][min(max(int(period), 0), max_periods - 1)] += int(value)
+    return out
+
+
+def _present(start: date, data: dict, closed: bool, periods: int) -> dict:
+    leads = data["leads"]
+    curves, totals = {}, {}
+    for stage in CURVE_STAGES:
+        running, curve = 0, []
+        for n in data["reached"][stage][:periods]:
+            running += n
+            curve.append(running / leads if leads else 0.0)
+        curves[stage] = curve
+        totals[stage] = sum(data["reached"][stage])
+    return {
+        "start": start.isoformat(),
+        "closed": closed,
+        "leads": leads,
+        "reached": totals,
+        "curves": curves,
+        "revenue": data["revenue"],
+        "revenue_per_lead": data["revenue"] / leads if leads else 0.0,
+    }
+
+
+def cohort_report(user_id: int, grain: str = "week", periods=None, today=None) -> dict:
+    """Cohort table for one rep: cached closed cohorts plus freshly computed open ones."""
+    if grain not in PERIOD_DAYS:
+        raise ValueError("grain must be 'week' or 'month'")
+    cfg = current_app.config
+    max_periods = cfg.get("COHORT_MAX_PERIODS", 26)
+    periods = max(1, min(periods or max_periods, max_periods))
+    today = today or date.today()
+    closed_before = _py_period_start(today - timedelta(days=cfg.get("COHORT_CLOSE_DAYS", 180)), grain)
+
+    cached = {s.cohort_start: json.loads(s.data) for s in
+              CohortSnapshot.query.filter_by(user_id=user_id, grain=grain)}
+    # Cohorts are contiguous in time: anything before the last cached one is cached
+    # (or empty), so only leads after the watermark need scanning.
+    watermark = datetime.combine(_next_period(max(cached), grain), datetime.min.time()) if cached else None
+    fresh = _compute(user_id, grain, watermark, max_periods)
+
+    newly_closed = [(start, data) for start, data in fresh.items() if start < closed_before]
+    if newly_closed:
+        db.session.add_all([CohortSnapshot(user_id=user_id, grain=grain, cohort_start=start,
+                                           data=json.dumps(data)) for start, data in newly_closed])
+        try:
+            db.session.commit()
+        except IntegrityError:  # a concurrent request froze them first; same numbers
+            db.session.rollback()
+
+    cohorts = [_present(s, d, True, periods) for s, d in cached.items()]
+    cohorts += [_present(s, d, s < closed_before, periods) for s, d in fresh.items()]
+    cohorts.sort(key=lambda c: c["start"])
+    return {"grain": grain, "periods": periods, "stages": CURVE_STAGES, "cohorts": cohorts}
+
+
+def reset_cache(user_id=None, grain=None) -> int:
+    """Drop frozen cohorts (e.g. after a backfill rewrote old leads)."""
+    q = CohortSnapshot.query
+    if user_id is not None:
+        q = q.filter_by(user_id=user_id)
+    if grain is not None:
+        q = q.filter_by(grain=grain)
+    n = q.delete()
+    db.session.commit()
+    return n
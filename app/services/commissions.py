@@ -0,0 +1,363 @@
+# File: app/services/commissions.py
+
+# Commission pay plans. A plan is a small JSON document:
+#
+#   {"base": "profit",                 # 'deal' (each deal's own base, the default), 'profit' or 'revenue'
+#    "rate": 40, "margin": 30,         # percents; null = the deal's own commission_rate / company_margin
+#    "tiers": [{"min": 0, "rate": 35}, {"min": 20000, "rate": 40}],   # rate by contract price
+#    "splits": [{"to": 7, "share": 0.25}],                           # part of the rep's commission
+#    "overrides": [{"to": 2, "rate": 2, "of": "revenue"}],           # paid on top: revenue|profit|commission
+#    "bonuses": [{"period": "month", "metric": "rcv", "threshold": 100000,
+#                 "amount": 500, "rate": 1}]}                        # per period of completed deals
+#
+# A rep's PayPlan row wins over the company default (user_id NULL); with
+# neither, every deal pays on its own terms exactly like the projector's
+# _eff_rate. compile_plan() turns the rules into a CompiledPlan once (tier
+# bounds sorted for bisect, per-base factors resolved), cached per
+# (tenant, plan id, version), and CompiledPlan.evaluate() scores a whole
+# column set of deals in one pass of list operations. Archiving folds the
+# plan earnings a rep loses into archive_summary, so their total holds.
+
+import bisect
+import json
+import threading
+from collections import OrderedDict, defaultdict
+from dataclasses import dataclass, field
+
+from flask import current_app, has_app_context
+from sqlalchemy import or_, select
+
+from app import db, tenancy
+from app.models import Deal, Lead, PayPlan
+from app.services.projector import _eff_rate
+
+# The dashboard also counts legacy rows that still carry the long status names.
+COMPLETED = {"Completed", "Job Completed"}
+BASES = ("deal", "profit", "revenue")
+OVERRIDE_OF = ("revenue", "profit", "commission")
+PERIODS = ("month", "quarter", "year")
+METRICS = ("rcv", "deals")
+
+_compiled = OrderedDict()   # (tenant, plan id, version) -> CompiledPlan
+_lock = threading.Lock()
+
+
+# -----------------------------
+# Deal columns
+# -----------------------------
+@dataclass
+class Deals:
+    """Deals as parallel columns, the shape CompiledPlan.evaluate() works on."""
+    id: list = field(default_factory=list)
+    status: list = field(default_factory=list)
+    price: list = field(default_factory=list)
+    rate: list = field(default_factory=list)
+    base: list = field(default_factory=list)
+    margin: list = field(default_factory=list)
+    updated: list = field(default_factory=list)   # completion date for completed deals
+
+    def __len__(self):
+        return len(self.id)
+
+    def append(self, id, status, price, rate, base, margin, updated):
+        self.id.append(id)
+        self.status.append(status)
+        self.price.append(float(price or 0.0))
+        self.rate.append(float(rate or 0.0))
+        self.base.append(base if base is not None else "profit")
+        self.margin.append(float(margin or 0.0))
+        self.updated.append(updated)
+
+    @property
+    def done(self) -> list:
+        return [s in COMPLETED for s in self.status]
+
+
+def deal_columns(user_ids) -> dict:
+    """{user_id: Deals} for every live deal of these users, one query."""
+    out = {uid: Deals() for uid in user_ids}
+    if not out:
+        return out
+    for uid, *row in db.session.execute(
+            select(Lead.user_id, Deal.id, Deal.status, Deal.contract_price, Deal.commission_rate,
+                   Deal.commission_base, Deal.company_margin, Deal.date_updated)
+            .join(Lead, Lead.id == Deal.lead_id).where(Lead.user_id.in_(list(out)))
+            .order_by(Lead.user_id, Deal.id)):
+        out[uid].append(*row)
+    return out
+
+
+# -----------------------------
+# Compiling
+# -----------------------------
+def _number(value, what, lo=0.0, hi=None) -> float:
+    try:
+        value = float(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"{what} must be a number")
+    if value < lo or (hi is not None and value > hi):
+        raise ValueError(f"{what} must be between {lo:g} and {hi:g}" if hi is not None
+                         else f"{what} must be >= {lo:g}")
+    return value
+
+
+def _payee(value, what) -> int:
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"{what}.to must be a user id")
+
+
+@dataclass
+class Evaluation:
+    """Result of scoring one rep's deals under a plan."""
+    rep: list              # the rep's commission per deal (after splits)
+    gross: list            # per deal, before splits
+    others: list           # (payee user_id, deal index, amount, 'split' | 'override')
+    bonuses: list          # (period key, amount) for completed volume past a threshold
+
+
+def _period_key(day, period) -> str:
+    if period == "year":
+        return f"{day.year}"
+    if period == "quarter":
+        return f"{day.year}-Q{(day.month - 1) // 3 + 1}"
+    return f"{day.year}-{day.month:02d}"
+
+
+class CompiledPlan:
+    """A pay plan ready to evaluate. Build with compile_plan()."""
+
+    def __init__(self, rules: dict, name="default", plan_id=None, version=0):
+        self.name, self.plan_id, self.version = name, plan_id, version
+        self.rules = rules
+        base = rules.get("base", "deal")
+        if base not in BASES:
+            raise ValueError(f"base must be one of {', '.join(BASES)}")
+        self.base = None if base == "deal" else base
+        self.rate = None if rules.get("rate") is None else _number(rules["rate"], "rate", 0, 100)
+        self.margin = None if rules.get("margin") is None else _number(rules["margin"], "margin", 0, 100)
+
+        tiers = []
+        for t in rules.get("tiers") or ():
+            if not isinstance(t, dict) or "rate" not in t:
+                raise ValueError("each tier needs a rate")
+            tiers.append((_number(t.get("min", 0), "tier min"), _number(t["rate"], "tier rate", 0, 100)))
+        tiers.sort()
+        self.tier_mins = [t[0] for t in tiers]
+        self.tier_rates = [t[1] for t in tiers]
+
+        self.splits = [(_payee(s.get("to"), "split"), _number(s.get("share"), "split share", 0, 1))
+                       for s in rules.get("splits") or ()]
+        if sum(share for _, share in self.splits) > 1:
+            raise ValueError("split shares add up to more than 1")
+        self.keep = 1.0 - sum(share for _, share in self.splits)
+
+        self.overrides = []
+        for o in rules.get("overrides") or ():
+            of = o.get("of", "revenue")
+            if of not in OVERRIDE_OF:
+                raise ValueError(f"override of must be one of {', '.join(OVERRIDE_OF)}")
+            self.overrides.append((_payee(o.get("to"), "override"),
+                                   _number(o.get("rate"), "override rate", 0, 100), of))
+
+        self.bonuses = []
+        for b in rules.get("bonuses") or ():
+            period, metric = b.get("period", "month"), b.get("metric", "rcv")
+            if period not in PERIODS:
+                raise ValueError(f"bonus period must be one of {', '.join(PERIODS)}")
+            if metric not in METRICS:
+                raise ValueError(f"bonus metric must be one of {', '.join(METRICS)}")
+            if b.get("rate") and metric != "rcv":
+                raise ValueError("a bonus rate needs metric 'rcv'")
+            self.bonuses.append((period, metric, _number(b.get("threshold"), "bonus threshold"),
+                                 _number(b.get("amount", 0), "bonus amount"),
+                                 _number(b.get("rate", 0), "bonus rate", 0, 100)))
+
+        self.payees = {to for to, _ in self.splits} | {to for to, _, _ in self.overrides}
+
+    # --- per-column terms ---
+    def _rates(self, deals: Deals) -> list:
+        if self.tier_mins:
+            mins, rates = self.tier_mins, self.tier_rates
+            return [rates[i - 1] if i else 0.0 for i in (bisect.bisect_right(mins, p) for p in deals.price)]
+        if self.rate is not None:
+            return [self.rate] * len(deals)
+        return deals.rate
+
+    def _factors(self, deals: Deals) -> list:
+        """Share of revenue a 100% rate would pay, per deal (margin for profit, 1 for revenue)."""
+        margins = [self.margin] * len(deals) if self.margin is not None else deals.margin
+        if self.base == "revenue":
+            return [1.0] * len(deals)
+        if self.base == "profit":
+            return [m / 100.0 for m in margins]
+        return [_eff_rate(100.0, m, b) for m, b in zip(margins, deals.base)]
+
+    def evaluate(self, deals: Deals, owner=None) -> Evaluation:
+        """Score every deal of one rep (`owner`) in one pass."""
+        factors = self._factors(deals)
+        gross = [p * r / 100.0 * f for p, r, f in zip(deals.price, self._rates(deals), factors)]
+        rep = [g * self.keep for g in gross] if self.splits else gross
+        others = []
+        for to, share in self.splits:
+            others.extend((to, i, g * share, "split") for i, g in enumerate(gross) if g)
+        for to, rate, of in self.overrides:
+            if to == owner:
+                continue
+            basis = gross if of == "commission" else \
+                [p * f for p, f in zip(deals.price, factors)] if of == "profit" else deals.price
+            others.extend((to, i, b * rate / 100.0, "override") for i, b in enumerate(basis) if b)
+        return Evaluation(rep=rep, gross=gross, others=others, bonuses=self._bonuses(deals))
+
+    def _bonuses(self, deals: Deals) -> list:
+        if not self.bonuses:
+            return []
+        out = []
+        done = [(u, p) for u, p, d in zip(deals.updated, deals.price, deals.done) if d and u is not None]
+        for period, metric, threshold, amount, rate in self.bonuses:
+            volume = defaultdict(lambda: [0, 0.0])
+            for updated, price in done:
+                v = volume[_period_key(updated, period)]
+                v[0] += 1
+                v[1] += price
+            for key in sorted(volume):
+                n, rcv = volume[key]
+                if (rcv if metric == "rcv" else n) >= threshold:
+                    extra = (rcv - threshold) * rate / 100.0 if metric == "rcv" else 0.0
+                    out.append((key, amount + extra))
+        return out
+
+    def effective_rate(self, contract_price, commission_pct, margin_pct, base) -> float:
+        """Decimal share of revenue the rep keeps on one deal of this size and terms."""
+        deals = Deals()
+        deals.append(None, "Signed", contract_price, commission_pct, (base or "").strip().lower(), margin_pct, None)
+        rep = self.evaluate(deals).rep[0]
+        return rep / contract_price if contract_price else 0.0
+
+
+def compile_plan(rules, name="default", plan_id=None, version=0) -> CompiledPlan:
+    """Validate and compile plan rules (a dict or JSON text); ValueError if malformed."""
+    if isinstance(rules, str):
+        try:
+            rules = json.loads(rules)
+        except ValueError:
+            raise ValueError("plan rules must be JSON")
+    if not isinstance(rules, dict):
+        raise ValueError("plan rules must be an object")
+    return CompiledPlan(rules, name=name, plan_id=plan_id, version=version)
+
+
+DEFAULT_PLAN = CompiledPlan({})
+
+
+# -----------------------------
+# Plans per user (cached per version)
+# -----------------------------
+def _cached(plan_id, version, name) -> CompiledPlan:
+    key = (tenancy.current(), plan_id, version)
+    with _lock:
+        plan = _compiled.get(key)
+        if plan is not None:
+            _compiled.move_to_end(key)
+            return plan
+    rules = db.session.execute(select(PayPlan.rules).where(PayPlan.id == plan_id)).scalar()
+    plan = compile_plan(rules, name=name, plan_id=plan_id, version=version)
+    size = current_app.config.get("COMMISSION_PLAN_CACHE_SIZE", 256) if has_app_context() else 256
+    with _lock:
+        _compiled[key] = plan
+        while len(_compiled) > size:
+            _compiled.popitem(last=False)
+    return plan
+
+
+def plans_for(user_ids) -> dict:
+    """{user_id: CompiledPlan}: each rep's own plan, else the company default, else DEFAULT_PLAN."""
+    user_ids = list(user_ids)
+    rows = db.session.execute(
+        select(PayPlan.user_id, PayPlan.id, PayPlan.version, PayPlan.name)
+        .where(or_(PayPlan.user_id.in_(user_ids), PayPlan.user_id.is_(None)))).all()
+    by_user = {uid: _cached(pid, v, name) for uid, pid, v, name in rows}
+    company = by_user.get(None, DEFAULT_PLAN)
+    return {uid: by_user.get(uid, company) for uid in user_ids}
+
+
+def plan_for(user_id) -> CompiledPlan:
+    return plans_for([user_id])[user_id]
+
+
+def save_plan(user_id, rules, name=None) -> PayPlan:
+    """Create or replace the plan of `user_id` (None = company default). Caller commits."""
+    compiled = compile_plan(rules)
+    plan = PayPlan.query.filter(PayPlan.user_id.is_(None) if user_id is None
+                                else PayPlan.user_id == user_id).first()
+    text = json.dumps(compiled.rules, sort_keys=True)
+    if plan is None:
+        plan = PayPlan(user_id=user_id, name=name or ("company" if user_id is None else "custom"), rules=text)
+        db.session.add(plan)
+    else:
+        plan.rules = text
+        plan.name = name or plan.name
+    return plan
+
+
+def payees() -> frozenset:
+    """Reps that some plan pays a split or override (their earnings move with other reps' deals)."""
+    rows = db.session.execute(select(PayPlan.id, PayPlan.version, PayPlan.name)).all()
+    return frozenset().union(*(_cached(pid, v, name).payees for pid, v, name in rows))
+
+
+def _payers(user_ids) -> set:
+    """Other reps whose plan pays any of `user_ids` a split or override."""
+    wanted = set(user_ids)
+    plans = db.session.execute(select(PayPlan.user_id, PayPlan.id, PayPlan.version, PayPlan.name)).all()
+    compiled = {uid: _cached(pid, v, name) for uid, pid, v, name in plans}
+    own = {uid for uid, plan in compiled.items() if uid is not None and wanted & plan.payees}
+    if None in compiled and wanted & compiled[None].payees:
+        with_plan = {uid for uid in compiled if uid is not None}
+        own |= {uid for (uid,) in db.session.execute(select(Lead.user_id).distinct())
+                if uid is not None and uid not in with_plan}
+    return own - wanted
+
+
+# -----------------------------
+# Earnings
+# -----------------------------
+def earnings_by_user(user_ids) -> dict:
+    """{user_id: earnings()} for every id given; each rep's deals are scored once.
+
+    Splits and overrides a rep's plan pays to another rep in the set are
+    credited from that same pass, so a whole team costs one deal query.
+    """
+    user_ids = list(user_ids)
+    out = {uid: dict.fromkeys(("earned", "potential", "bonus", "received_earned", "received_potential"), 0.0)
+           for uid in user_ids}
+    if not out:
+        return out
+    columns = deal_columns([*out, *_payers(out)])
+    plans = plans_for(list(columns))
+
+    for owner, deals in columns.items():
+        ev = plans[owner].evaluate(deals, owner=owner)
+        done = deals.done
+        if owner in out:
+            mine = out[owner]
+            mine["earned"] = sum(a for a, d in zip(ev.rep, done) if d)
+            mine["potential"] = sum(a for a, d in zip(ev.rep, done) if not d)
+            mine["bonus"] = sum(a for _, a in ev.bonuses)
+        for to, i, amount, _ in ev.others:
+            if to in out and to != owner:
+                out[to]["received_earned" if done[i] else "received_potential"] += amount
+    for mine in out.values():
+        mine["earned"] += mine["bonus"] + mine["received_earned"]
+        mine["potential"] += mine["received_potential"]
+    return out
+
+
+def earnings(user_id) -> dict:
+    """Commission of one rep on live deals: own deals, bonuses, and splits/overrides paid by others.
+
+    {"earned", "potential", "bonus", "received_earned", "received_potential"};
+    earned includes bonus and received_earned.
+    """
+    return earnings_by_user([user_id])[user_id]
@@ -0,0 +1,324 @@
+# File: app/services/forecast.py
+
+# Commission cash-flow forecast: when the money in a rep's open pipeline is
+# expected to land, month by month.
+#
+# Stage statistics come from the rep's own deal history in the status
+# transition log. For every stage a deal entered, did it go on to complete,
+# and how many months later? That is one grouped statement: outcome counts
+# plus a histogram of lags in 30-day buckets. Deals still open and younger
+# than FORECAST_STALE_DAYS are left out because their outcome isn't known.
+# Thin histories are shrunk toward the company-wide numbers, and those toward
+# DEFAULT_PRIOR, with FORECAST_PRIOR_WEIGHT pseudo-deals each. Statistics are
+# kept in the shared cache (app/cache.py) per rep until their next deal
+# transition, at most FORECAST_STATS_TTL seconds.
+#
+# Each open deal pays its commission under the rep's pay plan. It is spread
+# over months by the lag histogram, conditioned on the time the deal has
+# already spent in its stage; deals that have waited longer than most also
+# become less likely to complete. Months are compared with the
+# annual_income_goal / 12 pace.
+
+import math
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta
+
+from flask import current_app
+from sqlalchemy import and_, case, func, literal, select
+
+from app import db
+from app.cache import cache
+from app.cache import invalidate as invalidate_tags
+from app.models import Deal, LEAD_STATUSES, Settings, StatusTransition
+from app.services import commissions
+from app.services.sql import seconds_between
+
+MONTH_DAYS = 30.4375
+LAG_BUCKETS = 12            # lags of 0..11 months, then one open bucket
+OPEN_STAGES = [s for s in LEAD_STATUSES if s not in commissions.COMPLETED]
+Z_80 = 1.2816               # low/high bounds: 10th and 90th percentiles (normal approximation)
+
+# Used where a company has no history yet: (completion probability, typical lag in months).
+DEFAULT_PRIOR = {"New": (0.10, 3), "Contacted": (0.15, 3), "Appt": (0.30, 2), "Signed": (0.85, 1)}
+
+@dataclass
+class StageStats:
+    """Resolved history of deals that entered a stage: how many, how many completed, lag histogram."""
+    resolved: float = 0.0
+    completed: float = 0.0
+    lags: list = None       # completions per lag bucket
+    observed: float = 0.0   # resolved deals of our own, before shrinking
+
+    def __post_init__(self):
+        if self.lags is None:
+            self.lags = [0.0] * (LAG_BUCKETS + 1)
+
+    @property
+    def probability(self) -> float:
+        return self.completed / self.resolved if self.resolved else 0.0
+
+    def pmf(self) -> list:
+        total = sum(self.lags)
+        return [n / total for n in self.lags] if total else [0.0] * len(self.lags)
+
+    def typical_lag_days(self):
+        """Median lag (bucket midpoint), in days."""
+        seen, total = 0.0, sum(self.lags)
+        for b, n in enumerate(self.lags):
+            seen += n
+            if total and seen >= total / 2:
+                return round((b + 0.5) * MONTH_DAYS)
+        return None
+
+    def shrunk(self, prior: "StageStats", weight: float) -> "StageStats":
+        """These counts plus `weight` pseudo-deals distributed like `prior`."""
+        pmf = prior.pmf()
+        p = prior.probability
+        return StageStats(self.resolved + weight, self.completed + weight * p,
+                          [n + weight * p * q for n, q in zip(self.lags, pmf)], observed=self.resolved)
+
+
+def _default_prior() -> dict:
+    out = {}
+    for stage, (p, lag) in DEFAULT_PRIOR.items():
+        s = StageStats(1.0, p)
+        s.lags[min(lag, LAG_BUCKETS)] = p
+        out[stage] = s
+    return out
+
+
+# -----------------------------
+# Stage statistics
+# -----------------------------
+def _lag_bucket(seconds):
+    whens = [(seconds < (b + 1) * MONTH_DAYS * 86400, b) for b in range(LAG_BUCKETS)]
+    return case(*whens, else_=LAG_BUCKETS)
+
+
+def _history(user_ids, now) -> dict:
+    """{user_id: {stage: StageStats}} from raw transitions, one grouped statement (None = everyone)."""
+    T, D = StatusTransition.__table__, Deal.__table__
+    reached = (select(T.c.user_id, T.c.entity_id, T.c.to_status.label("stage"), func.min(T.c.at).label("entered"))
+               .where(T.c.entity == "deal", T.c.to_status.in_(OPEN_STAGES), T.c.user_id.is_not(None)))
+    done = (select(T.c.entity_id, func.min(T.c.at).label("completed"))
+            .where(T.c.entity == "deal", T.c.to_status.in_(commissions.COMPLETED)))
+    if user_ids is not None:
+        reached = reached.where(T.c.user_id.in_(user_ids))
+        done = done.where(T.c.user_id.in_(user_ids))
+    reached = reached.group_by(T.c.user_id, T.c.entity_id, T.c.to_status).subquery("reached")
+    done = done.group_by(T.c.entity_id).subquery("done")
+
+    completed = and_(done.c.completed.is_not(None), done.c.completed >= reached.c.entered)
+    stale_before = now - timedelta(days=current_app.config.get("FORECAST_STALE_DAYS", 180))
+    outcome = case((completed, literal("completed")),
+                   (and_(D.c.id.is_not(None), reached.c.entered >= stale_before), literal("open")),
+                   else_=literal("lost"))      # deleted, or open for longer than anyone waits
+    bucket = case((completed, _lag_bucket(seconds_between(reached.c.entered, done.c.completed))), else_=-1)
+    rows = db.session.execute(
+        select(reached.c.user_id, reached.c.stage, outcome.label("outcome"), bucket.label("bucket"), func.count())
+        .select_from(reached.outerjoin(done, done.c.entity_id == reached.c.entity_id)
+                     .outerjoin(D, D.c.id == reached.c.entity_id))
+        .group_by(reached.c.user_id, reached.c.stage, "outcome", "bucket"))
+
+    out = {}
+    for uid, stage, result, b, n in rows:
+        if result == "open":
+            continue
+        s = out.setdefault(uid, {}).setdefault(stage, StageStats())
+        s.resolved += n
+        if result == "completed":
+            s.completed += n
+            s.lags[b] += n
+    return out
+
+
+def _stats_key(user_id, watermark) -> str:
+    # A newer transition changes the key, so stale statistics are never looked up again.
+    return f"forecast:{user_id}:{watermark.isoformat() if watermark else '-'}"
+
+
+def invalidate():
+    """Forget every cached statistic of the active tenant."""
+    invalidate_tags("forecast")
+
+
+def _watermarks(user_ids) -> dict:
+    """{user_id: time of their latest deal transition}: an index-only lookup that tells stale stats apart."""
+    T = StatusTransition.__table__
+    return dict(db.session.execute(
+        select(T.c.user_id, func.max(T.c.at))
+        .where(T.c.user_id.in_(user_ids), T.c.entity == "deal").group_by(T.c.user_id)).all())
+
+
+def _company(now) -> dict:
+    """Company-wide stage statistics shrunk toward DEFAULT_PRIOR, cached for FORECAST_STATS_TTL."""
+    def compute():
+        totals = {}
+        for per_stage in _history(None, now).values():
+            for stage, s in per_stage.items():
+                t = totals.setdefault(stage, StageStats())
+                t.resolved += s.resolved
+                t.completed += s.completed
+                t.lags = [a + b for a, b in zip(t.lags, s.lags)]
+        weight, defaults = current_app.config.get("FORECAST_PRIOR_WEIGHT", 5), _default_prior()
+        return {stage: totals.get(stage, StageStats()).shrunk(defaults[stage], weight) for stage in OPEN_STAGES}
+    return cache().cached("forecast:company", compute, tags=["forecast"],
+                          ttl=current_app.config.get("FORECAST_STATS_TTL", 3600))
+
+
+def stage_stats(user_ids, now=None) -> dict:
+    """{user_id: {stage: StageStats}}, each rep's history shrunk toward the company's.
+
+    A rep's cached statistics last until one of their deals changes status or
+    FORECAST_STATS_TTL runs out. The company's barely move between refreshes,
+    so only the TTL expires them.
+    """
+    now = now or datetime.utcnow()
+    c, ttl, out, missing = cache(), current_app.config.get("FORECAST_STATS_TTL", 3600), {}, []
+    marks = _watermarks(user_ids)
+    for uid in user_ids:
+        hit = c.get(_stats_key(uid, marks.get(uid)), tags=["forecast"])
+        if hit is None:
+            missing.append(uid)
+        else:
+            out[uid] = hit
+    if missing:
+        company, weight = _company(now), current_app.config.get("FORECAST_PRIOR_WEIGHT", 5)
+        history = _history(missing, now)
+        for uid in missing:
+            own = history.get(uid, {})
+            out[uid] = {stage: own.get(stage, StageStats()).shrunk(company[stage], weight) for stage in OPEN_STAGES}
+            c.set(_stats_key(uid, marks.get(uid)), out[uid], tags=["forecast"], ttl=ttl)
+    return out
+
+
+# -----------------------------
+# Forecast
+# -----------------------------
+def _month(d) -> str:
+    return f"{d.year}-{d.month:02d}"
+
+
+def _months_from(today, n) -> list:
+    out, d = [], today.replace(day=1)
+    for _ in range(n):
+        out.append(_month(d))
+        d = (d.replace(day=28) + timedelta(days=4)).replace(day=1)
+    return out
+
+
+def _entered(user_ids) -> dict:
+    """{deal_id: when it entered its current status} (its latest transition)."""
+    T = StatusTransition.__table__
+    return dict(db.session.execute(
+        select(T.c.entity_id, func.max(T.c.at))
+        .where(T.c.entity == "deal", T.c.user_id.in_(user_ids)).group_by(T.c.entity_id)).all())
+
+
+def _spread(stats: StageStats, age_days: float):
+    """(probability, [(lag bucket, share)]) for a deal `age_days` into its stage."""
+    pmf = stats.pmf()
+    age_bucket = int(age_days // MONTH_DAYS)
+    ahead = [(b, q) for b, q in enumerate(pmf) if q and (b >= age_bucket or b == LAG_BUCKETS)]
+    survive = sum(q for _, q in ahead)
+    p = stats.probability
+    if not survive or not p:
+        return 0.0, []
+    p_now = p * survive / (p * survive + (1.0 - p))     # still open after age_days
+    return p_now, [(b, q / survive) for b, q in ahead]
+
+
+def forecasts(user_ids, now=None, months=None) -> dict:
+    """{user_id: forecast report} for every id given; one pass over their deals."""
+    user_ids = list(user_ids)
+    if not user_ids:
+        return {}
+    cfg = current_app.config
+    now = now or datetime.utcnow()
+    today = now.date()
+    months = months or cfg.get("FORECAST_MONTHS", 12)
+    payout = timedelta(days=cfg.get("FORECAST_PAYOUT_LAG_DAYS", 0))
+    horizon = _months_from(today, months)
+
+    columns = commissions.deal_columns(user_ids)
+    plans = commissions.plans_for(user_ids)
+    stats = stage_stats(user_ids, now)
+    entered = _entered(user_ids)
+    goals = dict(db.session.execute(
+        select(Settings.user_id, Settings.annual_income_goal).where(Settings.user_id.in_(user_ids))).all())
+
+    out = {}
+    for uid in user_ids:
+        deals = columns[uid]
+        ev = plans[uid].evaluate(deals, owner=uid)
+        expected = dict.fromkeys(horizon, 0.0)
+        variance = dict.fromkeys(horizon, 0.0)
+        count = dict.fromkeys(horizon, 0.0)
+        later = unweighted = earned = 0.0
+        open_deals = 0
+        spreads = {}   # (stage, age in days) -> _spread(); deals entered the same day share one
+
+        for i, done in enumerate(deals.done):
+            amount = ev.rep[i]
+            if done:
+                if deals.updated[i] is not None and deals.updated[i].year == today.year:
+                    earned += amount
+                continue
+            stage = deals.status[i]
+            if stage not in OPEN_STAGES:
+                continue
+            open_deals += 1
+            unweighted += amount
+            start = entered.get(deals.id[i]) or deals.updated[i] or now
+            age = max(0, (now - start).days)
+            key = (stage, age)
+            if key not in spreads:
+                spreads[key] = _spread(stats[uid][stage], age)
+            p, shares = spreads[key]
+            for b, share in shares:
+                q = p * share
+                lands = max(start + timedelta(days=(b + 0.5) * MONTH_DAYS), now) + payout
+                month = _month(lands)
+                if month in expected:
+                    expected[month] += amount * q
+                    variance[month] += amount * amount * q * (1.0 - q)
+                    count[month] += q
+                else:
+                    later += amount * q
+
+        earned += sum(a for period, a in ev.bonuses if period.startswith(str(today.year)))
+        goal = goals.get(uid) or 0.0
+        monthly_goal = goal / 12.0
+        rows = []
+        for m in horizon:
+            sd = math.sqrt(variance[m])
+            rows.append({"month": m, "expected": round(expected[m], 2),
+                         "low": round(max(0.0, expected[m] - Z_80 * sd), 2),
+                         "high": round(expected[m] + Z_80 * sd, 2),
+                         "deals": round(count[m], 2),
+                         "vs_goal": round(expected[m] - monthly_goal, 2)})
+        rest_of_year = sum(expected[m] for m in horizon if m.startswith(str(today.year)))
+        year_end = date(today.year, 12, 31)
+        out[uid] = {
+            "as_of": today.isoformat(),
+            "months": rows,
+            "later": round(later, 2),
+            "pipeline": {"open_deals": open_deals, "unweighted": round(unweighted, 2),
+                         "expected": round(sum(expected.values()) + later, 2)},
+            "goal": {
+                "annual": goal,
+                "monthly": round(monthly_goal, 2),
+                "earned_this_year": round(earned, 2),
+                "on_pace": round(goal * today.timetuple().tm_yday / year_end.timetuple().tm_yday, 2),
+                "projected_year_end": round(earned + rest_of_year, 2),
+                "shortfall": round(max(0.0, goal - earned - rest_of_year), 2),
+            },
+            "stages": {stage: {"probability": round(s.probability, 3), "typical_lag_days": s.typical_lag_days(),
+                               "history": int(s.observed)}
+                       for stage, s in stats[uid].items()},
+        }
+    return out
+
+
+def forecast(user_id, now=None, months=None) -> dict:
+    return forecasts([user_id], now, months)[user_id]
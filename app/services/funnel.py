@@ -0,0 +1,244 @@
+# File: app/services/funnel.py
+
+# Status-transition log and funnel velocity analytics.
+#
+# Every Lead/Deal status change is appended to `status_transition` inside the
+# flush that makes it. A set-based rollup (window functions, one INSERT ...
+# SELECT) folds finished "stints" into `funnel_daily_stat`; reports read those
+# daily aggregates, so they cost the same for ten events or ten million.
+
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import and_, case, event, exists, func, insert, literal, select, union_all
+from sqlalchemy.orm import aliased
+
+from app import db
+from app.models import (
+    Lead, Deal, StatusTransition, FunnelDailyStat, LEAD_STATUSES, LEAD_STATUS_ORDER,
+)
+from app.services.sql import seconds_between
+
+# Dwell-time histogram: upper bounds (days) of each bucket; the last is open.
+BUCKET_BOUNDS_DAYS = [1, 2, 4, 7, 14, 30, 60, 90, None]
+TERMINAL_STAGES = {"Completed"}
+
+
+# -----------------------------
+# Transition capture
+# -----------------------------
+def _transition_rows(session):
+    now = datetime.utcnow()
+    rows = []
+    for obj in session.new:
+        if isinstance(obj, (Lead, Deal)) and obj.status:
+            rows.append(_row(obj, None, obj.status, now))
+    for obj in session.dirty:
+        if not isinstance(obj, (Lead, Deal)):
+            continue
+        hist = db.inspect(obj).attrs.status.history
+        if hist.added and hist.deleted and hist.added[0] != hist.deleted[0]:
+            rows.append(_row(obj, hist.deleted[0], hist.added[0], now))
+    return rows
+
+
+def _row(obj, before, after, at):
+    if isinstance(obj, Lead):
+        return {"entity": "lead", "entity_id": obj.id, "lead_id": obj.id,
+                "user_id": obj.user_id, "from_status": before, "to_status": after, "at": at}
+    lead = obj.lead
+    return {"entity": "deal", "entity_id": obj.id, "lead_id": obj.lead_id,
+            "user_id": lead.user_id if lead is not None else None,
+            "from_status": before, "to_status": after, "at": at}
+
+
+@event.listens_for(db.session, "after_flush")
+def _record_transitions(session, flush_context):
+    """Append transitions on the flush's own connection: same transaction, ids already assigned."""
+    rows = _transition_rows(session)
+    if rows:
+        session.connection().execute(insert(StatusTransition), rows)
+
+
+def record_created(entity: str, rows: list, at=None):
+    """Log creations for rows inserted with core statements (which skip the ORM hook).
+
+    `rows` are dicts with id, lead_id, user_id and status.
+    """
+    at = at or datetime.utcnow()
+    if rows:
+        db.session.execute(insert(StatusTransition), [
+            {"entity": entity, "entity_id": r["id"], "lead_id": r["lead_id"], "user_id": r["user_id"],
+             "from_status": None, "to_status": r["status"], "at": at}
+            for r in rows
+        ])
+
+
+# -----------------------------
+# SQL helpers
+# -----------------------------
+def _bucket(seconds):
+    whens = [(seconds < bound * 86400, i) for i, bound in enumerate(BUCKET_BOUNDS_DAYS) if bound]
+    return case(*whens, else_=len(BUCKET_BOUNDS_DAYS) - 1)
+
+
+def _stints(since=None, user_ids=None):
+    """Finished stints: (user_id, entity, stage, start, end, next_stage), creations included."""
+    t = StatusTransition.__table__
+    window = dict(partition_by=(t.c.entity, t.c.entity_id), order_by=(t.c.at, t.c.id))
+    q = select(
+        t.c.user_id, t.c.entity,
+        t.c.to_status.label("stage"),
+        t.c.at.label("start"),
+        func.lead(t.c.at).over(**window).label("end"),
+        func.lead(t.c.to_status).over(**window).label("next_stage"),
+    )
+    creations = select(
+        t.c.user_id, t.c.entity, literal("").label("stage"),
+        t.c.at.label("start"), t.c.at.label("end"), t.c.to_status.label("next_stage"),
+    ).where(t.c.from_status.is_(None))
+
+    if user_ids is not None:
+        q = q.where(t.c.user_id.in_(user_ids))
+        creations = creations.where(t.c.user_id.in_(user_ids))
+    if since is not None:
+        # Only partitions with activity since `since` can have stints ending then;
+        # the window still sees their full history.
+        t2 = aliased(StatusTransition)
+        q = q.where(exists().where(and_(t2.entity == t.c.entity, t2.entity_id == t.c.entity_id,
+                                        t2.at >= since)))
+        creations = creations.where(t.c.at >= since)
+    return union_all(q, creations).subquery("stints")
+
+
+# -----------------------------
+# Daily rollup
+# -----------------------------
+def rebuild_daily_stats(since=None, user_ids=None) -> int:
+    """Recompute `funnel_daily_stat` for stints that ended on or after `since` (None = all)."""
+    since_dt = datetime.combine(since, datetime.min.time()) if isinstance(since, date) else None
+    s = _stints(since_dt, user_ids)
+    seconds = seconds_between(s.c.start, s.c.end)
+    day = func.date(s.c.end)
+    bucket = _bucket(seconds)
+
+    rollup = select(
+        s.c.user_id, day.label("day"), s.c.entity, s.c.stage, s.c.next_stage,
+        bucket.label("bucket"), func.count().label("n"), func.sum(seconds).label("dwell_seconds"),
+    ).where(s.c.end.is_not(None), s.c.user_id.is_not(None))
+    if since_dt is not None:
+        rollup = rollup.where(s.c.end >= since_dt)
+    rollup = rollup.group_by(s.c.user_id, day, s.c.entity, s.c.stage, s.c.next_stage, bucket)
+
+    stale = db.delete(FunnelDailyStat)
+    if since is not None:
+        stale = stale.where(FunnelDailyStat.day >= since)
+    if user_ids is not None:
+        stale = stale.where(FunnelDailyStat.user_id.in_(user_ids))
+    db.session.execute(stale)
+    rv = db.session.execute(
+        insert(FunnelDailyStat).from_select(
+            ["user_id", "day", "entity", "stage", "next_stage", "bucket", "n", "dwell_seconds"], rollup)
+    )
+    db.session.commit()
+    return rv.rowcount
+
+
+# -----------------------------
+# Reports
+# -----------------------------
+def _hist_percentile(counts, q):
+    """Approximate percentile (days) from bucket counts by interpolating within a bucket."""
+    total = sum(counts)
+    if not total:
+        return None
+    target, seen, lower = q * total, 0, 0.0
+    for i, c in enumerate(counts):
+        upper = BUCKET_BOUNDS_DAYS[i]
+        if c and seen + c >= target:
+            if upper is None:
+                return lower
+            return lower + (upper - lower) * (target - seen) / c
+        seen += c
+        lower = upper if upper is not None else lower
+    return lower
+
+
+def _aging(user_ids, entity, now):
+    """Open items per stage with an age histogram, from each entity's latest transition."""
+    t = StatusTransition.__table__
+    rn = func.row_number().over(partition_by=(t.c.entity, t.c.entity_id),
+                                order_by=(t.c.at.desc(), t.c.id.desc())).label("rn")
+    latest = (select(t.c.entity_id, t.c.to_status, t.c.at, rn)
+              .where(t.c.entity == entity, t.c.user_id.in_(user_ids))).subquery()
+    live = (Lead if entity == "lead" else Deal).__table__  # skip deleted leads/deals
+    age = seconds_between(latest.c.at, literal(now))
+    q = (select(latest.c.to_status, _bucket(age).label("bucket"), func.count())
+         .join(live, live.c.id == latest.c.entity_id)
+         .where(latest.c.rn == 1, latest.c.to_status.not_in(TERMINAL_STAGES))
+         .group_by(latest.c.to_status, "bucket"))
+    out = {}
+    for stage, b, n in db.session.execute(q):
+        out.setdefault(stage, [0] * len(BUCKET_BOUNDS_DAYS))[b] += n
+    return out
+
+
+def funnel_report(user_ids, entity="deal", start=None, end=None, now=None) -> dict:
+    """Time-in-stage distributions, stage-to-stage conversion and aging per stage."""
+    now = now or datetime.utcnow()
+    f = FunnelDailyStat
+    where = [f.user_id.in_(user_ids), f.entity == entity]
+    if start:
+        where.append(f.day >= start)
+    if end:
+        where.append(f.day <= end)
+
+    dwell_hist, dwell_sum, moves, entered = {}, {}, {}, {}
+    rows = db.session.execute(
+        select(f.stage, f.next_stage, f.bucket, func.sum(f.n), func.sum(f.dwell_seconds))
+        .where(*where).group_by(f.stage, f.next_stage, f.bucket)
+    )
+    for stage, nxt, b, n, secs in rows:
+        entered[nxt] = entered.get(nxt, 0) + n
+        if stage == "":
+            continue
+        dwell_hist.setdefault(stage, [0] * len(BUCKET_BOUNDS_DAYS))[b] += n
+        dwell_sum[stage] = dwell_sum.get(stage, 0.0) + (secs or 0.0)
+        moves[(stage, nxt)] = moves.get((stage, nxt), 0) + n
+
+    aging = _aging(user_ids, entity, now)
+    stages = []
+    for i, stage in enumerate(LEAD_STATUSES):
+        hist = dwell_hist.get(stage, [0] * len(BUCKET_BOUNDS_DAYS))
+        exited = sum(hist)
+        forward = sum(n for (s, nxt), n in moves.items()
+                      if s == stage and LEAD_STATUS_ORDER.get(nxt, -1) > i)
+        open_hist = aging.get(stage, [0] * len(BUCKET_BOUNDS_DAYS))
+        stages.append({
+            "stage": stage,
+            "entered": entered.get(stage, 0),
+            "exited": exited,
+            "advanced": forward,
+            "conversion_rate": (forward / entered[stage]) if entered.get(stage) else None,
+            "time_in_stage_days": {
+                "mean": (dwell_sum.get(stage, 0.0) / exited / 86400.0) if exited else None,
+                "p50": _hist_percentile(hist, 0.5),
+                "p90": _hist_percentile(hist, 0.9),
+                "histogram": hist,
+            },
+            "aging": {
+                "open": sum(open_hist),
+                "p50_days": _hist_percentile(open_hist, 0.5),
+                "histogram": open_hist,
+            },
+        })
+    return {
+        "entity": entity,
+        "bucket_bounds_days": BUCKET_BOUNDS_DAYS,
+        "transitions": [{"from": s, "to": t, "count": n} for (s, t), n in sorted(moves.items())],
+        "stages": stages,
+    }
+
+
+def default_rollup_since(today=None):
+    """Nightly incremental window: yesterday and today."""
+    return (today or date.today()) - timedelta(days=1)
@@ -0,0 +1,179 @@
+# File: app/services/geocoding.py
+
+# Address -> (lat, lng) through a pluggable provider, cached on the Lead row.
+#
+# GEOCODER names a provider: "nominatim" (HTTP, any Nominatim-compatible
+# /search endpoint at GEOCODER_URL), "file" (the offline stand-in, a CSV of
+# address,lat,lng under GEOCODER_FILE) or a "package.module:Class" path. A
+# provider only has to implement `geocode_many(addresses) -> {address: (lat, lng) | None}`.
+# Misses (None) are cached too (geocoded_address set, coordinates NULL) so they
+# aren't retried until the address changes; an address the provider leaves out
+# of its answer, say after a network error, stays pending for the next run.
+
+import csv
+import importlib
+import json
+import logging
+import os
+import re
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from datetime import datetime
+
+from flask import current_app
+from sqlalchemy import bindparam, or_, select, update
+
+from app import db
+from app.models import Lead
+from app.services import clusters, geohash
+from app.services.sql import quiet_values
+
+GEOCODE_BATCH_SIZE = 200
+
+log = logging.getLogger(__name__)
+
+
+def normalize(address: str) -> str:
+    """Cache/lookup key: lower case, punctuation dropped, whitespace collapsed."""
+    return re.sub(r"\s+", " ", re.sub(r"[.,#]", " ", (address or "").lower())).strip()
+
+
+class Geocoder:
+    """Provider interface."""
+
+    def geocode_many(self, addresses) -> dict:
+        raise NotImplementedError
+
+
+class FileGeocoder(Geocoder):
+    """Offline stand-in: looks addresses up in a CSV file (address,lat,lng)."""
+
+    def __init__(self, path):
+        self.path = path
+        self._table = None
+
+    def _load(self):
+        table = {}
+        if os.path.exists(self.path):
+            with open(self.path, newline="", encoding="utf-8-sig") as fh:
+                for row in csv.DictReader(fh):
+                    try:
+                        table[normalize(row["address"])] = (float(row["lat"]), float(row["lng"]))
+                    except (KeyError, TypeError, ValueError):
+                        continue
+        return table
+
+    def geocode_many(self, addresses) -> dict:
+        if self._table is None:
+            self._table = self._load()
+        return {a: self._table.get(normalize(a)) for a in addresses}
+
+
+class NominatimGeocoder(Geocoder):
+    """HTTP provider for the Nominatim search API (OpenStreetMap's, or a self-hosted one).
+
+    One request per address, at most one per `min_interval` seconds (the
+    public server's usage policy; lower it for your own). Stops at the first
+    failed request and leaves the rest of the batch out.
+    """
+
+    def __init__(self, url, user_agent, timeout=10.0, min_interval=1.0, countries=None):
+        self.url, self.user_agent = url, user_agent
+        self.timeout, self.min_interval, self.countries = timeout, min_interval, countries
+        self._last = 0.0
+
+    def _search(self, address):
+        wait = self._last + self.min_interval - time.monotonic()
+        if wait > 0:
+            time.sleep(wait)
+        query = {"q": address, "format": "jsonv2", "limit": 1}
+        if self.countries:
+            query["countrycodes"] = self.countries
+        req = urllib.request.Request(f"{self.url}?{urllib.parse.urlencode(query)}",
+                                     headers={"User-Agent": self.user_agent, "Accept": "application/json"})
+        try:
+            with urllib.request.urlopen(req, timeout=self.timeout) as rv:
+                hits = json.load(rv)
+        finally:
+            self._last = time.monotonic()
+        return (float(hits[0]["lat"]), float(hits[0]["lon"])) if hits else None
+
+    def geocode_many(self, addresses) -> dict:
+        out = {}
+        for address in addresses:
+            try:
+                out[address] = self._search(address)
+            except (OSError, ValueError, KeyError, IndexError) as e:
+                log.warning("geocoding %r failed, leaving %d addresses for later: %s",
+                            address, len(addresses) - len(out), e)
+                break
+        return out
+
+
+PROVIDERS = {
+    "file": lambda cfg: FileGeocoder(cfg.get("GEOCODER_FILE")),
+    "nominatim": lambda cfg: NominatimGeocoder(
+        cfg.get("GEOCODER_URL", "https://nominatim.openstreetmap.org/search"), cfg.get("GEOCODER_USER_AGENT", "roofing-sales-geocoder"),
+        timeout=cfg.get("GEOCODER_TIMEOUT", 10.0), min_interval=cfg.get("GEOCODER_MIN_INTERVAL", 1.0),
+        countries=cfg.get("GEOCODER_COUNTRIES")),
+}
+
+
+def get_geocoder(app=None) -> Geocoder:
+    """The configured provider, built once per app."""
+    app = app or current_app._get_current_object()
+    geocoder = app.extensions.get("geocoder")
+    if geocoder is None:
+        name = app.config.get("GEOCODER", "file")
+        if name in PROVIDERS:
+            geocoder = PROVIDERS[name](app.config)
+        else:
+            module, _, attr = name.partition(":")
+            geocoder = getattr(importlib.import_module(module), attr)(app.config)
+        app.extensions["geocoder"] = geocoder
+    return geocoder
+
+
+def _pending():
+    return select(Lead.id, Lead.address).where(
+        Lead.address.is_not(None), Lead.address != "",
+        or_(Lead.geocoded_address.is_(None), Lead.geocoded_address != Lead.address),
+    )
+
+
+def geocode_leads(user_id=None, lead_ids=None, limit=None) -> dict:
+    """Geocode leads whose address is new or changed. Returns counts; the caller commits."""
+    q = _pending().order_by(Lead.id)
+    if user_id is not None:
+        q = q.where(Lead.user_id == user_id)
+    if lead_ids is not None:
+        q = q.where(Lead.id.in_(list(lead_ids)))
+    if limit:
+        q = q.limit(limit)
+    rows = db.session.execute(q).all()
+
+    geocoder, L, now = get_geocoder(), Lead.__table__, datetime.utcnow()
+    stmt = (update(L).where(L.c.id == bindparam("_id"))
+            .values(latitude=bindparam("_lat"), longitude=bindparam("_lng"), geohash=bindparam("_gh"),
+                    geocoded_address=bindparam("_addr"), geocoded_at=now, **quiet_values(L)))
+    looked_up = found = 0
+    for start in range(0, len(rows), GEOCODE_BATCH_SIZE):
+        batch = rows[start:start + GEOCODE_BATCH_SIZE]
+        coords = geocoder.geocode_many(sorted({a for _, a in batch}))
+        params = []
+        for lead_id, address in batch:
+            if address not in coords:
+                continue
+            hit = coords[address]
+            found += hit is not None
+            params.append({"_id": lead_id, "_lat": hit[0] if hit else None,
+                           "_lng": hit[1] if hit else None, "_addr": address,
+                           "_gh": geohash.encode(*hit) if hit else None})
+        if params:
+            db.session.execute(stmt, params)
+        looked_up += len(params)
+    if rows:
+        clusters.invalidate()
+    return {"looked_up": looked_up, "found": found}
@@ -0,0 +1,82 @@
+# File: app/services/geohash.py
+
+# Geohash encoding. A geohash prefix is a lat/lng box, and every point inside
+# the box has a hash starting with that prefix -- so "leads in this box" is a
+# string range scan on an indexed column, and GROUP BY substr(geohash, 1, p)
+# clusters them on a regular grid.
+
+BASE32 = "0123456789bcdefghjkmnpqrstuvwxyz"
+_DECODE = {c: i for i, c in enumerate(BASE32)}
+PRECISION = 9           # stored on Lead: ~5 m cells
+
+
+def encode(lat: float, lng: float, precision: int = PRECISION) -> str:
+    lat_lo, lat_hi, lng_lo, lng_hi = -90.0, 90.0, -180.0, 180.0
+    out, bits, ch, even = [], 0, 0, True
+    while len(out) < precision:
+        if even:
+            mid = (lng_lo + lng_hi) / 2
+            if lng >= mid:
+                ch, lng_lo = ch * 2 + 1, mid
+            else:
+                ch, lng_hi = ch * 2, mid
+        else:
+            mid = (lat_lo + lat_hi) / 2
+            if lat >= mid:
+                ch, lat_lo = ch * 2 + 1, mid
+            else:
+                ch, lat_hi = ch * 2, mid
+        even = not even
+        bits += 1
+        if bits == 5:
+            out.append(BASE32[ch])
+            bits, ch = 0, 0
+    return "".join(out)
+
+
+def bounds(gh: str):
+    """(south, west, north, east) of a geohash cell."""
+    lat_lo, lat_hi, lng_lo, lng_hi = -90.0, 90.0, -180.0, 180.0
+    even = True
+    for c in gh:
+        v = _DECODE[c]
+        for shift in range(4, -1, -1):
+            bit = (v >> shift) & 1
+            if even:
+                mid = (lng_lo + lng_hi) / 2
+                lng_lo, lng_hi = (mid, lng_hi) if bit else (lng_lo, mid)
+            else:
+                mid = (lat_lo + lat_hi) / 2
+                lat_lo, lat_hi = (mid, lat_hi) if bit else (lat_lo, mid)
+            even = not even
+    return lat_lo, lng_lo, lat_hi, lng_hi
+
+
+def cell_size(precision: int):
+    """(lat degrees, lng degrees) spanned by a cell of this precision."""
+    bits = 5 * precision
+    return 180.0 / 2 ** (bits // 2), 360.0 / 2 ** ((bits + 1) // 2)
+
+
+def cover(south: float, west: float, north: float, east: float, precision: int) -> list:
+    """Sorted geohashes of every cell of `precision` overlapping the box."""
+    if precision <= 0:
+        return [""]
+    dlat, dlng = cell_size(precision)
+    south, north = max(south, -90.0), min(north, 90.0)
+    west, east = max(west, -180.0), min(east, 180.0)
+    lat0, lng0 = int((south + 90.0) // dlat), int((west + 180.0) // dlng)
+    lat1 = min(int((north + 90.0) // dlat), round(180.0 / dlat) - 1)
+    lng1 = min(int((east + 180.0) // dlng), round(360.0 / dlng) - 1)
+    return sorted({encode(-90.0 + (i + 0.5) * dlat, -180.0 + (j + 0.5) * dlng, precision)
+                   for i in range(lat0, lat1 + 1) for j in range(lng0, lng1 + 1)})
+
+
+def cover_count(south: float, west: float, north: float, east: float, precision: int) -> int:
+    """len(cover(...)) without building the list."""
+    if precision <= 0:
+        return 1
+    dlat, dlng = cell_size(precision)
+    rows = int((min(north, 90.0) + 90.0) // dlat) - int((max(south, -90.0) + 90.0) // dlat) + 1
+    cols = int((min(east, 180.0) + 180.0) // dlng) - int((max(west, -180.0) + 180.0) // dlng) + 1
+    return max(rows, 1) * max(cols, 1)
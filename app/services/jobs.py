@@ -0,0 +1,265 @@
+# File: app/services/jobs.py
+
+# A small durable job queue: jobs live in the `job` table, routes enqueue them
+# inside their own transaction, and `flask jobs worker` claims and runs them on
+# concurrent.futures pools. No external broker.
+
+import json
+import logging
+import os
+import socket
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Callable, Optional
+
+from flask import jsonify, url_for
+from sqlalchemy import update
+
+from app import db, tenancy
+from app.models import Job
+
+log = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class Task:
+    kind: str
+    fn: Callable
+    max_attempts: int = 3
+    cpu_bound: bool = False   # True -> fn(payload) runs in a process pool, no app context
+
+
+TASKS: dict = {}
+
+
+def load_tasks():
+    """Import the handler module on first use; plain web requests never pay for it."""
+    import app.tasks  # noqa: F401  (registers handlers via @task)
+    return TASKS
+
+
+def task(kind: str, max_attempts: int = 3, cpu_bound: bool = False):
+    """Register a job handler.
+
+    I/O-bound handlers are called as ``fn(ctx)`` inside an app context on a
+    worker thread. CPU-bound handlers must be picklable top-level functions and
+    are called as ``fn(payload)`` in a worker process.
+    """
+    def decorator(fn):
+        TASKS[kind] = Task(kind, fn, max_attempts, cpu_bound)
+        return fn
+    return decorator
+
+
+def enqueue(kind: str, payload: Optional[dict] = None, user_id: Optional[int] = None,
+            max_attempts: Optional[int] = None, delay: float = 0) -> Job:
+    """Add a job to the current session. It becomes visible when the caller commits."""
+    if kind not in load_tasks():
+        raise ValueError(f"Unknown job kind: {kind}")
+    job = Job(
+        kind=kind,
+        payload=json.dumps(payload or {}),
+        user_id=user_id,
+        max_attempts=max_attempts or TASKS[kind].max_attempts,
+        run_after=datetime.utcnow() + timedelta(seconds=delay),
+    )
+    db.session.add(job)
+    return job
+
+
+def accepted(job: Job):
+    """202 response pointing the client at the job's status URL (for routes that enqueue)."""
+    status_url = url_for('api.job_status', job_id=job.id)
+    return jsonify({"job_id": job.id, "status": job.status, "status_url": status_url}), 202, \
+        {"Location": status_url}
+
+
+class JobContext:
+    """What an I/O-bound handler sees: its payload plus progress reporting."""
+
+    def __init__(self, job_id: int, payload: dict):
+        self.job_id = job_id
+        self.payload = payload
+
+    def set_progress(self, fraction: float, message: Optional[str] = None):
+        """Record progress in its own short transaction so pollers see it immediately."""
+        db.session.execute(
+            update(Job).where(Job.id == self.job_id)
+            .values(progress=max(0.0, min(1.0, float(fraction))), message=message)
+        )
+        db.session.commit()
+
+
+# -----------------------------
+# Claiming / completion
+# -----------------------------
+def claim(worker_id: str, kind: str, limit: int) -> list:
+    """Atomically move up to `limit` due jobs of `kind` from queued to running.
+
+    Uses a compare-and-set UPDATE per candidate so several workers can poll the
+    same table without a broker or row-level locking support.
+    """
+    if limit <= 0:
+        return []
+    now = datetime.utcnow()
+    candidates = db.session.execute(
+        db.select(Job.id)
+        .where(Job.status == 'queued', Job.kind == kind, Job.run_after <= now)
+        .order_by(Job.run_after, Job.id)
+        .limit(limit)
+    ).scalars().all()
+    claimed = []
+    for job_id in candidates:
+        rv = db.session.execute(
+            update(Job)
+            .where(Job.id == job_id, Job.status == 'queued')
+            .values(status='running', locked_by=worker_id, locked_at=now,
+                    attempts=Job.attempts + 1)
+        )
+        if rv.rowcount == 1:
+            claimed.append(job_id)
+    db.session.commit()
+    return claimed
+
+
+def complete(job_id: int, result=None):
+    db.session.execute(
+        update(Job).where(Job.id == job_id).values(
+            status='succeeded', progress=1.0, result=json.dumps(result),
+            finished_at=datetime.utcnow(), locked_by=None, locked_at=None, error=None,
+        )
+    )
+    db.session.commit()
+
+
+def fail(job_id: int, error: str, backoff_seconds: float):
+    """Re-queue with exponential backoff, or mark failed once attempts run out."""
+    job = db.session.get(Job, job_id)
+    if job is None:
+        return
+    job.error = error
+    job.locked_by = None
+    job.locked_at = None
+    if job.attempts < job.max_attempts:
+        job.status = 'queued'
+        job.run_after = datetime.utcnow() + timedelta(seconds=backoff_seconds * (2 ** (job.attempts - 1)))
+    else:
+        job.status = 'failed'
+        job.finished_at = datetime.utcnow()
+    db.session.commit()
+
+
+def requeue_stale(lease_seconds: float) -> int:
+    """Return jobs whose worker died mid-run (lease expired) to the queue."""
+    cutoff = datetime.utcnow() - timedelta(seconds=lease_seconds)
+    rv = db.session.execute(
+        update(Job)
+        .where(Job.status == 'running', Job.locked_at < cutoff)
+        .values(status='queued', locked_by=None, locked_at=None)
+    )
+    db.session.commit()
+    return rv.rowcount
+
+
+# -----------------------------
+# Worker
+# -----------------------------
+class Worker:
+    """Polls the job table and runs handlers on thread/process pools.
+
+    Concurrency is bounded globally by the pool sizes and per kind by
+    ``JOBS_CONCURRENCY`` ({kind: max running in this worker}). With TENANTS
+    configured one worker serves every tenant's queue in turn.
+    """
+
+    def __init__(self, app, threads=None, processes=None, poll_interval=None):
+        cfg = app.config
+        self.app = app
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}"
+        self.threads = threads or cfg.get('JOBS_WORKER_THREADS', 4)
+        self.processes = processes or cfg.get('JOBS_WORKER_PROCESSES', 2)
+        self.poll_interval = poll_interval or cfg.get('JOBS_POLL_INTERVAL', 1.0)
+        self.lease_seconds = cfg.get('JOBS_LEASE_SECONDS', 600)
+        self.backoff_seconds = cfg.get('JOBS_RETRY_BACKOFF', 30)
+        self.concurrency = cfg.get('JOBS_CONCURRENCY', {})
+        self._running = {}            # kind -> count
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+
+    def stop(self):
+        self._stop.set()
+
+    def _slots(self, kind, total_free):
+        limit = self.concurrency.get(kind, total_free)
+        return max(0, min(total_free, limit - self._running.get(kind, 0)))
+
+    def _track(self, kind, delta):
+        with self._lock:
+            self._running[kind] = self._running.get(kind, 0) + delta
+
+    def _run_threaded(self, spec, tenant, job_id, payload):
+        with self.app.app_context():
+            tenancy.activate(tenant)
+            try:
+                result = spec.fn(JobContext(job_id, payload))
+                complete(job_id, result)
+            except Exception as e:  # handler errors become retries, never kill the worker
+                db.session.rollback()
+                log.exception("job %s (%s) failed", job_id, spec.kind)
+                fail(job_id, f"{type(e).__name__}: {e}", self.backoff_seconds)
+            finally:
+                db.session.remove()
+                self._track(spec.kind, -1)
+
+    def _on_process_done(self, spec, tenant, job_id, future):
+        with self.app.app_context():
+            tenancy.activate(tenant)
+            try:
+                complete(job_id, future.result())
+            except Exception as e:
+                db.session.rollback()
+                log.exception("job %s (%s) failed", job_id, spec.kind)
+                fail(job_id, f"{type(e).__name__}: {e}", self.backoff_seconds)
+            finally:
+                db.session.remove()
+                self._track(spec.kind, -1)
+
+    def run_once(self, threads: ThreadPoolExecutor, procs: ProcessPoolExecutor) -> int:
+        """Claim and dispatch whatever fits in the free slots. Returns jobs dispatched."""
+        dispatched = 0
+        with self.app.app_context():
+            for tenant in tenancy.each():
+                requeue_stale(self.lease_seconds)
+                for kind, spec in TASKS.items():
+                    pool_size = self.processes if spec.cpu_bound else self.threads
+                    busy = sum(n for k, n in self._running.items() if TASKS[k].cpu_bound == spec.cpu_bound)
+                    for job_id in claim(self.worker_id, kind, self._slots(kind, pool_size - busy)):
+                        job = db.session.get(Job, job_id)
+                        payload = json.loads(job.payload or "{}")
+                        self._track(kind, +1)
+                        if spec.cpu_bound:
+                            fut = procs.submit(spec.fn, payload)
+                            fut.add_done_callback(
+                                lambda f, s=spec, t=tenant, j=job_id: self._on_process_done(s, t, j, f))
+                        else:
+                            threads.submit(self._run_threaded, spec, tenant, job_id, payload)
+                        dispatched += 1
+            db.session.remove()
+        return dispatched
+
+    def run(self, burst: bool = False):
+        """Run until stopped. With ``burst`` exit once the queue is drained."""
+        load_tasks()
+        log.info("job worker %s starting (%d threads, %d processes)",
+                 self.worker_id, self.threads, self.processes)
+        with ThreadPoolExecutor(self.threads, thread_name_prefix="job") as threads, \
+                ProcessPoolExecutor(self.processes) as procs:
+            while not self._stop.is_set():
+                dispatched = self.run_once(threads, procs)
+                if burst and not dispatched and not any(self._running.values()):
+                    break
+                if not dispatched:
+                    time.sleep(self.poll_interval)
@@ -0,0 +1,103 @@
+# File: app/services/kpis.py
+
+# Nightly point-in-time KPI snapshots. The dashboard recomputes its numbers
+# from raw rows and keeps nothing, so "how did pipeline value move since
+# March?" had no answer. snapshot() records every rep's dashboard totals,
+# forecast and projector targets for a day into kpi_snapshot. It runs a batch
+# of KPI_SNAPSHOT_BATCH_SIZE reps at a time through the same grouped queries
+# the dashboard uses for one rep (metrics.dashboard_summaries,
+# forecast.forecasts), so the cost is a handful of queries per batch, not
+# per rep. Rows are append-only: reps that already have a row for the day are
+# skipped, and a re-run only fills the gaps. Only today can be snapshotted:
+# the numbers are always the current ones, so a row under a past date would
+# record them as that day's for good. trend() reads the rows back for charts.
+
+from datetime import date, timedelta
+
+from flask import current_app
+from sqlalchemy import select
+
+from app import db
+from app.models import KpiSnapshot, Settings, User
+from app.services import commissions, forecast, metrics, sql
+from app.services.projector import projector_metrics
+
+FIELDS = tuple(c.name for c in KpiSnapshot.__table__.columns if c.name not in ("id", "user_id", "day"))
+PROJECTOR = ("doors_per_day", "appts_per_day", "deals_per_day", "eff_rate")
+
+
+def _projector(summary, goal, user, plan) -> dict:
+    """Daily targets for the full goal from the rep's own ratios, or NULLs without them."""
+    ratios, _ = metrics.ratios_from_totals(summary["funnel"])
+    if ratios is None or not goal:
+        return dict.fromkeys(PROJECTOR)
+    try:
+        out = projector_metrics(goal, metrics.WORK_DAYS_PER_YEAR, ratios, user.commission_rate,
+                                user.company_margin, "profit", plan=plan)
+    except (ValueError, ZeroDivisionError):   # a plan paying nothing at the average RCV
+        return dict.fromkeys(PROJECTOR)
+    return {k: out[k] for k in PROJECTOR}
+
+
+def _rows(user_ids, day, now) -> list:
+    users = {u.id: u for u in User.query.filter(User.id.in_(user_ids))}
+    goals = dict.fromkeys(user_ids)
+    goals.update(db.session.execute(
+        select(Settings.user_id, Settings.annual_income_goal).where(Settings.user_id.in_(user_ids))).all())
+    summaries = metrics.dashboard_summaries(user_ids, goals)
+    cash = forecast.forecasts(user_ids, now=now)
+    plans = commissions.plans_for(user_ids)
+
+    rows = []
+    for uid in user_ids:
+        s, p, f = summaries[uid], summaries[uid]["projections"], cash[uid]
+        rows.append({
+            "user_id": uid, "day": day,
+            "pipeline_value": float(s["pipeline_value"]),
+            "potential_commission": s["potential_commission"],
+            "earned_commission": s["earned_commission"],
+            "forecast_expected": f["pipeline"]["expected"],
+            "projected_year_end": f["goal"]["projected_year_end"],
+            "doors": s["funnel"]["doors"], "appointments": s["funnel"]["appts"],
+            "deals_signed": s["funnel"]["signed"], "deals_completed": s["funnel"]["completed"],
+            "completion_rate": p["completion_rate"],
+            "avg_commission": p["avg_commission"],
+            "deals_needed": p["deals_needed"],
+            "daily_doors_goal": p["daily_doors_goal"],
+            "daily_appointments_goal": p["daily_appointments_goal"],
+            **_projector(s, goals[uid], users[uid], plans[uid]),
+        })
+    return rows
+
+
+def snapshot(batch_size=None, now=None) -> dict:
+    """Write today's snapshot for every rep without one; commits per batch."""
+    day = date.today()
+    batch_size = batch_size or current_app.config.get("KPI_SNAPSHOT_BATCH_SIZE", 500)
+    done = set(db.session.execute(select(KpiSnapshot.user_id).where(KpiSnapshot.day == day)).scalars())
+    todo = [uid for uid in db.session.execute(select(User.id).order_by(User.id)).scalars() if uid not in done]
+
+    T = KpiSnapshot.__table__
+    written = 0
+    for i in range(0, len(todo), batch_size):
+        rows = _rows(todo[i:i + batch_size], day, now)
+        # DO NOTHING: a concurrent run that got there first wins; rows are never rewritten.
+        stmt = sql.upsert(T).values(rows).on_conflict_do_nothing(index_elements=["user_id", "day"])
+        written += db.session.execute(stmt).rowcount
+        db.session.commit()
+    return {"day": day.isoformat(), "written": written, "skipped": len(done)}
+
+
+def trend(user_id, start=None, end=None, fields=None) -> list:
+    """[{day, field: value}] of one rep's snapshots in [start, end] (default: the last 90 days), by day."""
+    fields = list(fields or FIELDS)
+    unknown = [f for f in fields if f not in FIELDS]
+    if unknown:
+        raise ValueError(f"unknown KPI fields: {', '.join(unknown)}")
+    end = end or date.today()
+    start = start or end - timedelta(days=90)
+    T = KpiSnapshot.__table__
+    rows = db.session.execute(
+        select(T.c.day, *(T.c[f] for f in fields))
+        .where(T.c.user_id == user_id, T.c.day >= start, T.c.day <= end).order_by(T.c.day))
+    return [{"day": day.isoformat(), **dict(zip(fields, values))} for day, *values in rows]
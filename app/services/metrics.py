@@ -0,0 +1,208 @@
+# File: app/services/metrics.py
+
+# Per-user funnel totals computed with grouped queries, so one call covers one
+# rep or a whole team at the same cost. Archived deals count through
+# `archive_summary` (see app/services/archive.py).
+#
+# One rep's dashboard summary and funnel history are cached (app/cache.py)
+# under the rep's tags. Those are bumped by ORM writes to their leads, deals,
+# activity, settings and archive totals (listener below), and by the core
+# bulk writers, which call touched().
+
+from sqlalchemy import case, event, func, inspect, select
+
+from app import db
+from app.cache import cache, invalidate
+from app.models import ArchiveSummary, DailyActivity, Deal, Lead, PayPlan, Settings
+from app.services import archive, commissions
+from app.services.commissions import COMPLETED
+from app.services.projector import Ratios
+
+SIGNED_STATUSES = ("Signed", "Completed")
+SIGNED = {"Signed", "Contract Signed"} | COMPLETED
+WORK_DAYS_PER_YEAR = 250
+
+
+def funnel_totals(user_ids) -> dict:
+    """{user_id: {doors, appts, signed, completed, completed_rcv}} for every id given."""
+    user_ids = list(user_ids)
+    totals = {uid: {"doors": 0, "appts": 0, "signed": 0, "completed": 0, "completed_rcv": 0.0}
+              for uid in user_ids}
+    if not user_ids:
+        return totals
+
+    activity = db.session.execute(
+        select(DailyActivity.user_id,
+               func.coalesce(func.sum(DailyActivity.doors_knocked), 0),
+               func.coalesce(func.sum(DailyActivity.appointments_set), 0))
+        .where(DailyActivity.user_id.in_(user_ids))
+        .group_by(DailyActivity.user_id)
+    )
+    for uid, doors, appts in activity:
+        totals[uid].update(doors=int(doors), appts=int(appts))
+
+    completed = Deal.status == "Completed"
+    deals = db.session.execute(
+        select(Lead.user_id,
+               func.sum(case((Deal.status.in_(SIGNED_STATUSES), 1), else_=0)),
+               func.sum(case((completed, 1), else_=0)),
+               func.sum(case((completed, Deal.contract_price), else_=0.0)))
+        .join(Lead, Lead.id == Deal.lead_id)
+        .where(Lead.user_id.in_(user_ids))
+        .group_by(Lead.user_id)
+    )
+    for uid, signed, done, rcv in deals:
+        totals[uid].update(signed=int(signed or 0), completed=int(done or 0), completed_rcv=float(rcv or 0.0))
+
+    for uid, s in archive.summaries(user_ids).items():
+        t = totals[uid]
+        t["signed"] += s["deals_signed"]
+        t["completed"] += s["deals_completed"]
+        t["completed_rcv"] += s["completed_rcv"]
+    return totals
+
+
+def ratios_from_totals(t: dict):
+    """(Ratios, sign_to_complete) from funnel totals, or (None, None) if history is too thin."""
+    if not (t["doors"] and t["appts"] and t["signed"] and t["completed"] and t["completed_rcv"]):
+        return None, None
+    ratios = Ratios(
+        doors_per_appt=t["doors"] / t["appts"],
+        appts_per_deal=t["appts"] / t["signed"],
+        avg_rcv_per_completed_deal=t["completed_rcv"] / t["completed"],
+    )
+    return ratios, min(1.0, t["completed"] / t["signed"])
+
+
+def dashboard_summaries(user_ids, goals=None) -> dict:
+    """{user_id: dashboard_summary()} for every id given, from the same grouped queries.
+
+    `goals` maps user ids to income goals; missing ones use the saved setting.
+    """
+    user_ids = list(user_ids)
+    if not user_ids:
+        return {}
+    goals = dict(goals or {})
+    missing = [uid for uid in user_ids if uid not in goals]
+    if missing:
+        goals.update(db.session.execute(
+            select(Settings.user_id, Settings.annual_income_goal).where(Settings.user_id.in_(missing))).all())
+
+    by_status = {uid: [] for uid in user_ids}
+    for uid, status, n, price in db.session.execute(
+            select(Lead.user_id, Deal.status, func.count(Deal.id), func.sum(Deal.contract_price))
+            .join(Lead).where(Lead.user_id.in_(user_ids)).group_by(Lead.user_id, Deal.status)):
+        by_status[uid].append((status, n, price))
+    activity = dict.fromkeys(user_ids, (0, 0))
+    for uid, doors, appts in db.session.execute(
+            select(DailyActivity.user_id,
+                   func.coalesce(func.sum(DailyActivity.doors_knocked), 0),
+                   func.coalesce(func.sum(DailyActivity.appointments_set), 0))
+            .where(DailyActivity.user_id.in_(user_ids)).group_by(DailyActivity.user_id)):
+        activity[uid] = (doors, appts)
+    archived = archive.summaries(user_ids)
+    pay = commissions.earnings_by_user(user_ids)
+    return {uid: _summary(by_status[uid], activity[uid], archived[uid], pay[uid], goals.get(uid))
+            for uid in user_ids}
+
+
+def _summary(by_status, activity, archived, pay, annual_income_goal) -> dict:
+    pipeline_value = sum(price or 0 for status, _, price in by_status if status not in COMPLETED)
+    potential_commission = pay["potential"]
+    earned_commission = pay["earned"] + archived["completed_commission"]
+
+    doors, appts = activity
+    signed = sum(n for status, n, _ in by_status if status in SIGNED) + archived["deals_signed"]
+    completed = sum(n for status, n, _ in by_status if status in COMPLETED) + archived["deals_completed"]
+    completed_rcv = sum(price or 0 for status, _, price in by_status if status in COMPLETED) + archived["completed_rcv"]
+
+    completion_rate = completed / signed if signed > 0 else 0
+    avg_commission = earned_commission / completed if completed > 0 else 0
+    doors_per_appointment = doors / appts if appts > 0 else 0
+    appointments_per_deal = appts / signed if signed > 0 else 0
+
+    remaining = max(0, (annual_income_goal or 0) - earned_commission)
+    deals_needed = (remaining / avg_commission) / completion_rate \
+        if avg_commission > 0 and completion_rate > 0 else 0
+    appointments_needed = deals_needed * appointments_per_deal
+    doors_needed = appointments_needed * doors_per_appointment
+
+    return {
+        "funnel": {"doors": doors, "appts": appts, "signed": signed, "completed": completed,
+                   "completed_rcv": completed_rcv},
+        "pipeline_value": pipeline_value,
+        "potential_commission": potential_commission,
+        "earned_commission": earned_commission,
+        "projections": {
+            "avg_commission": avg_commission,
+            "doors_per_appointment": doors_per_appointment,
+            "appointments_per_deal": appointments_per_deal,
+            "deals_needed": deals_needed,
+            "daily_appointments_goal": appointments_needed / WORK_DAYS_PER_YEAR,
+            "daily_doors_goal": doors_needed / WORK_DAYS_PER_YEAR,
+            "completion_rate": completion_rate,
+        },
+    }
+
+
+def dashboard_summary(user_id: int, annual_income_goal=None) -> dict:
+    """Dashboard money totals and goal projections for one rep (cached until their next write).
+
+    One grouped query over live deals, the rep's pay plan over those deals
+    (app/services/commissions.py), plus the archived lifetime totals.
+    `annual_income_goal` defaults to the user's saved setting.
+    """
+    goals = {} if annual_income_goal is None else {user_id: annual_income_goal}
+    return cache().cached(f"dashboard:{user_id}:{annual_income_goal}",
+                          lambda: dashboard_summaries([user_id], goals)[user_id], tags=rep_tags(user_id, pay=True))
+
+
+def rep_funnel(user_id: int) -> dict:
+    """funnel_totals() of one rep, cached until their next write."""
+    return cache().cached(f"funnel:{user_id}", lambda: funnel_totals([user_id])[user_id], tags=rep_tags(user_id))
+
+
+# -----------------------------
+# Cache tags
+# -----------------------------
+def _payees() -> frozenset:
+    return cache().cached("payees", commissions.payees, tags=["plans"])
+
+
+def rep_tags(user_id, pay=False) -> list:
+    """Tags of numbers computed from one rep's rows; `pay` adds their plan and others' splits to them."""
+    tags = ["reps", f"rep:{user_id}"]
+    if pay:
+        tags.append("plans")
+        if user_id in _payees():
+            tags.append("payouts")
+    return tags
+
+
+def touched(user_ids, session=None):
+    """Drop cached numbers of these reps after a write (the ORM listener covers flushed objects)."""
+    tags = [f"rep:{uid}" for uid in set(user_ids) if uid is not None]
+    if tags:
+        tags.append("payouts")   # cheap: only reps paid by others' deals depend on it
+    invalidate(*tags, session=session)
+
+
+@event.listens_for(db.session, "after_flush")
+def _invalidate_on_write(session, flush_context):
+    users, lead_ids, plans = set(), set(), False
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        if isinstance(obj, (Lead, DailyActivity, Settings, ArchiveSummary)):
+            users.add(obj.user_id)
+            if isinstance(obj, Lead):
+                users.update(inspect(obj).attrs.user_id.history.deleted)   # reassigned
+        elif isinstance(obj, Deal):
+            lead_ids.add(obj.lead_id)
+        elif isinstance(obj, PayPlan):
+            plans = True
+    lead_ids.discard(None)
+    if lead_ids:
+        users.update(session.connection().execute(select(Lead.user_id).where(Lead.id.in_(lead_ids))).scalars())
+    if plans:
+        invalidate("plans", session=session)
+    if users:
+        touched(users, session=session)
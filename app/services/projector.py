@@ -1,4 +1,6 @@
 # File: app/services/projector.py
+import math
+import random
 from dataclasses import dataclass
 
 @dataclass(frozen=True)
@@ -28,6 +30,7 @@ def projector_metrics(
     commission_pct: float,
     company_margin_pct: float,
     commission_base: str,   # 'profit' | 'revenue'
+    plan=None,              # CompiledPlan: pay on its rules at the average RCV instead
 ) -> dict:
     if days <= 0:
         raise ValueError("Days must be > 0")
@@ -38,7 +41,11 @@ def projector_metrics(
     if not (0 <= commission_pct <= 100 and 0 <= company_margin_pct <= 100):
         raise ValueError("Percents must be between 0 and 100")
 
-    eff = _eff_rate(commission_pct, company_margin_pct, commission_base)
+    if plan is not None:
+        eff = plan.effective_rate(ratios.avg_rcv_per_completed_deal, commission_pct,
+                                  company_margin_pct, commission_base)
+    else:
+        eff = _eff_rate(commission_pct, company_margin_pct, commission_base)
     avg_comm_per_deal = ratios.avg_rcv_per_completed_deal * eff
 
     daily_income   = annual_goal / float(days)
@@ -53,3 +60,82 @@ def projector_metrics(
         "appts_per_day": appts_per_day,
         "doors_per_day": doors_per_day,
     }
+
+
+def _binomial(rng, n: int, p: float) -> int:
+    """Binomial draw: exact for small n, normal approximation otherwise."""
+    if n <= 0 or p <= 0:
+        return 0
+    if p >= 1:
+        return n
+    if n < 50:
+        return sum(1 for _ in range(n) if rng.random() < p)
+    mean, sd = n * p, math.sqrt(n * p * (1 - p))
+    return int(min(n, max(0, round(rng.gauss(mean, sd)))))
+
+
+def simulate_income(
+    doors_per_day: float,
+    days: int,
+    ratios: Ratios,
+    sign_to_complete: float,
+    commission_pct: float,
+    company_margin_pct: float,
+    commission_base: str,
+    trials: int = 2000,
+    rcv_cv: float = 0.35,
+    seed=None,
+    plan=None,              # CompiledPlan: pay each drawn deal on its rules
+) -> dict:
+    """Monte Carlo income distribution for a fixed daily door capacity.
+
+    Each trial draws appointments, signed and completed deals from the
+    historical funnel rates and a lognormal RCV per completed deal
+    (coefficient of variation `rcv_cv`). Returns income percentiles.
+    """
+    if days <= 0 or doors_per_day < 0 or trials <= 0:
+        raise ValueError("Days and trials must be > 0")
+    if not (0 < sign_to_complete <= 1):
+        raise ValueError("sign_to_complete must be in (0, 1]")
+    if plan is not None:
+        def pay(rcv):
+            return rcv * plan.effective_rate(rcv, commission_pct, company_margin_pct, commission_base)
+        eff = plan.effective_rate(ratios.avg_rcv_per_completed_deal, commission_pct,
+                                  company_margin_pct, commission_base)
+    else:
+        eff = _eff_rate(commission_pct, company_margin_pct, commission_base)
+
+        def pay(rcv):
+            return rcv * eff
+
+    rng = random.Random(seed)
+    doors = int(round(doors_per_day * days))
+    p_appt = 1.0 / ratios.doors_per_appt
+    p_sign = 1.0 / ratios.appts_per_deal
+    sigma = math.sqrt(math.log(1 + rcv_cv ** 2))
+    mu = math.log(ratios.avg_rcv_per_completed_deal) - sigma ** 2 / 2
+
+    incomes = []
+    for _ in range(trials):
+        appts = _binomial(rng, doors, p_appt)
+        signs = _binomial(rng, appts, p_sign)
+        completes = _binomial(rng, signs, sign_to_complete)
+        if completes < 50:
+            incomes.append(sum(pay(rng.lognormvariate(mu, sigma)) for _ in range(completes)))
+        else:  # sum of many lognormals ~ normal, paid at the average deal's rate
+            mean = completes * ratios.avg_rcv_per_completed_deal
+            rcv = max(0.0, rng.gauss(mean, math.sqrt(completes) * rcv_cv * ratios.avg_rcv_per_completed_deal))
+            incomes.append(rcv * eff)
+
+    incomes.sort()
+
+    def pct(q):
+        return incomes[min(len(incomes) - 1, int(q * len(incomes)))]
+
+    return {
+        "trials": trials,
+        "mean": sum(incomes) / len(incomes),
+        "p10": pct(0.10),
+        "p50": pct(0.50),
+        "p90": pct(0.90),
+    }
@@ -0,0 +1,105 @@
+# File: app/services/scoring.py
+
+# Lead priority scores. The score is one SQL expression over columns we already
+# store (status, age, deals, contract price, notes length), so a full recompute
+# is a single UPDATE over the whole book and "top N to revisit" is an index
+# range scan on (user_id, priority_score). Closed leads score NULL.
+#
+# Scores are refreshed for touched leads in the same flush as every write, and
+# nightly for everyone (`flask leads rescore` / the `score_leads` job) so the
+# age decay keeps moving.
+
+from datetime import datetime
+
+from flask import current_app, has_app_context
+from sqlalchemy import case, event, exists, func, literal, select, update
+
+from app import db
+from app.models import Lead, Deal
+from app.services.sql import quiet_values, seconds_between
+
+DEFAULT_WEIGHTS = {
+    "status": {"New": 20.0, "Contacted": 35.0, "Appt": 60.0, "Signed": 45.0},   # others: closed
+    "fresh": 30.0,            # points for a brand-new lead...
+    "half_life_days": 14.0,   # ...halved after this many days (hyperbolic decay)
+    "has_deal": 10.0,
+    "per_1000_price": 1.0,    # per $1,000 of the largest open contract
+    "max_price": 25.0,
+    "per_100_notes": 1.0,     # per 100 characters of notes
+    "max_notes": 5.0,
+}
+
+
+def _weights() -> dict:
+    w = dict(DEFAULT_WEIGHTS)
+    if has_app_context():
+        w.update(current_app.config.get("LEAD_SCORE_WEIGHTS") or {})
+    return w
+
+
+def _cap(expr, cap):
+    return case((expr > cap, cap), else_=expr)
+
+
+def score_expression(now=None):
+    """Priority score of the `lead` row in scope, as a SQL expression."""
+    w = _weights()
+    L, D = Lead.__table__, Deal.__table__
+    now = now or datetime.utcnow()
+
+    status = case(*[(L.c.status == s, literal(v)) for s, v in w["status"].items()], else_=None)
+    age_days = func.coalesce(seconds_between(L.c.date_created, literal(now)) / 86400.0, 0.0)
+    fresh = w["fresh"] / (1.0 + case((age_days > 0, age_days), else_=0.0) / w["half_life_days"])
+    has_deal = case((exists().where(D.c.lead_id == L.c.id), w["has_deal"]), else_=0.0)
+    price = (select(func.coalesce(func.max(D.c.contract_price), 0.0))
+             .where(D.c.lead_id == L.c.id, D.c.status != "Completed").scalar_subquery())
+    notes = func.coalesce(func.length(L.c.notes), 0) / 100.0
+    return (status + fresh + has_deal
+            + _cap(price / 1000.0 * w["per_1000_price"], w["max_price"])
+            + _cap(notes * w["per_100_notes"], w["max_notes"]))
+
+
+def _update(ids=None, now=None):
+    L = Lead.__table__
+    # A rescore is not an edit: no version bump, no sync traffic, no reset of the archive clock.
+    stmt = update(L).values(priority_score=score_expression(now), **quiet_values(L))
+    if ids is not None:
+        stmt = stmt.where(L.c.id.in_(ids))
+    return stmt
+
+
+def rescore_all(now=None) -> int:
+    """Recompute every lead's score in one statement."""
+    rv = db.session.execute(_update(now=now))
+    db.session.commit()
+    return rv.rowcount
+
+
+def rescore(lead_ids, connection=None) -> int:
+    """Recompute the given leads' scores (caller commits)."""
+    lead_ids = list(lead_ids)
+    if not lead_ids:
+        return 0
+    conn = connection if connection is not None else db.session
+    return conn.execute(_update(lead_ids)).rowcount
+
+
+def top_leads(user_id: int, limit: int = 50):
+    """Highest-priority open leads, straight off the (user_id, priority_score) index."""
+    return (Lead.query
+            .filter(Lead.user_id == user_id, Lead.priority_score.is_not(None))
+            .order_by(Lead.priority_score.desc(), Lead.id)
+            .limit(limit).all())
+
+
+@event.listens_for(db.session, "after_flush")
+def _rescore_touched(session, flush_context):
+    """Rescore leads written in this flush (directly or through their deals)."""
+    ids = set()
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        if isinstance(obj, Lead) and obj not in session.deleted:
+            ids.add(obj.id)
+        elif isinstance(obj, Deal) and obj.lead_id is not None:
+            ids.add(obj.lead_id)
+    if ids:
+        rescore(ids, session.connection())
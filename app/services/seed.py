@@ -0,0 +1,297 @@
+# File: app/services/seed.py
+
+# Synthetic data for load and performance testing (`flask seed`). Each rep gets
+# their own funnel drawn from SEED_PROFILE distributions: doors per day, doors
+# per appointment, appointment -> signed -> completed rates and lags, RCV,
+# commission terms, and a territory. That produces daily activity, leads,
+# deals and the status transitions between them, day by day over the history.
+#
+# Everything comes from one random.Random(seed), so the same arguments always
+# produce the same dataset. Rows go in as batched core INSERTs, with one
+# sync-sequence reservation per batch. Scores and the funnel rollup are then
+# recomputed once, set-based.
+
+import math
+import random
+from datetime import date, datetime, time, timedelta
+
+from flask import current_app
+from sqlalchemy import insert, select
+from werkzeug.security import generate_password_hash
+
+from app import db
+from app.cache import invalidate
+from app.models import (
+    User, Lead, Deal, DailyActivity, Settings, StatusTransition, reserve_sync_seqs,
+)
+from app.services import funnel, geohash, scoring
+
+DEFAULT_PROFILE = {
+    "years": 2,
+    "day_off_rate": 0.1,                                   # weekdays a rep doesn't knock
+    "doors_per_day": {"median": 60, "sigma": 0.35},        # rep average (lognormal across reps)
+    "doors_per_appt": {"median": 25, "sigma": 0.3},        # rep average (lognormal across reps)
+    "appt_to_sign": {"alpha": 3.0, "beta": 6.0},           # rep rate (beta across reps), ~33%
+    "sign_to_complete": {"alpha": 8.0, "beta": 2.0},       # rep rate (beta across reps), ~80%
+    "contact_rate": 0.04,                                  # doors that leave a New/Contacted lead
+    "sign_lag_days": {"median": 4, "sigma": 0.8},          # appointment -> signature
+    "complete_lag_days": {"median": 21, "sigma": 0.6},     # signature -> completed job
+    "rcv": {"median": 14000, "sigma": 0.45, "min": 3000},  # contract price
+    "commission_base": {"profit": 0.7, "revenue": 0.3},
+    "commission_rate": {"profit": [30, 50], "revenue": [6, 12]},   # percent, uniform
+    "company_margin": [25, 40],                            # percent, profit-based deals only
+    "income_goal": [60000, 200000],
+    "area": {"lat": 40.0, "lng": -75.0, "radius_km": 30, "territory_km": 4},
+}
+
+FIRST_NAMES = ["James", "Mary", "John", "Patricia", "Robert", "Jennifer", "Michael", "Linda", "David",
+               "Elizabeth", "William", "Barbara", "Richard", "Susan", "Joseph", "Jessica", "Thomas", "Sarah",
+               "Carlos", "Maria", "Wei", "Aisha", "Omar", "Priya", "Liam", "Sofia", "Noah", "Emma"]
+LAST_NAMES = ["Smith", "Johnson", "Williams", "Brown", "Jones", "Garcia", "Miller", "Davis", "Rodriguez",
+              "Martinez", "Hernandez", "Lopez", "Wilson", "Anderson", "Thomas", "Taylor", "Moore", "Jackson",
+              "Martin", "Lee", "Nguyen", "Patel", "Kim", "Chen", "Khan", "Murphy", "Rivera", "Cooper"]
+STREETS = ["Oak", "Maple", "Cedar", "Pine", "Elm", "Walnut", "Chestnut", "Spruce", "Willow", "Birch",
+           "Hickory", "Main", "Church", "Mill", "Park", "Ridge", "Lake", "Hill", "Sunset", "Meadow"]
+SUFFIXES = ["St", "Ave", "Rd", "Ln", "Dr", "Ct", "Way", "Blvd"]
+
+
+def profile() -> dict:
+    """DEFAULT_PROFILE with SEED_PROFILE overrides (top-level keys)."""
+    p = dict(DEFAULT_PROFILE)
+    p.update(current_app.config.get("SEED_PROFILE") or {})
+    return p
+
+
+class _Draw:
+    """The distributions in a profile, all from one seeded Random."""
+
+    def __init__(self, rng, p):
+        self.rng, self.p = rng, p
+
+    def lognormal(self, d):
+        return d["median"] * math.exp(self.rng.gauss(0.0, d["sigma"]))
+
+    def beta(self, d):
+        return self.rng.betavariate(d["alpha"], d["beta"])
+
+    def uniform(self, bounds):
+        return self.rng.uniform(*bounds)
+
+    def poisson(self, lam):
+        if lam <= 0:
+            return 0
+        if lam > 30:   # normal approximation for large means
+            return max(0, round(self.rng.gauss(lam, math.sqrt(lam))))
+        k, p, limit = 0, 1.0, math.exp(-lam)
+        while True:
+            p *= self.rng.random()
+            if p <= limit:
+                return k
+            k += 1
+
+    def pick(self, weights: dict):
+        r, acc = self.rng.random() * sum(weights.values()), 0.0
+        for key, w in weights.items():
+            acc += w
+            if r < acc:
+                return key
+        return key
+
+    def at(self, day):
+        """A time during the working day (9:00-20:00)."""
+        return datetime.combine(day, time(9)) + timedelta(seconds=self.rng.randrange(11 * 3600))
+
+
+def _offset(lat, lng, km_north, km_east):
+    return lat + km_north / 111.32, lng + km_east / (111.32 * math.cos(math.radians(lat)))
+
+
+def _insert_ids(table, rows) -> list:
+    """Multi-row INSERT of `rows` into a SyncTracked table; their new ids, in order.
+
+    Ids are matched back through the unique sync_seq each row carries:
+    sort_by_parameter_order would degrade to one statement per row on SQLite.
+    """
+    pairs = db.session.execute(insert(table).returning(table.c.sync_seq, table.c.id), rows).all()
+    ids = dict(pairs)
+    return [ids[row["sync_seq"]] for row in rows]
+
+
+class _Rep:
+    def __init__(self, draw, user_id):
+        p, rng = draw.p, draw.rng
+        self.user_id = user_id
+        self.doors = draw.lognormal(p["doors_per_day"])
+        self.appt_rate = 1.0 / max(draw.lognormal(p["doors_per_appt"]), 1.0)
+        self.sign_rate = draw.beta(p["appt_to_sign"])
+        self.complete_rate = draw.beta(p["sign_to_complete"])
+        area = p["area"]
+        r, theta = area["radius_km"] * math.sqrt(rng.random()), rng.uniform(0, 2 * math.pi)
+        self.center = _offset(area["lat"], area["lng"], r * math.sin(theta), r * math.cos(theta))
+
+
+class Seeder:
+    def __init__(self, seed=42, batch_size=None, end=None, years=None):
+        self.p = profile()
+        if years is not None:
+            self.p["years"] = years
+        self.rng = random.Random(seed)
+        self.draw = _Draw(self.rng, self.p)
+        self.batch_size = batch_size or current_app.config.get("SEED_BATCH_SIZE", 5000)
+        self.end = end or date.today()
+        self.start = self.end - timedelta(days=round(365.25 * self.p["years"]))
+        self.leads, self.activity = [], []
+        self.counts = {"users": 0, "activity": 0, "leads": 0, "deals": 0, "transitions": 0}
+
+    # --- users ---
+    def create_users(self, n, prefix="seed", password="seed") -> list:
+        taken = db.session.execute(
+            select(User.id).where(User.username.like(f"{prefix}%")).limit(1)).first()
+        if taken:
+            raise ValueError(f"users named {prefix}* already exist; pick another prefix")
+        pw_hash = generate_password_hash(password)   # hashed once, shared by every seeded user
+        rows = [{"username": f"{prefix}{i:05d}", "email": f"{prefix}{i:05d}@example.com",
+                 "password_hash": pw_hash,
+                 "commission_rate": round(self.draw.uniform(self.p["commission_rate"]["profit"]), 1),
+                 "company_margin": round(self.draw.uniform(self.p["company_margin"]), 1)}
+                for i in range(n)]
+        users = User.__table__
+        ids = dict(db.session.execute(insert(users).returning(users.c.username, users.c.id), rows).all())
+        ids = [ids[row["username"]] for row in rows]
+        first = reserve_sync_seqs(n)
+        db.session.execute(insert(Settings.__table__), [
+            {"user_id": uid, "annual_income_goal": round(self.draw.uniform(self.p["income_goal"]), -3),
+             "sync_seq": first + i} for i, uid in enumerate(ids)])
+        self.counts["users"] += n
+        return ids
+
+    # --- per-rep history ---
+    def _lead(self, rep, created, status):
+        first, last = self.rng.choice(FIRST_NAMES), self.rng.choice(LAST_NAMES)
+        lat, lng = _offset(*rep.center, self.rng.gauss(0, self.p["area"]["territory_km"]),
+                           self.rng.gauss(0, self.p["area"]["territory_km"]))
+        address = f"{self.rng.randrange(1, 9999)} {self.rng.choice(STREETS)} {self.rng.choice(SUFFIXES)}"
+        return {
+            "row": {"first_name": first, "last_name": last,
+                    "phone_number": f"555-{self.rng.randrange(10 ** 7):07d}",
+                    "email": f"{first}.{last}{self.rng.randrange(1000)}@example.com".lower(),
+                    "address": address, "notes": None, "status": status, "user_id": rep.user_id,
+                    "date_created": created, "updated_at": created,
+                    "latitude": lat, "longitude": lng, "geohash": geohash.encode(lat, lng),
+                    "geocoded_address": address, "geocoded_at": created},
+            "transitions": [(None, "New", created)] + ([("New", status, created)] if status != "New" else []),
+            "deal": None,
+        }
+
+    def _appointment(self, rep, when):
+        p, d = self.p, self.draw
+        lead = self._lead(rep, when, "Appt")
+        horizon = datetime.combine(self.end, time(23, 59))
+        if self.rng.random() >= rep.sign_rate:
+            return lead
+        signed = when + timedelta(days=d.lognormal(p["sign_lag_days"]))
+        if signed > horizon:
+            return lead
+        base = d.pick(p["commission_base"])
+        deal = {"row": {"status": "Signed",
+                        "contract_price": round(max(d.lognormal(p["rcv"]), p["rcv"]["min"]), -1),
+                        "commission_base": base,
+                        "commission_rate": round(d.uniform(p["commission_rate"][base]), 1),
+                        "company_margin": round(d.uniform(p["company_margin"]), 1) if base == "profit" else 0.0,
+                        "date_updated": signed},
+                "transitions": [(None, "Signed", signed)]}
+        lead["row"].update(status="Signed", updated_at=signed)
+        lead["transitions"].append(("Appt", "Signed", signed))
+        if self.rng.random() < rep.complete_rate:
+            done = signed + timedelta(days=d.lognormal(p["complete_lag_days"]))
+            if done <= horizon:
+                deal["row"].update(status="Completed", date_updated=done)
+                deal["transitions"].append(("Signed", "Completed", done))
+                lead["row"].update(status="Completed", updated_at=done)
+                lead["transitions"].append(("Signed", "Completed", done))
+        lead["deal"] = deal
+        return lead
+
+    def seed_rep(self, user_id):
+        rep, d, p = _Rep(self.draw, user_id), self.draw, self.p
+        day = self.start
+        while day <= self.end:
+            if day.weekday() < 5 and self.rng.random() >= p["day_off_rate"]:
+                doors = max(0, round(self.rng.gauss(rep.doors, rep.doors * 0.25)))
+                appts = d.poisson(doors * rep.appt_rate)
+                self.activity.append({"user_id": user_id, "date": day, "doors_knocked": doors,
+                                      "appointments_set": appts, "updated_at": d.at(day)})
+                for _ in range(appts):
+                    self.leads.append(self._appointment(rep, d.at(day)))
+                for _ in range(d.poisson(doors * p["contact_rate"])):
+                    self.leads.append(self._lead(rep, d.at(day), self.rng.choice(("New", "Contacted"))))
+                if len(self.leads) >= self.batch_size:
+                    self.flush_leads()
+                if len(self.activity) >= self.batch_size:
+                    self.flush_activity()
+            day += timedelta(days=1)
+
+    # --- batched inserts ---
+    def flush_activity(self):
+        if not self.activity:
+            return
+        first = reserve_sync_seqs(len(self.activity))
+        for i, row in enumerate(self.activity):
+            row["sync_seq"] = first + i
+        db.session.execute(insert(DailyActivity.__table__), self.activity)
+        self.counts["activity"] += len(self.activity)
+        self.activity = []
+
+    def flush_leads(self):
+        if not self.leads:
+            return
+        batch, self.leads = self.leads, []
+        first = reserve_sync_seqs(len(batch))
+        rows = [dict(l["row"], sync_seq=first + i) for i, l in enumerate(batch)]
+        leads, deals = Lead.__table__, Deal.__table__
+        ids = _insert_ids(leads, rows)
+
+        with_deals = [(lead_id, l) for lead_id, l in zip(ids, batch) if l["deal"]]
+        deal_ids = []
+        if with_deals:
+            first = reserve_sync_seqs(len(with_deals))
+            deal_ids = _insert_ids(deals, [dict(l["deal"]["row"], lead_id=lead_id, sync_seq=first + i)
+                                           for i, (lead_id, l) in enumerate(with_deals)])
+
+        transitions = [{"entity": "lead", "entity_id": lead_id, "lead_id": lead_id, "user_id": l["row"]["user_id"],
+                        "from_status": a, "to_status": b, "at": at}
+                       for lead_id, l in zip(ids, batch) for a, b, at in l["transitions"]]
+        transitions += [{"entity": "deal", "entity_id": deal_id, "lead_id": lead_id, "user_id": l["row"]["user_id"],
+                         "from_status": a, "to_status": b, "at": at}
+                        for deal_id, (lead_id, l) in zip(deal_ids, with_deals) for a, b, at in l["deal"]["transitions"]]
+        db.session.execute(insert(StatusTransition.__table__), transitions)
+        self.counts["leads"] += len(ids)
+        self.counts["deals"] += len(deal_ids)
+        self.counts["transitions"] += len(transitions)
+
+    def finish(self):
+        self.flush_leads()
+        self.flush_activity()
+        db.session.commit()
+
+
+def seed(users=10, seed=42, prefix="seed", password="seed", end=None, years=None, batch_size=None,
+         progress=None) -> dict:
+    """Generate `users` reps with full histories. Returns row counts.
+
+    `progress(done, total)` is called after each rep; each rep is committed on its own.
+    """
+    seeder = Seeder(seed=seed, batch_size=batch_size, end=end, years=years)
+    user_ids = seeder.create_users(users, prefix=prefix, password=password)
+    db.session.commit()
+    for i, user_id in enumerate(user_ids, 1):
+        seeder.seed_rep(user_id)
+        seeder.finish()
+        if progress:
+            progress(i, len(user_ids))
+    # Derived data, recomputed once over everything rather than per batch.
+    scoring.rescore_all()
+    funnel.rebuild_daily_stats()
+    invalidate("reps", "map", "forecast")
+    db.session.commit()
+    return seeder.counts
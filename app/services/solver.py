@@ -0,0 +1,194 @@
+# File: app/services/solver.py
+
+# Inverse projector: from daily capacity to achievable income, and the
+# commission rate / company margin / door count needed to hit a goal.
+#
+# The linear funnel inverts in closed form; `bisect_batch` handles income
+# functions that don't (pay plans), and `solve_batch` runs one bisection
+# across every plan-priced scenario at once.
+
+from dataclasses import dataclass
+from typing import Callable, Optional, Sequence
+
+from app.services.projector import Ratios, _eff_rate
+
+
+@dataclass(frozen=True)
+class Capacity:
+    """What a rep can sustain, plus the pay terms to evaluate it under."""
+    doors_per_day: float
+    days: int
+    ratios: Ratios
+    commission_pct: float
+    company_margin_pct: float
+    commission_base: str              # 'profit' | 'revenue'
+    sign_to_complete: float = 1.0     # completed / signed
+    annual_goal: Optional[float] = None
+    plan: object = None               # CompiledPlan: pay on its rules at the average RCV
+
+
+def _validate(c: Capacity):
+    if c.days <= 0 or c.doors_per_day < 0:
+        raise ValueError("Days must be > 0 and doors per day >= 0")
+    if c.ratios.doors_per_appt <= 0 or c.ratios.appts_per_deal <= 0:
+        raise ValueError("Historical ratios must be > 0")
+    if c.ratios.avg_rcv_per_completed_deal <= 0:
+        raise ValueError("Average RCV must be > 0")
+    if not (0 < c.sign_to_complete <= 1):
+        raise ValueError("sign_to_complete must be in (0, 1]")
+    if not (0 <= c.commission_pct <= 100 and 0 <= c.company_margin_pct <= 100):
+        raise ValueError("Percents must be between 0 and 100")
+
+
+def _pct_or_none(value):
+    return value if value is not None and value <= 100 else None
+
+
+def _eff(c: Capacity, commission_pct=None, margin_pct=None) -> float:
+    """Decimal share of revenue paid under the scenario's terms (or the given percents)."""
+    commission_pct = c.commission_pct if commission_pct is None else commission_pct
+    margin_pct = c.company_margin_pct if margin_pct is None else margin_pct
+    if c.plan is None:
+        return _eff_rate(commission_pct, margin_pct, c.commission_base)
+    return c.plan.effective_rate(c.ratios.avg_rcv_per_completed_deal, commission_pct, margin_pct,
+                                 c.commission_base)
+
+
+def _required_pcts(scenarios: Sequence[Capacity], revenues: Sequence[float]) -> list:
+    """[(commission %, margin %)] reaching each scenario's goal under its plan, by bisection.
+
+    A plan's tiers, fixed rates and splits make pay non-linear (or flat) in
+    the percents, so there's no division to do; None where no percent gets there.
+    """
+    goals = [c.annual_goal for c in scenarios]
+    by_commission = bisect_batch(
+        lambda xs: [r * _eff(c, commission_pct=x) for c, r, x in zip(scenarios, revenues, xs)],
+        goals, 0.0, 100.0)
+    by_margin = bisect_batch(
+        lambda xs: [r * _eff(c, margin_pct=x) for c, r, x in zip(scenarios, revenues, xs)],
+        goals, 0.0, 100.0)
+    return list(zip(by_commission, by_margin))
+
+
+def _funnel(c: Capacity) -> dict:
+    _validate(c)
+    eff = _eff(c)
+    doors = c.doors_per_day * c.days
+    appts = doors / c.ratios.doors_per_appt
+    signed = appts / c.ratios.appts_per_deal
+    completed = signed * c.sign_to_complete
+    revenue = completed * c.ratios.avg_rcv_per_completed_deal
+    income = revenue * eff
+    return {
+        "doors": doors,
+        "appointments": appts,
+        "deals_signed": signed,
+        "deals_completed": completed,
+        "revenue": revenue,
+        "eff_rate": eff,
+        "income": income,
+        "income_per_day": income / c.days,
+    }
+
+
+def _with_goal(c: Capacity, out: dict, plan_pcts=(None, None)) -> dict:
+    """Add the goal requirements; `plan_pcts` are the bisected percents when c has a plan."""
+    goal, revenue, income, doors = c.annual_goal, out["revenue"], out["income"], out["doors"]
+    # Income is linear in every lever, so each requirement is a single division.
+    needed_eff = goal / revenue if revenue > 0 else None
+    base = (c.commission_base or "").strip().lower()
+    if c.plan is not None:
+        commission, margin = plan_pcts
+    elif base == "profit":
+        commission = needed_eff / (c.company_margin_pct / 100.0) * 100.0 \
+            if needed_eff is not None and c.company_margin_pct > 0 else None
+        margin = needed_eff / (c.commission_pct / 100.0) * 100.0 \
+            if needed_eff is not None and c.commission_pct > 0 else None
+    else:
+        commission = needed_eff * 100.0 if needed_eff is not None else None
+        margin = None  # margin does not enter revenue-based pay
+    per_door = income / doors if doors > 0 else 0.0
+    out.update({
+        "annual_goal": goal,
+        "goal_gap": goal - income,
+        "meets_goal": income >= goal,
+        "required_eff_rate": needed_eff,
+        "required_commission_pct": _pct_or_none(commission),
+        "required_company_margin_pct": _pct_or_none(margin),
+        "required_doors_per_day": (goal / per_door / c.days) if per_door > 0 else None,
+    })
+    return out
+
+
+def _needs_bisect(c: Capacity, out: dict) -> bool:
+    return c.annual_goal is not None and c.plan is not None and out["revenue"] > 0
+
+
+def solve_capacity(c: Capacity) -> dict:
+    """Invert `projector_metrics` for one scenario (closed form unless it has a plan)."""
+    out = _funnel(c)
+    if c.annual_goal is None:
+        return out
+    if _needs_bisect(c, out):
+        return _with_goal(c, out, _required_pcts([c], [out["revenue"]])[0])
+    return _with_goal(c, out)
+
+
+def solve_batch(scenarios: Sequence[Capacity]) -> list:
+    """Evaluate many capacities in one call. Invalid scenarios report an error instead of raising.
+
+    Plan-priced requirements are bisected together: one `bisect_batch` per
+    lever across every such scenario, rather than one per scenario.
+    """
+    results, pending = [], []
+    for i, c in enumerate(scenarios):
+        try:
+            out = _funnel(c)
+        except ValueError as e:
+            results.append({"error": str(e)})
+            continue
+        if _needs_bisect(c, out):
+            pending.append(i)
+        elif c.annual_goal is not None:
+            out = _with_goal(c, out)
+        results.append(out)
+    if pending:
+        pcts = _required_pcts([scenarios[i] for i in pending], [results[i]["revenue"] for i in pending])
+        for i, p in zip(pending, pcts):
+            _with_goal(scenarios[i], results[i], p)
+    return results
+
+
+def bisect_batch(
+    fn: Callable[[list], list],
+    targets: Sequence[float],
+    lo: float,
+    hi: float,
+    tol: float = 1e-6,
+    max_iter: int = 200,
+) -> list:
+    """Solve fn(x)[i] == targets[i] for every i at once, fn increasing in x.
+
+    `fn` takes the whole vector of current guesses and returns the vector of
+    values, so a caller can evaluate all scenarios in one pass per iteration.
+    Entries whose target is out of [fn(lo), fn(hi)] come back as None.
+    """
+    n = len(targets)
+    if n == 0:
+        return []
+    f_lo, f_hi = fn([lo] * n), fn([hi] * n)
+    a, b = [lo] * n, [hi] * n
+    active = [f_lo[i] <= targets[i] <= f_hi[i] for i in range(n)]
+    for _ in range(max_iter):
+        if not any(active[i] and b[i] - a[i] > tol for i in range(n)):
+            break
+        mid = [(a[i] + b[i]) / 2.0 for i in range(n)]
+        f_mid = fn(mid)
+        for i in range(n):
+            if not active[i]:
+                continue
+            if f_mid[i] < targets[i]:
+                a[i] = mid[i]
+            else:
+                b[i] = mid[i]
+    return [(a[i] + b[i]) / 2.0 if active[i] else None for i in range(n)]
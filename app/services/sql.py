@@ -0,0 +1,50 @@
+# File: app/services/sql.py
+
+# Small dialect shims (SQLite locally, PostgreSQL in production) for the
+# set-based analytics queries and upserts.
+
+from sqlalchemy import Date, cast, func
+
+from app import db
+
+
+def dialect() -> str:
+    # The session's bind, not db.engine: with tenants that's the tenant's database.
+    return db.session.get_bind().dialect.name
+
+
+def upsert(table):
+    """INSERT supporting ``on_conflict_do_update`` / ``on_conflict_do_nothing``."""
+    if dialect() == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+    return insert(table)
+
+
+def quiet_values(table) -> dict:
+    """UPDATE values that keep a SyncTracked row's version/sync_seq/updated_at as they are.
+
+    For derived columns (scores, coordinates): listing the columns stops their
+    onupdate hooks from firing, so the write isn't treated as an edit.
+    """
+    return {name: table.c[name] for name in ("version", "sync_seq", "updated_at") if name in table.c}
+
+
+def seconds_between(start, end):
+    """end - start in seconds, as a float SQL expression."""
+    if dialect() == "postgresql":
+        return func.extract("epoch", end - start)
+    return (func.julianday(end) - func.julianday(start)) * 86400.0
+
+
+def period_start(col, grain: str):
+    """First day of the ISO week (Monday) or month containing timestamp `col`."""
+    if grain not in ("week", "month"):
+        raise ValueError("grain must be 'week' or 'month'")
+    if dialect() == "postgresql":
+        return cast(func.date_trunc(grain, col), Date)
+    if grain == "week":
+        # 'weekday 0' rolls forward to Sunday (or stays), then back to Monday.
+        return func.date(col, "weekday 0", "-6 days")
+    return func.date(col, "start of month")
@@ -0,0 +1,319 @@
+# File: app/services/sync.py
+
+# Delta sync for offline-first clients: pull changes since a cursor (the global
+# sync_seq), push batched offline mutations with optimistic version checks.
+
+from datetime import date, datetime
+
+from sqlalchemy import event
+from sqlalchemy.exc import IntegrityError
+
+from app import db
+from app.models import (
+    Lead, Deal, DailyActivity, Settings, Tombstone, SyncTracked, LEAD_STATUSES, reserve_sync_seqs,
+)
+
+MAX_PULL = 1000
+MAX_MUTATIONS = 500
+
+
+def _iso(v):
+    return v.isoformat() if isinstance(v, (date, datetime)) else v
+
+
+def _lead(l):
+    return {
+        "id": l.id, "first_name": l.first_name, "last_name": l.last_name,
+        "phone_number": l.phone_number, "email": l.email, "address": l.address,
+        "notes": l.notes, "status": l.status, "date_created": _iso(l.date_created),
+        "updated_at": _iso(l.updated_at), "version": l.version,
+    }
+
+
+def _deal(d):
+    return {
+        "id": d.id, "lead_id": d.lead_id, "status": d.status,
+        "contract_price": d.contract_price, "commission_rate": d.commission_rate,
+        "commission_base": d.commission_base, "company_margin": d.company_margin,
+        "updated_at": _iso(d.date_updated), "version": d.version,
+    }
+
+
+def _activity(a):
+    return {
+        "id": a.id, "date": _iso(a.date), "doors_knocked": a.doors_knocked,
+        "appointments_set": a.appointments_set, "updated_at": _iso(a.updated_at),
+        "version": a.version,
+    }
+
+
+def _settings(s):
+    return {
+        "id": s.id, "annual_income_goal": s.annual_income_goal,
+        "updated_at": _iso(s.updated_at), "version": s.version,
+    }
+
+
+# entity name -> (model, serializer, client-writable fields, response key)
+ENTITIES = {
+    "lead": (Lead, _lead, ("first_name", "last_name", "phone_number", "email",
+                           "address", "notes", "status"), "leads"),
+    "deal": (Deal, _deal, ("status", "contract_price", "commission_rate",
+                           "commission_base", "company_margin"), "deals"),
+    "activity": (DailyActivity, _activity, ("date", "doors_knocked", "appointments_set"), "activities"),
+    "settings": (Settings, _settings, ("annual_income_goal",), "settings"),
+}
+
+
+# -----------------------------
+# Tombstones
+# -----------------------------
+def _owner_id(entity, obj):
+    if entity == "deal":
+        return obj.lead.user_id if obj.lead is not None else None
+    return obj.user_id
+
+
+_ENTITY_BY_MODEL = {model: name for name, (model, *_rest) in ENTITIES.items()}
+
+
+@event.listens_for(db.session, "before_flush")
+def _record_tombstones(session, flush_context, instances):
+    """Write a tombstone for every synced row deleted in this flush (same transaction)."""
+    for obj in list(session.deleted):
+        entity = _ENTITY_BY_MODEL.get(type(obj))
+        if entity is None:
+            continue
+        session.add(Tombstone(entity=entity, entity_id=obj.id, user_id=_owner_id(entity, obj)))
+        if entity == "lead":  # deals go with their lead via cascade
+            for d in obj.deals:
+                if d not in session.deleted:
+                    session.add(Tombstone(entity="deal", entity_id=d.id, user_id=obj.user_id))
+
+
+@event.listens_for(db.session, "before_flush")
+def stamp_flush(session, flush_context, instances):
+    """Give every synced row this flush writes its sync_seq from one reserved block.
+
+    Registered after _record_tombstones so its tombstones are included. Rows
+    changed later in the flush fall back to the column default (next_sync_seq).
+    """
+    rows = [o for o in session.new if isinstance(o, (SyncTracked, Tombstone))]
+    rows += [o for o in session.dirty
+             if isinstance(o, SyncTracked) and session.is_modified(o, include_collections=False)]
+    if rows:
+        first = reserve_sync_seqs(len(rows), session.connection())
+        for i, obj in enumerate(rows):
+            obj.sync_seq = first + i
+
+
+# -----------------------------
+# Pull
+# -----------------------------
+def _scoped(entity, user_id):
+    model = ENTITIES[entity][0]
+    if entity == "deal":
+        return Deal.query.join(Lead).filter(Lead.user_id == user_id)
+    return model.query.filter(model.user_id == user_id)
+
+
+def changes_since(user_id: int, since: int = 0, limit: int = MAX_PULL) -> dict:
+    """Everything the user's rows went through after cursor `since`.
+
+    Pages never split a sequence number (one bulk UPDATE stamps many rows with
+    the same seq), so the returned cursor is always safe to resume from.
+    """
+    limit = max(1, min(limit, MAX_PULL))
+    sources = [(e, _scoped(e, user_id), ENTITIES[e][0].sync_seq) for e in ENTITIES]
+    sources.append(("tombstone", Tombstone.query.filter(Tombstone.user_id == user_id), Tombstone.sync_seq))
+
+    seqs = []
+    for _, q, col in sources:
+        seqs.extend(s for (s,) in q.filter(col > since).order_by(col).limit(limit + 1)
+                    .with_entities(col).all())
+    seqs.sort()
+    if not seqs:
+        return {"cursor": since, "more": False, "changes": {v[3]: [] for v in ENTITIES.values()}, "deleted": []}
+    more = len(seqs) > limit
+    boundary = seqs[min(limit, len(seqs)) - 1]
+
+    changes, deleted = {}, []
+    for entity, q, col in sources:
+        rows = q.filter(col > since, col <= boundary).order_by(col).all()
+        if entity == "tombstone":
+            deleted = [{"entity": t.entity, "id": t.entity_id, "deleted_at": _iso(t.deleted_at)} for t in rows]
+        else:
+            _, serialize, _, key = ENTITIES[entity]
+            changes[key] = [serialize(r) for r in rows]
+    return {"cursor": boundary, "more": more, "changes": changes, "deleted": deleted}
+
+
+# -----------------------------
+# Push
+# -----------------------------
+class MutationError(ValueError):
+    pass
+
+
+def _clean(entity, fields):
+    if fields is not None and not isinstance(fields, dict):
+        raise MutationError("fields must be an object")
+    allowed = ENTITIES[entity][2]
+    out = {k: v for k, v in (fields or {}).items() if k in allowed}
+    if "status" in out and out["status"] not in LEAD_STATUSES:
+        raise MutationError(f"Invalid status: {out['status']}")
+    if "commission_base" in out and out["commission_base"] not in ("profit", "revenue"):
+        raise MutationError("commission_base must be 'profit' or 'revenue'")
+    if "date" in out:
+        try:
+            out["date"] = date.fromisoformat(out["date"])
+        except (TypeError, ValueError):
+            raise MutationError("date must be YYYY-MM-DD")
+    for k in ("contract_price", "commission_rate", "company_margin", "annual_income_goal"):
+        if k in out:
+            try:
+                out[k] = float(out[k])
+            except (TypeError, ValueError):
+                raise MutationError(f"{k} must be numeric")
+    for k in ("doors_knocked", "appointments_set"):
+        if k in out:
+            try:
+                out[k] = int(out[k])
+            except (TypeError, ValueError):
+                raise MutationError(f"{k} must be an integer")
+    return out
+
+
+def _owned(entity, obj_id, user_id):
+    return _scoped(entity, user_id).filter(ENTITIES[entity][0].id == obj_id).first()
+
+
+def _apply_one(m, user_id, created):
+    entity, op = m.get("entity"), m.get("op", "upsert")
+    if entity not in ENTITIES or op not in ("upsert", "delete"):
+        raise MutationError("Unknown entity or op")
+    fields = _clean(entity, m.get("fields"))
+    obj_id = m.get("id")
+
+    if entity == "settings" and obj_id is None:
+        existing = Settings.query.filter_by(user_id=user_id).first()
+        obj_id = existing.id if existing else None
+
+    if obj_id is None:
+        if op == "delete":
+            raise MutationError("Delete needs an id")
+        if entity == "activity":   # one row per day: a second create conflicts with the first
+            existing = _activity_for(m, user_id)
+            if existing is not None:
+                return "conflict", existing
+        return "applied", _create(entity, fields, m, user_id, created)
+
+    obj = _owned(entity, obj_id, user_id)
+    if obj is None:
+        return "gone", None
+    if m.get("base_version") != obj.version:
+        return "conflict", obj
+    if op == "delete":
+        db.session.delete(obj)
+        if entity == "deal":
+            obj.lead.deals.remove(obj)
+            obj.lead.refresh_status_from_deals()
+        return "deleted", None
+    for k, v in fields.items():
+        setattr(obj, k, v)
+    if entity == "lead" and "status" in fields:
+        for d in obj.deals:  # same rule as edit_lead: lead status is pushed to its deals
+            d.status = fields["status"]
+    if entity == "deal" and "status" in fields:
+        obj.lead.refresh_status_from_deals()
+    return "applied", obj
+
+
+def _create(entity, fields, m, user_id, created):
+    if entity == "lead":
+        if not fields.get("first_name") or not fields.get("last_name"):
+            raise MutationError("first_name and last_name are required")
+        obj = Lead(user_id=user_id, **fields)
+    elif entity == "deal":
+        lead_id = m.get("lead_id") or created.get(m.get("lead_ref"))
+        lead = _owned("lead", lead_id, user_id) if lead_id else None
+        if lead is None:
+            raise MutationError("Deal needs a lead_id or lead_ref the user owns")
+        obj = Deal(**fields)
+        lead.deals.append(obj)
+        lead.refresh_status_from_deals()
+    elif entity == "activity":
+        fields["date"] = fields.get("date") or date.today()
+        obj = DailyActivity(user_id=user_id, **fields)
+    else:
+        obj = Settings(user_id=user_id, **fields)
+    db.session.add(obj)
+    db.session.flush()
+    if m.get("client_id"):
+        created[m["client_id"]] = obj.id
+    return obj
+
+
+def _activity_for(m, user_id):
+    """The existing activity row a clashing activity mutation collided with, if any."""
+    if m.get("entity") != "activity":
+        return None
+    try:
+        day = date.fromisoformat((m.get("fields") or {}).get("date") or date.today().isoformat())
+    except (TypeError, ValueError):
+        return None
+    return DailyActivity.query.filter_by(user_id=user_id, date=day).first()
+
+
+def apply_mutations(user_id: int, mutations: list) -> list:
+    """Apply a batch of offline mutations in order and commit once.
+
+    Every update/delete must carry the `base_version` the client last saw; a
+    mismatch is reported as a conflict with the server's copy and left
+    untouched. Creates may reference an earlier create in the same batch via
+    `lead_ref` (its `client_id`). Malformed mutations come back as errors and
+    a duplicate activity day as a conflict; the rest of the batch still applies.
+    """
+    if len(mutations) > MAX_MUTATIONS:
+        raise MutationError(f"At most {MAX_MUTATIONS} mutations per batch")
+    created, results = {}, []
+    for m in mutations:
+        if not isinstance(m, dict):
+            results.append({"client_id": None, "entity": None, "id": None,
+                            "status": "error", "error": "mutation must be an object"})
+            continue
+        entity = m.get("entity")
+        entry = {"client_id": m.get("client_id"), "entity": entity, "id": m.get("id")}
+        try:
+            # Each mutation runs in a savepoint: a rejected one leaves nothing
+            # behind and the rest of the batch still commits.
+            with db.session.begin_nested():
+                status, obj = _apply_one(m, user_id, created)
+                db.session.flush()
+        except MutationError as e:
+            entry.update(status="error", error=str(e))
+            results.append(entry)
+            continue
+        except IntegrityError:
+            # The one unique key a push can hit: a second activity row for a day
+            # (raced with another device, or an update moving onto a taken date).
+            status, obj = "conflict", _activity_for(m, user_id)
+            if obj is None:
+                raise
+        entry["status"] = status
+        if obj is not None:
+            entry["id"] = obj.id
+            entry["_obj"] = obj
+        results.append(entry)
+    db.session.commit()
+
+    for entry in results:
+        obj = entry.pop("_obj", None)
+        if obj is None:
+            continue
+        serialized = ENTITIES[entry["entity"]][1](obj)
+        if entry["status"] == "conflict":
+            entry["server"] = serialized
+        else:
+            entry["version"] = serialized["version"]
+    return results
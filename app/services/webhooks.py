@@ -0,0 +1,349 @@
+# File: app/services/webhooks.py
+
+# Outbound webhooks: integrations get changes pushed instead of polling.
+#
+# Domain events (lead.created, deal.status_changed, and deal.completed with
+# the rep's commission under their pay plan) are written to `outbox_event` by
+# an after_flush hook, so they commit or roll back with the route's own
+# transaction; bulk core inserts, which skip the hook, call record_created().
+# Each event gets one `webhook_delivery` row per WEBHOOK_ENDPOINTS entry
+# subscribed to its kind; with no subscriber nothing is written at all.
+#
+# `flask webhooks dispatch` claims due deliveries per endpoint in batches (one
+# signed POST carries up to `batch_size` events, oldest first) with at most
+# `concurrency` batches in flight per endpoint. Failures are retried with
+# exponential backoff, or after the endpoint's Retry-After. Once attempts run
+# out, or on a 4xx that retrying won't fix, deliveries are dead-lettered
+# (status 'dead') until `flask webhooks replay`. Delivery is at least once and
+# concurrent batches can land out of order: consumers dedupe on the event id.
+
+import hashlib
+import hmac
+import json
+import logging
+import os
+import secrets
+import socket
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+
+from flask import current_app, has_app_context
+from sqlalchemy import delete, event, exists, insert, select, update
+
+from app import db, tenancy
+from app.models import Deal, Lead, OutboxEvent, WebhookDelivery
+from app.services import commissions, sync
+
+log = logging.getLogger(__name__)
+
+EVENTS = ("lead.created", "deal.status_changed", "deal.completed")
+RETRYABLE_4XX = {408, 425, 429}
+
+
+def endpoints(app=None) -> dict:
+    return (app or current_app).config.get("WEBHOOK_ENDPOINTS") or {}
+
+
+def subscribers(app=None) -> dict:
+    """{event kind: [endpoint names]} for kinds at least one endpoint wants."""
+    routes = {}
+    for name, spec in endpoints(app).items():
+        wanted = spec.get("events") or ("*",)
+        for kind in EVENTS:
+            if "*" in wanted or kind in wanted:
+                routes.setdefault(kind, []).append(name)
+    return routes
+
+
+# -----------------------------
+# Capture
+# -----------------------------
+def _commission(deal, user_id) -> dict:
+    plan = commissions.plan_for(user_id)
+    deals = commissions.Deals()
+    deals.append(deal.id, deal.status, deal.contract_price, deal.commission_rate,
+                 deal.commission_base, deal.company_margin, deal.date_updated)
+    ev = plan.evaluate(deals, owner=user_id)
+    return {"plan": plan.name, "amount": round(ev.rep[0], 2),
+            "others": [{"user_id": to, "amount": round(amount, 2), "kind": kind}
+                       for to, _, amount, kind in ev.others]}
+
+
+def _deal_events(deal, before, after, wanted):
+    user_id = deal.lead.user_id if deal.lead is not None else None
+    data = {**sync._deal(deal), "user_id": user_id, "from_status": before}
+    if "deal.status_changed" in wanted:
+        yield "deal.status_changed", user_id, data
+    if "deal.completed" in wanted and after in commissions.COMPLETED and before not in commissions.COMPLETED:
+        yield "deal.completed", user_id, {**data, "commission": _commission(deal, user_id)}
+
+
+def _events(session, wanted):
+    """(kind, user_id, data) for each event in this flush whose kind is in `wanted`."""
+    for obj in session.new:
+        if isinstance(obj, Lead) and "lead.created" in wanted:
+            yield "lead.created", obj.user_id, {**sync._lead(obj), "user_id": obj.user_id}
+        elif isinstance(obj, Deal):
+            yield from _deal_events(obj, None, obj.status, wanted)
+    for obj in session.dirty:
+        if isinstance(obj, Deal):
+            hist = db.inspect(obj).attrs.status.history
+            if hist.added and hist.deleted and hist.added[0] != hist.deleted[0]:
+                yield from _deal_events(obj, hist.deleted[0], hist.added[0], wanted)
+
+
+def _write(conn, events, routes):
+    """Insert (kind, user_id, data) events and one delivery per subscribed endpoint."""
+    events = list(events)
+    if not events:
+        return
+    now = datetime.utcnow()
+    ids = conn.execute(
+        insert(OutboxEvent).returning(OutboxEvent.id, sort_by_parameter_order=True),
+        [{"kind": kind, "payload": json.dumps(data), "user_id": user_id, "created_at": now}
+         for kind, user_id, data in events]).scalars().all()
+    conn.execute(insert(WebhookDelivery), [
+        {"event_id": event_id, "endpoint": name, "run_after": now}
+        for event_id, (kind, _, _) in zip(ids, events) for name in routes[kind]])
+
+
+@event.listens_for(db.session, "after_flush")
+def _record_events(session, flush_context):
+    """Write events and their deliveries on the flush's own connection (same transaction)."""
+    routes = subscribers() if has_app_context() else {}
+    if routes:
+        _write(session.connection(), _events(session, routes), routes)
+
+
+def record_created(rows):
+    """Queue lead.created for leads inserted with core statements (which skip the ORM hook).
+
+    `rows` carry the Lead columns, e.g. the rows of INSERT ... RETURNING the table.
+    """
+    routes = subscribers() if has_app_context() else {}
+    if "lead.created" in routes:
+        _write(db.session.connection(),
+               (("lead.created", r.user_id, {**sync._lead(r), "user_id": r.user_id}) for r in rows), routes)
+
+
+# -----------------------------
+# Claiming / completion
+# -----------------------------
+@dataclass
+class Batch:
+    endpoint: str
+    token: str
+    ids: list          # webhook_delivery ids
+    body: bytes
+
+
+def claim(endpoint: str, limit: int, worker_id: str):
+    """Lease up to `limit` due deliveries for `endpoint` as one Batch, or None.
+
+    Rows are leased with a single compare-and-set UPDATE under a fresh token,
+    so several dispatchers can share the table.
+    """
+    now = datetime.utcnow()
+    D = WebhookDelivery
+    ids = db.session.execute(
+        select(D.id).where(D.endpoint == endpoint, D.status == 'pending', D.run_after <= now)
+        .order_by(D.id).limit(limit)).scalars().all()
+    if not ids:
+        return None
+    token = f"{worker_id}:{secrets.token_hex(4)}"
+    db.session.execute(
+        update(D).where(D.id.in_(ids), D.status == 'pending')
+        .values(status='sending', locked_by=token, locked_at=now, attempts=D.attempts + 1))
+    rows = db.session.execute(
+        select(D.id, OutboxEvent.id, OutboxEvent.kind, OutboxEvent.created_at, OutboxEvent.payload)
+        .join(OutboxEvent, OutboxEvent.id == D.event_id)
+        .where(D.locked_by == token).order_by(D.id)).all()
+    db.session.commit()
+    if not rows:
+        return None
+    events = [f'{{"id":{eid},"type":{json.dumps(kind)},"created_at":"{at.isoformat()}","data":{payload}}}'
+              for _, eid, kind, at, payload in rows]   # payloads are JSON already
+    body = f'{{"tenant":{json.dumps(tenancy.current())},"events":[{",".join(events)}]}}'.encode()
+    return Batch(endpoint, token, [r[0] for r in rows], body)
+
+
+def delivered(ids):
+    db.session.execute(
+        update(WebhookDelivery).where(WebhookDelivery.id.in_(ids))
+        .values(status='delivered', delivered_at=datetime.utcnow(), locked_by=None, locked_at=None, error=None))
+    db.session.commit()
+
+
+def failed(ids, error: str, backoff_seconds: float, max_attempts: int, retry_after=None, permanent=False):
+    """Put deliveries back with exponential backoff, or dead-letter them."""
+    D, now = WebhookDelivery, datetime.utcnow()
+    rows = db.session.execute(select(D.id, D.attempts).where(D.id.in_(ids))).all()
+    by_attempts = {}
+    for delivery_id, attempts in rows:
+        by_attempts.setdefault(attempts, []).append(delivery_id)
+    cap = current_app.config.get("WEBHOOK_MAX_BACKOFF", 3600)
+    for attempts, group in by_attempts.items():
+        values = {"error": error[:1000], "locked_by": None, "locked_at": None}
+        if permanent or attempts >= max_attempts:
+            values["status"] = 'dead'
+        else:
+            delay = max(retry_after or 0, min(cap, backoff_seconds * 2 ** (attempts - 1)))
+            values.update(status='pending', run_after=now + timedelta(seconds=delay))
+        db.session.execute(update(D).where(D.id.in_(group)).values(**values))
+    db.session.commit()
+
+
+def requeue_stale(lease_seconds: float) -> int:
+    """Return batches whose dispatcher died mid-send to the queue."""
+    cutoff = datetime.utcnow() - timedelta(seconds=lease_seconds)
+    rv = db.session.execute(
+        update(WebhookDelivery).where(WebhookDelivery.status == 'sending', WebhookDelivery.locked_at < cutoff)
+        .values(status='pending', locked_by=None, locked_at=None))
+    db.session.commit()
+    return rv.rowcount
+
+
+def replay(endpoint=None) -> int:
+    """Send dead-lettered deliveries again (all, or one endpoint's); the caller commits."""
+    q = update(WebhookDelivery).where(WebhookDelivery.status == 'dead')
+    if endpoint is not None:
+        q = q.where(WebhookDelivery.endpoint == endpoint)
+    return db.session.execute(q.values(status='pending', attempts=0, run_after=datetime.utcnow())).rowcount
+
+
+def prune(days=None) -> dict:
+    """Delete delivered rows older than WEBHOOK_RETENTION_DAYS, then events nothing still owes."""
+    days = current_app.config.get("WEBHOOK_RETENTION_DAYS", 7) if days is None else days
+    cutoff = datetime.utcnow() - timedelta(days=days)
+    D, E = WebhookDelivery, OutboxEvent
+    done = db.session.execute(delete(D).where(D.status == 'delivered', D.delivered_at < cutoff)).rowcount
+    events = db.session.execute(
+        delete(E).where(E.created_at < cutoff, ~exists().where(D.event_id == E.id))).rowcount
+    db.session.commit()
+    return {"deliveries": done, "events": events}
+
+
+# -----------------------------
+# HTTP
+# -----------------------------
+def _retry_after(value):
+    try:
+        return max(0.0, float(value))
+    except (TypeError, ValueError):
+        return None   # HTTP-date form: fall back to our own backoff
+
+
+def sign(secret: str, timestamp: str, body: bytes) -> str:
+    return "sha256=" + hmac.new(secret.encode(), timestamp.encode() + b"." + body, hashlib.sha256).hexdigest()
+
+
+def post(spec: dict, batch: Batch, timeout: float):
+    """POST a batch. Returns (HTTP status, Retry-After seconds or None); network errors raise OSError."""
+    timestamp = str(int(time.time()))
+    headers = {"Content-Type": "application/json", "User-Agent": "roofing-sales-webhooks",
+               "X-Webhook-Batch": batch.token, "X-Webhook-Timestamp": timestamp}
+    if spec.get("secret"):
+        headers["X-Webhook-Signature"] = sign(spec["secret"], timestamp, batch.body)
+    req = urllib.request.Request(spec["url"], data=batch.body, headers=headers, method="POST")
+    try:
+        with urllib.request.urlopen(req, timeout=spec.get("timeout", timeout)) as rv:
+            return rv.status, None
+    except urllib.error.HTTPError as e:
+        with e:
+            return e.code, _retry_after(e.headers.get("Retry-After"))
+
+
+# -----------------------------
+# Dispatcher
+# -----------------------------
+class Dispatcher:
+    """Polls the delivery table and POSTs batches on a thread pool.
+
+    Concurrency is bounded globally by the pool size and per endpoint by its
+    `concurrency` (default WEBHOOK_CONCURRENCY) batches in flight, across all
+    tenants. With TENANTS configured one dispatcher serves every tenant.
+    """
+
+    def __init__(self, app, threads=None, poll_interval=None):
+        cfg = app.config
+        self.app = app
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}"
+        self.threads = threads or cfg.get("WEBHOOK_WORKER_THREADS", 8)
+        self.poll_interval = poll_interval or cfg.get("WEBHOOK_POLL_INTERVAL", 1.0)
+        self.lease_seconds = cfg.get("WEBHOOK_LEASE_SECONDS", 300)
+        self.backoff_seconds = cfg.get("WEBHOOK_RETRY_BACKOFF", 30)
+        self.max_attempts = cfg.get("WEBHOOK_MAX_ATTEMPTS", 8)
+        self.batch_size = cfg.get("WEBHOOK_BATCH_SIZE", 100)
+        self.concurrency = cfg.get("WEBHOOK_CONCURRENCY", 2)
+        self.timeout = cfg.get("WEBHOOK_TIMEOUT", 10)
+        self._running = {}            # endpoint -> batches in flight
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+
+    def stop(self):
+        self._stop.set()
+
+    def _slots(self, name, spec) -> int:
+        with self._lock:
+            free = self.threads - sum(self._running.values())
+            return max(0, min(free, spec.get("concurrency", self.concurrency) - self._running.get(name, 0)))
+
+    def _track(self, name, delta):
+        with self._lock:
+            self._running[name] = self._running.get(name, 0) + delta
+
+    def _send(self, tenant, spec, batch):
+        error, retry_after, permanent = None, None, False
+        try:
+            status, retry_after = post(spec, batch, self.timeout)
+            if not 200 <= status < 300:
+                error = f"HTTP {status}"
+                permanent = 400 <= status < 500 and status not in RETRYABLE_4XX
+        except OSError as e:
+            error = f"{type(e).__name__}: {e}"
+        try:
+            with self.app.app_context():
+                tenancy.activate(tenant)
+                try:
+                    if error is None:
+                        delivered(batch.ids)
+                    else:
+                        log.warning("webhook %s: %d events failed: %s", batch.endpoint, len(batch.ids), error)
+                        failed(batch.ids, error, self.backoff_seconds, self.max_attempts, retry_after, permanent)
+                finally:
+                    db.session.remove()
+        finally:
+            self._track(batch.endpoint, -1)
+
+    def run_once(self, pool: ThreadPoolExecutor) -> int:
+        """Claim and send whatever fits in the free slots. Returns batches dispatched."""
+        dispatched = 0
+        with self.app.app_context():
+            for tenant in tenancy.each():
+                requeue_stale(self.lease_seconds)
+                for name, spec in endpoints(self.app).items():
+                    for _ in range(self._slots(name, spec)):
+                        batch = claim(name, spec.get("batch_size", self.batch_size), self.worker_id)
+                        if batch is None:
+                            break
+                        self._track(name, +1)
+                        pool.submit(self._send, tenant, spec, batch)
+                        dispatched += 1
+            db.session.remove()
+        return dispatched
+
+    def run(self, burst: bool = False):
+        """Run until stopped. With ``burst`` exit once nothing is due or in flight."""
+        log.info("webhook dispatcher %s starting (%d threads)", self.worker_id, self.threads)
+        with ThreadPoolExecutor(self.threads, thread_name_prefix="webhook") as pool:
+            while not self._stop.is_set():
+                dispatched = self.run_once(pool)
+                if burst and not dispatched and not any(self._running.values()):
+                    break
+                if not dispatched:
+                    time.sleep(self.poll_interval)
@@ -0,0 +1,159 @@
+# File: app/tasks.py
+
+# Background job handlers. Each is registered with @task and run by
+# `flask jobs worker` (see app/services/jobs.py).
+
+import csv
+import io
+import os
+from datetime import date, datetime
+
+from flask import current_app
+from sqlalchemy import insert
+
+from app import db
+from app.models import Lead, LEAD_STATUSES
+from app.services import archive, commissions, funnel, geocoding, kpis, metrics, scoring, webhooks
+from app.services.jobs import task
+from app.services.projector import Ratios, simulate_income
+
+IMPORT_BATCH_SIZE = 500
+LEAD_CSV_FIELDS = ["first_name", "last_name", "phone_number", "email", "address", "notes", "status"]
+
+
+def _insert_leads(batch):
+    """One multi-row INSERT ... RETURNING, plus what the ORM hooks would have written."""
+    created = db.session.execute(insert(Lead).returning(*Lead.__table__.c), batch).all()
+    funnel.record_created("lead", [
+        {"id": r.id, "lead_id": r.id, "user_id": r.user_id, "status": r.status} for r in created
+    ])
+    webhooks.record_created(created)
+    scoring.rescore([r.id for r in created])
+    metrics.touched(r.user_id for r in created)
+    db.session.commit()
+    return len(created)
+
+
+@task('import_leads', max_attempts=1)
+def import_leads(ctx):
+    """Bulk-insert leads from CSV text. Bad rows are skipped and reported, not fatal."""
+    user_id = ctx.payload["user_id"]
+    rows = list(csv.DictReader(io.StringIO(ctx.payload["csv"])))
+    total = len(rows) or 1
+    imported, skipped, batch = 0, [], []
+    now = datetime.utcnow()
+
+    for i, row in enumerate(rows, start=2):  # line 1 is the header
+        row = {k.strip().lower(): (v or "").strip() for k, v in row.items() if k}
+        if not row.get("first_name") or not row.get("last_name"):
+            skipped.append(i)
+            continue
+        status = row.get("status") or "New"
+        if status not in LEAD_STATUSES:
+            skipped.append(i)
+            continue
+        batch.append({
+            "first_name": row["first_name"][:100],
+            "last_name": row["last_name"][:100],
+            "phone_number": row.get("phone_number", "")[:20] or None,
+            "email": row.get("email", "")[:120] or None,
+            "address": row.get("address", "")[:200] or None,
+            "notes": row.get("notes") or None,
+            "status": status,
+            "date_created": now,
+            "user_id": user_id,
+        })
+        if len(batch) >= IMPORT_BATCH_SIZE:
+            imported += _insert_leads(batch)
+            batch = []
+            ctx.set_progress(i / total, f"Imported {imported} leads")
+
+    if batch:
+        imported += _insert_leads(batch)
+
+    return {"imported": imported, "skipped_lines": skipped[:100], "skipped": len(skipped)}
+
+
+@task('export_leads')
+def export_leads(ctx):
+    """Write a user's leads to a CSV file under EXPORT_FOLDER, streaming rows."""
+    user_id = ctx.payload["user_id"]
+    folder = current_app.config["EXPORT_FOLDER"]
+    os.makedirs(folder, exist_ok=True)
+    filename = f"leads-{user_id}-job{ctx.job_id}.csv"
+
+    total = db.session.query(Lead).filter_by(user_id=user_id).count() or 1
+    query = (db.session.query(*[getattr(Lead, f) for f in LEAD_CSV_FIELDS])
+             .filter(Lead.user_id == user_id)
+             .order_by(Lead.id)
+             .yield_per(1000))
+    written = 0
+    with open(os.path.join(folder, filename), "w", newline="") as fh:
+        writer = csv.writer(fh)
+        writer.writerow(LEAD_CSV_FIELDS)
+        for row in query:
+            writer.writerow(row)
+            written += 1
+            if written % 5000 == 0:
+                ctx.set_progress(written / total, f"Exported {written} leads")
+    return {"filename": filename, "rows": written}
+
+
+@task('monte_carlo_forecast', cpu_bound=True)
+def monte_carlo_forecast(payload):
+    """Income distribution for a daily door capacity (runs in a worker process)."""
+    knocks = int(payload["doors_knocked"])
+    appts = int(payload["appointments_set"])
+    signs = int(payload["deals_signed"])
+    completes = int(payload["deals_completed"])
+    ratios = Ratios(
+        doors_per_appt=knocks / appts,
+        appts_per_deal=appts / signs,
+        avg_rcv_per_completed_deal=float(payload["total_rcv"]) / completes,
+    )
+    return simulate_income(
+        doors_per_day=float(payload["doors_per_day"]),
+        days=int(payload["days_to_forecast"]),
+        ratios=ratios,
+        sign_to_complete=min(1.0, completes / signs),
+        commission_pct=float(payload["commission_rate"]),
+        company_margin_pct=float(payload["company_margin"]),
+        commission_base=payload.get("commission_base") or "profit",
+        trials=int(payload.get("trials", 2000)),
+        seed=payload.get("seed"),
+        plan=commissions.compile_plan(payload["plan"]) if payload.get("plan") is not None else None,
+    )
+
+
+@task('funnel_rollup')
+def funnel_rollup(ctx):
+    """Rebuild funnel_daily_stat from `since` (ISO date; omitted = full rebuild)."""
+    since = ctx.payload.get("since")
+    rows = funnel.rebuild_daily_stats(date.fromisoformat(since) if since else None)
+    return {"rows": rows, "since": since}
+
+
+@task('archive_leads', max_attempts=1)
+def archive_leads(ctx):
+    """Nightly cold-storage pass (see app/services/archive.py)."""
+    return archive.archive_leads(batch_size=ctx.payload.get("batch_size"))
+
+
+@task('score_leads')
+def score_leads(ctx):
+    """Nightly full recompute of lead priority scores (age decay moves daily)."""
+    return {"rescored": scoring.rescore_all()}
+
+
+@task('geocode_leads')
+def geocode_leads(ctx):
+    """Geocode leads whose address is new or changed (optionally one user's)."""
+    out = geocoding.geocode_leads(user_id=ctx.payload.get("user_id"), limit=ctx.payload.get("limit"))
+    db.session.commit()
+    return out
+
+
+@task('kpi_snapshot', max_attempts=1)
+def kpi_snapshot(ctx):
+    """Nightly per-rep KPI snapshot for today (see app/services/kpis.py)."""
+    return kpis.snapshot(batch_size=ctx.payload.get("batch_size"))
@@ -0,0 +1,149 @@
+# File: app/tenancy.py
+
+# Per-company database routing. Each tenant gets its own SQLAlchemy bind
+# (`tenant:<name>` in SQLALCHEMY_BINDS): a SQLite file per tenant locally, a
+# schema per tenant on Postgres, or an explicit URL for tenants living on
+# another server. The active tenant is stored on `g`, so it follows the app
+# context exactly like the scoped `db.session` does.
+#
+# With no TENANTS configured nothing changes: every query uses the default bind.
+
+import os
+import re
+
+from flask import abort, current_app, g, has_app_context, request, session
+from flask_sqlalchemy.session import Session
+from sqlalchemy.engine import make_url
+
+from app import replicas
+
+TENANT_NAME = re.compile(r"^[a-z0-9_]{1,40}$")
+
+
+def bind_key(name: str) -> str:
+    return f"tenant:{name}"
+
+
+def names(app=None) -> list:
+    """Configured tenant names, in config order."""
+    return list((app or current_app).config.get("TENANTS") or [])
+
+
+def _engine_options(config, name: str) -> dict:
+    """Engine options for one tenant's bind."""
+    explicit = (config.get("TENANT_DATABASE_URLS") or {}).get(name)
+    if explicit:
+        return {"url": explicit}
+    template = config.get("TENANT_DATABASE_URL")
+    if template:
+        return {"url": template.format(tenant=name)}
+    base = make_url(config["SQLALCHEMY_DATABASE_URI"])
+    if base.get_backend_name() == "postgresql":
+        # Same server, one schema per tenant; unqualified SQL (including
+        # migrations) resolves inside it.
+        return {"url": config["SQLALCHEMY_DATABASE_URI"],
+                "connect_args": {"options": f"-csearch_path={name}"}}
+    folder = config.get("TENANT_SQLITE_FOLDER")
+    os.makedirs(folder, exist_ok=True)
+    return {"url": "sqlite:///" + os.path.join(folder, f"{name}.db")}
+
+
+def configure_binds(app):
+    """Add one bind per tenant to SQLALCHEMY_BINDS (call before db.init_app)."""
+    binds = dict(app.config.get("SQLALCHEMY_BINDS") or {})
+    for name in names(app):
+        if not TENANT_NAME.match(name):
+            raise ValueError(f"Invalid tenant name {name!r}: use a-z, 0-9 and _")
+        binds.setdefault(bind_key(name), _engine_options(app.config, name))
+    app.config["SQLALCHEMY_BINDS"] = binds
+
+
+def current():
+    """The tenant the current app context is routed to, or None."""
+    return g.get("tenant") if has_app_context() else None
+
+
+def activate(name):
+    """Route this app context's session to `name` (None = default database).
+
+    The scoped session is discarded first so no connection from the previous
+    tenant is reused.
+    """
+    from app import db
+    if name is not None and name not in names():
+        raise LookupError(f"Unknown tenant: {name}")
+    if current() != name:
+        db.session.remove()
+    g.tenant = name
+
+
+def engine(name=None):
+    """Engine for a tenant (or the default database)."""
+    from app import db
+    return db.engines[bind_key(name)] if name else db.engine
+
+
+def each():
+    """Activate every tenant in turn (just the default database if there are none)."""
+    previous = current()
+    try:
+        for name in names() or [None]:
+            activate(name)
+            yield name
+    finally:
+        activate(previous)
+
+
+class TenantSession(Session):
+    """`db.session` class: while a tenant is active every model routes to its bind.
+
+    Reads on replica-routed requests go to the tenant's replica when one is
+    configured (see app/replicas.py).
+    """
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is not None:
+            return bind
+        name = current()
+        if replicas.reading(self, clause):
+            engine = self._db.engines.get(replicas.bind_key(name))
+            if engine is not None:
+                return engine
+        if name is not None:
+            return self._db.engines[bind_key(name)]
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+def _resolve():
+    """Tenant for this request: X-Tenant header, else the first host label."""
+    tenants = names()
+    header = request.headers.get(current_app.config.get("TENANT_HEADER", "X-Tenant"))
+    if header:
+        return header if header in tenants else None
+    label = request.host.split(":", 1)[0].split(".", 1)[0]
+    if label in tenants:
+        return label
+    return current_app.config.get("TENANT_DEFAULT")
+
+
+def init_app(app):
+    """Register per-request tenant resolution (a no-op without TENANTS)."""
+    if not names(app):
+        return app
+
+    @app.before_request
+    def _route_to_tenant():
+        if request.endpoint == "static":
+            return None
+        name = _resolve()
+        if name is None:
+            abort(404)
+        # User ids are only unique within a tenant: never honour a login cookie
+        # issued by another one.
+        if session.get("tenant") != name:
+            session.clear()
+            session["tenant"] = name
+        activate(name)
+        return None
+
+    return app
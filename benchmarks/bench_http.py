@@ -0,0 +1,86 @@
+# File: benchmarks/bench_http.py
+
+# Bytes-on-the-wire and latency for the dashboard and the JSON projector,
+# with and without response compression.
+#
+#   python benchmarks/bench_http.py [--leads 500] [--runs 50]
+
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, ROOT)
+
+_tmp = tempfile.mkdtemp(prefix="bench-http-")
+os.environ["DATABASE_URL"] = "sqlite:///" + os.path.join(_tmp, "bench.db")
+
+from app import create_app, db                           # noqa: E402
+from app.models import User, Lead, Deal, Settings       # noqa: E402
+
+PROJECTOR_PAYLOAD = {
+    "income_goal": 120000, "days_to_forecast": 240,
+    "doors_knocked": 4000, "appointments_set": 400,
+    "deals_signed": 120, "deals_completed": 100, "total_rcv": 1500000,
+}
+
+
+def seed(n_leads):
+    db.create_all()
+    user = User(username="bench", email="bench@example.com")
+    user.set_password("bench")
+    db.session.add(user)
+    db.session.flush()
+    db.session.add(Settings(user_id=user.id))
+    for i in range(n_leads):
+        lead = Lead(first_name=f"First{i}", last_name=f"Last{i}",
+                    email=f"lead{i}@example.com", address=f"{i} Main St",
+                    status="Signed" if i % 3 == 0 else "New", user_id=user.id)
+        if i % 3 == 0:
+            lead.deals.append(Deal(status="Signed", contract_price=15000 + i, commission_rate=40.0))
+        db.session.add(lead)
+    db.session.commit()
+
+
+def measure(client, method, url, encoding, runs, **kwargs):
+    headers = {"Accept-Encoding": encoding} if encoding else {}
+    sizes, timings = [], []
+    for _ in range(runs):
+        t0 = time.perf_counter()
+        rv = getattr(client, method)(url, headers=headers, **kwargs)
+        body = rv.get_data()
+        timings.append((time.perf_counter() - t0) * 1000.0)
+        sizes.append(len(body))
+    return statistics.median(sizes), statistics.median(timings), rv.headers.get("Content-Encoding", "identity")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--leads", type=int, default=500)
+    parser.add_argument("--runs", type=int, default=50)
+    args = parser.parse_args()
+
+    app = create_app()
+    app.config.update(WTF_CSRF_ENABLED=False, TESTING=True)
+    with app.app_context():
+        seed(args.leads)
+
+    client = app.test_client()
+    client.post("/login", data={"username": "bench", "password": "bench"})
+
+    cases = [
+        ("dashboard", "get", "/index", {}),
+        ("projector.json", "post", "/manual_projector.json", {"json": PROJECTOR_PAYLOAD}),
+    ]
+    print(f"{'endpoint':<16}{'encoding':<10}{'bytes':>10}{'median ms':>12}")
+    for name, method, url, kwargs in cases:
+        for encoding in (None, "gzip", "br"):
+            size, ms, used = measure(client, method, url, encoding, args.runs, **kwargs)
+            print(f"{name:<16}{used:<10}{size:>10.0f}{ms:>12.2f}")
+
+
+if __name__ == "__main__":
+    main()
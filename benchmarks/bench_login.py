@@ -0,0 +1,80 @@
+# File: benchmarks/bench_login.py
+
+# Shift-start login storm against one worker: N reps sign in at once from
+# --threads concurrent clients (a threaded Gunicorn worker). The first storm
+# finds hashes made with --old-method and upgrades each to
+# PASSWORD_HASH_METHOD; the second is steady state. Both run with hashing in
+# the request thread (PASSWORD_HASH_WORKERS=0) and on the bounded pool, and
+# report logins/sec, latency and 503s.
+#
+#   python benchmarks/bench_login.py [--users 200] [--threads 16] [--pool 4]
+
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, ROOT)
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+from sqlalchemy import insert  # noqa: E402
+from werkzeug.security import generate_password_hash  # noqa: E402
+
+from app import create_app, db  # noqa: E402
+from app.models import User  # noqa: E402
+from config import Config  # noqa: E402
+
+
+def storm(app, users, threads):
+    def one(name):
+        client = app.test_client()
+        t0 = time.perf_counter()
+        res = client.post("/login", data={"username": name, "password": "pw"})
+        return res.status_code, time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(threads) as pool:
+        results = list(pool.map(one, users))
+    wall = time.perf_counter() - t0
+    ok = [dt for status, dt in results if status == 302]
+    q = statistics.quantiles(ok, n=20) if len(ok) > 1 else [0.0] * 19
+    return len(ok) / wall, q[9] * 1000.0, q[18] * 1000.0, len(results) - len(ok)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--threads", type=int, default=16)
+    parser.add_argument("--pool", type=int, default=4)
+    parser.add_argument("--method", default=Config.PASSWORD_HASH_METHOD)
+    parser.add_argument("--old-method", default="pbkdf2:sha256:50000")
+    args = parser.parse_args()
+
+    old = generate_password_hash("pw", args.old_method)   # one salt for all: setup speed only
+    names = [f"rep{i}" for i in range(args.users)]
+    print(f"{args.users} logins, {args.threads} client threads, {os.cpu_count()} CPUs, {args.method}")
+    print(f"{'hashing':<10}{'storm':<9}{'logins/s':>10}{'p50 ms':>9}{'p95 ms':>9}{'503s':>6}")
+    for workers in (0, args.pool):
+        path = os.path.join(tempfile.mkdtemp(), "bench.db")
+        cfg = type("BenchConfig", (Config,), {
+            "SQLALCHEMY_DATABASE_URI": f"sqlite:///{path}", "WTF_CSRF_ENABLED": False, "CACHE_BACKEND": "memory",
+            "PASSWORD_HASH_METHOD": args.method, "PASSWORD_HASH_WORKERS": workers,
+            "PASSWORD_HASH_QUEUE": args.threads, "PASSWORD_HASH_WAIT": 30.0})
+        app = create_app(cfg)
+        with app.app_context():
+            db.create_all()
+            db.session.execute(insert(User), [
+                {"username": n, "email": f"{n}@example.com", "password_hash": old} for n in names])
+            db.session.commit()
+        label = f"pool {workers}" if workers else "inline"
+        for name in ("upgrade", "steady"):
+            rate, p50, p95, busy = storm(app, names, args.threads)
+            print(f"{label:<10}{name:<9}{rate:>10.1f}{p50:>9.0f}{p95:>9.0f}{busy:>6}")
+
+
+if __name__ == "__main__":
+    main()
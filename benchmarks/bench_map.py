@@ -0,0 +1,69 @@
+# File: benchmarks/bench_map.py
+
+# Map clusters over a dense metro: N geocoded leads in a ~30 x 30 km box, then
+# the viewport endpoint at a few zoom levels, cold (tiles computed) and warm
+# (tiles cached), with the JSON payload size.
+#
+#   python benchmarks/bench_map.py [--leads 200000]
+
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, ROOT)
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+from sqlalchemy import insert  # noqa: E402
+
+from app import create_app, db  # noqa: E402
+from app.models import User, Lead  # noqa: E402
+from app.services import clusters, geohash  # noqa: E402
+from config import Config  # noqa: E402
+
+STATUSES = ("New", "Contacted", "Appt", "Signed", "Completed")
+# (zoom, viewport) -- roughly a 1280 x 800 px window centred on the metro
+VIEWS = [(10, (39.55, -75.45, 40.45, -74.55)), (12, (39.9, -75.1, 40.1, -74.9)), (14, (39.97, -75.03, 40.03, -74.97))]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--leads", type=int, default=200_000)
+    args = parser.parse_args()
+
+    path = os.path.join(tempfile.mkdtemp(), "bench.db")
+    cfg = type("BenchConfig", (Config,), {"SQLALCHEMY_DATABASE_URI": f"sqlite:///{path}"})
+    app = create_app(cfg)
+    rng = random.Random(7)
+    with app.app_context():
+        db.create_all()
+        users = [User(username=f"rep{i}", email=f"rep{i}@example.com") for i in range(20)]
+        db.session.add_all(users)
+        db.session.commit()
+        rows = []
+        for i in range(args.leads):
+            lat, lng = rng.gauss(40.0, 0.06), rng.gauss(-75.0, 0.08)
+            rows.append({"first_name": "L", "last_name": str(i), "user_id": users[i % 20].id,
+                         "status": rng.choice(STATUSES), "latitude": lat, "longitude": lng,
+                         "geohash": geohash.encode(lat, lng)})
+        db.session.execute(insert(Lead), rows)
+        db.session.commit()
+
+        print(f"{'zoom':<6}{'tiles':>6}{'clusters':>10}{'cold ms':>10}{'warm ms':>10}{'json KB':>9}")
+        for zoom, box in VIEWS:
+            t0 = time.perf_counter()
+            out = clusters.viewport_clusters(*box, zoom)
+            cold = (time.perf_counter() - t0) * 1000.0
+            t0 = time.perf_counter()
+            clusters.viewport_clusters(*box, zoom)
+            warm = (time.perf_counter() - t0) * 1000.0
+            size = len(json.dumps(out, separators=(",", ":"))) / 1024.0
+            print(f"{zoom:<6}{out['tiles']:>6}{len(out['clusters']):>10}{cold:>10.1f}{warm:>10.2f}{size:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
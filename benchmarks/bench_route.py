@@ -0,0 +1,46 @@
+# File: benchmarks/bench_route.py
+
+# Canvassing route planning: nearest-neighbour construction vs. the full plan
+# (nearest-neighbour + neighbour-list 2-opt) on random stops in a city-sized box.
+#
+#   python benchmarks/bench_route.py [--stops 300] [--runs 5]
+
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, ROOT)
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+from app.services import routing  # noqa: E402
+
+
+def _time(fn, runs):
+    timings, out = [], None
+    for _ in range(runs):
+        t0 = time.perf_counter()
+        out = fn()
+        timings.append((time.perf_counter() - t0) * 1000.0)
+    return statistics.median(timings), out
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--stops", type=int, default=300)
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    points = [(40.0 + rng.random() * 0.2, -75.0 + rng.random() * 0.3) for _ in range(args.stops)]
+    print(f"{'plan':<24}{'median ms':>12}{'km':>10}")
+    for label, optimize in (("nearest neighbour", False), ("nn + 2-opt", True)):
+        ms, plan = _time(lambda: routing.plan_route(points, optimize=optimize), args.runs)
+        print(f"{label:<24}{ms:>12.1f}{plan['total_km']:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
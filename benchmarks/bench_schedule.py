@@ -0,0 +1,91 @@
+# File: benchmarks/bench_schedule.py
+
+# Appointment calendar for a sales team: R reps with a few visits every working
+# day for D days, then a month of team availability, the team's next open slot,
+# single-rep conflict checks and a storm-day bulk reschedule.
+#
+#   python benchmarks/bench_schedule.py [--reps 50] [--days 60]
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, ROOT)
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+from sqlalchemy import insert  # noqa: E402
+
+from app import create_app, db  # noqa: E402
+from app.models import User, Appointment  # noqa: E402
+from app.services import appointments  # noqa: E402
+from config import Config  # noqa: E402
+
+MONDAY = datetime(2030, 1, 7)
+
+
+def _ms(fn, repeat=1):
+    t0 = time.perf_counter()
+    for _ in range(repeat):
+        out = fn()
+    return (time.perf_counter() - t0) * 1000.0 / repeat, out
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--reps", type=int, default=50)
+    parser.add_argument("--days", type=int, default=60)
+    args = parser.parse_args()
+
+    path = os.path.join(tempfile.mkdtemp(), "bench.db")
+    cfg = type("BenchConfig", (Config,), {"SQLALCHEMY_DATABASE_URI": f"sqlite:///{path}"})
+    app = create_app(cfg)
+    rng = random.Random(7)
+    with app.app_context():
+        db.create_all()
+        users = [User(username=f"rep{i}", email=f"rep{i}@example.com") for i in range(args.reps)]
+        db.session.add_all(users)
+        db.session.commit()
+        rows = []
+        for u in users:
+            for d in range(args.days):
+                day = MONDAY + timedelta(days=d)
+                if day.weekday() == 6:
+                    continue
+                for hour in sorted(rng.sample(range(8, 18), rng.randint(2, 5))):
+                    start = day + timedelta(hours=hour, minutes=rng.choice((0, 15, 30)))
+                    rows.append({"lead_id": rng.randint(1, 10_000), "user_id": u.id, "starts_at": start,
+                                 "ends_at": start + timedelta(minutes=rng.choice((30, 45, 60))),
+                                 "status": "scheduled"})
+        db.session.execute(insert(Appointment), rows)
+        db.session.commit()
+        ids = [u.id for u in users]
+        print(f"{len(rows)} appointments, {args.reps} reps, {args.days} days")
+
+        ms, free = _ms(lambda: appointments.availability(ids, MONDAY, MONDAY + timedelta(days=30), 60))
+        print(f"{'team availability, 30 days':<36}{ms:>9.1f} ms  ({sum(map(len, free.values()))} windows)")
+        ms, _ = _ms(lambda: appointments.availability(ids[:1], MONDAY, MONDAY + timedelta(days=30), 60), 20)
+        print(f"{'one rep availability, 30 days':<36}{ms:>9.1f} ms")
+        ms, slot = _ms(lambda: appointments.next_open_slot(ids, MONDAY + timedelta(hours=8), 120), 20)
+        print(f"{'team next open 2h slot':<36}{ms:>9.1f} ms  ({slot[1]:%a %H:%M})")
+
+        def check():
+            start = MONDAY + timedelta(days=rng.randint(0, args.days - 1), hours=rng.randint(8, 17))
+            try:
+                appointments._check_free(rng.choice(ids), start, start + timedelta(hours=1))
+            except appointments.ScheduleConflict:
+                pass
+        ms, _ = _ms(check, 200)
+        print(f"{'conflict check':<36}{ms:>9.2f} ms")
+
+        ms, out = _ms(lambda: appointments.bulk_reschedule(MONDAY.date()))
+        db.session.rollback()
+        print(f"{'storm day, whole team':<36}{ms:>9.1f} ms  ({len(out['moved'])} moved, {len(out['unplaced'])} unplaced)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+# File: benchmarks/bench_startup.py
+
+# Startup cost: `import app`, one create_app(), and many isolated apps in one
+# process. Each import measurement runs in a fresh interpreter.
+#
+#   python benchmarks/bench_startup.py [--runs 10] [--apps 50] [--importtime]
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, ROOT)
+
+IMPORT_ONLY = "import time; t = time.perf_counter(); import app; print(time.perf_counter() - t)"
+CREATE_APP = ("import time; t = time.perf_counter(); from app import create_app; create_app(); "
+              "print(time.perf_counter() - t)")
+
+
+def _fresh(code, runs, env):
+    timings = []
+    for _ in range(runs):
+        out = subprocess.run([sys.executable, "-c", code], cwd=ROOT, env=env,
+                             check=True, capture_output=True, text=True)
+        timings.append(float(out.stdout.strip().splitlines()[-1]) * 1000.0)
+    return statistics.median(timings)
+
+
+def _isolated_apps(n):
+    from app import create_app, db
+    from config import Config
+
+    t0 = time.perf_counter()
+    apps = []
+    for i in range(n):
+        cfg = type(f"BenchConfig{i}", (Config,), {"SQLALCHEMY_DATABASE_URI": "sqlite://", "TESTING": True})
+        app = create_app(cfg)
+        with app.app_context():
+            db.create_all()
+        apps.append(app)
+    return (time.perf_counter() - t0) * 1000.0 / n
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--apps", type=int, default=50)
+    parser.add_argument("--importtime", action="store_true",
+                        help="Also print the 15 slowest modules from `python -X importtime`.")
+    args = parser.parse_args()
+
+    env = dict(os.environ, DATABASE_URL="sqlite://")
+    print(f"{'step':<28}{'median ms':>12}")
+    print(f"{'import app':<28}{_fresh(IMPORT_ONLY, args.runs, env):>12.1f}")
+    print(f"{'import + create_app()':<28}{_fresh(CREATE_APP, args.runs, env):>12.1f}")
+    print(f"{'create_app() + schema, each':<28}{_isolated_apps(args.apps):>12.2f}")
+
+    if args.importtime:
+        out = subprocess.run([sys.executable, "-X", "importtime", "-c", "from app import create_app; create_app()"],
+                             cwd=ROOT, env=env, check=True, capture_output=True, text=True)
+        rows = []
+        for line in out.stderr.splitlines():
+            parts = line.split("|")
+            if len(parts) == 3 and parts[1].strip().isdigit():
+                rows.append((int(parts[1]), parts[2].rstrip()))
+        print("\ncumulative us  module")
+        for us, mod in sorted(rows, reverse=True)[:15]:
+            print(f"{us:>13}  {mod}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+# File: benchmarks/bench_upload.py
+
+# Worker memory for big attachments: upload a file of --mb megabytes in
+# ATTACHMENT_CHUNK_MAX chunks through the API (the request bodies are generated
+# on the fly, never materialised), then download it and a range of it. Prints
+# the peak Python heap growth (tracemalloc) for each step and the throughput.
+#
+#   python benchmarks/bench_upload.py [--mb 200]
+
+import argparse
+import io
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, ROOT)
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+from app import create_app, db  # noqa: E402
+from app.models import User, Lead  # noqa: E402
+from config import Config  # noqa: E402
+
+BLOCK = os.urandom(1 << 20)
+
+
+class Generated(io.RawIOBase):
+    """`size` bytes of BLOCK repeated, produced as they are read."""
+
+    def __init__(self, size):
+        self.size, self.pos = size, 0
+
+    def readable(self):
+        return True
+
+    def seekable(self):   # the test client measures the body by seeking
+        return True
+
+    def seek(self, pos, whence=0):
+        self.pos = self.size + pos if whence == 2 else pos
+        return self.pos
+
+    def tell(self):
+        return self.pos
+
+    def readinto(self, buf):
+        n = min(len(buf), self.size - self.pos, len(BLOCK))
+        buf[:n] = BLOCK[:n]
+        self.pos += n
+        return n
+
+
+def _peak(fn):
+    tracemalloc.start()
+    base = tracemalloc.get_traced_memory()[0]
+    t0 = time.perf_counter()
+    out = fn()
+    elapsed = time.perf_counter() - t0
+    peak = tracemalloc.get_traced_memory()[1] - base
+    tracemalloc.stop()
+    return out, elapsed, peak / (1 << 20)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--mb", type=int, default=200)
+    args = parser.parse_args()
+    size = args.mb << 20
+
+    folder = tempfile.mkdtemp()
+    cfg = type("BenchConfig", (Config,), {"SQLALCHEMY_DATABASE_URI": f"sqlite:///{folder}/bench.db",
+                                          "ATTACHMENT_FOLDER": folder, "ATTACHMENT_MAX_SIZE": size,
+                                          "WTF_CSRF_ENABLED": False, "TESTING": True})
+    app = create_app(cfg)
+    chunk = app.config["ATTACHMENT_CHUNK_MAX"]
+    with app.app_context():
+        db.create_all()
+        user = User(username="rep", email="rep@example.com")
+        user.set_password("pw")
+        db.session.add(user)
+        db.session.flush()
+        lead = Lead(first_name="A", last_name="B", user_id=user.id)
+        db.session.add(lead)
+        db.session.commit()
+        client = app.test_client()
+        client.post("/login", data={"username": "rep", "password": "pw"})
+        url = client.post("/attachments/uploads", json={"filename": "big.jpg", "size": size,
+                                                        "content_type": "image/jpeg", "lead_id": lead.id}).json["upload_url"]
+
+        def upload():
+            rv = None
+            for at in range(0, size, chunk):
+                n = min(chunk, size - at)
+                rv = client.patch(url, input_stream=Generated(n),
+                                  headers={"Upload-Offset": str(at), "Content-Length": str(n)})
+            return rv.json["id"]
+
+        attachment_id, up_s, up_peak = _peak(upload)
+
+        def download(headers=None):
+            with client.get(f"/attachments/{attachment_id}", headers=headers or {}, buffered=False) as rv:
+                return sum(len(piece) for piece in rv.response)
+
+        got, down_s, down_peak = _peak(download)
+        part, _, range_peak = _peak(lambda: download({"Range": f"bytes={size // 2}-{size // 2 + (1 << 20) - 1}"}))
+        assert got == size and part == 1 << 20
+
+    print(f"file {args.mb} MB in {chunk >> 20} MB chunks")
+    print(f"{'step':<12}{'MB/s':>8}{'peak heap MB':>14}")
+    print(f"{'upload':<12}{args.mb / up_s:>8.0f}{up_peak:>14.2f}")
+    print(f"{'download':<12}{args.mb / down_s:>8.0f}{down_peak:>14.2f}")
+    print(f"{'range 1 MB':<12}{'':>8}{range_peak:>14.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -18,4 +18,197 @@ class Config:
     SQLALCHEMY_DATABASE_URI = DATABASE_URL or \
         'sqlite:///' + os.path.join(basedir, 'app.db')
         
-    SQLALCHEMY_TRACK_MODIFICATIONS = False
\ No newline at end of file
+    SQLALCHEMY_TRACK_MODIFICATIONS = False
+
+    # Password hashing (app/passwords.py). Any Werkzeug method string; stored
+    # hashes made with other parameters are upgraded at the user's next login.
+    # Hashes run on a pool of PASSWORD_HASH_WORKERS threads (0: in the request
+    # thread); past PASSWORD_HASH_QUEUE waiting logins, requests wait up to
+    # PASSWORD_HASH_WAIT seconds for a place and then get a 503.
+    PASSWORD_HASH_METHOD = os.environ.get('PASSWORD_HASH_METHOD', 'scrypt:32768:8:1')
+    PASSWORD_HASH_WORKERS = int(os.environ.get('PASSWORD_HASH_WORKERS', min(4, os.cpu_count() or 1)))
+    PASSWORD_HASH_QUEUE = 32
+    PASSWORD_HASH_WAIT = 2.0
+
+    # Multi-company deployments (app/tenancy.py). Each tenant gets its own
+    # database: a SQLite file under TENANT_SQLITE_FOLDER, a schema of the same
+    # name on Postgres, or an explicit URL. Requests pick their tenant from the
+    # X-Tenant header or the first label of the host name.
+    TENANTS = [t.strip() for t in os.environ.get('TENANTS', '').split(',') if t.strip()]
+    TENANT_DATABASE_URL = os.environ.get('TENANT_DATABASE_URL')   # optional, '{tenant}' placeholder
+    TENANT_DATABASE_URLS = {}     # tenant -> URL, for tenants hosted elsewhere
+    TENANT_SQLITE_FOLDER = os.path.join(basedir, 'instance', 'tenants')
+    TENANT_HEADER = 'X-Tenant'
+    TENANT_DEFAULT = os.environ.get('TENANT_DEFAULT')   # used when the request names no tenant
+
+    # Read replica (app/replicas.py). GET requests to REPLICA_ENDPOINTS read from
+    # it; a client that just wrote reads from the primary for REPLICA_PIN_SECONDS.
+    REPLICA_URL = os.environ.get('DATABASE_REPLICA_URL')
+    if REPLICA_URL and REPLICA_URL.startswith("postgres://"):
+        REPLICA_URL = REPLICA_URL.replace("postgres://", "postgresql://", 1)
+    SQLALCHEMY_REPLICA_URI = REPLICA_URL
+    TENANT_REPLICA_URLS = {}      # tenant -> replica URL
+    REPLICA_PIN_SECONDS = 5
+    REPLICA_ENDPOINTS = {         # endpoint -> methods that never write
+        'dashboard.index': ('GET', 'HEAD'),
+        'leads.lead_detail': ('GET', 'HEAD'),
+        'projector.manual_projector': ('GET', 'HEAD'),
+        'projector.manual_projector_json': ('GET', 'HEAD', 'POST'),
+        'projector.projector_solve_json': ('POST',),
+        'api.funnel_json': ('GET', 'HEAD'),
+        'api.top_leads': ('GET', 'HEAD'),
+        'api.map_clusters': ('GET', 'HEAD'),
+        'api.forecast_json': ('GET', 'HEAD'),
+        'api.kpi_trend_json': ('GET', 'HEAD'),
+        'api.appointment_availability': ('GET', 'HEAD'),
+        'api.appointment_next': ('GET', 'HEAD'),
+    }
+
+    # Optional blueprints (app/__init__.py: create_app)
+    API_ENABLED = os.environ.get('API_ENABLED', '1') != '0'   # /jobs, /sync, /analytics JSON API
+
+    # HTTP response middleware (app/middleware.py)
+    COMPRESS_MIN_SIZE = int(os.environ.get('COMPRESS_MIN_SIZE', 500))   # bytes
+    COMPRESS_LEVEL = 6                                                  # gzip 1-9
+    COMPRESS_BROTLI_QUALITY = 4                                         # brotli 0-11
+    COMPRESS_MIMETYPES = ('text/html', 'application/json')
+    CACHE_DEFAULT_POLICY = 'private, no-cache'
+    CACHE_POLICIES = {}   # endpoint -> Cache-Control value, overrides the defaults
+
+    # Background jobs (app/services/jobs.py, `flask jobs worker`)
+    JOBS_WORKER_THREADS = int(os.environ.get('JOBS_WORKER_THREADS', 4))
+    JOBS_WORKER_PROCESSES = int(os.environ.get('JOBS_WORKER_PROCESSES', 2))
+    JOBS_POLL_INTERVAL = 1.0      # seconds between polls when idle
+    JOBS_LEASE_SECONDS = 600      # running jobs older than this are re-queued
+    JOBS_RETRY_BACKOFF = 30       # seconds, doubled per attempt
+    JOBS_CONCURRENCY = {'import_leads': 2, 'export_leads': 2, 'monte_carlo_forecast': 2}
+    EXPORT_FOLDER = os.environ.get('EXPORT_FOLDER') or os.path.join(basedir, 'instance', 'exports')
+
+    # Lead cohorts (app/services/cohorts.py)
+    COHORT_CLOSE_DAYS = 180       # cohorts older than this are frozen and never recomputed
+    COHORT_MAX_PERIODS = 26       # length of each conversion curve (weeks or months)
+
+    # Nightly KPI snapshots (app/services/kpis.py, `flask kpis snapshot` or the kpi_snapshot job)
+    KPI_SNAPSHOT_BATCH_SIZE = 500   # reps per set of grouped queries
+
+    # Cold storage (app/services/archive.py, `flask archive run`)
+    ARCHIVE_AFTER_MONTHS = int(os.environ.get('ARCHIVE_AFTER_MONTHS', 12))   # untouched this long -> archived
+    ARCHIVE_STALE_STATUSES = ('New', 'Contacted')   # archived when stale; Completed leads always qualify
+    ARCHIVE_BATCH_SIZE = 500
+
+    # Bulk daily-activity upserts (app/services/activity.py)
+    ACTIVITY_MAX_ROWS = 1000      # rows per bulk/CSV request
+
+    # Lead priority scores (app/services/scoring.py); overrides DEFAULT_WEIGHTS keys
+    LEAD_SCORE_WEIGHTS = {}
+
+    # Geocoding and canvassing routes (app/services/geocoding.py, app/services/routing.py).
+    # GEOCODER is 'nominatim' (HTTP lookups at GEOCODER_URL), 'file' (offline CSV of
+    # address,lat,lng; leads not in it never get coordinates) or 'package.module:Class'.
+    GEOCODER = os.environ.get('GEOCODER', 'file')
+    GEOCODER_FILE = os.environ.get('GEOCODER_FILE') or os.path.join(basedir, 'instance', 'geocodes.csv')
+    GEOCODER_URL = os.environ.get('GEOCODER_URL', 'https://nominatim.openstreetmap.org/search')
+    GEOCODER_USER_AGENT = os.environ.get('GEOCODER_USER_AGENT', 'roofing-sales-geocoder')  # identify yourself
+    GEOCODER_COUNTRIES = os.environ.get('GEOCODER_COUNTRIES')   # e.g. 'us' to narrow the search
+    GEOCODER_TIMEOUT = 10         # seconds per request
+    GEOCODER_MIN_INTERVAL = 1.0   # seconds between requests (the public server allows 1/s)
+    ROUTE_MAX_STOPS = 300
+    ROUTE_INDEX_CACHE_SIZE = 64   # per-user lead grids kept per process
+
+    # Map clusters (app/services/clusters.py): per-tile aggregates by geohash prefix
+    MAP_MAX_TILES = 32            # viewport tiles before dropping to coarser clusters
+    MAP_TILE_TTL = 600            # seconds a cached tile lives (writes drop it sooner, see app/cache.py)
+
+    # Live dashboard (app/live.py): SSE deltas fanned out by 'local' (one process),
+    # 'redis' (LIVE_REDIS_URL, needs the redis package) or 'package.module:Class'.
+    # Each open stream holds a worker thread: serve with threaded or async workers.
+    LIVE_BACKEND = os.environ.get('LIVE_BACKEND', 'local')
+    LIVE_REDIS_URL = os.environ.get('LIVE_REDIS_URL') or os.environ.get('REDIS_URL', 'redis://localhost:6379/0')
+    LIVE_HEARTBEAT = 15           # seconds between keep-alive comments
+    LIVE_STREAM_SECONDS = 300     # streams end after this; EventSource reconnects
+    LIVE_QUEUE_SIZE = 100         # events buffered per stream before it is told to reload
+
+    # Cache (app/cache.py): a per-worker LRU in front of a tier every worker shares:
+    # 'sqlite' (CACHE_SQLITE_PATH, memory-mapped), 'redis' (CACHE_REDIS_URL, needs the redis
+    # package; 'stub://' is an in-process stand-in), 'memory' (no sharing) or 'package.module:Class'.
+    # Writes through the app invalidate entries at once; anything else within CACHE_TTL.
+    CACHE_BACKEND = os.environ.get('CACHE_BACKEND', 'sqlite')
+    CACHE_SQLITE_PATH = os.environ.get('CACHE_SQLITE_PATH') or os.path.join(basedir, 'instance', 'cache.sqlite3')
+    CACHE_SQLITE_MMAP = 64 << 20         # bytes of the file mapped into each worker
+    CACHE_SQLITE_MAX_ENTRIES = 100000
+    CACHE_REDIS_URL = os.environ.get('CACHE_REDIS_URL') or os.environ.get('REDIS_URL', 'redis://localhost:6379/0')
+    CACHE_KEY_PREFIX = None              # default: derived from the database URI
+    CACHE_MEMORY_SIZE = 2048             # entries kept per worker (LRU)
+    CACHE_TTL = 300                      # seconds
+    CACHE_STATS_EVERY = 200              # lookups between hit/miss counter flushes to the shared tier
+
+    # Request profiling (app/profiling.py, /admin/profiles). A request is profiled with a
+    # signed X-Profile header (`flask profile token`), ?_profile=1 from a PROFILE_ADMINS
+    # user, or at random with PROFILE_SAMPLE_RATE.
+    PROFILE_ENABLED = os.environ.get('PROFILE_ENABLED', '1') != '0'
+    PROFILE_ADMINS = [u.strip() for u in os.environ.get('PROFILE_ADMINS', '').split(',') if u.strip()]
+    PROFILE_SAMPLE_RATE = float(os.environ.get('PROFILE_SAMPLE_RATE', 0.0))   # 0.01 = 1% of requests
+    PROFILE_MODE = 'sample'       # 'sample' (collapsed stacks) or 'cprofile' (.prof)
+    PROFILE_INTERVAL = 0.005      # seconds between stack samples
+    PROFILE_TOKEN_MAX_AGE = 3600  # seconds an X-Profile token stays valid
+    PROFILE_KEEP = 200            # newest captures kept in PROFILE_DIR
+    # Write SQL parameter values to the captures? They include password hashes and customer PII.
+    PROFILE_SQL_PARAMS = os.environ.get('PROFILE_SQL_PARAMS', '0') == '1'
+    PROFILE_DIR = os.environ.get('PROFILE_DIR') or os.path.join(basedir, 'instance', 'profiles')
+
+    # Commission pay plans (app/services/commissions.py, `flask plans set`)
+    COMMISSION_PLAN_CACHE_SIZE = 256   # compiled plans kept per process
+
+    # Attachments (app/services/attachments.py): resumable chunked uploads, content-addressed
+    # blobs under ATTACHMENT_FOLDER/<tenant>/, thumbnails made lazily in a thread pool.
+    # Behind nginx, set ATTACHMENT_ACCEL_PREFIX to an `internal` location aliased to
+    # ATTACHMENT_FOLDER so files go out with X-Accel-Redirect (or set USE_X_SENDFILE).
+    ATTACHMENT_FOLDER = os.environ.get('ATTACHMENT_FOLDER') or os.path.join(basedir, 'instance', 'attachments')
+    ATTACHMENT_ACCEL_PREFIX = os.environ.get('ATTACHMENT_ACCEL_PREFIX')   # e.g. '/_attachments'
+    ATTACHMENT_MAX_SIZE = 50 * 1024 * 1024     # bytes per file
+    ATTACHMENT_CHUNK_MAX = 8 * 1024 * 1024     # bytes per PATCH
+    ATTACHMENT_COPY_BUFFER = 64 * 1024         # bytes read from the request at a time
+    ATTACHMENT_UPLOAD_TTL = 86400              # seconds before an unfinished upload is pruned
+    ATTACHMENT_INLINE_TYPES = ('image/jpeg', 'image/png', 'image/gif', 'image/webp', 'application/pdf')
+    THUMBNAILER = 'pil'                        # or 'package.module:callable(src, dst, size)'
+    ATTACHMENT_THUMB_SIZES = (256, 1024)
+    ATTACHMENT_THUMB_WORKERS = 2
+    ATTACHMENT_THUMB_TIMEOUT = 10              # seconds a request waits for a new thumbnail
+
+    # Commission cash-flow forecast (app/services/forecast.py, /analytics/forecast.json)
+    FORECAST_MONTHS = 12               # months listed; the rest is reported as 'later'
+    FORECAST_DASHBOARD_MONTHS = 6
+    FORECAST_STALE_DAYS = 180          # open this long in a stage counts as lost when learning
+    FORECAST_PRIOR_WEIGHT = 5          # pseudo-deals of company history blended into each rep's
+    FORECAST_PAYOUT_LAG_DAYS = 0       # completion -> paycheck
+    FORECAST_STATS_TTL = 3600          # seconds stage statistics are cached
+
+    # Appointments (app/services/appointments.py, /appointments). Times are reps' local wall clock.
+    APPOINTMENT_DAY_HOURS = (8, 19)              # working hours offered as free slots
+    APPOINTMENT_WORKDAYS = (0, 1, 2, 3, 4, 5)    # Monday = 0
+    APPOINTMENT_BUFFER_MINUTES = 15              # travel time kept clear around each appointment
+    APPOINTMENT_SLOT_MINUTES = 15                # free slots start on this grid
+    APPOINTMENT_MAX_MINUTES = 480
+    APPOINTMENT_SEARCH_DAYS = 60                 # look-ahead for next open slot / bulk reschedule
+    # Usernames allowed team-wide views and actions (scope=team, booking for other reps).
+    TEAM_MANAGERS = [u.strip() for u in os.environ.get('TEAM_MANAGERS', '').split(',') if u.strip()]
+
+    # Outbound webhooks (app/services/webhooks.py, `flask webhooks dispatch`). Lead and deal
+    # events are written to an outbox in the same transaction and POSTed in signed batches:
+    # {'accounting': {'url': 'https://...', 'events': ['deal.completed'], 'secret': '...',
+    #                 'batch_size': 100, 'concurrency': 2, 'timeout': 10}}; 'events' defaults to all.
+    WEBHOOK_ENDPOINTS = {}
+    WEBHOOK_BATCH_SIZE = 100      # events per POST
+    WEBHOOK_CONCURRENCY = 2       # batches in flight per endpoint
+    WEBHOOK_WORKER_THREADS = 8    # batches in flight per dispatcher
+    WEBHOOK_TIMEOUT = 10          # seconds per POST
+    WEBHOOK_MAX_ATTEMPTS = 8      # then dead-lettered until `flask webhooks replay`
+    WEBHOOK_RETRY_BACKOFF = 30    # seconds, doubled per attempt
+    WEBHOOK_MAX_BACKOFF = 3600
+    WEBHOOK_POLL_INTERVAL = 1.0
+    WEBHOOK_LEASE_SECONDS = 300   # batches sending longer than this are re-queued
+    WEBHOOK_RETENTION_DAYS = 7    # delivered events kept for `flask webhooks prune`
+
+    # Synthetic data (`flask seed`, app/services/seed.py); overrides DEFAULT_PROFILE keys
+    SEED_PROFILE = {}
+    SEED_BATCH_SIZE = 5000        # rows per bulk INSERT
@@ -16,6 +16,12 @@ logger = logging.getLogger('alembic.env')
 
 
 def get_engine():
+    # `flask tenants upgrade` (or `flask db upgrade -x tenant=<name>`) migrates
+    # one tenant's database at a time.
+    tenant = context.get_x_argument(as_dictionary=True).get('tenant')
+    if tenant:
+        from app import tenancy
+        return tenancy.engine(tenant)
     try:
         # this works with Flask-SQLAlchemy<3 and Alchemical
         return current_app.extensions['migrate'].db.get_engine()
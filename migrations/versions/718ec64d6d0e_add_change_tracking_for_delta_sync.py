@@ -0,0 +1,72 @@
+"""add change tracking (version, sync_seq, tombstones) for delta sync
+
+Revision ID: 718ec64d6d0e
+Revises: c241102e28dc
+Create Date: 2026-10-19 11:03:27.554112
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '718ec64d6d0e'
+down_revision = 'c241102e28dc'
+branch_labels = None
+depends_on = None
+
+TRACKED = ('lead', 'deal', 'daily_activity', 'settings')
+
+
+def upgrade():
+    op.create_table('sync_clock',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('value', sa.BigInteger(), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_table('tombstone',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('entity', sa.String(length=20), nullable=False),
+    sa.Column('entity_id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=True),
+    sa.Column('sync_seq', sa.BigInteger(), nullable=True),
+    sa.Column('deleted_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['user_id'], ['user.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('tombstone', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_tombstone_sync_seq'), ['sync_seq'], unique=False)
+        batch_op.create_index(batch_op.f('ix_tombstone_user_id'), ['user_id'], unique=False)
+
+    for table in TRACKED:
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.add_column(sa.Column('version', sa.Integer(), nullable=False, server_default='1'))
+            batch_op.add_column(sa.Column('sync_seq', sa.BigInteger(), nullable=True))
+            if table != 'deal':  # deal already has date_updated
+                batch_op.add_column(sa.Column('updated_at', sa.DateTime(), nullable=True))
+            batch_op.create_index(batch_op.f(f'ix_{table}_sync_seq'), ['sync_seq'], unique=False)
+
+    # Existing rows all belong to the first change; a client syncing from 0 gets everything.
+    for table in TRACKED:
+        op.execute(f"UPDATE {table} SET sync_seq = 1")
+    op.execute("UPDATE lead SET updated_at = date_created")
+    op.execute("UPDATE daily_activity SET updated_at = CURRENT_TIMESTAMP")
+    op.execute("UPDATE settings SET updated_at = CURRENT_TIMESTAMP")
+    op.execute("INSERT INTO sync_clock (id, value) VALUES (1, 1)")
+
+
+def downgrade():
+    for table in reversed(TRACKED):
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.drop_index(batch_op.f(f'ix_{table}_sync_seq'))
+            if table != 'deal':
+                batch_op.drop_column('updated_at')
+            batch_op.drop_column('sync_seq')
+            batch_op.drop_column('version')
+
+    with op.batch_alter_table('tombstone', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_tombstone_user_id'))
+        batch_op.drop_index(batch_op.f('ix_tombstone_sync_seq'))
+
+    op.drop_table('tombstone')
+    op.drop_table('sync_clock')
@@ -3,3 +3,36 @@ import os, sys
 ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
 if ROOT not in sys.path:
     sys.path.insert(0, ROOT)
+
+# Never let the suite touch the committed app.db.
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+import pytest
+
+
+@pytest.fixture
+def app():
+    """A fresh application per test (see create_app)."""
+    from app import create_app
+    from config import Config
+
+    class TestConfig(Config):
+        SQLALCHEMY_DATABASE_URI = "sqlite://"
+        TESTING = True
+        WTF_CSRF_ENABLED = False
+        CACHE_BACKEND = "memory"
+
+    return create_app(TestConfig)
+
+
+@pytest.fixture
+def app_ctx(app):
+    """App context with a fresh in-memory schema."""
+    from app import db
+    from app.services import commissions
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
+    commissions._compiled.clear()      # plan ids restart with every test database
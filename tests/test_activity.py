@@ -0,0 +1,69 @@
+# File: tests/test_activity.py
+from datetime import date, timedelta
+
+import pytest
+
+from app import db
+from app.models import User, DailyActivity
+from app.services import activity
+
+
+@pytest.fixture
+def client(app_ctx):
+    user = User(username="rep", email="rep@example.com")
+    user.set_password("pw")
+    db.session.add(user)
+    db.session.commit()
+    c = app_ctx.test_client()
+    c.post("/login", data={"username": "rep", "password": "pw"})
+    return c
+
+
+def test_bulk_upsert_inserts_then_updates_in_place(client):
+    start = date.today() - timedelta(days=29)
+    rows = [{"date": (start + timedelta(days=i)).isoformat(), "doors_knocked": 50, "appointments_set": 2}
+            for i in range(30)]
+    assert client.post("/activity.json", json={"rows": rows}).get_json()["upserted"] == 30
+    first = {a.date: (a.id, a.version, a.sync_seq) for a in DailyActivity.query}
+
+    rv = client.post("/activity.json", json={"rows": rows[:2], "mode": "add"})
+    assert rv.status_code == 200
+    db.session.expire_all()
+    assert DailyActivity.query.count() == 30
+    bumped = DailyActivity.query.filter_by(date=start).one()
+    assert (bumped.id, bumped.doors_knocked, bumped.version) == (first[start][0], 100, 2)
+    assert bumped.sync_seq > max(seq for _, _, seq in first.values())
+
+    csv_text = f"date,doors_knocked,appointments_set\n{start.isoformat()},7,1\n"
+    assert client.post("/activity/import", data=csv_text, content_type="text/csv").status_code == 200
+    db.session.expire_all()
+    assert DailyActivity.query.filter_by(date=start).one().doors_knocked == 7
+
+    days = client.get(f"/activity.json?start={start.isoformat()}").get_json()["days"]
+    assert len(days) == 30 and days[0]["doors_knocked"] == 7
+
+
+def test_invalid_rows_reject_the_whole_request(client):
+    today = date.today()
+    rv = client.post("/activity.json", json={"rows": [
+        {"date": today.isoformat(), "doors_knocked": 5},
+        {"date": today.isoformat(), "doors_knocked": 1},
+        {"date": "tomorrow", "doors_knocked": 1},
+        {"date": (today + timedelta(days=1)).isoformat()},
+        {"date": today.replace(day=1).isoformat(), "doors_knocked": -3},
+    ]})
+    assert rv.status_code == 400
+    assert [e["row"] for e in rv.get_json()["errors"]] == [2, 3, 4, 5]
+    assert DailyActivity.query.count() == 0
+
+
+def test_dashboard_logging_twice_keeps_one_row(client):
+    for doors in (10, 25):
+        client.post("/index", data={"submit_activity": "1", "doors_knocked": doors, "appointments_set": 1})
+    rows = DailyActivity.query.all()
+    assert [(r.date, r.doors_knocked) for r in rows] == [(date.today(), 25)]
+
+
+def test_upsert_rejects_unknown_mode(app_ctx):
+    with pytest.raises(ValueError):
+        activity.upsert_activities(1, [{"date": date.today(), "doors_knocked": 1, "appointments_set": 0}], "merge")
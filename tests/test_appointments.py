@@ -0,0 +1,125 @@
+# File: tests/test_appointments.py
+from datetime import date, datetime, timedelta
+
+from app import db
+from app.models import User, Lead, Appointment
+from app.services import appointments
+
+MONDAY = datetime(2030, 1, 7)
+
+
+def _at(day, hour, minute=0):
+    return MONDAY + timedelta(days=day, hours=hour, minutes=minute)
+
+
+def _rep(name):
+    rep = User(username=name, email=f"{name}@example.com")
+    rep.set_password("pw")
+    db.session.add(rep)
+    db.session.commit()
+    return rep
+
+
+def _lead(rep):
+    lead = Lead(first_name="A", last_name="B", user_id=rep.id, status="New")
+    db.session.add(lead)
+    db.session.commit()
+    return lead
+
+
+def test_interval_index_and_booking_conflicts(app_ctx):
+    index = appointments.IntervalIndex([(1, 10, "a"), (2, 3, "b"), (12, 14, "c")])
+    assert index.overlapping(4, 5) == ["a"] and index.overlapping(3, 12) == ["a"]
+    assert index.overlapping(0, 13) == ["a", "b", "c"] and index.overlapping(10, 12) == []
+    assert list(index.gaps(0, 20)) == [(0, 1), (10, 12), (14, 20)]
+    index.remove("a")
+    index.add(15, 16, "d")
+    assert list(index.gaps(0, 20)) == [(0, 2), (3, 12), (14, 15), (16, 20)]
+
+    rep = _rep("rep")
+    lead = _lead(rep)
+    client = app_ctx.test_client()
+    client.post("/login", data={"username": "rep", "password": "pw"})
+    first = client.post("/appointments", json={"lead_id": lead.id, "starts_at": _at(0, 9).isoformat(), "minutes": 60})
+    assert first.status_code == 201 and db.session.get(Lead, lead.id).status == "Appt"
+
+    # 10:00 is free on the clock but inside the 15-minute travel buffer.
+    clash = client.post("/appointments", json={"lead_id": lead.id, "starts_at": _at(0, 10).isoformat()})
+    assert clash.status_code == 409 and [a["id"] for a in clash.json["conflicts"]] == [first.json["id"]]
+    ok = client.post("/appointments", json={"lead_id": lead.id, "starts_at": _at(0, 10, 15).isoformat()})
+    assert ok.status_code == 201
+    assert client.post("/appointments", json={"lead_id": lead.id, "starts_at": "soon"}).status_code == 400
+
+    assert client.patch(f"/appointments/{ok.json['id']}", json={"starts_at": _at(0, 9, 30).isoformat()}).status_code == 409
+    assert client.delete(f"/appointments/{first.json['id']}").status_code == 204
+    moved = client.patch(f"/appointments/{ok.json['id']}", json={"starts_at": _at(0, 9, 30).isoformat()})
+    assert moved.status_code == 200 and moved.json["ends_at"] == _at(0, 10, 30).isoformat()
+    listed = client.get(f"/appointments?start={_at(0, 0).isoformat()}").json
+    assert [a["id"] for a in listed] == [ok.json["id"]]
+
+
+def test_availability_and_next_open_slot_across_the_team(app_ctx):
+    ann, bob = _rep("ann"), _rep("bob")
+    lead = _lead(ann)
+    appointments.book(lead, ann.id, _at(0, 8), _at(0, 12))
+    appointments.book(lead, bob.id, _at(0, 8), _at(0, 9))
+    db.session.commit()
+
+    free = appointments.availability([ann.id, bob.id], _at(0, 0), _at(1, 0), 60)
+    assert free[ann.id] == [(_at(0, 12, 15), _at(0, 19))]
+    assert free[bob.id] == [(_at(0, 9, 15), _at(0, 19))]
+    assert appointments.next_open_slot([ann.id, bob.id], _at(0, 7), 60) == (bob.id, _at(0, 9, 15))
+    assert appointments.next_open_slot([ann.id], _at(0, 7, 1), 60) == (ann.id, _at(0, 12, 15))
+    assert appointments.next_open_slot([ann.id], _at(5, 18, 30), 60) == (ann.id, _at(7, 8))   # past Sunday
+
+    app_ctx.config["TEAM_MANAGERS"] = ["ann"]
+    client = app_ctx.test_client()
+    client.post("/login", data={"username": "ann", "password": "pw"})
+    body = client.get(f"/appointments/availability?scope=team&start={_at(0, 0).isoformat()}&end={_at(1, 0).isoformat()}").json
+    assert body["free"][str(bob.id)] == [[_at(0, 9, 15).isoformat(), _at(0, 19).isoformat()]]
+    mine = client.get(f"/appointments/next?after={_at(0, 7).isoformat()}").json["slot"]
+    assert mine == {"user_id": ann.id, "starts_at": _at(0, 12, 15).isoformat(), "ends_at": _at(0, 13, 15).isoformat()}
+    assert client.get(f"/appointments/availability?start={_at(0, 0).isoformat()}&end=x").status_code == 400
+
+
+def test_storm_day_reschedule_and_deleted_leads(app_ctx):
+    rep = _rep("rep")
+    lead, other = _lead(rep), _lead(rep)
+    storm = [appointments.book(lead, rep.id, _at(0, h), _at(0, h + 1)) for h in (9, 11, 13)]
+    appointments.book(other, rep.id, _at(1, 8), _at(1, 10))      # Tuesday morning is taken
+    db.session.commit()
+
+    client = app_ctx.test_client()
+    client.post("/login", data={"username": "rep", "password": "pw"})
+    out = client.post("/appointments/reschedule", json={"day": date(2030, 1, 7).isoformat()}).json
+    assert out["unplaced"] == []
+    assert [m["to"] for m in out["moved"]] == [_at(1, h, m).isoformat() for h, m in ((10, 15), (11, 30), (12, 45))]
+    assert [db.session.get(Appointment, a.id).starts_at for a in storm] == [_at(1, 10, 15), _at(1, 11, 30), _at(1, 12, 45)]
+    assert client.post("/appointments/reschedule", json={"day": "monday"}).status_code == 400
+
+    db.session.delete(db.session.get(Lead, lead.id))
+    db.session.commit()
+    assert [a.lead_id for a in Appointment.query.all()] == [other.id]
+
+
+def test_reps_only_see_and_book_their_own_calendar(app_ctx):
+    ann, bob = _rep("ann"), _rep("bob")
+    ann_lead, bob_lead = _lead(ann), _lead(bob)
+    client = app_ctx.test_client()
+    client.post("/login", data={"username": "bob", "password": "pw"})
+    span = f"start={_at(0, 0).isoformat()}&end={_at(1, 0).isoformat()}"
+
+    assert list(client.get(f"/appointments/availability?{span}").json["free"]) == [str(bob.id)]
+    assert client.get(f"/appointments/availability?scope=team&{span}").status_code == 403
+    assert client.get("/appointments/next?scope=team").status_code == 403
+    assert client.post("/appointments/reschedule", json={"day": "2030-01-07", "scope": "team"}).status_code == 403
+    book = {"starts_at": _at(0, 9).isoformat()}
+    assert client.post("/appointments", json={**book, "lead_id": bob_lead.id, "user_id": ann.id}).status_code == 403
+    assert client.post("/appointments", json={**book, "lead_id": ann_lead.id}).status_code == 404
+    assert client.post("/appointments", json={**book, "lead_id": bob_lead.id, "user_id": "1"}).status_code == 400
+
+    # A manager books for a rep, but only on that rep's leads.
+    app_ctx.config["TEAM_MANAGERS"] = ["bob"]
+    assert client.post("/appointments", json={**book, "lead_id": bob_lead.id, "user_id": ann.id}).status_code == 404
+    assert client.post("/appointments", json={**book, "lead_id": ann_lead.id, "user_id": ann.id}).status_code == 201
+    assert Appointment.query.one().user_id == ann.id
@@ -0,0 +1,155 @@
+# File: tests/test_archive.py
+from datetime import datetime, timedelta
+
+from app import db
+from app.models import User, Lead, Deal, Tombstone, ArchivedLead, ArchivedDeal, Appointment, Attachment, Blob
+from app.services import archive, attachments, commissions
+from app.services.metrics import dashboard_summaries, funnel_totals
+
+OLD = datetime.utcnow() - timedelta(days=500)
+
+
+def _lead(user, name, status, updated_at, deals=()):
+    lead = Lead(first_name=name, last_name="Roof", email=f"{name.lower()}@example.com",
+                status=status, user_id=user.id)
+    for st, price in deals:
+        lead.deals.append(Deal(status=st, contract_price=price, commission_rate=10.0))
+    db.session.add(lead)
+    db.session.flush()
+    # Backdate after the flush so onupdate doesn't overwrite it.
+    Lead.query.filter_by(id=lead.id).update({"updated_at": updated_at})
+    Deal.query.filter_by(lead_id=lead.id).update({"date_updated": updated_at})
+    return lead
+
+
+def test_archive_moves_finished_and_stale_leads_and_keeps_lifetime_totals(app_ctx):
+    user = User(username="u", email="u@example.com")
+    db.session.add(user)
+    db.session.flush()
+    done = _lead(user, "Done", "Completed", OLD, [("Completed", 20000)])
+    dead = _lead(user, "Dead", "New", OLD)
+    _lead(user, "Fresh", "New", datetime.utcnow())
+    _lead(user, "Waiting", "Signed", OLD, [("Signed", 15000)])             # money still pending
+    _lead(user, "Partial", "Completed", OLD, [("Completed", 1), ("Signed", 1)])
+    db.session.commit()
+    done_id, dead_id = done.id, dead.id
+    before = funnel_totals([user.id])[user.id]
+
+    out = archive.archive_leads(batch_size=1)
+    assert (out["leads"], out["deals"], out["batches"]) == (2, 1, 2)
+    assert sorted(l.first_name for l in Lead.query) == ["Fresh", "Partial", "Waiting"]
+    assert {a.first_name for a in ArchivedLead.query} == {"Done", "Dead"}
+    assert ArchivedDeal.query.one().lead.original_id == done_id
+    assert {(t.entity, t.entity_id) for t in Tombstone.query} >= {("lead", done_id), ("lead", dead_id)}
+
+    summary = archive.summaries([user.id])[user.id]
+    assert summary["leads"] == 2 and summary["deals_completed"] == 1
+    assert summary["completed_commission"] == 600.0      # 10% of the 30% default margin on $20k
+    assert funnel_totals([user.id])[user.id] == before
+
+    assert [a.first_name for a in archive.search(user.id, "done@")] == ["Done"]
+    assert archive.search(user.id + 1, "") == []
+
+
+def test_restore_brings_back_lead_with_deals_and_undoes_summary(app_ctx):
+    user = User(username="u", email="u@example.com")
+    db.session.add(user)
+    db.session.flush()
+    done = _lead(user, "Done", "Completed", OLD, [("Completed", 20000)])
+    db.session.commit()
+    lead_id = done.id
+    archive.archive_leads()
+    archived_id = ArchivedLead.query.one().id
+
+    assert archive.restore_lead(user.id + 1, archived_id) is None
+    restored = archive.restore_lead(user.id, archived_id)
+    assert restored.id == lead_id and [d.contract_price for d in restored.deals] == [20000]
+    assert restored.updated_at > OLD
+    assert ArchivedLead.query.count() == 0 and ArchivedDeal.query.count() == 0
+    assert archive.summaries([user.id])[user.id]["deals_completed"] == 0
+    assert archive.archive_leads()["leads"] == 0      # freshly touched
+
+
+def test_archiving_keeps_plan_pay_on_the_dashboard_for_rep_and_split_payee(app_ctx):
+    user, boss = User(username="u", email="u@example.com"), User(username="b", email="b@example.com")
+    db.session.add_all([user, boss])
+    db.session.flush()
+    commissions.save_plan(user.id, {"base": "revenue", "rate": 12, "splits": [{"to": boss.id, "share": 0.25}]})
+    _lead(user, "Done", "Completed", OLD, [("Completed", 20000)])
+    db.session.commit()
+
+    def earned():
+        return {u: s["earned_commission"] for u, s in dashboard_summaries([user.id, boss.id]).items()}
+
+    before = earned()
+    assert before == {user.id: 1800.0, boss.id: 600.0}
+    archive.archive_leads()
+    assert archive.summaries([user.id])[user.id]["completed_commission"] == 1800.0
+    assert earned() == before
+    archive.restore_lead(user.id, ArchivedLead.query.one().id)
+    assert earned() == before
+    assert archive.summaries([user.id, boss.id]) == {
+        u: dict.fromkeys(archive.SUMMARY_FIELDS, 0) for u in (user.id, boss.id)}
+
+
+def test_files_and_visits_follow_the_lead_into_cold_storage_and_back(app_ctx):
+    user, other = User(username="u", email="u@example.com"), User(username="o", email="o@example.com")
+    db.session.add_all([user, other])
+    db.session.flush()
+    done = _lead(user, "Done", "Completed", OLD, [("Completed", 20000)])
+    blob = Blob(sha256="0" * 64, size=1)
+    db.session.add_all([
+        Attachment(filename="roof.jpg", lead_id=done.id, blob=blob, user_id=user.id),
+        Attachment(filename="contract.pdf", deal_id=done.deals[0].id, blob=blob, user_id=user.id),
+        Appointment(lead_id=done.id, user_id=user.id, starts_at=OLD, ends_at=OLD + timedelta(hours=1)),
+    ])
+    db.session.commit()
+    lead_id, deal_id = done.id, done.deals[0].id
+    archive.archive_leads()
+
+    # SQLite hands the freed ids to the next rows; another rep's lead must not inherit the files.
+    reuse = Lead(id=lead_id, first_name="New", last_name="Lead", user_id=other.id)
+    reuse.deals.append(Deal(id=deal_id, status="Appt"))
+    db.session.add(reuse)
+    db.session.commit()
+    assert attachments.listing(lead_id=lead_id) == [] and attachments.listing(deal_id=deal_id) == []
+    assert Appointment.query.filter_by(lead_id=lead_id).count() == 0
+
+    restored = archive.restore_lead(user.id, ArchivedLead.query.one().id)
+    assert restored.id != lead_id
+    assert [a.filename for a in attachments.listing(lead_id=restored.id)] == ["roof.jpg"]
+    assert [a.filename for a in attachments.listing(deal_id=restored.deals[0].id)] == ["contract.pdf"]
+    assert Appointment.query.one().lead_id == restored.id
+    assert Attachment.query.filter(Attachment.archived_lead_id.isnot(None)
+                                   | Attachment.archived_deal_id.isnot(None)).count() == 0
+
+
+def test_a_reused_lead_id_can_be_archived_again_and_each_restores_its_own_files(app_ctx):
+    user = User(username="u", email="u@example.com")
+    db.session.add(user)
+    db.session.flush()
+    blob = Blob(sha256="0" * 64, size=1)
+    first = _lead(user, "First", "Completed", OLD, [("Completed", 1000)])
+    db.session.add(Attachment(filename="first.jpg", lead_id=first.id, blob=blob, user_id=user.id))
+    db.session.commit()
+    lead_id, deal_id = first.id, first.deals[0].id
+    archive.archive_leads()
+    db.session.expunge(first)   # archiving deletes in Core; drop the stale object
+
+    second = _lead(user, "Second", "Completed", OLD, [("Completed", 2000)])
+    assert (second.id, second.deals[0].id) == (lead_id, deal_id)     # SQLite reused both ids
+    db.session.add(Attachment(filename="second.jpg", deal_id=deal_id, blob=blob, user_id=user.id))
+    db.session.commit()
+    assert archive.archive_leads()["leads"] == 1
+
+    rows = ArchivedLead.query.order_by(ArchivedLead.id).all()
+    assert [(a.first_name, a.original_id) for a in rows] == [("First", lead_id), ("Second", lead_id)]
+    restored = archive.restore_lead(user.id, rows[1].id)
+    assert restored.id == lead_id and [d.contract_price for d in restored.deals] == [2000]
+    assert attachments.listing(lead_id=lead_id) == []
+    assert [a.filename for a in attachments.listing(deal_id=restored.deals[0].id)] == ["second.jpg"]
+
+    restored = archive.restore_lead(user.id, rows[0].id)
+    assert restored.id != lead_id and [d.contract_price for d in restored.deals] == [1000]
+    assert [a.filename for a in attachments.listing(lead_id=restored.id)] == ["first.jpg"]
+    assert attachments.listing(deal_id=restored.deals[0].id) == []
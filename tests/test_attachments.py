@@ -0,0 +1,160 @@
+# File: tests/test_attachments.py
+import os
+import threading
+
+from app import db
+from app.models import User, Lead, Deal, Attachment, Blob, Upload
+from app.services import attachments
+
+PHOTO = bytes(range(256)) * 1000   # 256 kB
+
+
+def _setup(app, tmp_path):
+    app.config.update(ATTACHMENT_FOLDER=str(tmp_path), ATTACHMENT_COPY_BUFFER=4096,
+                      ATTACHMENT_CHUNK_MAX=100_000, THUMBNAILER="fake")
+    user = User(username="rep", email="rep@example.com")
+    user.set_password("pw")
+    db.session.add(user)
+    db.session.flush()
+    lead = Lead(first_name="A", last_name="B", user_id=user.id)
+    lead.deals.append(Deal(status="Signed", contract_price=1000))
+    db.session.add(lead)
+    db.session.commit()
+    client = app.test_client()
+    client.post("/login", data={"username": "rep", "password": "pw"})
+    return client, lead
+
+
+def _upload(client, data, chunk=100_000, **target):
+    rv = client.post("/attachments/uploads", json={"filename": "roof.jpg", "size": len(data),
+                                                   "content_type": "image/jpeg", **target})
+    assert rv.status_code == 201
+    url = rv.json["upload_url"]
+    for at in range(0, len(data), chunk):
+        rv = client.patch(url, data=data[at:at + chunk], headers={"Upload-Offset": str(at)})
+    return url, rv
+
+
+def test_chunked_resumable_upload_dedupes_by_content(app_ctx, tmp_path):
+    client, lead = _setup(app_ctx, tmp_path)
+    url = client.post("/attachments/uploads", json={"filename": "../../roof.jpg", "size": len(PHOTO),
+                                                    "content_type": "image/jpeg", "lead_id": lead.id}).json["upload_url"]
+    assert client.patch(url, data=PHOTO[:50_000], headers={"Upload-Offset": "0"}).headers["Upload-Offset"] == "50000"
+    # A retried chunk at a stale offset is refused with the offset to resume from.
+    stale = client.patch(url, data=PHOTO[:50_000], headers={"Upload-Offset": "0"})
+    assert stale.status_code == 409 and stale.json["offset"] == 50_000
+    assert client.head(url).headers["Upload-Offset"] == "50000"
+    assert client.patch(url, data=PHOTO[50_000:], headers={"Upload-Offset": "50000"}).status_code == 413  # > chunk max
+    for at in range(50_000, len(PHOTO), 100_000):
+        done = client.patch(url, data=PHOTO[at:at + 100_000], headers={"Upload-Offset": str(at)})
+    assert done.status_code == 201 and done.json["filename"] == "roof.jpg"
+
+    _, again = _upload(client, PHOTO, deal_id=lead.deals[0].id)
+    assert again.status_code == 201
+    assert Attachment.query.count() == 2 and Blob.query.count() == 1 and Upload.query.count() == 0
+    blob = Blob.query.one()
+    assert os.path.getsize(attachments.blob_path(blob.sha256)) == len(PHOTO)
+    assert os.listdir(tmp_path / "default" / "uploads") == []
+
+    listed = client.get(f"/attachments?lead_id={lead.id}").json
+    assert [a["id"] for a in listed] == [done.json["id"]]
+    assert client.get("/attachments?lead_id=999").status_code == 404
+
+
+def test_concurrent_uploads_of_the_same_file_share_one_blob(app_ctx, tmp_path):
+    client, lead = _setup(app_ctx, tmp_path)
+    uploads = []
+    for _ in range(2):
+        upload_id = client.post("/attachments/uploads", json={"filename": "roof.jpg", "size": len(PHOTO),
+                                                              "content_type": "image/jpeg", "lead_id": lead.id}).json["upload_id"]
+        upload = db.session.get(Upload, upload_id)
+        with open(attachments._part_path(upload.id), "wb") as f:
+            f.write(PHOTO)
+        uploads.append(upload)
+    # Neither sees the other's blob before inserting its own, as with two workers.
+    with db.session.no_autoflush:
+        first, second = (attachments.finish_upload(u) for u in uploads)
+    db.session.commit()
+    assert Blob.query.count() == 1 and first.blob_id == second.blob_id
+    assert os.path.getsize(attachments.blob_path(Blob.query.one().sha256)) == len(PHOTO)
+
+
+def test_range_requests_and_immutable_caching(app_ctx, tmp_path):
+    client, lead = _setup(app_ctx, tmp_path)
+    _, done = _upload(client, PHOTO, lead_id=lead.id)
+    url = f"/attachments/{done.json['id']}"
+
+    full = client.get(url)
+    assert full.status_code == 200 and full.data == PHOTO
+    assert "immutable" in full.headers["Cache-Control"] and full.headers["Accept-Ranges"] == "bytes"
+    part = client.get(url, headers={"Range": "bytes=1000-1999"})
+    assert part.status_code == 206 and part.data == PHOTO[1000:2000]
+    assert part.headers["Content-Range"] == f"bytes 1000-1999/{len(PHOTO)}"
+    assert client.get(url, headers={"If-None-Match": full.headers["ETag"]}).status_code == 304
+
+    app_ctx.config["ATTACHMENT_ACCEL_PREFIX"] = "/_files"
+    accel = client.get(url)
+    assert accel.headers["X-Accel-Redirect"] == f"/_files/default/blobs/{done.json['sha256'][:2]}/{done.json['sha256']}"
+    assert accel.data == b""
+
+
+calls = []
+gate = threading.Event()
+
+
+def fake_thumbnail(src, dst, size):
+    gate.wait(5)
+    calls.append(size)
+    with open(dst, "wb") as fh:
+        fh.write(b"thumb-%d" % size)
+
+
+def test_thumbnails_are_made_once_in_the_pool_and_cached(app_ctx, tmp_path, monkeypatch):
+    monkeypatch.setitem(attachments.THUMBNAILERS, "fake", fake_thumbnail)
+    client, lead = _setup(app_ctx, tmp_path)
+    _, done = _upload(client, PHOTO, lead_id=lead.id)
+    blob = Blob.query.one()
+    calls.clear()
+    gate.clear()
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(_thumb(app_ctx, blob))) for _ in range(3)]
+    for t in threads:
+        t.start()
+    gate.set()
+    for t in threads:
+        t.join()
+    assert calls == [256] and len(set(results)) == 1
+
+    rv = client.get(f"/attachments/{done.json['id']}/thumb")
+    assert rv.status_code == 200 and rv.data == b"thumb-256" and calls == [256]
+    assert client.get(f"/attachments/{done.json['id']}/thumb?size=99").status_code == 400
+
+
+def _thumb(app, blob):
+    with app.app_context():
+        return attachments.thumbnail(blob, 256)
+
+
+def test_deleting_a_lead_drops_attachments_and_prune_removes_files(app_ctx, tmp_path):
+    client, lead = _setup(app_ctx, tmp_path)
+    _upload(client, PHOTO, lead_id=lead.id)
+    _upload(client, PHOTO[::-1], deal_id=lead.deals[0].id)
+    client.post("/attachments/uploads", json={"filename": "x.jpg", "size": 10, "lead_id": lead.id})
+    shas = [b.sha256 for b in Blob.query]
+
+    client.post(f"/lead/delete/{lead.id}")
+    assert Attachment.query.count() == 0
+    app_ctx.config["ATTACHMENT_UPLOAD_TTL"] = -1
+    assert attachments.prune() == {"uploads": 1, "blobs": 2}
+    assert Blob.query.count() == 0 and not any(os.path.exists(attachments.blob_path(s)) for s in shas)
+
+
+def test_an_upload_for_a_lead_deleted_midway_is_dropped(app_ctx, tmp_path):
+    client, lead = _setup(app_ctx, tmp_path)
+    url = client.post("/attachments/uploads", json={"filename": "roof.jpg", "size": 10,
+                                                    "lead_id": lead.id}).json["upload_url"]
+    client.post(f"/lead/delete/{lead.id}")
+    rv = client.patch(url, data=b"0123456789", headers={"Upload-Offset": "0"})
+    assert rv.status_code == 404
+    assert Attachment.query.count() == 0 and Upload.query.count() == 0
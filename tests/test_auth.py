@@ -0,0 +1,73 @@
+# File: tests/test_auth.py
+from sqlalchemy import event
+from werkzeug.security import generate_password_hash
+
+from app import db, passwords
+from app.models import User
+
+
+def _register(client, username="rep", email="rep@example.com"):
+    return client.post("/register", data={"username": username, "email": email, "password": "pw", "password2": "pw"})
+
+
+def test_login_upgrades_old_hashes(app_ctx):
+    app_ctx.config["PASSWORD_HASH_METHOD"] = "pbkdf2:sha256:1000"
+    rep = User(username="rep", email="rep@example.com", password_hash=generate_password_hash("pw", "pbkdf2:sha256:2000"))
+    db.session.add(rep)
+    db.session.commit()
+    client = app_ctx.test_client()
+
+    assert client.post("/login", data={"username": "rep", "password": "nope"}).location.endswith("/login")
+    assert client.post("/login", data={"username": "ghost", "password": "pw"}).location.endswith("/login")
+    assert db.session.get(User, rep.id).password_hash.startswith("pbkdf2:sha256:2000$")   # no upgrade on a miss
+    assert client.post("/login", data={"username": "rep", "password": "pw"}).location.endswith("/index")
+    db.session.expire_all()
+    assert db.session.get(User, rep.id).password_hash.startswith("pbkdf2:sha256:1000$")
+    assert db.session.get(User, rep.id).check_password("pw")
+
+
+def test_registration_checks_uniqueness_in_one_query(app_ctx):
+    client = app_ctx.test_client()
+    _register(client)
+    db.session.remove()
+
+    reads = []
+    listen = lambda conn, cursor, stmt, *a: reads.append(stmt) if stmt.lstrip().startswith("SELECT") else None  # noqa: E731
+    event.listen(db.engine, "before_cursor_execute", listen)
+    try:
+        page = _register(client, "rep", "REP@example.com").get_data(as_text=True)
+    finally:
+        event.remove(db.engine, "before_cursor_execute", listen)
+    assert len(reads) == 1
+    assert "Please use a different username." in page and "different email" not in page
+    assert "Please use a different email address." in _register(client, "other").get_data(as_text=True)
+    assert User.query.count() == 1
+
+
+def test_a_full_hash_pool_returns_503(app_ctx):
+    app_ctx.config.update(PASSWORD_HASH_WORKERS=1, PASSWORD_HASH_QUEUE=0, PASSWORD_HASH_WAIT=0.01)
+    client = app_ctx.test_client()
+    pool = passwords._pool()
+    pool.slots.acquire()                      # another login is hashing
+    try:
+        res = client.post("/login", data={"username": "rep", "password": "pw"})
+        assert res.status_code == 503 and res.headers["Retry-After"] == "1"
+    finally:
+        pool.slots.release()
+    assert _register(client).status_code == 302
+
+
+def test_a_busy_pool_during_the_rehash_still_signs_in(app_ctx, monkeypatch):
+    app_ctx.config["PASSWORD_HASH_METHOD"] = "pbkdf2:sha256:1000"
+    old = generate_password_hash("pw", "pbkdf2:sha256:2000")
+    db.session.add(User(username="rep", email="rep@example.com", password_hash=old))
+    db.session.commit()
+
+    def busy(password):
+        raise passwords.HashPoolBusy("too many logins at once, try again")
+
+    monkeypatch.setattr(passwords, "hash_password", busy)
+    res = app_ctx.test_client().post("/login", data={"username": "rep", "password": "pw"})
+    assert res.status_code == 302 and res.location.endswith("/index")
+    db.session.expire_all()
+    assert User.query.one().password_hash == old             # upgraded on a later sign-in
@@ -0,0 +1,108 @@
+# File: tests/test_cache.py
+import pytest
+from flask import g
+from sqlalchemy import event
+
+from app import create_app, db
+from app.cache import Cache, RedisTier, SqliteTier, StubRedis, cache
+from app.models import User, Lead, Deal
+from app.services import metrics
+from config import Config
+
+
+@pytest.fixture(params=["sqlite", "redis"])
+def tier(request, tmp_path):
+    if request.param == "sqlite":
+        return SqliteTier({"CACHE_SQLITE_PATH": str(tmp_path / "cache.db")})
+    return RedisTier({}, client=StubRedis())
+
+
+def test_workers_share_entries_and_versions(app_ctx, tier):
+    a, b = Cache(tier, stats_every=1), Cache(tier, stats_every=1)   # two workers' views of one tier
+    calls = []
+
+    def compute():
+        calls.append(1)
+        return {"n": len(calls)}
+
+    assert a.cached("dashboard:1", compute, tags=["rep:1"]) == {"n": 1}
+    assert b.cached("dashboard:1", compute, tags=["rep:1"]) == {"n": 1}     # from the shared tier
+    assert a.cached("dashboard:1", compute, tags=["rep:1"]) == {"n": 1}     # from a's memory
+    assert len(calls) == 1
+
+    b.bump([b._tag("rep:1")])                                                # a write on worker b
+    assert a.cached("dashboard:1", compute, tags=["rep:1"]) == {"n": 2}
+    assert b.cached("dashboard:1", compute, tags=["rep:1"]) == {"n": 2}
+    assert a.get("dashboard:1", tags=["rep:1", "plans"]) is None            # the tags are part of the key
+    assert a.stats()["dashboard"] == {"memory": 1, "shared": 2, "miss": 3, "hit_rate": 0.5}
+
+
+def _shared_apps(tmp_path):
+    cfg = type("CacheConfig", (Config,), dict(
+        SQLALCHEMY_DATABASE_URI=f"sqlite:///{tmp_path / 'app.db'}", TESTING=True, WTF_CSRF_ENABLED=False,
+        CACHE_BACKEND="sqlite", CACHE_SQLITE_PATH=str(tmp_path / "cache.db")))
+    return create_app(cfg), create_app(cfg)
+
+
+def test_a_write_in_one_worker_reaches_the_other(tmp_path):
+    one, two = _shared_apps(tmp_path)
+    with one.app_context():
+        db.create_all()
+        rep = User(username="rep", email="rep@example.com")
+        db.session.add(rep)
+        db.session.commit()
+        lead = Lead(first_name="A", last_name="B", user_id=rep.id)
+        lead.deals.append(Deal(status="Signed", contract_price=10000, commission_rate=10, commission_base="revenue"))
+        db.session.add(lead)
+        db.session.commit()
+        rep_id, deal_id = rep.id, lead.deals[0].id
+        assert metrics.dashboard_summary(rep_id)["pipeline_value"] == 10000
+    with two.app_context():
+        assert metrics.dashboard_summary(rep_id)["pipeline_value"] == 10000
+        assert cache().stats()["dashboard"]["shared"] == 1
+    with one.app_context():
+        db.session.get(Deal, deal_id).contract_price = 12000
+        db.session.commit()
+        db.session.remove()
+    with two.app_context():
+        assert metrics.dashboard_summary(rep_id)["pipeline_value"] == 12000
+        db.session.remove()
+    for app in (one, two):
+        with app.app_context():
+            db.engine.dispose()
+
+
+def test_load_user_comes_from_the_cache(app_ctx):
+    rep = User(username="rep", email="rep@example.com")
+    rep.set_password("pw")
+    db.session.add(rep)
+    db.session.commit()
+    client = app_ctx.test_client()
+    client.post("/login", data={"username": "rep", "password": "pw"})
+    g.pop("_login_user", None)
+    db.session.remove()
+    client.get("/analytics/forecast.json")       # the first request per worker reads and caches the user
+    db.session.remove()
+
+    reads = []
+    listen = lambda conn, cursor, stmt, *a: reads.append(stmt) if 'FROM user' in stmt else None  # noqa: E731
+    event.listen(db.engine, "before_cursor_execute", listen)
+    try:
+        for _ in range(2):
+            g.pop("_login_user", None)      # the test's app context outlives requests; load per request
+            assert client.get("/analytics/forecast.json").status_code == 200
+            db.session.remove()
+    finally:
+        event.remove(db.engine, "before_cursor_execute", listen)
+    assert reads == []
+    assert "password_hash" not in cache().get(f"user:{rep.id}:session", tags=[f"user:{rep.id}"])
+
+    user = db.session.get(User, rep.id)
+    user.commission_rate = 55.0
+    db.session.commit()
+    db.session.remove()
+    from app.models import load_user
+    assert load_user(str(rep.id)).commission_rate == 55.0
+    db.session.remove()
+    assert load_user(str(rep.id)).check_password("pw")         # the hash is loaded on demand
+    assert load_user("999") is None
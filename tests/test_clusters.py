@@ -0,0 +1,62 @@
+# File: tests/test_clusters.py
+from app import db
+from app.models import User, Lead, Deal
+from app.services import clusters, geohash
+
+
+def test_geohash_encode_bounds_and_cover():
+    assert geohash.encode(57.64911, 10.40744, 11) == "u4pruydqqvj"
+    s, w, n, e = geohash.bounds(geohash.encode(40.1, -74.9, 4))
+    assert s <= 40.1 <= n and w <= -74.9 <= e
+    tiles = geohash.cover(40.0, -75.0, 40.2, -74.7, 4)
+    assert len(tiles) == geohash.cover_count(40.0, -75.0, 40.2, -74.7, 4)
+    assert geohash.encode(40.1, -74.9, 4) in tiles
+    assert clusters.precision_for_zoom(0) == 1 and clusters.precision_for_zoom(22) == geohash.PRECISION
+
+
+def _lead(user, lat, lng, status="New", **kw):
+    return Lead(first_name="L", last_name="X", user_id=user.id, status=status, latitude=lat, longitude=lng,
+                geohash=geohash.encode(lat, lng), **kw)
+
+
+def test_tile_aggregates_are_cached_until_a_write(app_ctx):
+    a, b = User(username="a", email="a@x"), User(username="b", email="b@x")
+    a.set_password("pw")
+    db.session.add_all([a, b])
+    db.session.commit()
+    signed = _lead(a, 40.001, -75.001, "Signed")
+    signed.deals.append(Deal(status="Signed", contract_price=15000))
+    db.session.add_all([signed, _lead(a, 40.002, -75.002), _lead(b, 40.003, -75.001, "Appt"),
+                        _lead(b, 41.5, -73.0)])
+    db.session.commit()
+
+    out = clusters.viewport_clusters(39.95, -75.05, 40.05, -74.95, zoom=12)
+    assert sum(c["count"] for c in out["clusters"]) == 3
+    assert sum(c["pipeline"] for c in out["clusters"]) == 15000
+    mix = {}
+    for c in out["clusters"]:
+        for status, n in c["status"].items():
+            mix[status] = mix.get(status, 0) + n
+    assert mix == {"Signed": 1, "New": 1, "Appt": 1}
+
+    mine = clusters.viewport_clusters(39.95, -75.05, 40.05, -74.95, zoom=12, user_id=a.id)
+    assert sum(c["count"] for c in mine["clusters"]) == 2
+
+    # Cached: a core write doesn't show until invalidated; an ORM write invalidates.
+    db.session.execute(Lead.__table__.delete().where(Lead.__table__.c.status == "Appt"))
+    again = clusters.viewport_clusters(39.95, -75.05, 40.05, -74.95, zoom=12)
+    assert sum(c["count"] for c in again["clusters"]) == 3
+    db.session.add(_lead(a, 40.004, -75.003))
+    db.session.commit()
+    fresh = clusters.viewport_clusters(39.95, -75.05, 40.05, -74.95, zoom=12)
+    assert sum(c["count"] for c in fresh["clusters"]) == 3
+
+    client = app_ctx.test_client()
+    client.post("/login", data={"username": "a", "password": "pw"})
+    body = client.get("/map/clusters.json?bbox=39,-76,42,-72&zoom=6").get_json()
+    assert body["scope"] == "mine" and sum(c["count"] for c in body["clusters"]) == 3   # none of b's leads
+    assert client.get("/map/clusters.json?bbox=39,-76,42,-72&zoom=6&scope=team").status_code == 403
+    app_ctx.config["TEAM_MANAGERS"] = ["a"]
+    body = client.get("/map/clusters.json?bbox=39,-76,42,-72&zoom=6&scope=team").get_json()
+    assert sum(c["count"] for c in body["clusters"]) == 4
+    assert client.get("/map/clusters.json?bbox=1,2,3").status_code == 400
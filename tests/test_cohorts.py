@@ -0,0 +1,52 @@
+# File: tests/test_cohorts.py
+from datetime import date, datetime, timedelta
+
+from app import db
+from app.models import Lead, Deal, User, StatusTransition, CohortSnapshot
+from app.services.cohorts import cohort_report
+
+
+def _lead(user, created, reached=(), revenue=None):
+    lead = Lead(first_name="L", last_name="X", user_id=user.id, date_created=created)
+    if revenue:
+        lead.deals.append(Deal(status="Completed", contract_price=revenue))
+    db.session.add(lead)
+    db.session.flush()
+    for status, days in reached:
+        db.session.add(StatusTransition(entity="lead", entity_id=lead.id, lead_id=lead.id, user_id=user.id,
+                                        from_status="New", to_status=status,
+                                        at=created + timedelta(days=days)))
+    return lead
+
+
+def test_weekly_cohorts_curves_revenue_and_freezing(app_ctx):
+    u = User(username="rep", email="rep@example.com")
+    u.set_password("x")
+    db.session.add(u)
+    db.session.commit()
+
+    old_week = datetime(2025, 1, 6, 10)     # a Monday, long closed
+    new_week = datetime(2026, 10, 12, 10)   # recent, still open
+    _lead(u, old_week, reached=[("Appt", 2), ("Signed", 9), ("Completed", 30)], revenue=20000)
+    _lead(u, old_week + timedelta(days=3), reached=[("Appt", 1)])
+    _lead(u, new_week)
+    db.session.commit()
+
+    today = date(2026, 10, 19)
+    report = cohort_report(u.id, "week", periods=6, today=today)
+    first, last = report["cohorts"][0], report["cohorts"][-1]
+    assert first["start"] == "2025-01-06" and first["closed"]
+    assert first["leads"] == 2
+    assert first["reached"] == {"Appt": 2, "Signed": 1, "Completed": 1}
+    assert first["curves"]["Appt"][0] == 1.0          # both within the first week
+    assert first["curves"]["Signed"][:3] == [0.0, 0.5, 0.5]
+    assert first["revenue_per_lead"] == 10000.0
+    assert last["start"] == "2026-10-12" and not last["closed"]
+
+    assert CohortSnapshot.query.count() == 1
+
+    # A closed cohort is served from the cache even if its rows change later.
+    _lead(u, old_week + timedelta(days=1))
+    db.session.commit()
+    again = cohort_report(u.id, "week", periods=6, today=today)
+    assert again["cohorts"][0]["leads"] == 2
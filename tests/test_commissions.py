@@ -0,0 +1,95 @@
+# File: tests/test_commissions.py
+import math
+from datetime import datetime
+
+import pytest
+
+from app import db
+from app.models import User, Lead, Deal
+from app.services import commissions, metrics
+from app.services.projector import Ratios, projector_metrics
+
+
+def _deals(*rows):
+    deals = commissions.Deals()
+    for i, (status, price, updated) in enumerate(rows):
+        deals.append(i, status, price, 10.0, "profit", 30.0, updated)
+    return deals
+
+
+def test_tiers_splits_overrides_and_bonuses():
+    plan = commissions.compile_plan({
+        "base": "revenue",
+        "tiers": [{"min": 20000, "rate": 10}, {"min": 0, "rate": 8}],
+        "splits": [{"to": 7, "share": 0.25}],
+        "overrides": [{"to": 2, "rate": 1, "of": "revenue"}],
+        "bonuses": [{"period": "month", "metric": "rcv", "threshold": 30000, "amount": 500, "rate": 2}],
+    })
+    deals = _deals(("Completed", 10000, datetime(2024, 3, 5)),
+                   ("Completed", 25000, datetime(2024, 3, 20)),
+                   ("Signed", 40000, None),
+                   ("Completed", 5000, datetime(2024, 4, 2)))
+    ev = plan.evaluate(deals, owner=1)
+    assert ev.gross == [800.0, 2500.0, 4000.0, 400.0]
+    assert ev.rep == [600.0, 1875.0, 3000.0, 300.0]
+    assert [(to, i, amount) for to, i, amount, kind in ev.others if kind == "split"] == \
+        [(7, 0, 200.0), (7, 1, 625.0), (7, 2, 1000.0), (7, 3, 100.0)]
+    assert sum(a for to, _, a, kind in ev.others if kind == "override") == 800.0
+    assert ev.bonuses == [("2024-03", 500 + 5000 * 0.02)]          # April stays under the threshold
+
+    assert plan.evaluate(deals, owner=2).others[-1][3] == "split"  # no override on the manager's own deals
+
+
+def test_default_plan_matches_the_projector():
+    ratios = Ratios(doors_per_appt=20, appts_per_deal=3, avg_rcv_per_completed_deal=15000)
+    for pct, margin, base in ((40.0, 30.0, "profit"), (10.0, 0.0, "revenue")):
+        flat = projector_metrics(100000, 250, ratios, pct, margin, base)
+        planned = projector_metrics(100000, 250, ratios, pct, margin, base, plan=commissions.DEFAULT_PLAN)
+        assert math.isclose(flat["eff_rate"], planned["eff_rate"])
+
+    tiered = commissions.compile_plan({"base": "revenue", "tiers": [{"min": 0, "rate": 5}, {"min": 10000, "rate": 9}]})
+    assert math.isclose(projector_metrics(100000, 250, ratios, 40, 30, "profit", plan=tiered)["eff_rate"], 0.09)
+
+
+@pytest.mark.parametrize("rules", [
+    {"base": "gross"}, {"tiers": [{"min": 0}]}, {"splits": [{"to": 2, "share": 0.7}, {"to": 3, "share": 0.4}]},
+    {"overrides": [{"to": "boss", "rate": 1}]}, {"bonuses": [{"metric": "deals", "threshold": 3, "rate": 1}]},
+    "[1, 2]", "{not json",
+])
+def test_malformed_rules_are_rejected(rules):
+    with pytest.raises(ValueError):
+        commissions.compile_plan(rules)
+
+
+def test_dashboard_uses_the_plan_and_recompiles_per_version(app_ctx):
+    rep, boss = User(username="rep", email="rep@example.com"), User(username="boss", email="boss@example.com")
+    db.session.add_all([rep, boss])
+    db.session.flush()
+    lead = Lead(first_name="A", last_name="B", user_id=rep.id)
+    lead.deals.append(Deal(status="Completed", contract_price=20000, commission_rate=10, commission_base="revenue"))
+    lead.deals.append(Deal(status="Signed", contract_price=10000, commission_rate=10, commission_base="revenue"))
+    db.session.add(lead)
+    db.session.commit()
+
+    before = metrics.dashboard_summary(rep.id)
+    assert (before["earned_commission"], before["potential_commission"]) == (2000.0, 1000.0)
+
+    company = commissions.save_plan(None, {"overrides": [{"to": boss.id, "rate": 1, "of": "revenue"}]})
+    db.session.commit()
+    first = commissions.plan_for(rep.id)
+    assert first is commissions.plan_for(rep.id)                    # compiled once per version
+    assert metrics.dashboard_summary(boss.id)["earned_commission"] == 200.0
+    assert metrics.dashboard_summary(boss.id)["potential_commission"] == 100.0
+
+    commissions.save_plan(rep.id, {"base": "revenue", "rate": 12, "splits": [{"to": boss.id, "share": 0.5}]},
+                          name="closer")
+    db.session.commit()
+    mine = metrics.dashboard_summary(rep.id)
+    assert (mine["earned_commission"], mine["potential_commission"]) == (1200.0, 600.0)
+    assert metrics.dashboard_summary(boss.id)["earned_commission"] == 1200.0   # split only: rep has own plan
+
+    commissions.save_plan(rep.id, {"base": "revenue", "rate": 15})
+    db.session.commit()
+    assert commissions.plan_for(rep.id).version == 2
+    assert metrics.dashboard_summary(rep.id)["earned_commission"] == 3000.0
+    assert company.version == 1
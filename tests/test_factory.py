@@ -0,0 +1,27 @@
+# File: tests/test_factory.py
+from app import create_app, db
+from app.models import User
+from config import Config
+
+
+def _config(**overrides):
+    return type("IsolatedConfig", (Config,), dict(SQLALCHEMY_DATABASE_URI="sqlite://", TESTING=True, **overrides))
+
+
+def test_two_apps_keep_separate_config_and_data():
+    a = create_app(_config())
+    b = create_app(_config(API_ENABLED=False))
+    for app, name in ((a, "alice"), (b, "bob")):
+        with app.app_context():
+            db.create_all()
+            db.session.add(User(username=name, email=f"{name}@example.com", password_hash="x"))
+            db.session.commit()
+
+    with a.app_context():
+        assert [u.username for u in User.query.all()] == ["alice"]
+    with b.app_context():
+        assert [u.username for u in User.query.all()] == ["bob"]
+
+    assert "api" in a.blueprints and "api" not in b.blueprints
+    assert a.test_client().get("/sync").status_code == 302      # login required
+    assert b.test_client().get("/sync").status_code == 404
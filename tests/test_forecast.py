@@ -0,0 +1,94 @@
+# File: tests/test_forecast.py
+import math
+from datetime import datetime, timedelta
+
+from sqlalchemy import insert, update
+
+from app import db
+from app.models import User, Lead, Deal, Settings, StatusTransition
+from app.services import forecast
+
+
+def _rep_with_history(signed=10, completed=8, lag_days=45):
+    """A rep whose past deals entered Signed 300+ days ago; `completed` of them closed `lag_days` later."""
+    forecast.invalidate()
+    rep = User(username="rep", email="rep@example.com")
+    db.session.add(rep)
+    db.session.flush()
+    db.session.add(Settings(user_id=rep.id, annual_income_goal=120000))
+    start = datetime.utcnow() - timedelta(days=300)
+    rows = []
+    for i in range(signed):
+        at = start + timedelta(days=i)
+        rows.append({"entity": "deal", "entity_id": 1000 + i, "lead_id": 1, "user_id": rep.id,
+                     "from_status": None, "to_status": "Signed", "at": at})
+        if i < completed:
+            rows.append({"entity": "deal", "entity_id": 1000 + i, "lead_id": 1, "user_id": rep.id,
+                         "from_status": "Signed", "to_status": "Completed", "at": at + timedelta(days=lag_days)})
+    db.session.execute(insert(StatusTransition), rows)
+    db.session.commit()
+    return rep
+
+
+def _open_deal(rep, price=10000, status="Signed"):
+    lead = Lead(first_name="A", last_name="B", user_id=rep.id)
+    deal = Deal(status=status, contract_price=price, commission_rate=10, commission_base="revenue")
+    lead.deals.append(deal)
+    db.session.add(lead)
+    db.session.commit()
+    return deal
+
+
+def test_open_deals_land_when_history_says_they_will(app_ctx):
+    rep = _rep_with_history()
+    for _ in range(2):
+        _open_deal(rep)
+    report = forecast.forecast(rep.id)
+
+    signed = report["stages"]["Signed"]
+    company_p = (8 + 5 * 0.85) / 15                      # this rep is the whole company
+    p = (8 + 5 * company_p) / 15
+    assert signed["history"] == 10 and math.isclose(signed["probability"], round(p, 3))
+    assert 30 <= signed["typical_lag_days"] <= 61
+
+    lands = forecast._month(datetime.utcnow() + timedelta(days=1.5 * forecast.MONTH_DAYS))
+    month = next(m for m in report["months"] if m["month"] == lands)
+    assert math.isclose(month["expected"], 2000 * p, abs_tol=0.01) and math.isclose(month["deals"], 2 * p, abs_tol=0.01)
+    assert month["low"] < month["expected"] < month["high"] and month["vs_goal"] == round(month["expected"] - 10000, 2)
+    assert sum(m["expected"] for m in report["months"]) == month["expected"]
+    assert report["pipeline"] == {"open_deals": 2, "unweighted": 2000.0, "expected": round(2000 * p, 2)}
+
+
+def test_deals_waiting_longer_than_history_are_discounted(app_ctx):
+    rep = _rep_with_history()
+    fresh, stuck = _open_deal(rep), _open_deal(rep)
+    T = StatusTransition.__table__
+    db.session.execute(update(T).where(T.c.entity == "deal", T.c.entity_id == stuck.id)
+                       .values(at=datetime.utcnow() - timedelta(days=100)))
+    db.session.commit()
+
+    report = forecast.forecast(rep.id)
+    assert report["pipeline"]["unweighted"] == 2000.0
+    assert report["pipeline"]["expected"] < 1000 * 0.82 + 1          # the stuck deal adds next to nothing
+
+
+def test_stats_are_cached_until_the_rep_moves_a_deal(app_ctx):
+    rep = _rep_with_history()
+    deal = _open_deal(rep)
+    first = forecast.stage_stats([rep.id])[rep.id]
+    assert forecast.stage_stats([rep.id])[rep.id] is first
+
+    deal.status = "Completed"
+    db.session.commit()
+    again = forecast.stage_stats([rep.id])[rep.id]
+    assert again is not first and again["Signed"].observed == 11
+    report = forecast.forecast(rep.id)
+    assert report["pipeline"]["open_deals"] == 0 and report["goal"]["earned_this_year"] == 1000.0
+
+    client = app_ctx.test_client()
+    rep.set_password("pw")
+    db.session.commit()
+    client.post("/login", data={"username": "rep", "password": "pw"})
+    assert client.get("/analytics/forecast.json?months=3").json["goal"]["monthly"] == 10000.0
+    assert len(client.get("/analytics/forecast.json?months=3").json["months"]) == 3
+    assert client.get("/analytics/forecast.json?months=99").status_code == 400
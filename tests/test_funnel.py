@@ -0,0 +1,74 @@
+# File: tests/test_funnel.py
+from datetime import datetime, timedelta
+
+from app import db
+from app.models import Lead, Deal, User, StatusTransition
+from app.services.funnel import rebuild_daily_stats, funnel_report, _hist_percentile
+
+
+def _user():
+    u = User(username="rep", email="rep@example.com")
+    u.set_password("x")
+    db.session.add(u)
+    db.session.commit()
+    return u
+
+
+def test_status_changes_are_logged_in_the_same_flush(app_ctx):
+    u = _user()
+    lead = Lead(first_name="Ann", last_name="Lee", user_id=u.id)
+    deal = Deal(status="Appt", contract_price=1000)
+    lead.deals.append(deal)
+    db.session.add(lead)
+    db.session.commit()
+
+    deal.status = "Signed"
+    lead.refresh_status_from_deals()
+    db.session.commit()
+
+    log = [(t.entity, t.from_status, t.to_status) for t in
+           StatusTransition.query.order_by(StatusTransition.id)]
+    assert ("deal", None, "Appt") in log
+    assert ("deal", "Appt", "Signed") in log
+    assert ("lead", "New", "Signed") in log
+
+
+def test_report_from_rollups(app_ctx):
+    u = _user()
+    t0 = datetime(2026, 3, 2, 9, 0)
+    # Two deals: Appt -> Signed after 3 and 10 days; one more still sitting in Appt.
+    for deal_id, dwell, signed in [(1, 3, True), (2, 10, True), (3, None, False)]:
+        lead = Lead(first_name="L", last_name=str(deal_id), user_id=u.id)
+        lead.deals.append(Deal(status="Signed" if signed else "Appt"))
+        db.session.add(lead)
+    db.session.commit()
+    StatusTransition.query.delete()
+    deal_ids = [d.id for d in Deal.query.order_by(Deal.id)]
+    for deal_id, dwell in zip(deal_ids, [3, 10, None]):
+        db.session.add(StatusTransition(entity="deal", entity_id=deal_id, lead_id=deal_id, user_id=u.id,
+                                        from_status=None, to_status="Appt", at=t0))
+        if dwell:
+            db.session.add(StatusTransition(entity="deal", entity_id=deal_id, lead_id=deal_id, user_id=u.id,
+                                            from_status="Appt", to_status="Signed",
+                                            at=t0 + timedelta(days=dwell)))
+    db.session.commit()
+
+    assert rebuild_daily_stats() > 0
+    report = funnel_report([u.id], "deal", now=t0 + timedelta(days=20))
+    appt = next(s for s in report["stages"] if s["stage"] == "Appt")
+    assert appt["entered"] == 3
+    assert appt["advanced"] == 2
+    assert abs(appt["conversion_rate"] - 2 / 3) < 1e-9
+    assert abs(appt["time_in_stage_days"]["mean"] - 6.5) < 1e-6
+    assert appt["aging"]["open"] == 1
+
+    # Incremental rebuild of the last day leaves earlier days intact.
+    rebuild_daily_stats(since=(t0 + timedelta(days=10)).date())
+    again = funnel_report([u.id], "deal", now=t0 + timedelta(days=20))
+    assert again["stages"] == report["stages"]
+
+
+def test_hist_percentile_interpolates_within_bucket():
+    counts = [0, 0, 4, 0, 0, 0, 0, 0, 0]   # everything in the 2-4 day bucket
+    assert _hist_percentile(counts, 0.5) == 3.0
+    assert _hist_percentile([0] * 9, 0.5) is None
@@ -0,0 +1,85 @@
+# File: tests/test_jobs.py
+import json
+
+from app import db
+from app.models import Job, Lead, User
+from app.services import jobs
+from app.services.commissions import compile_plan
+from app.services.projector import Ratios, simulate_income
+
+
+def _user():
+    u = User(username="rep", email="rep@example.com")
+    u.set_password("x")
+    db.session.add(u)
+    db.session.commit()
+    return u
+
+
+def test_claim_is_exclusive_and_respects_limit(app_ctx):
+    u = _user()
+    for _ in range(3):
+        jobs.enqueue('export_leads', {"user_id": u.id}, user_id=u.id)
+    db.session.commit()
+
+    first = jobs.claim("w1", 'export_leads', limit=2)
+    second = jobs.claim("w2", 'export_leads', limit=5)
+    assert len(first) == 2 and len(second) == 1
+    assert not set(first) & set(second)
+    assert Job.query.filter_by(status='running').count() == 3
+
+
+def test_failed_job_is_retried_then_marked_failed(app_ctx):
+    job = jobs.enqueue('export_leads', {}, max_attempts=2)
+    db.session.commit()
+
+    jobs.claim("w", 'export_leads', 1)
+    jobs.fail(job.id, "boom", backoff_seconds=0)
+    assert db.session.get(Job, job.id).status == 'queued'
+
+    jobs.claim("w", 'export_leads', 1)
+    jobs.fail(job.id, "boom", backoff_seconds=0)
+    job = db.session.get(Job, job.id)
+    assert job.status == 'failed' and job.attempts == 2 and job.error == "boom"
+
+
+def test_import_leads_handler_skips_bad_rows(app_ctx):
+    u = _user()
+    csv_text = "first_name,last_name,status\nAnn,Lee,New\n,Missing,New\nBob,Ray,Bogus\nCy,Ko,Appt\n"
+    job = jobs.enqueue('import_leads', {"user_id": u.id, "csv": csv_text}, user_id=u.id)
+    db.session.commit()
+
+    result = jobs.TASKS['import_leads'].fn(jobs.JobContext(job.id, json.loads(job.payload)))
+    assert result["imported"] == 2
+    assert result["skipped_lines"] == [3, 4]
+    assert Lead.query.filter_by(user_id=u.id).count() == 2
+
+
+def test_simulate_income_is_reproducible_and_centered():
+    ratios = Ratios(doors_per_appt=10.0, appts_per_deal=3.0, avg_rcv_per_completed_deal=15000.0)
+    kwargs = dict(doors_per_day=80, days=200, ratios=ratios, sign_to_complete=0.8,
+                  commission_pct=10.0, company_margin_pct=0.0, commission_base="revenue",
+                  trials=500, seed=7)
+    a, b = simulate_income(**kwargs), simulate_income(**kwargs)
+    assert a == b
+    expected = 80 * 200 / 10 / 3 * 0.8 * 15000 * 0.10
+    assert abs(a["mean"] - expected) / expected < 0.05
+    assert a["p10"] < a["p50"] < a["p90"]
+
+    doubled = simulate_income(**kwargs, plan=compile_plan({"base": "revenue", "rate": 20}))
+    assert abs(doubled["mean"] / a["mean"] - 2.0) < 1e-9
+
+
+def test_forecast_route_queues_one_job(app_ctx):
+    _user()
+    client = app_ctx.test_client()
+    client.post("/login", data={"username": "rep", "password": "x"})
+    body = {"doors_per_day": 80, "days_to_forecast": 200, "doors_knocked": 1000, "appointments_set": 100,
+            "deals_signed": 30, "deals_completed": 20, "total_rcv": 300000, "trials": 100}
+    res = client.post("/forecast.json", json=body)
+    assert res.status_code == 202
+    job = Job.query.one()
+    assert res.json["job_id"] == job.id and job.kind == "monte_carlo_forecast"
+    assert res.headers["Location"].endswith(f"/jobs/{job.id}")
+    assert json.loads(job.payload)["plan"] == {}                 # the default plan's rules
+    assert client.post("/forecast.json", json={**body, "total_rcv": "lots"}).status_code == 400
@@ -0,0 +1,76 @@
+# File: tests/test_kpis.py
+from datetime import date, timedelta
+
+from app import db
+from app.models import User, Lead, Deal, DailyActivity, Settings, KpiSnapshot
+from app.services import commissions, forecast, kpis, metrics
+
+
+def _team():
+    forecast.invalidate()
+    commissions._compiled.clear()      # plan ids restart with every test database
+    rep, boss, new = (User(username=n, email=f"{n}@example.com") for n in ("rep", "boss", "new"))
+    db.session.add_all([rep, boss, new])
+    db.session.flush()
+    db.session.add(Settings(user_id=rep.id, annual_income_goal=100000))
+    db.session.add(DailyActivity(user_id=rep.id, date=date.today(), doors_knocked=200, appointments_set=20))
+    lead = Lead(first_name="A", last_name="B", user_id=rep.id)
+    for status, price in (("Completed", 20000), ("Completed", 10000), ("Signed", 15000), ("Signed", 5000)):
+        lead.deals.append(Deal(status=status, contract_price=price, commission_rate=10, commission_base="revenue"))
+    db.session.add(lead)
+    commissions.save_plan(rep.id, {"base": "revenue", "rate": 10, "splits": [{"to": boss.id, "share": 0.5}]})
+    db.session.commit()
+    return rep, boss, new
+
+
+def test_batched_summaries_match_the_per_rep_dashboard(app_ctx):
+    ids = [u.id for u in _team()]
+    batch = metrics.dashboard_summaries(ids)
+    assert batch == {uid: metrics.dashboard_summary(uid) for uid in ids}
+    assert commissions.earnings_by_user(ids) == {uid: commissions.earnings(uid) for uid in ids}
+    assert batch[ids[1]]["earned_commission"] == 1500.0          # the boss's half of the rep's split
+
+
+def _backdate(days):
+    """Move every snapshot back, so the next run writes a new day."""
+    for row in KpiSnapshot.query:
+        row.day -= timedelta(days=days)
+    db.session.commit()
+
+
+def test_snapshots_are_written_once_per_rep_and_day(app_ctx):
+    rep, boss, new = _team()
+    assert kpis.snapshot(batch_size=2) == {"day": date.today().isoformat(), "written": 3, "skipped": 0}
+    row = KpiSnapshot.query.filter_by(user_id=rep.id).one()
+    assert (row.pipeline_value, row.earned_commission, row.deals_signed, row.deals_completed) == (20000.0, 1500.0, 4, 2)
+    # Full goal over a work year at the rep's history: 15000 RCV x 5% per completed deal, 5 appts per deal.
+    assert round(row.deals_per_day, 4) == round(100000 / 250 / 750, 4) and row.doors_per_day == row.appts_per_day * 10
+    assert KpiSnapshot.query.filter_by(user_id=new.id).one().doors_per_day is None   # no history yet
+
+    Deal.query.filter_by(contract_price=5000).one().status = "Completed"
+    db.session.commit()
+    assert kpis.snapshot() == {"day": date.today().isoformat(), "written": 0, "skipped": 3}
+    assert KpiSnapshot.query.filter_by(user_id=rep.id).one().deals_completed == 2      # rows are never rewritten
+    _backdate(1)
+    kpis.snapshot()
+    assert [r["deals_completed"] for r in kpis.trend(rep.id)] == [2, 3]
+
+
+def test_trend_endpoint(app_ctx):
+    rep, _, _ = _team()
+    for _ in range(3):
+        _backdate(1)
+        kpis.snapshot()
+    rep.set_password("pw")
+    db.session.commit()
+    client = app_ctx.test_client()
+    client.post("/login", data={"username": "rep", "password": "pw"})
+
+    body = client.get("/analytics/kpis.json?fields=pipeline_value,doors_per_day").json
+    assert body["fields"] == ["pipeline_value", "doors_per_day"]
+    assert [d["day"] for d in body["days"]] == [(date.today() - timedelta(days=b)).isoformat() for b in (2, 1, 0)]
+    assert set(body["days"][0]) == {"day", "pipeline_value", "doors_per_day"}
+    start = (date.today() - timedelta(days=1)).isoformat()
+    assert len(client.get(f"/analytics/kpis.json?start={start}").json["days"]) == 2
+    assert client.get("/analytics/kpis.json?fields=password_hash").status_code == 400
+    assert client.get("/analytics/kpis.json?start=yesterday").status_code == 400
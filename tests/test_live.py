@@ -0,0 +1,93 @@
+# File: tests/test_live.py
+import json
+
+from app import db, live
+from app.models import User, Lead, Deal
+
+
+def test_broker_fans_out_and_tells_stalled_clients_to_reload():
+    broker = live.Broker(queue_size=2)
+    broker.backend = live.LocalBackend(broker, {})
+    a, b = broker.subscribe("-:1"), broker.subscribe("-:1")
+    other = broker.subscribe("-:2")
+    for i in range(3):
+        broker.publish("-:1", {"n": i})
+    assert other.empty()
+    assert [json.loads(a.get_nowait()) for _ in range(a.qsize())] == [{"type": "reload"}]
+    broker.unsubscribe("-:1", a)
+    broker.unsubscribe("-:1", b)
+    assert not broker.listening("-:1") and broker.listening("-:2")
+
+
+def _events(response, n):
+    out = []
+    for chunk in response.response:
+        chunk = chunk.decode() if isinstance(chunk, bytes) else chunk
+        if chunk.startswith("data: "):
+            out.append(json.loads(chunk[6:]))
+            if len(out) == n:
+                return out
+    return out
+
+
+def test_writes_push_deltas_to_open_dashboards(app_ctx):
+    app_ctx.config.update(LIVE_HEARTBEAT=0.05, LIVE_STREAM_SECONDS=1)
+    user = User(username="rep", email="rep@example.com")
+    user.set_password("pw")
+    db.session.add(user)
+    db.session.commit()
+
+    viewer, writer = app_ctx.test_client(), app_ctx.test_client()
+    for c in (viewer, writer):
+        c.post("/login", data={"username": "rep", "password": "pw"})
+    stream = viewer.get("/events", buffered=False)
+    assert stream.mimetype == "text/event-stream"
+
+    writer.post("/add_lead", data={"first_name": "Ann", "last_name": "Lee", "status": "New"})
+    lead = Lead.query.filter_by(first_name="Ann").one()
+    db.session.add(Deal(lead_id=lead.id, status="Signed", contract_price=10000, commission_rate=10))
+    db.session.commit()
+    with app_ctx.test_request_context():
+        live.publish_changes(user.id, lead_ids=[lead.id])
+    lead_id = lead.id
+    writer.post(f"/lead/delete/{lead_id}")
+
+    added, signed, deleted = _events(stream, 3)
+    stream.close()
+    assert [r["name"] for r in added["leads"]] == ["Ann Lee"]
+    assert added["removed"] == []
+    assert signed["leads"][0]["badges"] == [{"status": "Signed", "class": "bg-blue-100 text-blue-800"}]
+    assert signed["aggregates"]["pipeline_value"] == 10000
+    assert signed["aggregates"]["earned_commission"] == 0     # sent in full, unchanged or not
+    assert deleted["removed"] == [lead_id] and deleted["aggregates"]["pipeline_value"] == 0
+    assert not live.broker(app_ctx).listening(live.channel(user.id))
+
+
+def test_a_dashboard_opened_after_skipped_writes_gets_true_totals(app_ctx):
+    user = User(username="rep", email="rep@example.com")
+    db.session.add(user)
+    db.session.flush()
+    lead = Lead(first_name="Ann", last_name="Lee", user_id=user.id)
+    db.session.add(lead)
+    db.session.commit()
+    b, name = live.broker(app_ctx), live.channel(user.id)
+
+    def publish():
+        with app_ctx.test_request_context():
+            live.publish_changes(user.id)
+
+    first = b.subscribe(name)
+    publish()                                       # v0
+    assert json.loads(first.get_nowait())["aggregates"]["pipeline_value"] == 0
+    b.unsubscribe(name, first)                      # the tab closes
+
+    deal = Deal(lead_id=lead.id, status="Signed", contract_price=5000)
+    db.session.add(deal)
+    db.session.commit()
+    publish()                                       # v1: nobody listening, skipped
+    second = b.subscribe(name)                      # a new tab renders v1
+    db.session.delete(deal)
+    db.session.commit()
+    publish()                                       # back to v0
+    assert json.loads(second.get_nowait())["aggregates"]["pipeline_value"] == 0
+    b.unsubscribe(name, second)
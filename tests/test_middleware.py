@@ -0,0 +1,94 @@
+# File: tests/test_middleware.py
+import gzip
+import zlib
+
+from app.middleware import CompressionMiddleware, choose_encoding
+
+
+def _wsgi_app(body, ctype="text/html; charset=utf-8", streamed=False):
+    def application(environ, start_response):
+        headers = [("Content-Type", ctype)]
+        if not streamed:
+            headers.append(("Content-Length", str(len(body))))
+        start_response("200 OK", headers)
+        if streamed:
+            return iter([body[:10], body[10:]])
+        return [body]
+    return application
+
+
+def _call(app, accept="gzip"):
+    captured = {}
+
+    def start_response(status, headers, exc_info=None):
+        captured["status"] = status
+        captured["headers"] = dict(headers)
+
+    body = b"".join(app({"REQUEST_METHOD": "GET", "HTTP_ACCEPT_ENCODING": accept}, start_response))
+    return captured["headers"], body
+
+
+def test_choose_encoding_respects_q_values():
+    assert choose_encoding("gzip, br", brotli_available=True) == "br"
+    assert choose_encoding("gzip, br;q=0", brotli_available=True) == "gzip"
+    assert choose_encoding("br", brotli_available=False) is None
+    assert choose_encoding("identity") is None
+    assert choose_encoding("*", brotli_available=False) == "gzip"
+
+
+def test_large_html_is_gzipped_with_correct_length():
+    body = b"<tr><td>lead</td></tr>" * 200
+    headers, out = _call(CompressionMiddleware(_wsgi_app(body), min_size=500))
+    assert headers["Content-Encoding"] == "gzip"
+    assert int(headers["Content-Length"]) == len(out) < len(body)
+    assert gzip.decompress(out) == body
+    assert "Accept-Encoding" in headers["Vary"]
+
+
+def test_small_and_non_text_responses_pass_through():
+    headers, out = _call(CompressionMiddleware(_wsgi_app(b"{}", "application/json"), min_size=500))
+    assert "Content-Encoding" not in headers and out == b"{}"
+
+    png = b"\x89PNG" * 500
+    headers, out = _call(CompressionMiddleware(_wsgi_app(png, "image/png"), min_size=500))
+    assert "Content-Encoding" not in headers and out == png
+
+
+def test_streamed_response_is_compressed_incrementally():
+    body = b"data: {}\n\n" * 300
+    headers, out = _call(CompressionMiddleware(_wsgi_app(body, streamed=True), min_size=500))
+    assert headers["Content-Encoding"] == "gzip"
+    assert "Content-Length" not in headers
+    assert zlib.decompress(out, 31) == body
+
+
+def test_cache_policy_applied_per_endpoint(app):
+    client = app.test_client()
+    rv = client.get('/login')
+    assert rv.headers["Cache-Control"] == "no-store"
+
+
+def test_start_response_deferred_to_first_iteration():
+    body = b"<tr><td>lead</td></tr>" * 200
+
+    def lazy(environ, start_response):
+        start_response("200 OK", [("Content-Type", "text/html"), ("Content-Length", str(len(body)))])
+        yield b""
+        yield body
+
+    headers, out = _call(CompressionMiddleware(lazy, min_size=500))
+    assert headers["Content-Encoding"] == "gzip" and gzip.decompress(out) == body
+    headers, out = _call(CompressionMiddleware(lazy, min_size=500), accept="identity")
+    assert "Content-Encoding" not in headers and out == body
+
+
+def test_legacy_write_data_is_kept_in_order():
+    def legacy(environ, start_response):
+        write = start_response("200 OK", [("Content-Type", "text/html")])
+        write(b"<p>head</p>" * 100)
+        return [b"<p>tail</p>"]
+
+    headers, out = _call(CompressionMiddleware(legacy, min_size=500))
+    assert zlib.decompress(out, 31) == b"<p>head</p>" * 100 + b"<p>tail</p>"
+    headers, out = _call(CompressionMiddleware(legacy, min_size=500), accept="identity")
+    assert out == b"<p>head</p>" * 100 + b"<p>tail</p>"
@@ -0,0 +1,73 @@
+# File: tests/test_profiling.py
+import os
+
+from app import db, profiling
+from app.models import User, Lead
+
+
+def _login(app, username):
+    user = User(username=username, email=f"{username}@example.com")
+    user.set_password("pw")
+    db.session.add(user)
+    db.session.commit()
+    client = app.test_client()
+    client.post("/login", data={"username": username, "password": "pw"})
+    return client, user
+
+
+def test_signed_header_profiles_a_request(app_ctx, tmp_path):
+    app_ctx.config.update(PROFILE_DIR=str(tmp_path), PROFILE_INTERVAL=0.001)
+    client, user = _login(app_ctx, "rep")
+    db.session.add_all([Lead(first_name=str(i), last_name="X", user_id=user.id) for i in range(50)])
+    db.session.commit()
+
+    assert "X-Profile-Id" not in client.get("/").headers
+    assert "X-Profile-Id" not in client.get("/", headers={"X-Profile": "forged"}).headers
+    assert "X-Profile-Id" not in client.get("/?_profile=1").headers       # not an admin
+
+    rv = client.get("/", headers={"X-Profile": profiling.make_token(app_ctx)})
+    assert rv.status_code == 200
+    run = rv.headers["X-Profile-Id"]
+    [summary] = profiling.captures(str(tmp_path))
+    assert summary["id"] == run and summary["endpoint"] == "dashboard.index"
+    assert summary["sql_count"] > 0
+    assert set(summary["files"]) == {run + ".collapsed", run + ".sql.txt"}
+    with open(os.path.join(tmp_path, run + ".sql.txt")) as fh:
+        text = fh.read()
+    assert "FROM lead" in text and profiling.REDACTED in text
+
+
+def test_sql_parameters_are_kept_only_when_configured(app_ctx, tmp_path):
+    app_ctx.config.update(PROFILE_SAMPLE_RATE=1.0)
+    client, texts = app_ctx.test_client(), []
+    for keep, name in ((False, "who@example.com"), (True, "again@example.com")):
+        folder = tmp_path / name
+        app_ctx.config.update(PROFILE_DIR=str(folder), PROFILE_SQL_PARAMS=keep)
+        client.post("/login", data={"username": name, "password": "secret"})
+        [summary] = profiling.captures(str(folder))
+        texts.append((folder / (summary["id"] + ".sql.txt")).read_text())
+    assert "who@example.com" not in texts[0] and profiling.REDACTED in texts[0]
+    assert "again@example.com" in texts[1]
+
+
+def test_admin_flag_cprofile_mode_and_slowest_page(app_ctx, tmp_path):
+    app_ctx.config.update(PROFILE_DIR=str(tmp_path), PROFILE_ADMINS=["boss"], PROFILE_MODE="cprofile")
+    client, _ = _login(app_ctx, "boss")
+    run = client.get("/?_profile=1").headers["X-Profile-Id"]
+    assert os.path.exists(os.path.join(tmp_path, run + ".prof"))
+
+    page = client.get("/admin/profiles")
+    assert page.status_code == 200 and b"dashboard.index" in page.data
+    assert client.get(f"/admin/profiles/{run}.sql.txt").status_code == 200
+
+    client.get("/logout")
+    other, _ = _login(app_ctx, "rep")
+    assert other.get("/admin/profiles").status_code == 403
+
+
+def test_sampling_rate_and_retention(app_ctx, tmp_path):
+    app_ctx.config.update(PROFILE_DIR=str(tmp_path), PROFILE_SAMPLE_RATE=1.0, PROFILE_KEEP=2)
+    client = app_ctx.test_client()
+    for _ in range(4):
+        client.get("/login")
+    assert len(profiling.captures(str(tmp_path))) == 2
@@ -0,0 +1,65 @@
+# File: tests/test_replicas.py
+import pytest
+
+from app import create_app, db, replicas
+from app.models import Lead
+from config import Config
+
+
+@pytest.fixture
+def split_app(tmp_path):
+    cfg = type("ReplicaConfig", (Config,), dict(
+        SQLALCHEMY_DATABASE_URI=f"sqlite:///{tmp_path / 'primary.db'}",
+        SQLALCHEMY_REPLICA_URI=f"sqlite:///{tmp_path / 'replica.db'}",
+        TESTING=True, WTF_CSRF_ENABLED=False,
+    ))
+    app = create_app(cfg)
+    with app.app_context():
+        db.create_all()
+    yield app
+    with app.app_context():
+        for engine in db.engines.values():
+            engine.dispose()
+
+
+def _replicate(app):
+    with app.app_context():
+        replicas.sync_sqlite(db.engine, db.engines["replica"])
+
+
+def _new_lead(client, first_name):
+    client.post("/add_lead", data={"first_name": first_name, "last_name": "X", "status": "New"})
+    with client.application.app_context():
+        return Lead.query.filter_by(first_name=first_name).one().id
+
+
+def test_reads_follow_replica_unless_pinned_by_own_write(split_app):
+    client = split_app.test_client()
+    client.post("/register", data={"username": "u", "email": "u@example.com", "password": "pw", "password2": "pw"})
+    _replicate(split_app)
+    client.post("/login", data={"username": "u", "password": "pw"})
+
+    lead_id = _new_lead(client, "Fresh")          # primary only: the replica lags
+    assert client.get(f"/lead/{lead_id}").status_code == 200   # read-your-writes
+
+    split_app.config["REPLICA_PIN_SECONDS"] = 0
+    stale = _new_lead(client, "Stale")
+    assert client.get(f"/lead/{stale}").status_code == 404     # served by the replica
+
+    _replicate(split_app)
+    assert client.get(f"/lead/{stale}").status_code == 200
+
+
+def test_writes_always_go_to_primary(split_app):
+    client = split_app.test_client()
+    client.post("/register", data={"username": "u", "email": "u@example.com", "password": "pw", "password2": "pw"})
+    _replicate(split_app)
+    split_app.config["REPLICA_PIN_SECONDS"] = 0
+    client.post("/login", data={"username": "u", "password": "pw"})
+    # The dashboard is replica-routed; its get-or-create of Settings must land on the primary.
+    assert client.get("/index").status_code == 200
+    with split_app.app_context():
+        with db.engine.connect() as conn:
+            assert conn.exec_driver_sql("SELECT count(*) FROM settings").scalar() == 1
+        with db.engines["replica"].connect() as conn:
+            assert conn.exec_driver_sql("SELECT count(*) FROM settings").scalar() == 0
@@ -0,0 +1,132 @@
+# File: tests/test_routing.py
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from app import db
+from app.models import User, Lead
+from app.services import geocoding, routing
+
+
+def _points(n, seed=7):
+    rng = random.Random(seed)
+    return [(40.0 + rng.random() * 0.2, -75.0 + rng.random() * 0.3) for _ in range(n)]
+
+
+def test_300_stops_plan_fast_and_two_opt_helps():
+    points = _points(300)
+    t0 = time.perf_counter()
+    plan = routing.plan_route(points, start=(40.1, -74.85))
+    assert time.perf_counter() - t0 < 1.0
+
+    assert sorted(plan["order"]) == list(range(300))
+    assert len(plan["legs_km"]) == 300
+    greedy = routing.plan_route(points, start=(40.1, -74.85), optimize=False)
+    assert plan["total_km"] < greedy["total_km"]
+
+
+def test_grid_nearest_matches_brute_force():
+    xy = routing.project(_points(200, seed=3))
+    grid = routing.GridIndex(xy)
+    rng = random.Random(1)
+    for _ in range(25):
+        x, y = rng.choice(xy)
+        x, y = x + rng.uniform(-1, 1), y + rng.uniform(-1, 1)
+        brute = sorted(range(len(xy)), key=lambda i: (xy[i][0] - x) ** 2 + (xy[i][1] - y) ** 2)
+        assert grid.nearest(x, y, k=6) == brute[:6]
+
+
+def test_geocodes_are_cached_on_the_lead_and_route_endpoint(app_ctx, tmp_path):
+    path = tmp_path / "geocodes.csv"
+    path.write_text("address,lat,lng\n1 Main St,40.00,-75.00\n9 Elm St,40.02,-75.00\n5 Oak St,40.01,-75.00\n")
+    app_ctx.config["GEOCODER_FILE"] = str(path)
+
+    user = User(username="rep", email="rep@example.com")
+    user.set_password("pw")
+    db.session.add(user)
+    db.session.commit()
+    addresses = ["1 Main St.", "9 elm st", "5 Oak St", "Nowhere"]
+    leads = [Lead(first_name=str(i), last_name="X", address=a, user_id=user.id) for i, a in enumerate(addresses)]
+    db.session.add_all(leads)
+    db.session.commit()
+    ids = [l.id for l in leads]
+
+    assert geocoding.geocode_leads(user_id=user.id) == {"looked_up": 4, "found": 3}
+    db.session.commit()
+    assert geocoding.geocode_leads(user_id=user.id) == {"looked_up": 0, "found": 0}   # misses cached too
+    assert db.session.get(Lead, ids[0]).version == 1
+
+    client = app_ctx.test_client()
+    client.post("/login", data={"username": "rep", "password": "pw"})
+    body = client.post("/route.json", json={"lead_ids": ids, "start": {"lat": 39.99, "lng": -75.0}}).get_json()
+    assert [s["id"] for s in body["stops"]] == [ids[0], ids[2], ids[1]]
+    assert body["skipped"] == [ids[3]]
+    assert 3.0 < body["total_km"] < 4.0
+
+    nearby = client.post("/route.json", json={"start": {"lat": 40.021, "lng": -75.0}}).get_json()
+    assert nearby["stops"][0]["id"] == ids[1]
+
+
+class _Nominatim(BaseHTTPRequestHandler):
+    def do_GET(self):
+        q = parse_qs(urlparse(self.path).query)["q"][0]
+        self.server.queries.append((q, self.headers["User-Agent"]))
+        if q in self.server.down:
+            self.send_response(502)
+            self.end_headers()
+            return
+        body = json.dumps([{"lat": "40.5", "lon": "-75.25"}] if q == "1 Main St" else []).encode()
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def test_nominatim_provider_caches_misses_and_retries_failed_lookups(app_ctx):
+    srv = ThreadingHTTPServer(("127.0.0.1", 0), _Nominatim)
+    srv.queries, srv.down = [], {"Down St"}
+    threading.Thread(target=srv.serve_forever, daemon=True).start()
+    app_ctx.config.update(GEOCODER="nominatim", GEOCODER_URL=f"http://127.0.0.1:{srv.server_address[1]}/search",
+                          GEOCODER_MIN_INTERVAL=0)
+    try:
+        user = User(username="rep", email="rep@example.com")
+        db.session.add(user)
+        db.session.flush()
+        db.session.add_all([Lead(first_name=a, last_name="X", address=a, user_id=user.id)
+                            for a in ("1 Main St", "Nowhere", "Down St")])
+        db.session.commit()
+
+        # Sorted: "1 Main St" hits, "Down St" fails and stops the batch before "Nowhere".
+        assert geocoding.geocode_leads() == {"looked_up": 1, "found": 1}
+        db.session.commit()
+        assert [q for q, _ in srv.queries] == ["1 Main St", "Down St"]
+        assert srv.queries[0][1] == "roofing-sales-geocoder"
+        main = Lead.query.filter_by(address="1 Main St").one()
+        assert (main.latitude, main.longitude) == (40.5, -75.25)
+
+        srv.down.clear()
+        assert geocoding.geocode_leads() == {"looked_up": 2, "found": 0}
+        db.session.commit()
+        assert geocoding.geocode_leads() == {"looked_up": 0, "found": 0}
+    finally:
+        srv.shutdown()
+        srv.server_close()
+
+
+def test_lead_indexes_are_bounded(app_ctx):
+    app_ctx.config["ROUTE_INDEX_CACHE_SIZE"] = 2
+    routing._indexes.clear()
+    users = [User(username=f"u{i}", email=f"u{i}@example.com") for i in range(3)]
+    db.session.add_all(users)
+    db.session.commit()
+    first = routing.lead_index(users[0].id)
+    routing.lead_index(users[1].id)
+    assert routing.lead_index(users[0].id) is first          # a hit, now most recently used
+    routing.lead_index(users[2].id)
+    assert [uid for _, uid in routing._indexes] == [users[0].id, users[2].id]
@@ -0,0 +1,63 @@
+# File: tests/test_scoring.py
+from datetime import datetime, timedelta
+
+import pytest
+
+from app import db
+from app.models import User, Lead, Deal
+from app.services import scoring
+
+
+def _user():
+    user = User(username="rep", email="rep@example.com")
+    db.session.add(user)
+    db.session.commit()
+    return user
+
+
+def test_scores_follow_writes_without_bumping_versions(app_ctx):
+    user = _user()
+    new = Lead(first_name="N", last_name="X", status="New", user_id=user.id)
+    appt = Lead(first_name="A", last_name="X", status="Appt", user_id=user.id, notes="x" * 250)
+    done = Lead(first_name="D", last_name="X", status="Completed", user_id=user.id)
+    db.session.add_all([new, appt, done])
+    db.session.commit()
+
+    assert done.priority_score is None
+    assert appt.priority_score > new.priority_score > 0
+    assert appt.version == 1
+
+    before = new.priority_score
+    new.deals.append(Deal(status="New", contract_price=12000))
+    db.session.commit()
+    assert new.priority_score == pytest.approx(before + 10.0 + 12.0, abs=1e-3)
+    assert new.version == 1      # adding a deal isn't an edit of the lead itself
+
+
+def test_nightly_rescore_decays_with_age_and_top_leads_uses_index(app_ctx):
+    user = _user()
+    leads = [Lead(first_name=str(i), last_name="X", status="Contacted", user_id=user.id,
+                  date_created=datetime.utcnow() - timedelta(days=i * 10)) for i in range(5)]
+    db.session.add_all(leads)
+    db.session.commit()
+    assert scoring.rescore_all(now=datetime.utcnow() + timedelta(days=1)) == 5
+
+    top = scoring.top_leads(user.id, limit=3)
+    assert [l.first_name for l in top] == ["0", "1", "2"]
+    assert scoring.top_leads(user.id + 1) == []
+
+    plan = " ".join(str(r) for r in db.session.execute(db.text(
+        "EXPLAIN QUERY PLAN SELECT id FROM lead WHERE user_id = 1 AND priority_score IS NOT NULL "
+        "ORDER BY priority_score DESC LIMIT 50")))
+    assert "ix_lead_user_priority_score" in plan
+
+
+def test_top_leads_endpoint(app_ctx):
+    user = _user()
+    user.set_password("pw")
+    db.session.add(Lead(first_name="Hot", last_name="Lead", status="Appt", user_id=user.id))
+    db.session.commit()
+    client = app_ctx.test_client()
+    client.post("/login", data={"username": "rep", "password": "pw"})
+    rows = client.get("/leads/top.json?limit=5").get_json()
+    assert [r["name"] for r in rows] == ["Hot Lead"]
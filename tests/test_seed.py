@@ -0,0 +1,50 @@
+# File: tests/test_seed.py
+from datetime import date
+
+import pytest
+
+from app import db
+from app.models import User, Lead, Deal, DailyActivity, StatusTransition, FunnelDailyStat
+from app.services import seed
+
+
+def _snapshot():
+    return (
+        db.session.query(db.func.count(Lead.id), db.func.count(Lead.priority_score)).one(),
+        db.session.query(db.func.count(Deal.id), db.func.sum(Deal.contract_price)).one(),
+        db.session.query(db.func.sum(DailyActivity.doors_knocked),
+                         db.func.sum(DailyActivity.appointments_set)).one(),
+        db.session.query(Deal.commission_base, db.func.count(Deal.id)).group_by(Deal.commission_base).all(),
+    )
+
+
+def test_same_seed_same_dataset(app_ctx):
+    counts = seed.seed(users=3, seed=7, end=date(2024, 6, 30), years=0.5)
+    first = _snapshot()
+    assert counts["users"] == 3 and counts["leads"] == first[0][0] > 0
+
+    for table in (StatusTransition, Deal, Lead, DailyActivity, FunnelDailyStat):
+        db.session.query(table).delete()
+    db.session.commit()
+    seed.seed(users=3, seed=7, end=date(2024, 6, 30), years=0.5, prefix="again", batch_size=50)
+    assert _snapshot() == first
+
+    with pytest.raises(ValueError):
+        seed.seed(users=1, prefix="again")
+
+
+def test_funnel_follows_the_profile(app_ctx):
+    app_ctx.config["SEED_PROFILE"] = {"doors_per_appt": {"median": 10, "sigma": 0.01},
+                                      "appt_to_sign": {"alpha": 50, "beta": 50}}
+    counts = seed.seed(users=2, seed=1, end=date(2024, 12, 31), years=1)
+    doors, appts = db.session.query(db.func.sum(DailyActivity.doors_knocked),
+                                    db.func.sum(DailyActivity.appointments_set)).one()
+    assert 0.08 < appts / doors < 0.12
+    appointments = db.session.query(StatusTransition).filter_by(entity="lead", to_status="Appt").count()
+    assert appointments == appts
+    assert 0.4 < counts["deals"] / appts < 0.6
+
+    seqs = [s for (s,) in db.session.query(Lead.sync_seq)] + [s for (s,) in db.session.query(Deal.sync_seq)]
+    assert len(seqs) == len(set(seqs)) and None not in seqs
+    assert db.session.query(FunnelDailyStat).count() > 0
+    assert User.query.filter(User.username.like("seed%")).count() == 2
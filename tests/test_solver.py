@@ -0,0 +1,91 @@
+# File: tests/test_solver.py
+import math
+
+from app.services.commissions import compile_plan
+from app.services.projector import Ratios, projector_metrics
+from app.services.solver import Capacity, solve_capacity, solve_batch, bisect_batch
+
+RATIOS = Ratios(doors_per_appt=10.0, appts_per_deal=3.0, avg_rcv_per_completed_deal=15000.0)
+
+
+def test_income_from_capacity_inverts_projector():
+    m = projector_metrics(annual_goal=90000.0, days=200, ratios=RATIOS,
+                          commission_pct=40.0, company_margin_pct=30.0, commission_base="profit")
+    out = solve_capacity(Capacity(doors_per_day=m["doors_per_day"], days=200, ratios=RATIOS,
+                                  commission_pct=40.0, company_margin_pct=30.0,
+                                  commission_base="profit", annual_goal=90000.0))
+    assert math.isclose(out["income"], 90000.0, rel_tol=1e-9)
+    assert math.isclose(out["required_doors_per_day"], m["doors_per_day"], rel_tol=1e-9)
+    assert math.isclose(out["required_commission_pct"], 40.0, rel_tol=1e-9)
+    assert math.isclose(out["required_company_margin_pct"], 30.0, rel_tol=1e-9)
+
+
+def test_required_rates_for_80_doors_a_day():
+    out = solve_capacity(Capacity(doors_per_day=80, days=200, ratios=RATIOS, commission_pct=10.0,
+                                  company_margin_pct=0.0, commission_base="revenue",
+                                  sign_to_complete=0.8, annual_goal=1000000.0))
+    revenue = 80 * 200 / 10 / 3 * 0.8 * 15000
+    assert math.isclose(out["income"], revenue * 0.10)
+    assert math.isclose(out["required_commission_pct"], 1000000 / revenue * 100)
+    assert out["required_company_margin_pct"] is None
+    assert out["meets_goal"] is False
+
+
+def test_batch_reports_errors_per_scenario():
+    good = Capacity(doors_per_day=50, days=100, ratios=RATIOS, commission_pct=40,
+                    company_margin_pct=30, commission_base="profit")
+    bad = Capacity(doors_per_day=50, days=0, ratios=RATIOS, commission_pct=40,
+                   company_margin_pct=30, commission_base="profit")
+    results = solve_batch([good, bad])
+    assert "income" in results[0] and "error" in results[1]
+
+
+def test_bisect_batch_solves_nonlinear_targets_together():
+    # Tiered pay: 5% of the first 100k, 10% above it.
+    def income(xs):
+        return [0.05 * min(x, 100000) + 0.10 * max(0.0, x - 100000) for x in xs]
+
+    roots = bisect_batch(income, [2500.0, 15000.0, 1e9], lo=0.0, hi=1e6, tol=1e-4)
+    assert math.isclose(roots[0], 50000.0, abs_tol=1e-3)
+    assert math.isclose(roots[1], 200000.0, abs_tol=1e-3)
+    assert roots[2] is None
+
+
+def test_plan_priced_scenarios_match_the_projector_and_bisect_requirements():
+    half = compile_plan({"splits": [{"to": 99, "share": 0.5}]})          # rep keeps half
+    tiered = compile_plan({"base": "revenue", "tiers": [{"min": 0, "rate": 5}, {"min": 20000, "rate": 10}]})
+    m = projector_metrics(annual_goal=90000.0, days=200, ratios=RATIOS, commission_pct=40.0,
+                          company_margin_pct=30.0, commission_base="profit", plan=half)
+    out = solve_capacity(Capacity(doors_per_day=m["doors_per_day"], days=200, ratios=RATIOS,
+                                  commission_pct=40.0, company_margin_pct=30.0, commission_base="profit",
+                                  annual_goal=45000.0, plan=half))
+    assert math.isclose(out["eff_rate"], m["eff_rate"]) and math.isclose(out["income"], 90000.0)
+    assert math.isclose(out["required_commission_pct"], 20.0, abs_tol=1e-4)
+    assert math.isclose(out["required_company_margin_pct"], 15.0, abs_tol=1e-4)
+
+    out = solve_capacity(Capacity(doors_per_day=50, days=200, ratios=RATIOS, commission_pct=40.0,
+                                  company_margin_pct=30.0, commission_base="profit",
+                                  annual_goal=1e9, plan=tiered))
+    assert math.isclose(out["eff_rate"], 0.05)                   # $15k deals sit in the 5% tier
+    assert out["required_commission_pct"] is None and out["required_company_margin_pct"] is None
+
+
+def test_batch_bisects_plan_scenarios_together_and_matches_one_at_a_time(monkeypatch):
+    from app.services import solver
+    half = compile_plan({"splits": [{"to": 99, "share": 0.5}]})
+    scenarios = [Capacity(doors_per_day=d, days=200, ratios=RATIOS, commission_pct=40.0,
+                          company_margin_pct=30.0, commission_base="profit", annual_goal=45000.0, plan=half)
+                 for d in (40, 60, 80)]
+    scenarios.insert(1, Capacity(doors_per_day=50, days=200, ratios=RATIOS, commission_pct=40.0,
+                                 company_margin_pct=30.0, commission_base="profit", annual_goal=45000.0))
+    one_by_one = [solve_capacity(c) for c in scenarios]
+
+    calls, real = [], solver.bisect_batch
+
+    def counting(fn, targets, *args):
+        calls.append(len(targets))
+        return real(fn, targets, *args)
+
+    monkeypatch.setattr(solver, "bisect_batch", counting)
+    assert solve_batch(scenarios) == one_by_one
+    assert calls == [3, 3]                  # one bisection per lever for all plan scenarios
@@ -0,0 +1,142 @@
+# File: tests/test_sync.py
+from datetime import date
+
+from sqlalchemy import event, insert, select
+
+from app import db
+from app.models import DailyActivity, Lead, Deal, User
+from app.services.sync import changes_since, apply_mutations
+
+
+def _user(name="rep"):
+    u = User(username=name, email=f"{name}@example.com")
+    u.set_password("x")
+    db.session.add(u)
+    db.session.commit()
+    return u
+
+
+def test_pull_returns_only_changes_after_cursor(app_ctx):
+    u = _user()
+    lead = Lead(first_name="Ann", last_name="Lee", user_id=u.id)
+    db.session.add(lead)
+    db.session.commit()
+
+    first = changes_since(u.id, 0)
+    assert [l["id"] for l in first["changes"]["leads"]] == [lead.id]
+
+    assert changes_since(u.id, first["cursor"])["changes"]["leads"] == []
+
+    lead.notes = "Hail damage on north slope"
+    db.session.commit()
+    second = changes_since(u.id, first["cursor"])
+    assert second["changes"]["leads"][0]["version"] == 2
+    assert second["cursor"] > first["cursor"]
+
+
+def test_pull_is_scoped_to_user_and_paginates(app_ctx):
+    u, other = _user("a"), _user("b")
+    for i in range(5):
+        db.session.add(Lead(first_name=f"L{i}", last_name="X", user_id=u.id))
+    db.session.add(Lead(first_name="Not", last_name="Mine", user_id=other.id))
+    db.session.commit()
+
+    page = changes_since(u.id, 0, limit=3)
+    assert len(page["changes"]["leads"]) == 3 and page["more"]
+    rest = changes_since(u.id, page["cursor"], limit=3)
+    assert len(rest["changes"]["leads"]) == 2 and not rest["more"]
+
+
+def test_deleting_a_lead_leaves_tombstones_for_it_and_its_deals(app_ctx):
+    u = _user()
+    lead = Lead(first_name="Ann", last_name="Lee", user_id=u.id)
+    lead.deals.append(Deal(status="Appt", contract_price=1000))
+    db.session.add(lead)
+    db.session.commit()
+    cursor = changes_since(u.id, 0)["cursor"]
+    lead_id, deal_id = lead.id, lead.deals[0].id
+
+    db.session.delete(lead)
+    db.session.commit()
+    deleted = changes_since(u.id, cursor)["deleted"]
+    assert {(d["entity"], d["id"]) for d in deleted} == {("lead", lead_id), ("deal", deal_id)}
+
+
+def test_push_creates_with_refs_and_detects_conflicts(app_ctx):
+    u = _user()
+    results = apply_mutations(u.id, [
+        {"client_id": "c1", "entity": "lead", "fields": {"first_name": "Ann", "last_name": "Lee"}},
+        {"client_id": "c2", "entity": "deal", "lead_ref": "c1",
+         "fields": {"status": "Signed", "contract_price": 12000}},
+    ])
+    assert [r["status"] for r in results] == ["applied", "applied"]
+    lead = db.session.get(Lead, results[0]["id"])
+    assert lead.status == "Signed"  # lead follows its furthest deal
+
+    stale = lead.version
+    lead.notes = "edited on the web"
+    db.session.commit()
+
+    results = apply_mutations(u.id, [
+        {"entity": "lead", "id": lead.id, "base_version": stale, "fields": {"notes": "edited offline"}},
+        {"entity": "lead", "fields": {"first_name": "No last name"}},
+    ])
+    assert results[0]["status"] == "conflict"
+    assert results[0]["server"]["notes"] == "edited on the web"
+    assert results[1]["status"] == "error"
+
+
+def test_sequence_numbers_are_reserved_once_per_flush(app_ctx):
+    u = _user()
+    leads = [Lead(first_name=f"L{i}", last_name="X", user_id=u.id) for i in range(20)]
+    db.session.add_all(leads)
+    db.session.commit()
+
+    gone, clock = leads[0].id, []
+    listen = lambda conn, cursor, stmt, *a: clock.append(stmt) if "sync_clock" in stmt else None  # noqa: E731
+    event.listen(db.engine, "before_cursor_execute", listen)
+    try:
+        with db.session.no_autoflush:         # one flush: 20 updates, a delete + tombstone, a new deal
+            for i, lead in enumerate(leads):
+                lead.notes = f"note {i}"
+            db.session.delete(leads[0])
+            db.session.add(Deal(lead=leads[1], status="Signed"))
+        db.session.commit()
+        db.session.execute(insert(Lead), [{"first_name": "C", "last_name": str(i), "user_id": u.id} for i in range(50)])
+        db.session.commit()
+    finally:
+        event.remove(db.engine, "before_cursor_execute", listen)
+    assert len(clock) == 2                     # one block for the flush, one for the bulk insert
+
+    seqs = db.session.execute(select(Lead.sync_seq)).scalars().all()
+    assert len(seqs) == len(set(seqs)) == 69
+    assert [(d["entity"], d["id"]) for d in changes_since(u.id, 0)["deleted"]] == [("lead", gone)]
+
+
+def test_push_rejects_bad_input_per_mutation_and_reports_duplicate_days(app_ctx):
+    u = _user()
+    client = app_ctx.test_client()
+    client.post("/login", data={"username": "rep", "password": "x"})
+    assert client.post("/sync", json={"since": "yesterday", "mutations": []}).status_code == 400
+
+    res = client.post("/sync", json={"since": 0, "mutations": [
+        "not a mutation",
+        {"entity": "lead", "fields": ["first_name"]},
+        {"client_id": "a", "entity": "activity", "fields": {"date": "2030-01-07", "doors_knocked": 40}},
+        {"client_id": "b", "entity": "activity", "fields": {"date": "2030-01-07", "doors_knocked": 50}},
+        {"client_id": "c", "entity": "activity", "fields": {"date": "2030-01-08", "doors_knocked": 60}},
+    ]})
+    assert res.status_code == 200
+    results = res.json["results"]
+    assert [r["status"] for r in results] == ["error", "error", "applied", "conflict", "applied"]
+    assert results[3]["server"]["doors_knocked"] == 40 and results[3]["id"] == results[2]["id"]
+
+    # An update moving a day onto a taken date hits the unique key; the batch still commits.
+    res = client.post("/sync", json={"mutations": [
+        {"entity": "activity", "id": results[4]["id"], "base_version": 1, "fields": {"date": "2030-01-07"}},
+        {"entity": "lead", "fields": {"first_name": "Ann", "last_name": "Lee"}},
+    ]}).json["results"]
+    assert [r["status"] for r in res] == ["conflict", "applied"]
+    assert res[0]["server"]["doors_knocked"] == 40
+    assert Lead.query.count() == 1
+    assert db.session.get(DailyActivity, results[4]["id"]).date == date(2030, 1, 8)
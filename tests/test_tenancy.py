@@ -0,0 +1,60 @@
+# File: tests/test_tenancy.py
+import pytest
+from sqlalchemy import inspect
+
+from app import create_app, db, tenancy
+from app.models import Lead, User
+from config import Config, basedir
+
+
+@pytest.fixture
+def tenant_app(tmp_path, monkeypatch):
+    monkeypatch.chdir(basedir)   # Flask-Migrate looks for ./migrations
+    cfg = type("TenantConfig", (Config,), dict(
+        SQLALCHEMY_DATABASE_URI="sqlite://", TESTING=True, WTF_CSRF_ENABLED=False,
+        TENANTS=["acme", "summit"], TENANT_SQLITE_FOLDER=str(tmp_path),
+    ))
+    app = create_app(cfg)
+    result = app.test_cli_runner().invoke(args=["tenants", "upgrade"])
+    assert result.exit_code == 0, result.output
+    yield app
+    with app.app_context():
+        for engine in db.engines.values():
+            engine.dispose()
+
+
+def _signup(client, tenant, name):
+    headers = {"X-Tenant": tenant}
+    client.post("/register", headers=headers, data={
+        "username": name, "email": f"{name}@example.com", "password": "pw", "password2": "pw"})
+    client.post("/login", headers=headers, data={"username": name, "password": "pw"})
+    return headers
+
+
+def test_upgrade_migrates_every_tenant_file(tenant_app, tmp_path):
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["acme.db", "summit.db"]
+    with tenant_app.app_context():
+        for name in ("acme", "summit"):
+            assert "lead" in inspect(tenancy.engine(name)).get_table_names()
+
+
+def test_requests_are_routed_to_their_tenant_database(tenant_app):
+    client = tenant_app.test_client()
+    headers = _signup(client, "acme", "alice")
+    rv = client.post("/add_lead", headers=headers, data={"first_name": "Ann", "last_name": "Lee", "status": "New"})
+    assert rv.status_code == 302
+
+    with tenant_app.app_context():
+        tenancy.activate("acme")
+        assert [l.first_name for l in Lead.query.all()] == ["Ann"]
+        tenancy.activate("summit")
+        assert Lead.query.count() == 0 and User.query.count() == 0
+
+
+def test_login_does_not_carry_over_to_another_tenant(tenant_app):
+    client = tenant_app.test_client()
+    _signup(client, "acme", "alice")
+    assert client.get("/index", headers={"X-Tenant": "acme"}).status_code == 200
+    # Same cookie, other company: user id 1 there is somebody else (or nobody).
+    assert client.get("/index", headers={"X-Tenant": "summit"}).status_code == 302
+    assert client.get("/index", headers={"X-Tenant": "nope"}).status_code == 404
@@ -0,0 +1,165 @@
+# File: tests/test_webhooks.py
+import json
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from app import create_app, db
+from app.models import User, Lead, Deal, OutboxEvent, WebhookDelivery
+from app.services import jobs, webhooks
+from config import Config
+
+
+@pytest.fixture
+def app(tmp_path):
+    """A file database: the dispatcher's threads each need their own connection."""
+    cfg = type("WebhookConfig", (Config,), dict(
+        SQLALCHEMY_DATABASE_URI=f"sqlite:///{tmp_path / 'app.db'}", TESTING=True, WTF_CSRF_ENABLED=False,
+        CACHE_BACKEND="memory"))
+    app = create_app(cfg)
+    yield app
+    with app.app_context():
+        db.engine.dispose()
+
+
+class Stub(BaseHTTPRequestHandler):
+    """Records each POST; answers with the server's next scripted status (200 when out)."""
+
+    def do_POST(self):
+        srv = self.server
+        body = self.rfile.read(int(self.headers["Content-Length"]))
+        with srv.lock:
+            srv.active += 1
+            srv.peak = max(srv.peak, srv.active)
+            status = srv.script.pop(0) if srv.script else 200
+        time.sleep(srv.delay)
+        with srv.lock:
+            srv.active -= 1
+            srv.received.append((dict(self.headers), json.loads(body), body))
+        self.send_response(status)
+        if status == 503:
+            self.send_header("Retry-After", "0")
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+
+@contextmanager
+def stub(script=(), delay=0.0):
+    srv = ThreadingHTTPServer(("127.0.0.1", 0), Stub)
+    srv.script, srv.delay, srv.received = list(script), delay, []
+    srv.lock, srv.active, srv.peak = threading.Lock(), 0, 0
+    threading.Thread(target=srv.serve_forever, daemon=True).start()
+    try:
+        yield srv
+    finally:
+        srv.shutdown()
+        srv.server_close()
+
+
+def _url(srv):
+    return f"http://127.0.0.1:{srv.server_address[1]}/hook"
+
+
+def _rep():
+    rep = User(username="rep", email="rep@example.com")
+    db.session.add(rep)
+    db.session.commit()
+    return rep
+
+
+def _dispatch(app):
+    app.config.update(WEBHOOK_RETRY_BACKOFF=0, WEBHOOK_POLL_INTERVAL=0.01)
+    webhooks.Dispatcher(app).run(burst=True)
+
+
+def test_events_are_written_with_the_change_for_subscribed_endpoints(app_ctx):
+    app_ctx.config["WEBHOOK_ENDPOINTS"] = {"crm": {"url": "http://crm", "events": ["lead.created"]},
+                                           "books": {"url": "http://books", "events": ["deal.completed"]}}
+    rep = _rep()
+    db.session.add(Lead(first_name="Gone", last_name="X", user_id=rep.id))
+    db.session.flush()
+    db.session.rollback()
+    assert OutboxEvent.query.count() == 0 and WebhookDelivery.query.count() == 0
+
+    lead = Lead(first_name="A", last_name="B", user_id=rep.id)
+    deal = Deal(status="Signed", contract_price=20000, commission_rate=10, commission_base="revenue")
+    lead.deals.append(deal)
+    db.session.add(lead)
+    db.session.commit()
+    deal.status = "Completed"
+    db.session.commit()
+    deal.contract_price = 21000   # no status change, no event
+    db.session.commit()
+
+    events = OutboxEvent.query.order_by(OutboxEvent.id).all()
+    assert [e.kind for e in events] == ["lead.created", "deal.completed"]
+    done = json.loads(events[1].payload)
+    assert done["from_status"] == "Signed" and done["commission"] == {"plan": "default", "amount": 2000.0, "others": []}
+    assert [(d.endpoint, d.event_id) for d in WebhookDelivery.query.order_by(WebhookDelivery.id)] == \
+        [("crm", events[0].id), ("books", events[1].id)]
+
+
+def test_imported_leads_get_lead_created_events(app_ctx):
+    app_ctx.config["WEBHOOK_ENDPOINTS"] = {"crm": {"url": "http://crm", "events": ["lead.created"]},
+                                           "all": {"url": "http://all"}}
+    rep = _rep()
+    rows = "".join(f"Ann{i},Lee,New\n" for i in range(7))
+    job = jobs.enqueue("import_leads", {"user_id": rep.id, "csv": "first_name,last_name,status\n" + rows})
+    db.session.commit()
+    assert jobs.TASKS["import_leads"].fn(jobs.JobContext(job.id, json.loads(job.payload)))["imported"] == 7
+
+    events = OutboxEvent.query.order_by(OutboxEvent.id).all()
+    assert [e.kind for e in events] == ["lead.created"] * 7
+    leads = Lead.query.order_by(Lead.id).all()
+    assert [json.loads(e.payload)["id"] for e in events] == [l.id for l in leads]
+    assert json.loads(events[0].payload)["first_name"] == "Ann0" and events[0].user_id == rep.id
+    assert WebhookDelivery.query.count() == 14
+
+
+def test_dispatcher_posts_signed_batches_and_retries(app_ctx):
+    rep = _rep()
+    with stub(script=[503, 500]) as srv:
+        app_ctx.config["WEBHOOK_ENDPOINTS"] = {"crm": {"url": _url(srv), "secret": "s3cret",
+                                                       "batch_size": 2, "concurrency": 1}}
+        for i in range(5):
+            db.session.add(Lead(first_name=f"L{i}", last_name="X", user_id=rep.id))
+            db.session.commit()
+        _dispatch(app_ctx)
+
+    batches = [payload for _, payload, _ in srv.received]
+    assert [len(b["events"]) for b in batches] == [2, 2, 2, 2, 1]     # two failed attempts, then 3 batches
+    assert [e["data"]["first_name"] for b in batches[2:] for e in b["events"]] == [f"L{i}" for i in range(5)]
+    headers, _, body = srv.received[-1]
+    assert headers["X-Webhook-Signature"] == webhooks.sign("s3cret", headers["X-Webhook-Timestamp"], body)
+    rows = WebhookDelivery.query.all()
+    assert {d.status for d in rows} == {"delivered"} and max(d.attempts for d in rows) == 3
+
+
+def test_concurrency_limit_dead_letters_and_replay(app_ctx):
+    rep = _rep()
+    with stub(delay=0.1) as fast, stub(script=[400]) as broken:
+        app_ctx.config.update(WEBHOOK_MAX_ATTEMPTS=2, WEBHOOK_ENDPOINTS={
+            "crm": {"url": _url(fast), "batch_size": 1, "concurrency": 2, "events": ["lead.created"]},
+            "books": {"url": _url(broken), "events": ["lead.created"]}})
+        for i in range(6):
+            db.session.add(Lead(first_name=f"L{i}", last_name="X", user_id=rep.id))
+        db.session.commit()
+        _dispatch(app_ctx)
+        assert len(fast.received) == 6 and fast.peak == 2
+        dead = WebhookDelivery.query.filter_by(endpoint="books").all()
+        assert len(broken.received) == 1                                   # a 400 isn't retried
+        assert {d.status for d in dead} == {"dead"} and dead[0].error == "HTTP 400"
+
+        assert webhooks.replay("books") == 6
+        db.session.commit()
+        _dispatch(app_ctx)
+        assert len(broken.received) == 2 and len(broken.received[1][1]["events"]) == 6
+    assert WebhookDelivery.query.filter(WebhookDelivery.status != "delivered").count() == 0
+
+    assert webhooks.prune(days=-1) == {"deliveries": 12, "events": 6}